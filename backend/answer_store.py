@@ -0,0 +1,261 @@
+"""
+Precomputed answers for canonical questions, keyed by index version.
+
+The chat UI's quick prompts and "explain <control>" questions for CROSSMAP
+controls make up much of the traffic, and each was answered live by the LLM.
+An offline job answers a configurable set of canonical questions
+(data/canonical_questions.json, per persona in agents.AGENTS) against the
+live index and stores the answers with their sources:
+
+    index_kms/answers/<index version>.json
+
+Orchestrator.route_and_chat serves a question from the store when its
+normalised text (case, punctuation, articles ignored) matches a canonical
+question or one of its aliases, and the store belongs to the index version
+being served. Follow-ups (non-empty history) and shard-filtered questions
+are always answered live.
+
+Usage:
+    python answer_store.py refresh           # regenerate if the index or question set changed
+    python answer_store.py refresh --force   # regenerate unconditionally
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from index_store import INDEX_ROOT, current_version, list_versions
+
+logger = logging.getLogger(__name__)
+
+# Serve precomputed answers from route_and_chat (false = always answer live)
+PRECOMPUTED_ANSWERS = os.environ.get("PRECOMPUTED_ANSWERS", "true").lower() == "true"
+CANONICAL_QUESTIONS_PATH = os.path.join(os.path.dirname(__file__), "data", "canonical_questions.json")
+ANSWERS_DIR = "answers"
+STORE_FORMAT = 1
+
+_FILLER = {"a", "an", "the", "please"}
+_PUNCTUATION = re.compile(r"[^\w\s\-()]")
+
+
+def normalize_question(text: str) -> str:
+    """Lower-case, strip punctuation (keeping control IDs like ac-2(1)) and articles."""
+    text = _PUNCTUATION.sub(" ", unicodedata.normalize("NFKC", text).lower())
+    return " ".join(t for t in text.split() if t not in _FILLER)
+
+
+def load_questions(path: str = CANONICAL_QUESTIONS_PATH) -> Dict[str, Any]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def canonical_questions(config: Dict[str, Any]) -> Iterator[Tuple[str, str, List[str]]]:
+    """Yield (agent id, question, alias phrasings) for every configured question."""
+    for agent_id, questions in config.get("questions", {}).items():
+        for question in questions:
+            yield agent_id, question, []
+    cards = config.get("control_cards")
+    if cards:
+        from crossmap import CROSSMAP
+
+        for control in CROSSMAP:
+            fields = {"nist_id": control["nist_id"], "nist_title": control["nist_title"]}
+            yield (
+                cards["agent"],
+                cards["question"].format(**fields),
+                [alias.format(**fields) for alias in cards.get("aliases", [])],
+            )
+
+
+def _config_sha256(config: Dict[str, Any]) -> str:
+    """Hash of the generated question list: changes with the config and with the crossmap controls."""
+    questions = list(canonical_questions(config))
+    return hashlib.sha256(json.dumps(questions).encode("utf-8")).hexdigest()
+
+
+def store_path(version: str, root: str = INDEX_ROOT) -> str:
+    return os.path.join(root, ANSWERS_DIR, f"{version}.json")
+
+
+def read_store(version: str, root: str = INDEX_ROOT) -> Optional[Dict[str, Any]]:
+    path = store_path(version, root)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, encoding="utf-8") as f:
+            store = json.load(f)
+    except (OSError, ValueError):
+        logger.warning("Ignoring unreadable answer store at %s", path)
+        return None
+    return store if store.get("format") == STORE_FORMAT else None
+
+
+def _write_store(store: Dict[str, Any], version: str, root: str) -> str:
+    path = store_path(version, root)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(store, f, indent=2)
+    os.replace(path + ".tmp", path)
+    return path
+
+
+def prune_stores(root: str = INDEX_ROOT) -> List[str]:
+    """Delete stores of index versions that no longer exist; returns the removed versions."""
+    answers_dir = os.path.join(root, ANSWERS_DIR)
+    if not os.path.isdir(answers_dir):
+        return []
+    alive = set(list_versions(root)) | {current_version(root)}
+    removed = []
+    for name in sorted(os.listdir(answers_dir)):
+        version, ext = os.path.splitext(name)
+        if ext == ".json" and version not in alive:
+            os.remove(os.path.join(answers_dir, name))
+            removed.append(version)
+    return removed
+
+
+class AnswerStore:
+    """Read side used by the Orchestrator: one store in memory, for the served index version."""
+
+    def __init__(self, root: str = INDEX_ROOT, enabled: bool = PRECOMPUTED_ANSWERS):
+        self.root = root
+        self.enabled = enabled
+        self._version: Optional[str] = None
+        self._store: Optional[Dict[str, Any]] = None
+        self._mtime: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _load(self, version: str) -> Optional[Dict[str, Any]]:
+        path = store_path(version, self.root)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            mtime = None
+        with self._lock:
+            # Reload when the served version changes or a refresh rewrote the file
+            if version != self._version or mtime != self._mtime:
+                self._store = read_store(version, self.root) if mtime is not None else None
+                self._version, self._mtime = version, mtime
+            return self._store
+
+    def lookup(self, question: str, version: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Precomputed response for question on index `version`, or None."""
+        if not self.enabled or not isinstance(version, str):
+            return None
+        store = self._load(version)
+        if not store:
+            return None
+        key = normalize_question(question)
+        entry = store["entries"].get(store["aliases"].get(key, key))
+        if entry is None:
+            return None
+        return {
+            "answer": entry["answer"],
+            "sources": [dict(s) for s in entry["sources"]],
+            "agent_name": entry["agent_name"],
+            "agent_id": entry["agent_id"],
+            "precomputed": True,
+        }
+
+
+def refresh(orchestrator=None, force: bool = False, root: Optional[str] = None,
+            questions_path: str = CANONICAL_QUESTIONS_PATH) -> Dict[str, Any]:
+    """Answer every canonical question against the live index and save the store.
+
+    Skipped (returns status "unchanged") when a store for the live version
+    was already built from the same question set (including the control cards
+    generated from the crossmap), unless force=True.
+    Questions the engine declines (no sources: empty or off-topic) are not stored.
+    """
+    from agents import AGENTS, Orchestrator
+
+    orchestrator = orchestrator or Orchestrator()
+    engine = orchestrator.rag_engine
+    root = root or engine.index_path
+    try:
+        engine._load_vector_store()
+    except FileNotFoundError:
+        return {"status": "no_index", "message": "No index to answer from. Run ingestion first."}
+    version = engine.index_version
+
+    config = load_questions(questions_path)
+    config_sha256 = _config_sha256(config)
+    existing = read_store(version, root)
+    if existing and existing.get("config_sha256") == config_sha256 and not force:
+        logger.info("Answer store for index version %s is up to date.", version)
+        return {"status": "unchanged", "index_version": version, "entries": len(existing["entries"])}
+
+    started = time.perf_counter()
+    entries: Dict[str, Dict[str, Any]] = {}
+    aliases: Dict[str, str] = {}
+    skipped, failed = [], []
+    for agent_id, question, alias_questions in canonical_questions(config):
+        key = normalize_question(question)
+        if key in entries:
+            continue
+        agent = AGENTS[agent_id]
+        try:
+            response = engine.chat(question=question, system_prompt_override=agent["prompt"])
+        except Exception as e:
+            logger.warning("  - Failed to answer %r: %s", question, e)
+            failed.append(question)
+            continue
+        if not response.get("sources"):
+            skipped.append(question)
+            continue
+        entries[key] = {
+            "question": question,
+            "agent_id": agent_id,
+            "agent_name": agent["name"],
+            "answer": response["answer"],
+            "sources": response["sources"],
+        }
+        for alias in alias_questions:
+            aliases.setdefault(normalize_question(alias), key)
+        logger.info("  - [%s] %s", agent_id, question)
+
+    store = {
+        "format": STORE_FORMAT,
+        "index_version": version,
+        "config_sha256": config_sha256,
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "entries": entries,
+        "aliases": {alias: key for alias, key in aliases.items() if alias not in entries},
+    }
+    path = _write_store(store, version, root)
+    pruned = prune_stores(root)
+    elapsed = round(time.perf_counter() - started, 2)
+    logger.info(
+        "Answer store for index version %s: %d answers (%d skipped, %d failed) in %.1fs -> %s",
+        version, len(entries), len(skipped), len(failed), elapsed, path,
+    )
+    return {
+        "status": "success",
+        "index_version": version,
+        "entries": len(entries),
+        "aliases": len(store["aliases"]),
+        "skipped": skipped,
+        "failed": failed,
+        "pruned_versions": pruned,
+        "elapsed_seconds": elapsed,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute answers to canonical questions for the live index.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    refresh_cmd = sub.add_parser("refresh", help="Regenerate answers if the index or question set changed")
+    refresh_cmd.add_argument("--force", action="store_true", help="Regenerate even if the store is up to date")
+    refresh_cmd.add_argument("--questions", default=CANONICAL_QUESTIONS_PATH, help="Canonical questions JSON")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    result = refresh(force=args.force, questions_path=args.questions)
+    print(json.dumps(result, indent=2))
@@ -1,23 +1,56 @@
 import logging
+from datetime import date, datetime, timedelta, timezone
 from functools import wraps
-from flask import Flask, request, jsonify, Response
-from flask_cors import CORS
-from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
 import os
-from dotenv import load_dotenv
+from startup import WARMUP_ON_START, StartupTracker
+
+# Per-process import/warm-up timings, served by /api/ready
+startup = StartupTracker()
+
+with startup.timed_import("flask"):
+    from flask import Flask, request, jsonify, Response
+    from flask_cors import CORS
+    from flask_limiter import Limiter
+    from flask_limiter.util import get_remote_address
+    from dotenv import load_dotenv
 
 logger = logging.getLogger(__name__)
 
-from agents import Orchestrator
-from ingest import ingest_documents
-from visitor_tracker import track_visit, get_visitor_counts, check_db_health
-from rag_engine import get_llm_backend_name
-from crossmap import get_crossmap, get_families, get_stats, generate_sankey_csv
+# Heavy libraries (LangChain, LLM clients, FAISS) are imported on first use or by warm-up
+with startup.timed_import("agents"):
+    from agents import Orchestrator
+with startup.timed_import("ingest_jobs"):
+    from ingest_jobs import IngestJobConflict, cancel_job, get_job, start_job
+with startup.timed_import("visitor_tracker"):
+    from visitor_tracker import (
+        track_visit, get_visitor_counts, check_db_health, init_db, pool_stats, buffer_stats,
+        get_daily_stats, get_recent_stats,
+    )
+with startup.timed_import("rag_engine"):
+    from rag_engine import check_llm_backend, get_llm_backend_name
+with startup.timed_import("health"):
+    from health import HEALTH_CHECK_LLM, HEALTH_LLM_CHECK_INTERVAL, HEALTH_LLM_TIMEOUT, HealthMonitor
+with startup.timed_import("sharded_index"):
+    from sharded_index import UnknownShardError
+with startup.timed_import("crossmap"):
+    from crossmap import (
+        DATA_VERSION, FRAMEWORKS, get_crossmap, get_families, get_stats, generate_sankey_csv,
+        get_reverse_mapping, get_target_controls, get_coverage, search_controls,
+    )
+with startup.timed_import("graph_export"):
+    from graph_export import FORMATS as GRAPH_FORMATS, export as export_graph, normalize_frameworks
+with startup.timed_import("response_cache"):
+    from response_cache import (
+        ENCODINGS, RESPONSE_CACHE_MAX_AGE, RESPONSE_COMPRESS_MIN_BYTES, CachedResponse, ResponseCache, compress,
+    )
+with startup.timed_import("json_provider"):
+    from json_provider import FastJSONProvider
 
 load_dotenv()
 
 app = Flask(__name__)
+# orjson-backed jsonify (stdlib fallback), same output contract as Flask's default provider
+app.json = FastJSONProvider(app)
 
 # CORS: use env var or default to localhost dev origins
 cors_origins = os.environ.get("CORS_ORIGINS", "http://localhost:5173,http://localhost:5050")
@@ -39,8 +72,16 @@ limiter = Limiter(
 def ratelimit_handler(e):
     return jsonify({"error": "Rate limit exceeded. Please try again later.", "retry_after": e.description}), 429
 
-# Initialize Orchestrator
+# Initialize Orchestrator (cheap: clients and the index are built by warm-up or on first use)
 orchestrator = Orchestrator()
+# Visitor table is created once per worker, not before every query
+with startup.phase("visitor_db_init"):
+    init_db()
+startup.serving()
+if WARMUP_ON_START:
+    startup.start_warmup(orchestrator)
+else:
+    startup.skip_warmup()
 
 
 # --- API Key Authentication ---
@@ -68,27 +109,83 @@ def track_visitor():
         track_visit(ip_address=ip, user_agent=ua, path=request.path)
 
 
-@app.route('/api/health', methods=['GET'])
-def health_check():
-    db_ok = check_db_health()
-    faiss_ok = os.path.exists(orchestrator.rag_engine.index_path)
+# Text bodies worth compressing on the fly (chat answers, JSON lists, CSV)
+_COMPRESSIBLE_MIMETYPES = ("application/json", "text/csv", "text/plain", "text/html", "application/xml")
 
-    if db_ok and faiss_ok:
-        status = "healthy"
-        code = 200
-    else:
-        status = "degraded"
-        code = 200  # still 200 so load balancers don't kill the service
 
+@app.after_request
+def compress_response(response):
+    """gzip/brotli-encode uncached 200 bodies above RESPONSE_COMPRESS_MIN_BYTES for clients that accept it.
+    Streamed bodies and responses already negotiated by response_cache are left as they are.
+    """
+    if (
+        response.status_code != 200
+        or response.is_streamed
+        or response.direct_passthrough
+        or "Content-Encoding" in response.headers
+        or "Accept-Encoding" in response.vary
+        or response.mimetype not in _COMPRESSIBLE_MIMETYPES
+    ):
+        return response
+    body = response.get_data()
+    if len(body) < RESPONSE_COMPRESS_MIN_BYTES:
+        return response
+    response.vary.add("Accept-Encoding")
+    for encoding in ENCODINGS:
+        if request.accept_encodings[encoding] <= 0:
+            continue
+        data = compress(body, encoding, fast=True)
+        if data is None or len(data) >= len(body):
+            continue
+        response.set_data(data)
+        response.headers["Content-Encoding"] = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(f"{etag}-{encoding}")
+        break
+    return response
+
+
+def _index_health():
+    status = orchestrator.rag_engine.index_status()
+    return status["available"], status
+
+
+# Component checks run in the background; /api/health serves the cached results
+health = HealthMonitor()
+health.register("database", check_db_health)
+health.register("faiss_index", _index_health)
+if HEALTH_CHECK_LLM:
+    health.register(
+        "llm_backend", lambda: check_llm_backend(HEALTH_LLM_TIMEOUT),
+        interval=HEALTH_LLM_CHECK_INTERVAL, critical=False,
+    )
+
+
+@app.route('/api/health', methods=['GET'])
+def health_check():
+    """Cached component status (database, index, LLM backend) with each check's latency and age.
+    Always 200 ("degraded" when a critical check fails) so load balancers don't kill the service.
+    """
+    snapshot = health.snapshot()
     return jsonify({
-        "status": status,
+        "status": snapshot["status"],
         "service": "nist-chatbot-orchestrator",
         "llm_backend": get_llm_backend_name(),
-        "checks": {
-            "database": "ok" if db_ok else "unavailable",
-            "faiss_index": "ok" if faiss_ok else "missing",
-        },
-    }), code
+        "checks": snapshot["checks"],
+        "database_pool": pool_stats(),
+        "visitor_buffer": buffer_stats(),
+        "response_cache": response_cache.stats(),
+    }), 200
+
+
+@app.route('/api/ready', methods=['GET'])
+def readiness():
+    """Readiness probe: 503 until the startup warm-up (index load, embed, search) has finished.
+    Includes the import-time and startup-phase breakdown of this worker.
+    """
+    report = startup.report()
+    return jsonify(report), 200 if report["ready"] else 503
 
 
 @app.route('/api/chat', methods=['POST'])
@@ -101,13 +198,19 @@ def chat():
 
     question = data.get('message')
     history = data.get('history', [])
+    # Optional: restrict retrieval to these index shards (see /api/shards)
+    shards = data.get('shards')
 
     if not question:
         return jsonify({"error": "Message is required"}), 400
+    if shards is not None and (not isinstance(shards, list) or not all(isinstance(s, str) for s in shards)):
+        return jsonify({"error": "shards must be a list of shard names"}), 400
 
     try:
-        response = orchestrator.route_and_chat(question, history)
+        response = orchestrator.route_and_chat(question, history, shards=shards or None)
         return jsonify(response)
+    except UnknownShardError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         logger.warning("Error processing chat: %s", e)
         return jsonify({"error": str(e)}), 500
@@ -117,15 +220,53 @@ def chat():
 @limiter.limit("5/minute")
 @require_api_key
 def run_ingest():
-    """Triggers the ingestion process for documents in the docs/ folder."""
+    """Starts a background ingestion job for documents in the docs/ folder.
+    Body (optional): {"rebuild": true} to re-embed every chunk.
+    Returns 202 with the job id; poll /api/ingest/<job_id> for progress.
+    """
     if os.environ.get("DISABLE_INGEST", "").lower() == "true":
         return jsonify({"error": "Ingestion is disabled in production."}), 403
+    data = request.get_json(silent=True) or {}
     try:
-        stats = ingest_documents()
-        return jsonify({"status": "success", "stats": stats}), 200
+        job = start_job(rebuild=bool(data.get("rebuild", False)))
+    except IngestJobConflict as e:
+        return jsonify({"error": "An ingestion job is already running.", "job_id": e.job_id}), 409
     except Exception as e:
-        logger.warning("Error during ingestion: %s", e)
+        logger.warning("Error starting ingestion: %s", e)
         return jsonify({"error": str(e)}), 500
+    status_url = f"/api/ingest/{job['job_id']}"
+    return jsonify({"job_id": job["job_id"], "status": job["status"], "status_url": status_url}), 202, {
+        "Location": status_url,
+    }
+
+
+@app.route('/api/ingest/<job_id>', methods=['GET'])
+@require_api_key
+def ingest_status(job_id):
+    """Return status and progress (files parsed, chunks embedded, throughput, ETA) of an ingestion job."""
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown ingestion job."}), 404
+    return jsonify(job), 200
+
+
+@app.route('/api/ingest/<job_id>', methods=['DELETE'])
+@require_api_key
+def cancel_ingest(job_id):
+    """Cancel a running ingestion job. The live index is left unchanged."""
+    job = cancel_job(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown ingestion job."}), 404
+    if not job.get("cancel_requested"):
+        return jsonify({"error": f"Ingestion job already {job['status']}.", "job": job}), 409
+    return jsonify(job), 202
+
+
+@app.route('/api/shards', methods=['GET'])
+def index_shards():
+    """Return the index shards (one per source or docs/shards.json group) and their vector counts."""
+    sizes = orchestrator.rag_engine.shard_sizes()
+    return jsonify({"shards": sizes, "count": len(sizes)}), 200
 
 
 @app.route('/api/visitors/count', methods=['GET'])
@@ -138,9 +279,90 @@ def visitor_count():
         return jsonify({"error": str(e)}), 500
 
 
+@app.route('/api/visitors/stats', methods=['GET'])
+def visitor_stats():
+    """Visitor statistics for a time range.
+    Query params: hours (last N hours, exact, from raw events) or
+    from/to (YYYY-MM-DD inclusive, per-day rollups; default: the last 30 days)
+    """
+    try:
+        if request.args.get('hours'):
+            return jsonify(get_recent_stats(int(request.args['hours']))), 200
+        today = datetime.now(timezone.utc).date()
+        end = date.fromisoformat(request.args['to']) if request.args.get('to') else today
+        start = date.fromisoformat(request.args['from']) if request.args.get('from') else end - timedelta(days=29)
+        return jsonify(get_daily_stats(start, end)), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.exception("Visitor stats query failed")
+        return jsonify({"error": str(e)}), 500
+
+
 # --- Cross-Mapping Endpoints ---
 
+# Finished crossmap responses (plus gzip/brotli copies), keyed by endpoint, query and data version
+response_cache = ResponseCache()
+
+
+def _crossmap_params(args):
+    """Query params of /api/crossmap reduced to what get_crossmap actually distinguishes."""
+    family, nist_id, framework = args.get('family'), args.get('nist_id'), args.get('framework')
+    return (
+        family.lower() if family else None,
+        nist_id.strip().upper() if nist_id else None,
+        framework if framework in FRAMEWORKS else None,
+    )
+
+
+def _control_list(args, name):
+    """Repeatable and/or comma-separated query param as a list of stripped, non-empty values."""
+    return [c.strip() for value in args.getlist(name) for c in value.split(',') if c.strip()]
+
+
+def _serve_cached(entry):
+    """Smallest accepted encoding of a cached entry, or 304 when the client already has it."""
+    encoding, body = entry.select(e for e in ENCODINGS if request.accept_encodings[e] > 0)
+    headers = {
+        **entry.headers,
+        "Vary": "Accept-Encoding",
+        "Cache-Control": f"public, max-age={RESPONSE_CACHE_MAX_AGE}",
+    }
+    if any(request.if_none_match.contains_weak(tag) for tag in entry.etags):
+        response = Response(status=304, headers=headers)
+    else:
+        response = Response(body, content_type=entry.content_type, headers=headers)
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+    response.set_etag(entry.etag_for(encoding))
+    return response
+
+
+def cached_response(params=None):
+    """Decorator: serve the view's 200 response from response_cache until the crossmap data changes.
+    `params` maps request.args to the normalized part of the cache key (query ignored if None).
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            key = (
+                request.endpoint, tuple(sorted(kwargs.items())),
+                params(request.args) if params else None, DATA_VERSION,
+            )
+            entry = response_cache.get(key)
+            if entry is None:
+                response = app.make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                headers = {k: v for k, v in response.headers.items() if k == "Content-Disposition"}
+                entry = response_cache.put(key, CachedResponse(response.get_data(), response.content_type, headers))
+            return _serve_cached(entry)
+        return decorated
+    return decorator
+
+
 @app.route('/api/crossmap', methods=['GET'])
+@cached_response(_crossmap_params)
 def crossmap():
     """Return NIST 800-53 cross-mapping to ISO 27001, CSF 2.0, ISO 27005.
     Query params: family, nist_id, framework
@@ -154,21 +376,97 @@ def crossmap():
 
 
 @app.route('/api/crossmap/families', methods=['GET'])
+@cached_response()
 def crossmap_families():
     """Return available NIST control families in the mapping."""
     return jsonify({"families": get_families()}), 200
 
 
 @app.route('/api/crossmap/stats', methods=['GET'])
+@cached_response()
 def crossmap_stats():
     """Return summary statistics about cross-mapping coverage."""
     return jsonify(get_stats()), 200
 
 
+@app.route('/api/crossmap/reverse', methods=['GET'])
+def crossmap_reverse():
+    """Return the NIST controls mapped to target-framework controls.
+    Query params: control (repeatable or comma-separated, e.g. A.8.15,DE.CM-09),
+    framework (optional; inferred from each control ID's shape)
+    """
+    controls = _control_list(request.args, 'control')
+    if not controls:
+        return jsonify({"error": "control is required"}), 400
+    framework = request.args.get('framework')
+    results, not_found = [], []
+    try:
+        for control in controls:
+            mapping = get_reverse_mapping(control, framework)
+            if mapping is None:
+                not_found.append(control.strip().upper())
+            else:
+                results.append(mapping)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"results": results, "not_found": not_found}), 200 if results else 404
+
+
+@app.route('/api/crossmap/targets/<framework>', methods=['GET'])
+@cached_response()
+def crossmap_targets(framework):
+    """Return every mapped control of a target framework (iso27001, csf2, iso27005) with its NIST count."""
+    try:
+        controls = get_target_controls(framework)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"framework": framework, "controls": controls, "count": len(controls)}), 200
+
+
+# Not in response_cache: the key space is free-form control lists, and each entry would be
+# compressed at the maximum level on the request thread. compress_response handles it instead.
+@app.route('/api/crossmap/coverage', methods=['GET'])
+def crossmap_coverage():
+    """Coverage and gap analysis from a set of implemented controls.
+    Query params: framework (nist, iso27001, csf2, iso27005), control (repeatable or comma-separated),
+    target (optional, repeatable; default all other frameworks), mode (any | all; default any)
+    """
+    framework = request.args.get('framework')
+    controls = _control_list(request.args, 'control')
+    if not framework or not controls:
+        return jsonify({"error": "framework and control are required"}), 400
+    targets = _control_list(request.args, 'target') or None
+    try:
+        return jsonify(get_coverage(framework, controls, targets, request.args.get('mode', 'any'))), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+
+@app.route('/api/crossmap/search', methods=['GET'])
+def crossmap_search():
+    """Typeahead search over NIST and mapped ISO/CSF control IDs and titles.
+    Query params: q (e.g. "acc man", "a.8.1"), limit (default 10, max 50), kind (nist, iso27001, csf2, iso27005)
+    """
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({"error": "q is required"}), 400
+    try:
+        results = search_controls(query, int(request.args.get('limit', 10)), request.args.get('kind') or None)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"query": query, "results": results, "count": len(results)}), 200
+
+
 @app.route('/api/crossmap/sankey', methods=['GET'])
+@cached_response(lambda args: args.get('level', 'control'))
 def crossmap_sankey():
-    """Return Sankey diagram CSV (source,target,value) for download."""
-    csv_data = generate_sankey_csv()
+    """Return Sankey diagram CSV (source,target,value) for download.
+    Query params: level (control, family, framework; default control)
+    """
+    try:
+        csv_data = generate_sankey_csv(request.args.get('level', 'control'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     return Response(
         csv_data,
         mimetype='text/csv',
@@ -176,6 +474,51 @@ def crossmap_sankey():
     )
 
 
+@app.route('/api/crossmap/graph', methods=['GET'])
+def crossmap_graph():
+    """Stream the crossmap as a weighted graph.
+    Query params: level (control, family, framework), format (csv, json, graphml),
+    framework (optional, repeatable target framework filter)
+    """
+    level = request.args.get('level', 'control')
+    fmt = request.args.get('format', 'csv')
+    try:
+        # Repeated frameworks collapse to one key (and one set of weights)
+        frameworks = normalize_frameworks(_control_list(request.args, 'framework'))
+        chunks = export_graph(level, fmt, frameworks)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    # The graph only changes with the data: revalidate by version instead of re-streaming.
+    # (make_conditional would buffer the whole stream to compute Content-Length.)
+    etag = f"{DATA_VERSION}-{level}-{fmt}-{'+'.join(frameworks)}"
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        response = Response(
+            chunks,
+            mimetype=GRAPH_FORMATS[fmt],
+            headers={'Content-Disposition': f'attachment; filename=nist_crossmap_{level}.{fmt}'},
+        )
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = f"public, max-age={RESPONSE_CACHE_MAX_AGE}"
+    return response
+
+
+def _precompute_crossmap_responses():
+    """Build the parameterless crossmap responses (and their compressed copies) and the search index
+    before the first request."""
+    search_controls("ac")
+    for path in ('/api/crossmap', '/api/crossmap/families', '/api/crossmap/stats', '/api/crossmap/sankey',
+                 *(f'/api/crossmap/targets/{fw}' for fw in FRAMEWORKS)):
+        with app.test_request_context(path):
+            app.dispatch_request()
+
+
+if WARMUP_ON_START:
+    with startup.phase("crossmap_response_cache"):
+        _precompute_crossmap_responses()
+
+
 if __name__ == '__main__':
     port = int(os.environ.get('FLASK_PORT', os.environ.get('PORT', 5050)))
     debug = os.environ.get('FLASK_DEBUG', 'false').lower() == 'true'
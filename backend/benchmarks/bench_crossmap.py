@@ -0,0 +1,169 @@
+"""
+Crossmap load time and memory at full Rev.5 catalog scale.
+
+The repository ships the ~30-control starter mapping, so this generates a
+synthetic catalog with the shape of the real one: 20 families, ~300 base
+controls with three enhancements each (~1,200 entries), written as OSCAL JSON plus a
+mappings.csv with 1-3 targets per framework per control. It then measures:
+
+  - parse:       OSCAL JSON + CSV -> CrossmapStore (cold start, no cache)
+  - cache_load:  binary cache -> CrossmapStore (normal start)
+  - index_build: CrossmapIndex over the store
+  - coverage:    CoverageEngine build, and one ISO 27001 -> NIST -> CSF/ISO 27005
+                 gap analysis with half of the ISO controls implemented
+  - search:      SearchIndex build, and p50/p99 latency of typeahead queries
+                 (every prefix of a set of typical queries, query cache bypassed)
+  - memory:      store vs. the same data as a list of dicts (the old layout)
+
+Usage:
+    python benchmarks/bench_crossmap.py [--controls 1190] [--repeat 5]
+"""
+
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from crossmap_store import FRAMEWORKS, CrossmapStore, build_store, source_files, sources_digest  # noqa: E402
+
+FAMILIES = [
+    ("ac", "Access Control"), ("at", "Awareness and Training"), ("au", "Audit and Accountability"),
+    ("ca", "Assessment, Authorization, and Monitoring"), ("cm", "Configuration Management"),
+    ("cp", "Contingency Planning"), ("ia", "Identification and Authentication"), ("ir", "Incident Response"),
+    ("ma", "Maintenance"), ("mp", "Media Protection"), ("pe", "Physical and Environmental Protection"),
+    ("pl", "Planning"), ("pm", "Program Management"), ("ps", "Personnel Security"),
+    ("pt", "PII Processing and Transparency"), ("ra", "Risk Assessment"), ("sa", "System and Services Acquisition"),
+    ("sc", "System and Communications Protection"), ("si", "System and Information Integrity"),
+    ("sr", "Supply Chain Risk Management"),
+]
+
+# Typed character by character in the search benchmark
+SEARCH_QUERIES = [
+    "acc man", "ac-2(1)", "si 4", "a.8.15", "de.cm-09", "pr.aa", "monitoring", "access control 12",
+    "incident response", "enhancement 3.2", "supply chain", "acount", "8.2",
+]
+
+
+def _targets(rng):
+    iso = [f"A.{g}.{n}" for g, count in ((5, 37), (6, 8), (7, 14), (8, 34)) for n in range(1, count + 1)]
+    csf = [f"{fn}.{cat}-{n:02d}" for fn, cats in (
+        ("GV", ("OC", "RM", "RR", "PO", "OV", "SC")), ("ID", ("AM", "RA", "IM")),
+        ("PR", ("AA", "AT", "DS", "PS", "IR")), ("DE", ("CM", "AE")), ("RS", ("MA", "AN", "CO", "MI")),
+        ("RC", ("RP", "CO")),
+    ) for cat in cats for n in range(1, 12)]
+    iso27005 = [f"{a}.{b}" for a in range(5, 11) for b in range(1, 6)]
+    return {"iso27001": iso, "csf2": csf, "iso27005": iso27005}
+
+
+def write_catalog(data_dir: str, n_controls: int, seed: int = 7) -> None:
+    rng = random.Random(seed)
+    per_family = max(1, round(n_controls / (len(FAMILIES) * 4)))
+    groups, ids = [], []
+    for prefix, title in FAMILIES:
+        controls = []
+        for i in range(1, per_family + 1):
+            enhancements = [{"id": f"{prefix}-{i}.{e}", "title": f"{title} enhancement {i}.{e}"} for e in range(1, 4)]
+            controls.append({"id": f"{prefix}-{i}", "title": f"{title} control {i}", "controls": enhancements})
+            ids += [f"{prefix.upper()}-{i}"] + [f"{prefix.upper()}-{i}({e})" for e in range(1, 4)]
+        groups.append({"id": prefix, "title": title, "controls": controls})
+    with open(os.path.join(data_dir, "catalog.json"), "w", encoding="utf-8") as f:
+        json.dump({"catalog": {"groups": groups}}, f)
+
+    targets = _targets(rng)
+    with open(os.path.join(data_dir, "mappings.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["nist_id", "framework", "control_id", "control_title"])
+        for nist_id in ids:
+            for fw in FRAMEWORKS:
+                for target in rng.sample(targets[fw], rng.randint(1, 3)):
+                    writer.writerow([nist_id, fw, target, f"{fw} control {target} title text"])
+
+
+def _best(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return result, round(min(times), 2)
+
+
+def _traced(fn):
+    tracemalloc.start()
+    result = fn()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--controls", type=int, default=1190)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    from crossmap import CrossmapIndex
+    from crossmap_coverage import CoverageEngine
+    from crossmap_search import SearchIndex
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        write_catalog(data_dir, args.controls)
+        files = source_files(data_dir)
+        digest = sources_digest(files)
+        cache = os.path.join(data_dir, "crossmap.bin")
+
+        store, parse_ms = _best(lambda: build_store(files, digest), args.repeat)
+        store.save(cache)
+        _, cache_ms = _best(lambda: CrossmapStore.load(cache), args.repeat)
+        _, index_ms = _best(lambda: CrossmapIndex(store), args.repeat)
+        engine, engine_ms = _best(lambda: CoverageEngine(store), args.repeat)
+        implemented = [store.target_id("iso27001", t) for t in range(0, store.target_count("iso27001"), 2)]
+
+        def analyze():
+            mask, _, _ = engine.resolve("iso27001", implemented)
+            nist = engine.nist_coverage("iso27001", mask)
+            engine.family_coverage(nist["covered"], nist["mapped"])
+            return [engine.target_coverage(fw, nist["covered"]) for fw in ("csf2", "iso27005")]
+
+        _, coverage_ms = _best(analyze, args.repeat)
+
+        search, search_build_ms = _best(lambda: SearchIndex(store), args.repeat)
+        typed = [q[:end] for q in SEARCH_QUERIES for end in range(1, len(q) + 1)]
+        latencies = []
+        for _ in range(args.repeat):
+            for query in typed:
+                start = time.perf_counter()
+                search._search(query, 10, None)
+                latencies.append((time.perf_counter() - start) * 1000)
+        latencies.sort()
+
+        _, store_bytes = _traced(lambda: CrossmapStore.load(cache))
+        _, dict_bytes = _traced(lambda: [store.entry(i) for i in range(len(store))])
+
+        print(json.dumps({
+            "controls": len(store),
+            "mappings": sum(len(store.columns[f"{fw}.targets"]) for fw in FRAMEWORKS),
+            "parse_ms": parse_ms,
+            "cache_load_ms": cache_ms,
+            "index_build_ms": index_ms,
+            "coverage_engine_build_ms": engine_ms,
+            "coverage_query_ms": coverage_ms,
+            "search_build_ms": search_build_ms,
+            "search_queries": len(latencies),
+            "search_p50_ms": round(latencies[len(latencies) // 2], 3),
+            "search_p99_ms": round(latencies[int(len(latencies) * 0.99)], 3),
+            "cache_file_kb": round(os.path.getsize(cache) / 1024, 1),
+            "store_memory_kb": round(store_bytes / 1024, 1),
+            "list_of_dicts_memory_kb": round(dict_bytes / 1024, 1),
+        }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+JSON serialization time and bytes on the wire for the main API payloads.
+
+Compares Flask's default (stdlib) JSON provider with FastJSONProvider (orjson)
+on the bodies the API actually serves. For each payload it then reports the
+body size raw and in each content-coding, together with the compression time:
+
+  - chat:              /api/chat response: a long markdown answer with five
+                       sources carrying 200-character snippets
+  - crossmap:          /api/crossmap with the shipped starter mapping
+  - crossmap_catalog:  /api/crossmap at full Rev.5 catalog scale (the synthetic
+                       catalog of bench_crossmap.py)
+
+"fast" levels are the ones compress_response uses per request
+(RESPONSE_GZIP_LEVEL / RESPONSE_BROTLI_QUALITY), "max" the ones the response
+cache uses once per body. Brotli rows are skipped when the package is not installed.
+
+Usage:
+    python benchmarks/bench_json.py [--controls 1190] [--repeat 20]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from flask import Flask  # noqa: E402
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+
+from bench_crossmap import write_catalog  # noqa: E402
+from crossmap_store import build_store, source_files, sources_digest  # noqa: E402
+from json_provider import FastJSONProvider  # noqa: E402
+from response_cache import ENCODINGS, compress  # noqa: E402
+
+
+def _best(fn, repeat):
+    """(result, best time in ms); three decimals, as the small bodies serialize in microseconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return result, round(min(times), 3)
+
+
+def chat_payload():
+    paragraph = (
+        "**AC-2 Account Management** requires organizations to define allowed account types, "
+        "assign account managers, and review accounts for compliance with account management requirements. "
+    )
+    return {
+        "answer": "\n\n".join(f"### Step {i}\n\n{paragraph * 3}\n\n- Map to **A.5.16**\n- Map to **PR.AA-01**"
+                              for i in range(1, 7)),
+        "sources": [
+            {"source": "nist_80053r5.pdf", "page": 40 + i, "score": round(0.9 - i * 0.05, 4),
+             "content_snippet": (paragraph * 2)[:200]}
+            for i in range(5)
+        ],
+        "agent_name": "NIST Controls Specialist",
+        "agent_id": "NIST_SPECIALIST",
+    }
+
+
+def crossmap_payload(entries):
+    return {"mappings": entries, "count": len(entries)}
+
+
+def _app(provider_cls):
+    app = Flask(__name__)
+    app.json = provider_cls(app)
+    return app
+
+
+def _serialize(app, payload, repeat):
+    with app.app_context():
+        return _best(lambda: app.json.response(payload).get_data(), repeat)
+
+
+def measure(payload, repeat):
+    body, stdlib_ms = _serialize(_app(DefaultJSONProvider), payload, repeat)
+    _, fast_ms = _serialize(_app(FastJSONProvider), payload, repeat)
+    result = {
+        "stdlib_ms": stdlib_ms,
+        "orjson_ms": fast_ms,
+        "speedup": round(stdlib_ms / fast_ms, 1) if fast_ms else None,
+        "raw_bytes": len(body),
+    }
+    for encoding in reversed(ENCODINGS):
+        for level, fast in (("fast", True), ("max", False)):
+            data, ms = _best(lambda: compress(body, encoding, fast=fast), repeat)
+            if data is None:
+                continue
+            result[f"{encoding}_{level}_bytes"] = len(data)
+            result[f"{encoding}_{level}_ms"] = ms
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--controls", type=int, default=1190)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    from crossmap import get_crossmap
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        write_catalog(data_dir, args.controls)
+        files = source_files(data_dir)
+        store = build_store(files, sources_digest(files))
+        catalog = [store.entry(i) for i in range(len(store))]
+
+    payloads = {
+        "chat": chat_payload(),
+        "crossmap": crossmap_payload(get_crossmap()),
+        "crossmap_catalog": crossmap_payload(catalog),
+    }
+    print(json.dumps({name: measure(payload, args.repeat) for name, payload in payloads.items()}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
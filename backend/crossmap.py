@@ -4,377 +4,145 @@ Cross-mapping between NIST SP 800-53 Rev.5, ISO 27001:2022, NIST CSF 2.0, and IS
 This module provides structured mappings of key NIST 800-53 control families
 to their equivalents in other major compliance frameworks, enabling organizations
 to understand coverage overlap and gap analysis.
+
+The catalog and mappings are loaded from data files (crossmap_store.py).
+Lookups go through a CrossmapIndex built once at import: hash indexes by
+NIST ID, by family and, for reverse questions ("which NIST controls map to
+ISO A.8.15?"), by target-framework control. The families list and stats
+are precomputed, so the API endpoints no longer rescan CROSSMAP per request.
 """
 
-import csv
-import io
-from typing import Dict, List, Any, Optional
+import re
+from array import array
+from collections.abc import Sequence
+from typing import Dict, Iterable, List, Any, Optional
+
+from crossmap_store import FRAMEWORKS, CrossmapStore, load_store, natural_key
 
 
 # ---------------------------------------------------------------------------
 # Cross-Mapping Data
-# Each entry maps a NIST 800-53 control to its counterparts in:
+# Each control maps to its counterparts in:
 #   - ISO 27001:2022 (Annex A controls)
 #   - NIST CSF 2.0 (Functions/Categories)
 #   - ISO 27005 (Risk Management clauses)
+# Loaded from data/crossmap/ (OSCAL catalog JSON + mapping CSVs) into a
+# compact store; see crossmap_store.py.
 # ---------------------------------------------------------------------------
 
-CROSSMAP: List[Dict[str, Any]] = [
-    # --- Access Control (AC) ---
-    {
-        "nist_id": "AC-1",
-        "nist_title": "Policy and Procedures",
-        "nist_family": "Access Control",
-        "iso27001": ["A.5.1", "A.5.2"],
-        "iso27001_titles": ["Policies for information security", "Information security roles and responsibilities"],
-        "csf2": ["GV.PO-01"],
-        "csf2_titles": ["Organizational context for cybersecurity risk management is established"],
-        "iso27005": ["5.1"],
-        "iso27005_titles": ["General — Establishing context"],
-    },
-    {
-        "nist_id": "AC-2",
-        "nist_title": "Account Management",
-        "nist_family": "Access Control",
-        "iso27001": ["A.5.16", "A.5.18"],
-        "iso27001_titles": ["Identity management", "Access rights"],
-        "csf2": ["PR.AA-01", "PR.AA-03"],
-        "csf2_titles": ["Identities and credentials are issued", "Users, services, and hardware are authenticated"],
-        "iso27005": ["8.2"],
-        "iso27005_titles": ["Risk identification"],
-    },
-    {
-        "nist_id": "AC-3",
-        "nist_title": "Access Enforcement",
-        "nist_family": "Access Control",
-        "iso27001": ["A.5.15", "A.8.3"],
-        "iso27001_titles": ["Access control", "Information access restriction"],
-        "csf2": ["PR.AA-05"],
-        "csf2_titles": ["Access permissions and authorizations are managed"],
-        "iso27005": ["8.2"],
-        "iso27005_titles": ["Risk identification"],
-    },
-    {
-        "nist_id": "AC-6",
-        "nist_title": "Least Privilege",
-        "nist_family": "Access Control",
-        "iso27001": ["A.5.15", "A.8.2"],
-        "iso27001_titles": ["Access control", "Privileged access rights"],
-        "csf2": ["PR.AA-05"],
-        "csf2_titles": ["Access permissions and authorizations are managed"],
-        "iso27005": ["8.3"],
-        "iso27005_titles": ["Risk analysis"],
-    },
-    {
-        "nist_id": "AC-7",
-        "nist_title": "Unsuccessful Logon Attempts",
-        "nist_family": "Access Control",
-        "iso27001": ["A.8.5"],
-        "iso27001_titles": ["Secure authentication"],
-        "csf2": ["PR.AA-03"],
-        "csf2_titles": ["Users, services, and hardware are authenticated"],
-        "iso27005": ["8.2"],
-        "iso27005_titles": ["Risk identification"],
-    },
-    # --- Audit and Accountability (AU) ---
-    {
-        "nist_id": "AU-2",
-        "nist_title": "Event Logging",
-        "nist_family": "Audit and Accountability",
-        "iso27001": ["A.8.15"],
-        "iso27001_titles": ["Logging"],
-        "csf2": ["DE.CM-09"],
-        "csf2_titles": ["Computing hardware and software are monitored"],
-        "iso27005": ["8.4"],
-        "iso27005_titles": ["Risk evaluation"],
-    },
-    {
-        "nist_id": "AU-3",
-        "nist_title": "Content of Audit Records",
-        "nist_family": "Audit and Accountability",
-        "iso27001": ["A.8.15"],
-        "iso27001_titles": ["Logging"],
-        "csf2": ["DE.CM-09"],
-        "csf2_titles": ["Computing hardware and software are monitored"],
-        "iso27005": ["8.4"],
-        "iso27005_titles": ["Risk evaluation"],
-    },
-    {
-        "nist_id": "AU-6",
-        "nist_title": "Audit Record Review, Analysis, and Reporting",
-        "nist_family": "Audit and Accountability",
-        "iso27001": ["A.8.15", "A.8.16"],
-        "iso27001_titles": ["Logging", "Monitoring activities"],
-        "csf2": ["DE.AE-02", "DE.AE-06"],
-        "csf2_titles": ["Potentially adverse events are analyzed", "Information on adverse events is provided to authorized staff"],
-        "iso27005": ["8.4"],
-        "iso27005_titles": ["Risk evaluation"],
-    },
-    # --- Configuration Management (CM) ---
-    {
-        "nist_id": "CM-2",
-        "nist_title": "Baseline Configuration",
-        "nist_family": "Configuration Management",
-        "iso27001": ["A.8.9"],
-        "iso27001_titles": ["Configuration management"],
-        "csf2": ["PR.PS-01"],
-        "csf2_titles": ["Configuration management practices are established"],
-        "iso27005": ["8.2"],
-        "iso27005_titles": ["Risk identification"],
-    },
-    {
-        "nist_id": "CM-6",
-        "nist_title": "Configuration Settings",
-        "nist_family": "Configuration Management",
-        "iso27001": ["A.8.9"],
-        "iso27001_titles": ["Configuration management"],
-        "csf2": ["PR.PS-01"],
-        "csf2_titles": ["Configuration management practices are established"],
-        "iso27005": ["8.3"],
-        "iso27005_titles": ["Risk analysis"],
-    },
-    {
-        "nist_id": "CM-7",
-        "nist_title": "Least Functionality",
-        "nist_family": "Configuration Management",
-        "iso27001": ["A.8.9", "A.8.19"],
-        "iso27001_titles": ["Configuration management", "Installation of software on operational systems"],
-        "csf2": ["PR.PS-01"],
-        "csf2_titles": ["Configuration management practices are established"],
-        "iso27005": ["8.3"],
-        "iso27005_titles": ["Risk analysis"],
-    },
-    # --- Identification and Authentication (IA) ---
-    {
-        "nist_id": "IA-2",
-        "nist_title": "Identification and Authentication (Organizational Users)",
-        "nist_family": "Identification and Authentication",
-        "iso27001": ["A.5.16", "A.8.5"],
-        "iso27001_titles": ["Identity management", "Secure authentication"],
-        "csf2": ["PR.AA-01", "PR.AA-03"],
-        "csf2_titles": ["Identities and credentials are issued", "Users, services, and hardware are authenticated"],
-        "iso27005": ["8.2"],
-        "iso27005_titles": ["Risk identification"],
-    },
-    {
-        "nist_id": "IA-5",
-        "nist_title": "Authenticator Management",
-        "nist_family": "Identification and Authentication",
-        "iso27001": ["A.5.17"],
-        "iso27001_titles": ["Authentication information"],
-        "csf2": ["PR.AA-02"],
-        "csf2_titles": ["Identities are proofed and bound to credentials"],
-        "iso27005": ["8.2"],
-        "iso27005_titles": ["Risk identification"],
-    },
-    # --- Incident Response (IR) ---
-    {
-        "nist_id": "IR-1",
-        "nist_title": "Policy and Procedures",
-        "nist_family": "Incident Response",
-        "iso27001": ["A.5.24"],
-        "iso27001_titles": ["Information security incident management planning and preparation"],
-        "csf2": ["RS.MA-01"],
-        "csf2_titles": ["The incident response plan is executed"],
-        "iso27005": ["10.1"],
-        "iso27005_titles": ["General — Continual improvement"],
-    },
-    {
-        "nist_id": "IR-4",
-        "nist_title": "Incident Handling",
-        "nist_family": "Incident Response",
-        "iso27001": ["A.5.25", "A.5.26"],
-        "iso27001_titles": ["Assessment and decision on information security events", "Response to information security incidents"],
-        "csf2": ["RS.MA-02", "RS.AN-03"],
-        "csf2_titles": ["Incident reports are triaged and validated", "Analysis is performed to establish what has taken place"],
-        "iso27005": ["10.1"],
-        "iso27005_titles": ["General — Continual improvement"],
-    },
-    {
-        "nist_id": "IR-6",
-        "nist_title": "Incident Reporting",
-        "nist_family": "Incident Response",
-        "iso27001": ["A.5.24", "A.6.8"],
-        "iso27001_titles": ["Information security incident management planning and preparation", "Information security event reporting"],
-        "csf2": ["RS.CO-02"],
-        "csf2_titles": ["Internal and external stakeholders are notified"],
-        "iso27005": ["10.1"],
-        "iso27005_titles": ["General — Continual improvement"],
-    },
-    # --- Risk Assessment (RA) ---
-    {
-        "nist_id": "RA-3",
-        "nist_title": "Risk Assessment",
-        "nist_family": "Risk Assessment",
-        "iso27001": ["A.5.7"],
-        "iso27001_titles": ["Threat intelligence"],
-        "csf2": ["ID.RA-01", "ID.RA-02"],
-        "csf2_titles": ["Vulnerabilities in assets are identified", "Cyber threat intelligence is received"],
-        "iso27005": ["8.2", "8.3", "8.4"],
-        "iso27005_titles": ["Risk identification", "Risk analysis", "Risk evaluation"],
-    },
-    {
-        "nist_id": "RA-5",
-        "nist_title": "Vulnerability Monitoring and Scanning",
-        "nist_family": "Risk Assessment",
-        "iso27001": ["A.8.8"],
-        "iso27001_titles": ["Management of technical vulnerabilities"],
-        "csf2": ["ID.RA-01"],
-        "csf2_titles": ["Vulnerabilities in assets are identified"],
-        "iso27005": ["8.2"],
-        "iso27005_titles": ["Risk identification"],
-    },
-    # --- System and Communications Protection (SC) ---
-    {
-        "nist_id": "SC-7",
-        "nist_title": "Boundary Protection",
-        "nist_family": "System and Communications Protection",
-        "iso27001": ["A.8.20", "A.8.21"],
-        "iso27001_titles": ["Networks security", "Security of network services"],
-        "csf2": ["PR.DS-10"],
-        "csf2_titles": ["The confidentiality, integrity, and availability of data-in-transit is protected"],
-        "iso27005": ["8.3"],
-        "iso27005_titles": ["Risk analysis"],
-    },
-    {
-        "nist_id": "SC-8",
-        "nist_title": "Transmission Confidentiality and Integrity",
-        "nist_family": "System and Communications Protection",
-        "iso27001": ["A.8.24"],
-        "iso27001_titles": ["Use of cryptography"],
-        "csf2": ["PR.DS-10"],
-        "csf2_titles": ["The confidentiality, integrity, and availability of data-in-transit is protected"],
-        "iso27005": ["8.3"],
-        "iso27005_titles": ["Risk analysis"],
-    },
-    {
-        "nist_id": "SC-12",
-        "nist_title": "Cryptographic Key Establishment and Management",
-        "nist_family": "System and Communications Protection",
-        "iso27001": ["A.8.24"],
-        "iso27001_titles": ["Use of cryptography"],
-        "csf2": ["PR.DS-10"],
-        "csf2_titles": ["The confidentiality, integrity, and availability of data-in-transit is protected"],
-        "iso27005": ["8.3"],
-        "iso27005_titles": ["Risk analysis"],
-    },
-    # --- System and Information Integrity (SI) ---
-    {
-        "nist_id": "SI-2",
-        "nist_title": "Flaw Remediation",
-        "nist_family": "System and Information Integrity",
-        "iso27001": ["A.8.8", "A.8.19"],
-        "iso27001_titles": ["Management of technical vulnerabilities", "Installation of software on operational systems"],
-        "csf2": ["PR.PS-02"],
-        "csf2_titles": ["Software is maintained, replaced, and removed"],
-        "iso27005": ["9.1"],
-        "iso27005_titles": ["Risk treatment — General"],
-    },
-    {
-        "nist_id": "SI-3",
-        "nist_title": "Malicious Code Protection",
-        "nist_family": "System and Information Integrity",
-        "iso27001": ["A.8.7"],
-        "iso27001_titles": ["Protection against malware"],
-        "csf2": ["DE.CM-09"],
-        "csf2_titles": ["Computing hardware and software are monitored"],
-        "iso27005": ["8.3"],
-        "iso27005_titles": ["Risk analysis"],
-    },
-    {
-        "nist_id": "SI-4",
-        "nist_title": "System Monitoring",
-        "nist_family": "System and Information Integrity",
-        "iso27001": ["A.8.16"],
-        "iso27001_titles": ["Monitoring activities"],
-        "csf2": ["DE.CM-01", "DE.CM-09"],
-        "csf2_titles": ["Networks and network services are monitored", "Computing hardware and software are monitored"],
-        "iso27005": ["8.4", "10.1"],
-        "iso27005_titles": ["Risk evaluation", "General — Continual improvement"],
-    },
-    # --- Planning (PL) ---
-    {
-        "nist_id": "PL-2",
-        "nist_title": "System Security and Privacy Plans",
-        "nist_family": "Planning",
-        "iso27001": ["A.5.1"],
-        "iso27001_titles": ["Policies for information security"],
-        "csf2": ["GV.PO-01"],
-        "csf2_titles": ["Organizational context for cybersecurity risk management is established"],
-        "iso27005": ["5.1"],
-        "iso27005_titles": ["General — Establishing context"],
-    },
-    # --- Contingency Planning (CP) ---
-    {
-        "nist_id": "CP-2",
-        "nist_title": "Contingency Plan",
-        "nist_family": "Contingency Planning",
-        "iso27001": ["A.5.29", "A.5.30"],
-        "iso27001_titles": ["Information security during disruption", "ICT readiness for business continuity"],
-        "csf2": ["RC.RP-01"],
-        "csf2_titles": ["The recovery portion of the incident response plan is executed"],
-        "iso27005": ["9.1"],
-        "iso27005_titles": ["Risk treatment — General"],
-    },
-    {
-        "nist_id": "CP-9",
-        "nist_title": "System Backup",
-        "nist_family": "Contingency Planning",
-        "iso27001": ["A.8.13"],
-        "iso27001_titles": ["Information backup"],
-        "csf2": ["PR.DS-11"],
-        "csf2_titles": ["Backups of data are created, protected, maintained, and tested"],
-        "iso27005": ["9.1"],
-        "iso27005_titles": ["Risk treatment — General"],
-    },
-    # --- Personnel Security (PS) ---
-    {
-        "nist_id": "PS-3",
-        "nist_title": "Personnel Screening",
-        "nist_family": "Personnel Security",
-        "iso27001": ["A.6.1"],
-        "iso27001_titles": ["Screening"],
-        "csf2": ["GV.RR-02"],
-        "csf2_titles": ["Roles, responsibilities, and authorities related to cybersecurity risk management are established"],
-        "iso27005": ["5.1"],
-        "iso27005_titles": ["General — Establishing context"],
-    },
-    # --- Physical and Environmental Protection (PE) ---
-    {
-        "nist_id": "PE-2",
-        "nist_title": "Physical Access Authorizations",
-        "nist_family": "Physical and Environmental Protection",
-        "iso27001": ["A.7.1", "A.7.2"],
-        "iso27001_titles": ["Physical security perimeters", "Physical entry"],
-        "csf2": ["PR.AA-05"],
-        "csf2_titles": ["Access permissions and authorizations are managed"],
-        "iso27005": ["8.2"],
-        "iso27005_titles": ["Risk identification"],
-    },
-    # --- Security Assessment (CA) ---
-    {
-        "nist_id": "CA-2",
-        "nist_title": "Control Assessments",
-        "nist_family": "Security Assessment and Authorization",
-        "iso27001": ["A.5.35", "A.5.36"],
-        "iso27001_titles": ["Independent review of information security", "Compliance with policies, rules and standards"],
-        "csf2": ["ID.RA-04"],
-        "csf2_titles": ["Potential impacts and likelihoods of threats exploiting vulnerabilities are identified"],
-        "iso27005": ["8.4"],
-        "iso27005_titles": ["Risk evaluation"],
-    },
-    {
-        "nist_id": "CA-7",
-        "nist_title": "Continuous Monitoring",
-        "nist_family": "Security Assessment and Authorization",
-        "iso27001": ["A.5.36", "A.8.16"],
-        "iso27001_titles": ["Compliance with policies, rules and standards", "Monitoring activities"],
-        "csf2": ["DE.CM-01", "DE.CM-09"],
-        "csf2_titles": ["Networks and network services are monitored", "Computing hardware and software are monitored"],
-        "iso27005": ["10.1"],
-        "iso27005_titles": ["General — Continual improvement"],
-    },
-]
+# Display names of the target frameworks
+FRAMEWORK_NAMES = {
+    "iso27001": "ISO 27001:2022",
+    "csf2": "NIST CSF 2.0",
+    "iso27005": "ISO 27005",
+}
+
+_STORE: CrossmapStore = load_store()
+# Content hash of the mapping data (changes whenever the data files do)
+DATA_VERSION = _STORE.version
+
+
+class CrossmapEntries(Sequence):
+    """Read-only list view of the store; each item is built as the classic entry dict on access."""
+
+    def __init__(self, store: CrossmapStore):
+        self._store = store
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._store.entry(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("crossmap index out of range")
+        return self._store.entry(index)
+
+
+CROSSMAP: Sequence[Dict[str, Any]] = CrossmapEntries(_STORE)
+
+
+# Control-ID shapes used to infer the framework of a bare ID (A.8.15, DE.CM-09, 8.2)
+_FRAMEWORK_PATTERNS = (
+    ("iso27001", re.compile(r"^A\.\d+\.\d+$")),
+    ("csf2", re.compile(r"^[A-Z]{2}\.[A-Z]{2}(-\d{2})?$")),
+    ("iso27005", re.compile(r"^\d+(\.\d+)*$")),
+)
+
+
+def normalize_control_id(control_id: str) -> str:
+    return control_id.strip().upper()
+
+
+def detect_framework(control_id: str) -> Optional[str]:
+    """Target framework a control ID belongs to, from its shape (None if unrecognised)."""
+    control_id = normalize_control_id(control_id)
+    for framework, pattern in _FRAMEWORK_PATTERNS:
+        if pattern.match(control_id):
+            return framework
+    return None
+
+
+class CrossmapIndex:
+    """Hash indexes over the store's control rows, built once."""
+
+    def __init__(self, store: CrossmapStore):
+        self.store = store
+        self.by_nist_id: Dict[str, int] = {}
+        self.by_family: Dict[str, array] = {}
+        self.families: List[str] = []
+        # framework -> target control ID (upper-case) -> target row
+        self.targets: Dict[str, Dict[str, int]] = {}
+        # framework -> target row -> control rows mapping to it
+        self.reverse: Dict[str, List[array]] = {}
+
+        strings = store.strings
+        for row in range(len(store)):
+            self.by_nist_id[strings[store.nist_id[row]].upper()] = row
+            family = strings[store.nist_family[row]]
+            if family.lower() not in self.by_family:
+                self.by_family[family.lower()] = array("I")
+                self.families.append(family)
+            self.by_family[family.lower()].append(row)
+        for fw in FRAMEWORKS:
+            count = store.target_count(fw)
+            self.targets[fw] = {normalize_control_id(store.target_id(fw, t)): t for t in range(count)}
+            self.reverse[fw] = [array("I") for _ in range(count)]
+            for row in range(len(store)):
+                for t in store.targets(fw, row):
+                    self.reverse[fw][t].append(row)
+
+        self.stats = {
+            "total_nist_controls": len(store),
+            "nist_families": len(self.families),
+            "unique_iso27001_controls": store.target_count("iso27001"),
+            "unique_csf2_categories": store.target_count("csf2"),
+            "unique_iso27005_clauses": store.target_count("iso27005"),
+        }
+
+    def filter_family(self, family: str) -> List[int]:
+        """Rows whose family contains `family` (case-insensitive), in catalog order."""
+        key = family.lower()
+        if key in self.by_family:
+            return list(self.by_family[key])
+        matched = [f for f in self.by_family if key in f]
+        if len(matched) == 1:
+            return list(self.by_family[matched[0]])
+        # Substring hits several families: only those (few) row lists are merged
+        return sorted(row for f in matched for row in self.by_family[f])
+
+    def nist_summary(self, row: int) -> Dict[str, str]:
+        s, store = self.store.strings, self.store
+        return {
+            "nist_id": s[store.nist_id[row]],
+            "nist_title": s[store.nist_title[row]],
+            "nist_family": s[store.nist_family[row]],
+        }
+
+
+_INDEX = CrossmapIndex(_STORE)
 
 
 def get_crossmap(
@@ -390,89 +158,199 @@ def get_crossmap(
         framework: Filter to only include a specific target framework
                    ("iso27001", "csf2", "iso27005")
     """
-    results = CROSSMAP
-
-    if family:
-        family_lower = family.lower()
-        results = [r for r in results if family_lower in r["nist_family"].lower()]
-
     if nist_id:
-        nist_upper = nist_id.upper()
-        results = [r for r in results if r["nist_id"] == nist_upper]
-
-    if framework and framework in ("iso27001", "csf2", "iso27005"):
-        # Slim the output to only the requested framework
-        slimmed = []
-        for r in results:
-            slimmed.append({
-                "nist_id": r["nist_id"],
-                "nist_title": r["nist_title"],
-                "nist_family": r["nist_family"],
-                framework: r[framework],
-                f"{framework}_titles": r[f"{framework}_titles"],
-            })
-        return slimmed
+        row = _INDEX.by_nist_id.get(nist_id.strip().upper())
+        rows = [] if row is None else [row]
+        if family:
+            rows = [r for r in rows if family.lower() in _STORE.strings[_STORE.nist_family[r]].lower()]
+    elif family:
+        rows = _INDEX.filter_family(family)
+    else:
+        rows = range(len(_STORE))
 
-    return results
+    # Slim the output to only the requested framework
+    slim = framework if framework in FRAMEWORKS else None
+    return [_STORE.entry(row, slim) for row in rows]
 
 
 def get_families() -> List[str]:
     """Return list of unique NIST control families in the mapping."""
-    seen = set()
-    families = []
-    for entry in CROSSMAP:
-        f = entry["nist_family"]
-        if f not in seen:
-            seen.add(f)
-            families.append(f)
-    return families
+    return list(_INDEX.families)
 
 
 def get_stats() -> Dict[str, Any]:
     """Return summary statistics about the cross-mapping coverage."""
-    families = set()
-    iso27001_controls = set()
-    csf2_controls = set()
-    iso27005_clauses = set()
-
-    for entry in CROSSMAP:
-        families.add(entry["nist_family"])
-        for c in entry["iso27001"]:
-            iso27001_controls.add(c)
-        for c in entry["csf2"]:
-            csf2_controls.add(c)
-        for c in entry["iso27005"]:
-            iso27005_clauses.add(c)
+    return dict(_INDEX.stats)
+
 
+def get_reverse_mapping(control_id: str, framework: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """NIST controls that map to a target-framework control (e.g. ISO A.8.15, CSF DE.CM-09).
+
+    The framework is inferred from the ID's shape when not given. Returns None
+    for an unmapped control; raises ValueError for an unknown framework.
+    """
+    control_id = normalize_control_id(control_id)
+    framework = framework or detect_framework(control_id)
+    if framework not in FRAMEWORKS:
+        raise ValueError(f"Unknown framework for control {control_id!r}; expected one of {', '.join(FRAMEWORKS)}")
+    target = _INDEX.targets[framework].get(control_id)
+    if target is None:
+        return None
     return {
-        "total_nist_controls": len(CROSSMAP),
-        "nist_families": len(families),
-        "unique_iso27001_controls": len(iso27001_controls),
-        "unique_csf2_categories": len(csf2_controls),
-        "unique_iso27005_clauses": len(iso27005_clauses),
+        "framework": framework,
+        "control_id": _STORE.target_id(framework, target),
+        "title": _STORE.target_title(framework, target),
+        "nist_controls": [_INDEX.nist_summary(row) for row in _INDEX.reverse[framework][target]],
     }
 
 
-def generate_sankey_csv() -> str:
-    """Generate a Sankey diagram CSV with source,target,value columns.
+def get_target_controls(framework: str) -> List[Dict[str, Any]]:
+    """Every mapped control of a target framework with the number of NIST controls mapping to it."""
+    if framework not in FRAMEWORKS:
+        raise ValueError(f"Unknown framework {framework!r}; expected one of {', '.join(FRAMEWORKS)}")
+    controls = [
+        {
+            "control_id": _STORE.target_id(framework, t),
+            "title": _STORE.target_title(framework, t),
+            "nist_count": len(rows),
+        }
+        for t, rows in enumerate(_INDEX.reverse[framework])
+    ]
+    return sorted(controls, key=lambda c: natural_key(c["control_id"]))
 
-    Produces links from NIST 800-53 controls to their mapped controls in
-    ISO 27001, CSF 2.0, and ISO 27005.
+
+_COVERAGE = None
+
+
+def _coverage_engine():
+    """CoverageEngine over the store, built on first use (imports NumPy)."""
+    global _COVERAGE
+    if _COVERAGE is None:
+        from crossmap_coverage import CoverageEngine
+        _COVERAGE = CoverageEngine(_STORE)
+    return _COVERAGE
+
+
+def _pct(part: int, whole: int) -> Optional[float]:
+    return round(100.0 * part / whole, 1) if whole else None
+
+
+def get_coverage(
+    framework: str,
+    controls: Iterable[str],
+    targets: Optional[Iterable[str]] = None,
+    mode: str = "any",
+) -> Dict[str, Any]:
+    """Coverage and gaps implied by the implemented controls of one framework.
+
+    Args:
+        framework: Framework of `controls`: "nist", "iso27001", "csf2" or "iso27005"
+        controls: Implemented control IDs (e.g. ["A.5.15", "A.8.15"])
+        targets: Frameworks to carry the coverage to through NIST (default: all but `framework`)
+        mode: "any" — a NIST control is covered when any mapped control is implemented;
+              "all" — only when every mapped control is
+
+    Raises ValueError for an unknown framework, target or mode.
     """
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(["source", "target", "value"])
+    engine = _coverage_engine()
+    implemented, known, unknown = engine.resolve(framework, controls)
+    nist = engine.nist_coverage(framework, implemented, mode)
+    targets = [fw for fw in FRAMEWORKS if fw != framework] if targets is None else list(targets)
+    for fw in targets:
+        if fw not in FRAMEWORKS:
+            raise ValueError(f"Unknown target framework {fw!r}; expected one of {', '.join(FRAMEWORKS)}")
 
-    for entry in CROSSMAP:
-        nist_label = f"NIST {entry['nist_id']}"
+    def nist_ids(mask) -> List[str]:
+        return [engine.nist_ids[row] for row in mask.nonzero()[0]]
 
-        for ctrl in entry["iso27001"]:
-            writer.writerow([nist_label, f"ISO {ctrl}", 1])
+    covered, mapped = int(nist["covered"].sum()), int(nist["mapped"].sum())
+    family_covered, family_mapped = engine.family_coverage(nist["covered"], nist["mapped"])
+    result: Dict[str, Any] = {
+        "framework": framework,
+        "mode": mode,
+        "implemented": (
+            [engine.nist_ids[row] for row in known] if framework == "nist"
+            else [_STORE.target_id(framework, t) for t in known]
+        ),
+        "unknown": unknown,
+        "nist": {
+            "total": len(_STORE),
+            "mapped": mapped,
+            "covered": covered,
+            "coverage_pct": _pct(covered, mapped),
+            "covered_controls": nist_ids(nist["covered"]),
+            "partial_controls": nist_ids(nist["partial"]),
+            "gap_controls": nist_ids(nist["gap"]),
+        },
+        "families": [
+            {
+                "family": family,
+                "mapped": int(family_mapped[i]),
+                "covered": int(family_covered[i]),
+                "coverage_pct": _pct(int(family_covered[i]), int(family_mapped[i])),
+            }
+            for i, family in enumerate(engine.families)
+        ],
+        "targets": {},
+    }
+    for fw in targets:
+        reach, total = engine.target_coverage(fw, nist["covered"])
+        reached = reach > 0 if mode == "any" else (total > 0) & (reach == total)
+        controls_out = sorted(
+            (
+                {
+                    "control_id": _STORE.target_id(fw, t),
+                    "title": _STORE.target_title(fw, t),
+                    "nist_total": int(total[t]),
+                    "nist_covered": int(reach[t]),
+                    "coverage_pct": _pct(int(reach[t]), int(total[t])),
+                }
+                for t in range(len(total))
+            ),
+            key=lambda c: natural_key(c["control_id"]),
+        )
+        result["targets"][fw] = {
+            "total": len(total),
+            "covered": int(reached.sum()),
+            "coverage_pct": _pct(int(reached.sum()), len(total)),
+            "controls": controls_out,
+            "gap_controls": [c["control_id"] for c in controls_out if c["nist_covered"] == 0],
+        }
+    return result
 
-        for i, cat in enumerate(entry["csf2"]):
-            writer.writerow([nist_label, f"CSF {cat}", 1])
 
-        for i, clause in enumerate(entry["iso27005"]):
-            writer.writerow([nist_label, f"ISO27005 {clause}", 1])
+_SEARCH = None
+
+
+def _search_index():
+    """SearchIndex over the store, built once on first use (or by the app's startup warm-up)."""
+    global _SEARCH
+    if _SEARCH is None:
+        from crossmap_search import SearchIndex
+        _SEARCH = SearchIndex(_STORE)
+    return _SEARCH
+
+
+def search_controls(query: str, limit: int = 10, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Typeahead matches for NIST controls and mapped ISO/CSF controls by partial ID or title words.
+
+    Args:
+        query: e.g. "acc man", "si-4", "a.8.1"
+        limit: Maximum number of results (capped at 50)
+        kind: Only "nist", "iso27001", "csf2" or "iso27005" results
+
+    Raises ValueError for an unknown kind.
+    """
+    return _search_index().search(query, limit, kind)
+
+
+def generate_sankey_csv(level: str = "control") -> str:
+    """Generate a Sankey diagram CSV with source,target,value columns.
+
+    Produces links from NIST 800-53 controls to their mapped controls in
+    ISO 27001, CSF 2.0, and ISO 27005; level "family" or "framework" sums
+    them per NIST family (see graph_export.py).
+    """
+    from graph_export import export
 
-    return output.getvalue()
+    return "".join(export(level, "csv"))
@@ -0,0 +1,119 @@
+"""
+Vectorised coverage and gap analysis over the crossmap.
+
+The question users bring is "given the ISO 27001 controls we implement,
+which NIST controls (and, through them, which CSF categories) are covered,
+and where are the gaps?". Answering it by walking entry dicts means nested
+loops over every control and mapping for each request. A CoverageEngine
+instead encodes each framework as a 0/1 matrix built once from the store's
+CSR columns: rows are NIST controls and columns are that framework's controls
+(float32, so the products below run through BLAS and stay exact for counts).
+An analysis then takes a handful of NumPy operations:
+
+    hits     = M_src @ implemented          mapped source controls implemented, per NIST control
+    covered  = hits > 0  (mode "any")  or  hits == mapped  (mode "all")
+    reach    = covered @ M_tgt              covered NIST controls per target control (ISO -> NIST -> CSF)
+    families = bincount(family, covered)    per-family coverage
+
+Source "nist" skips the first step: the given NIST controls are covered as-is.
+"""
+
+from typing import Dict, Iterable, List, Tuple
+
+from crossmap_store import FRAMEWORKS, CrossmapStore
+
+# Frameworks an analysis can start from ("nist" = implemented NIST controls directly)
+SOURCES = ("nist",) + FRAMEWORKS
+# "any": a NIST control is covered if any of its mapped controls is implemented; "all": only if every one is
+MODES = ("any", "all")
+
+
+class CoverageEngine:
+    """0/1 mapping matrices (NIST rows x framework columns) with per-row/column totals."""
+
+    def __init__(self, store: CrossmapStore):
+        import numpy as np
+
+        self.store = store
+        n = len(store)
+        strings = store.strings
+        self.nist_ids = [strings[sid] for sid in store.nist_id]
+        self.nist_rows = {nist_id.upper(): row for row, nist_id in enumerate(self.nist_ids)}
+
+        family_names = [strings[sid] for sid in store.nist_family]
+        self.families = list(dict.fromkeys(family_names))
+        family_index = {family: i for i, family in enumerate(self.families)}
+        self.family_of = np.array([family_index[f] for f in family_names], dtype=np.intp)
+
+        self.matrix: Dict[str, "np.ndarray"] = {}
+        self.mapped_count: Dict[str, "np.ndarray"] = {}  # per NIST row: mapped controls in framework
+        self.nist_count: Dict[str, "np.ndarray"] = {}  # per framework column: NIST controls mapped to it
+        self.columns: Dict[str, Dict[str, int]] = {}
+        for fw in FRAMEWORKS:
+            offsets = np.array(store.columns[f"{fw}.offsets"], dtype=np.intp)
+            targets = np.array(store.columns[f"{fw}.targets"], dtype=np.intp)
+            matrix = np.zeros((n, store.target_count(fw)), dtype=np.float32)
+            matrix[np.repeat(np.arange(n), np.diff(offsets)), targets] = 1
+            self.matrix[fw] = matrix
+            self.mapped_count[fw] = matrix.sum(axis=1)
+            self.nist_count[fw] = matrix.sum(axis=0)
+            self.columns[fw] = {
+                store.target_id(fw, t).strip().upper(): t for t in range(store.target_count(fw))
+            }
+
+    def resolve(self, source: str, controls: Iterable[str]) -> Tuple["np.ndarray", List[int], List[str]]:
+        """Boolean mask of the implemented controls of `source` plus their indexes and the unknown IDs."""
+        import numpy as np
+
+        if source not in SOURCES:
+            raise ValueError(f"Unknown framework {source!r}; expected one of {', '.join(SOURCES)}")
+        lookup = self.nist_rows if source == "nist" else self.columns[source]
+        mask = np.zeros(len(self.store) if source == "nist" else len(lookup), dtype=bool)
+        known, unknown = [], []
+        for control in controls:
+            index = lookup.get(control.strip().upper())
+            if index is None:
+                unknown.append(control.strip().upper())
+            elif not mask[index]:
+                mask[index] = True
+                known.append(index)
+        return mask, known, unknown
+
+    def nist_coverage(self, source: str, implemented: "np.ndarray", mode: str = "any") -> Dict[str, "np.ndarray"]:
+        """Per-NIST-control boolean vectors: mapped, covered, partial (some but not all), gap (none)."""
+        import numpy as np
+
+        if mode not in MODES:
+            raise ValueError(f"Unknown coverage mode {mode!r}; expected one of {', '.join(MODES)}")
+        if source == "nist":
+            none = np.zeros(len(implemented), dtype=bool)
+            return {"mapped": np.ones(len(implemented), dtype=bool), "covered": implemented,
+                    "partial": none, "gap": ~implemented}
+        hits = self.matrix[source] @ implemented.astype(np.float32)
+        mapped_count = self.mapped_count[source]
+        mapped = mapped_count > 0
+        some = hits > 0
+        full = mapped & (hits == mapped_count)
+        return {
+            "mapped": mapped,
+            "covered": some if mode == "any" else full,
+            "partial": some & ~full,
+            "gap": mapped & ~some,
+        }
+
+    def family_coverage(self, covered: "np.ndarray", mapped: "np.ndarray") -> Tuple["np.ndarray", "np.ndarray"]:
+        """(covered, mapped) NIST control counts per family, in self.families order."""
+        import numpy as np
+
+        size = len(self.families)
+        return (
+            np.bincount(self.family_of, weights=covered, minlength=size).astype(np.int64),
+            np.bincount(self.family_of, weights=mapped, minlength=size).astype(np.int64),
+        )
+
+    def target_coverage(self, framework: str, covered: "np.ndarray") -> Tuple["np.ndarray", "np.ndarray"]:
+        """(covered, total) NIST controls per column of `framework`: the transitive NIST -> framework step."""
+        import numpy as np
+
+        reach = covered.astype(np.float32) @ self.matrix[framework]
+        return reach.astype(np.int64), self.nist_count[framework].astype(np.int64)
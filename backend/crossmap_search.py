@@ -0,0 +1,219 @@
+"""
+Typeahead search over NIST control IDs and titles and the mapped ISO/CSF controls.
+
+The CrossMapModal and the chat box need "acc man" -> AC-2 Account Management,
+"a.8.1" -> A.8.15 / A.8.16 and "si-4" -> SI-4 while the user types. Scanning the
+catalog per keystroke costs a full pass over every title. A SearchIndex is
+instead built once from the store:
+
+    prefix   word prefix -> {doc: weight}    every prefix (up to PREFIX_MAX chars) of every
+                                             ID part, title word and NIST family word
+    trigram  trigram -> docs                 over ID + title, for typos and mid-word text
+
+A query is split into tokens. A document matches when every token prefixes one
+of its words (AND), and its score is the sum of the token weights: ID > title
+word > family word, with complete words weighted above partial ones. An exact
+ID match ranks first. Among the best candidates, titles whose consecutive words
+the tokens prefix in order ("acc man" -> "Account Management") get a phrase
+bonus. When no document matches, documents that share at least 60% of the
+query's trigrams are returned instead ("acount"). Lookups are dict probes plus
+a top-k over the candidates, and recent queries are kept in a small LRU.
+"""
+
+import heapq
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from crossmap_store import FRAMEWORKS, CrossmapStore, natural_key
+
+# Longest indexed prefix; longer tokens are looked up by this prefix and then verified
+PREFIX_MAX = 12
+MAX_RESULTS = 50
+KINDS = ("nist",) + FRAMEWORKS
+
+# Token weights per field (complete word; a partial prefix earns a share of it)
+_WEIGHTS = {"id": 8.0, "title": 4.0, "family": 1.0}
+_EXACT_ID_BONUS = 100.0
+_PHRASE_BONUS = 3.0
+# Candidates (x limit) re-ranked with the phrase bonus
+_RERANK_FACTOR = 3
+_TRIGRAM_MIN_SHARE = 0.6
+_QUERY_CACHE_SIZE = 1024
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def compact_id(control_id: str) -> str:
+    """Separator-insensitive form of a control ID: 'AC-2(1)' -> 'ac2.1', 'DE.CM-09' -> 'de.cm09'."""
+    text = control_id.strip().lower().replace("(", ".").replace(")", "")
+    return re.sub(r"[^a-z0-9.]", "", text)
+
+
+def _id_words(control_id: str) -> List[str]:
+    """The compact ID and its parts ('ac2.1', 'ac', '2', '1'); ISO IDs also without 'a.' ('8.15')."""
+    compact = compact_id(control_id)
+    words = [compact] + re.findall(r"[a-z]+|\d+", compact)
+    if compact.startswith("a."):
+        words.append(compact[2:])
+    return words
+
+
+def _trigrams(text: str) -> set:
+    text = f" {text} "
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class SearchIndex:
+    """Prefix and trigram postings over NIST controls and mapped target-framework controls."""
+
+    def __init__(self, store: CrossmapStore):
+        strings = store.strings
+        # doc -> (kind, control ID, title, family or None)
+        self.docs: List[Tuple[str, str, str, Optional[str]]] = []
+        for row in range(len(store)):
+            self.docs.append((
+                "nist", strings[store.nist_id[row]], strings[store.nist_title[row]], strings[store.nist_family[row]],
+            ))
+        for fw in FRAMEWORKS:
+            for t in range(store.target_count(fw)):
+                self.docs.append((fw, store.target_id(fw, t), store.target_title(fw, t), None))
+
+        import numpy as np
+
+        self.prefix: Dict[str, Dict[int, float]] = {}
+        self.by_id: Dict[str, List[int]] = {}
+        self.words: List[List[str]] = []
+        self.title_words: List[List[str]] = []
+        trigram: Dict[str, List[int]] = {}
+        for doc, (kind, control_id, title, family) in enumerate(self.docs):
+            # Best weight per distinct word of the doc (a word can be in the title and the family)
+            best: Dict[str, float] = {}
+            for field, words in (
+                ("family", _WORD.findall((family or "").lower())),
+                ("title", _WORD.findall(title.lower())),
+                ("id", _id_words(control_id)),
+            ):
+                for word in words:
+                    best[word] = _WEIGHTS[field]
+            self.words.append(list(best))
+            self.title_words.append(_WORD.findall(title.lower()))
+            for word, weight in best.items():
+                self._add_prefixes(doc, word, weight)
+            self.by_id.setdefault(compact_id(control_id), []).append(doc)
+            for gram in _trigrams(f"{compact_id(control_id)} {title.lower()}"):
+                trigram.setdefault(gram, []).append(doc)
+        self.trigram = {gram: np.array(docs, dtype=np.int32) for gram, docs in trigram.items()}
+        # Tie-break for equal scores: NIST first, then each framework, IDs in natural order
+        ordered = sorted(range(len(self.docs)), key=lambda d: (
+            KINDS.index(self.docs[d][0]), natural_key(self.docs[d][1]),
+        ))
+        self.order = [0] * len(self.docs)
+        for position, doc in enumerate(ordered):
+            self.order[doc] = position
+        self._cache: "OrderedDict[Tuple[str, int, Optional[str]], List[Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _add_prefixes(self, doc: int, word: str, weight: float) -> None:
+        prefix, size = self.prefix, len(word)
+        for end in range(1, min(size, PREFIX_MAX) + 1):
+            # Partial prefixes score by how much of the word they cover
+            score = weight * (0.5 + 0.5 * end / size)
+            postings = prefix.get(word[:end])
+            if postings is None:
+                prefix[word[:end]] = {doc: score}
+            elif postings.get(doc, 0.0) < score:
+                postings[doc] = score
+
+    def _tokens(self, query: str) -> List[str]:
+        return [t for t in (compact_id(part) for part in query.split()) if t]
+
+    def _prefix_matches(self, tokens: List[str]) -> Dict[int, float]:
+        postings = []
+        for token in tokens:
+            hits = self.prefix.get(token[:PREFIX_MAX])
+            if not hits:
+                return {}
+            postings.append((token, hits))
+        postings.sort(key=lambda p: len(p[1]))
+        # Walk the rarest token's postings once, probing the others
+        others = [hits for _, hits in postings[1:]]
+        scores = {}
+        for doc, score in postings[0][1].items():
+            for hits in others:
+                weight = hits.get(doc)
+                if weight is None:
+                    break
+                score += weight
+            else:
+                scores[doc] = score
+        # Tokens longer than the indexed prefixes: keep docs that really have such a word
+        for token, _ in postings:
+            if len(token) > PREFIX_MAX:
+                scores = {d: s for d, s in scores.items() if any(w.startswith(token) for w in self.words[d])}
+        return scores
+
+    def _phrase_match(self, doc: int, tokens: List[str]) -> bool:
+        words = self.title_words[doc]
+        span = len(tokens)
+        return any(
+            all(words[start + i].startswith(token) for i, token in enumerate(tokens))
+            for start in range(len(words) - span + 1)
+        )
+
+    def _trigram_matches(self, query: str) -> Dict[int, float]:
+        import numpy as np
+
+        grams = _trigrams(" ".join(self._tokens(query)))
+        postings = [self.trigram[g] for g in grams if g in self.trigram]
+        if not postings:
+            return {}
+        counts = np.bincount(np.concatenate(postings), minlength=len(self.docs))
+        docs = np.flatnonzero(counts >= _TRIGRAM_MIN_SHARE * len(grams))
+        return dict(zip(docs.tolist(), (counts[docs] / len(grams)).tolist()))
+
+    def _search(self, query: str, limit: int, kind: Optional[str]) -> List[Dict[str, Any]]:
+        tokens = self._tokens(query)
+        if not tokens:
+            return []
+        scores = self._prefix_matches(tokens)
+        for doc in self.by_id.get("".join(tokens), ()):
+            scores[doc] = scores.get(doc, 0.0) + _EXACT_ID_BONUS
+        if kind:
+            scores = {d: s for d, s in scores.items() if self.docs[d][0] == kind}
+        order = self.order
+        if not scores and len(" ".join(tokens)) >= 3:
+            scores = {
+                d: s for d, s in self._trigram_matches(query).items() if not kind or self.docs[d][0] == kind
+            }
+        elif len(tokens) > 1:
+            top = heapq.nsmallest(limit * _RERANK_FACTOR, scores.items(), key=lambda item: (-item[1], order[item[0]]))
+            scores = {d: s + _PHRASE_BONUS if self._phrase_match(d, tokens) else s for d, s in top}
+        ranked = heapq.nsmallest(limit, scores.items(), key=lambda item: (-item[1], order[item[0]]))
+        results = []
+        for doc, score in ranked:
+            doc_kind, control_id, title, family = self.docs[doc]
+            result = {"kind": doc_kind, "control_id": control_id, "title": title, "score": round(score, 2)}
+            if family is not None:
+                result["family"] = family
+            results.append(result)
+        return results
+
+    def search(self, query: str, limit: int = 10, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Ranked matches for a typeahead query (optionally only one kind: nist, iso27001, csf2, iso27005)."""
+        if kind is not None and kind not in KINDS:
+            raise ValueError(f"Unknown kind {kind!r}; expected one of {', '.join(KINDS)}")
+        limit = max(1, min(limit, MAX_RESULTS))
+        key = (" ".join(query.lower().split()), limit, kind)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return [dict(r) for r in cached]
+        results = self._search(query, limit, kind)
+        with self._lock:
+            self._cache[key] = results
+            while len(self._cache) > _QUERY_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return [dict(r) for r in results]
@@ -0,0 +1,330 @@
+"""
+Compact, file-backed store for the NIST 800-53 catalog and its framework mappings.
+
+The crossmap used to be ~30 hand-written dicts in crossmap.py. The
+production need is the full Rev.5 catalog (1,000+ controls and enhancements),
+so the data now lives in files under data/crossmap/ (CROSSMAP_DATA_DIR):
+
+    *.json        OSCAL catalogs (e.g. NIST_SP-800-53_rev5_catalog.json from
+                  usnistgov/oscal-content): control IDs, titles and families;
+                  withdrawn controls are skipped
+    controls.csv  nist_id,nist_title,nist_family — extra controls or title overrides
+    mappings.csv  nist_id,framework,control_id,control_title (framework: iso27001 | csf2 | iso27005)
+
+Catalog order is kept: OSCAL catalogs first, then controls.csv rows that add
+new IDs. Every string is interned once in a string table. Controls and
+target-framework controls are typed arrays of string IDs, and each
+control's mappings use a CSR layout (offsets + target rows per framework),
+so the full catalog costs a few hundred KB instead of thousands of dicts
+and lists. Entry dicts are only built when a caller asks for one.
+
+Parsing OSCAL JSON is the slow part of startup. The store is therefore also
+written to a binary cache (crossmap.bin next to the data, CROSSMAP_CACHE),
+keyed by the SHA-256 of the source files, and later loads read the arrays
+back directly. Rebuild it explicitly (e.g. in the Docker build) with:
+
+    python crossmap_store.py build-cache
+"""
+
+import argparse
+import csv
+import glob
+import hashlib
+import json
+import logging
+import os
+import re
+import struct
+import time
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+FRAMEWORKS = ("iso27001", "csf2", "iso27005")
+
+# Directory with OSCAL catalog JSON and mapping CSV files
+CROSSMAP_DATA_DIR = os.environ.get("CROSSMAP_DATA_DIR") or os.path.join(os.path.dirname(__file__), "data", "crossmap")
+# Binary cache of the parsed store
+CROSSMAP_CACHE = os.environ.get("CROSSMAP_CACHE") or os.path.join(CROSSMAP_DATA_DIR, "crossmap.bin")
+
+CONTROLS_CSV = "controls.csv"
+MAPPINGS_CSV = "mappings.csv"
+CACHE_MAGIC = b"XMAP"
+CACHE_FORMAT = 1
+
+_OSCAL_ID = re.compile(r"^([a-z]{2})-(\d+)(?:\.(\d+))?$")
+
+
+def _oscal_to_nist_id(oscal_id: str) -> Optional[str]:
+    """'ac-2' -> 'AC-2', 'ac-2.1' -> 'AC-2(1)'."""
+    m = _OSCAL_ID.match(oscal_id)
+    if not m:
+        return None
+    base = f"{m.group(1).upper()}-{m.group(2)}"
+    return f"{base}({m.group(3)})" if m.group(3) else base
+
+
+def natural_key(control_id: str):
+    """Sort key that orders numeric parts by value (A.5.9 before A.5.10, AC-2 before AC-10)."""
+    return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", control_id)]
+
+
+def _withdrawn(control: Dict[str, Any]) -> bool:
+    return any(p.get("name") == "status" and p.get("value") == "withdrawn" for p in control.get("props", []))
+
+
+def parse_oscal_catalog(path: str) -> Iterator[Tuple[str, str, str]]:
+    """Yield (nist_id, title, family) for every control and enhancement of an OSCAL catalog."""
+    with open(path, encoding="utf-8") as f:
+        catalog = json.load(f).get("catalog", {})
+
+    def walk(controls: Iterable[Dict[str, Any]], family: str) -> Iterator[Tuple[str, str, str]]:
+        for control in controls:
+            nist_id = _oscal_to_nist_id(control.get("id", ""))
+            if nist_id and not _withdrawn(control):
+                yield nist_id, control.get("title", ""), family
+            yield from walk(control.get("controls", []), family)
+
+    for group in catalog.get("groups", []):
+        yield from walk(group.get("controls", []), group.get("title", ""))
+
+
+def source_files(data_dir: str = CROSSMAP_DATA_DIR) -> List[str]:
+    files = sorted(glob.glob(os.path.join(data_dir, "*.json")))
+    files += [p for p in (os.path.join(data_dir, CONTROLS_CSV), os.path.join(data_dir, MAPPINGS_CSV)) if os.path.exists(p)]
+    return files
+
+
+def sources_digest(files: Sequence[str]) -> bytes:
+    digest = hashlib.sha256()
+    for path in files:
+        digest.update(os.path.basename(path).encode("utf-8") + b"\0")
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.digest()
+
+
+class CrossmapStore:
+    """Interned, array-backed catalog + mappings; entry dicts are materialised on demand."""
+
+    def __init__(self, strings: List[str], columns: Dict[str, array], digest: bytes = b""):
+        self.strings = strings
+        self.columns = columns
+        self.digest = digest
+        self.nist_id = columns["nist_id"]
+        self.nist_title = columns["nist_title"]
+        self.nist_family = columns["nist_family"]
+
+    @property
+    def version(self) -> str:
+        """Short content hash of the source files (changes whenever the mapping data does)."""
+        return self.digest.hex()[:16]
+
+    def __len__(self) -> int:
+        return len(self.nist_id)
+
+    def targets(self, framework: str, row: int) -> array:
+        """Target-control rows that control `row` maps to in `framework`."""
+        offsets = self.columns[f"{framework}.offsets"]
+        return self.columns[f"{framework}.targets"][offsets[row]:offsets[row + 1]]
+
+    def target_count(self, framework: str) -> int:
+        return len(self.columns[f"{framework}.control_id"])
+
+    def target_id(self, framework: str, target: int) -> str:
+        return self.strings[self.columns[f"{framework}.control_id"][target]]
+
+    def target_title(self, framework: str, target: int) -> str:
+        return self.strings[self.columns[f"{framework}.control_title"][target]]
+
+    def entry(self, row: int, framework: Optional[str] = None) -> Dict[str, Any]:
+        """The classic crossmap dict for one control, optionally slimmed to one framework."""
+        s = self.strings
+        entry: Dict[str, Any] = {
+            "nist_id": s[self.nist_id[row]],
+            "nist_title": s[self.nist_title[row]],
+            "nist_family": s[self.nist_family[row]],
+        }
+        for fw in (framework,) if framework else FRAMEWORKS:
+            targets = self.targets(fw, row)
+            entry[fw] = [self.target_id(fw, t) for t in targets]
+            entry[f"{fw}_titles"] = [self.target_title(fw, t) for t in targets]
+        return entry
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the arrays and string table."""
+        return sum(a.itemsize * len(a) for a in self.columns.values()) + sum(len(x) + 49 for x in self.strings)
+
+    # --- binary cache ---
+
+    def save(self, path: str) -> None:
+        blob = "\0".join(self.strings).encode("utf-8")
+        parts = [CACHE_MAGIC, struct.pack("<HI", CACHE_FORMAT, len(self.columns)), self.digest.ljust(32, b"\0")]
+        parts += [struct.pack("<Q", len(blob)), blob]
+        for name, values in self.columns.items():
+            encoded = name.encode("ascii")
+            parts += [struct.pack("<B", len(encoded)), encoded, values.typecode.encode("ascii"),
+                      struct.pack("<Q", len(values)), values.tobytes()]
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(b"".join(parts))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "CrossmapStore":
+        with open(path, "rb") as f:
+            data = f.read()
+        if data[:4] != CACHE_MAGIC:
+            raise ValueError(f"{path} is not a crossmap cache")
+        fmt, ncolumns = struct.unpack_from("<HI", data, 4)
+        if fmt != CACHE_FORMAT:
+            raise ValueError(f"Unsupported crossmap cache format {fmt}")
+        digest = data[10:42]
+        (blob_len,) = struct.unpack_from("<Q", data, 42)
+        pos = 50
+        strings = data[pos:pos + blob_len].decode("utf-8").split("\0")
+        pos += blob_len
+        columns: Dict[str, array] = {}
+        for _ in range(ncolumns):
+            name_len = data[pos]
+            name = data[pos + 1:pos + 1 + name_len].decode("ascii")
+            pos += 1 + name_len
+            typecode = chr(data[pos])
+            (count,) = struct.unpack_from("<Q", data, pos + 1)
+            pos += 9
+            values = array(typecode)
+            values.frombytes(data[pos:pos + count * values.itemsize])
+            pos += count * values.itemsize
+            columns[name] = values
+        return cls(strings, columns, digest)
+
+
+class StoreBuilder:
+    """Accumulates controls and mappings, interning every string once."""
+
+    def __init__(self):
+        self.strings: List[str] = []
+        self._string_ids: Dict[str, int] = {}
+        self.rows: Dict[str, int] = {}
+        self.controls: List[Tuple[int, int, int]] = []
+        self.mappings: List[Dict[str, List[int]]] = []
+        self.targets: Dict[str, Dict[str, int]] = {fw: {} for fw in FRAMEWORKS}
+        self.target_titles: Dict[str, List[int]] = {fw: [] for fw in FRAMEWORKS}
+
+    def intern(self, value: str) -> int:
+        sid = self._string_ids.get(value)
+        if sid is None:
+            sid = self._string_ids[value] = len(self.strings)
+            self.strings.append(value)
+        return sid
+
+    def add_control(self, nist_id: str, title: str, family: str) -> None:
+        nist_id = nist_id.strip().upper()
+        row = self.rows.get(nist_id)
+        control = (self.intern(nist_id), self.intern(title.strip()), self.intern(family.strip()))
+        if row is None:
+            self.rows[nist_id] = len(self.controls)
+            self.controls.append(control)
+            self.mappings.append({fw: [] for fw in FRAMEWORKS})
+        else:
+            self.controls[row] = control
+
+    def add_mapping(self, nist_id: str, framework: str, control_id: str, title: str) -> None:
+        if framework not in FRAMEWORKS:
+            raise ValueError(f"Unknown framework {framework!r} in mapping for {nist_id}")
+        row = self.rows.get(nist_id.strip().upper())
+        if row is None:
+            logger.warning("Skipping mapping %s -> %s %s: control not in catalog", nist_id, framework, control_id)
+            return
+        control_id = control_id.strip()
+        target = self.targets[framework].get(control_id)
+        if target is None:
+            target = self.targets[framework][control_id] = len(self.target_titles[framework])
+            self.target_titles[framework].append(self.intern(title.strip()))
+        if target not in self.mappings[row][framework]:
+            self.mappings[row][framework].append(target)
+
+    def build(self, digest: bytes = b"") -> CrossmapStore:
+        columns: Dict[str, array] = {
+            "nist_id": array("I", (c[0] for c in self.controls)),
+            "nist_title": array("I", (c[1] for c in self.controls)),
+            "nist_family": array("I", (c[2] for c in self.controls)),
+        }
+        for fw in FRAMEWORKS:
+            offsets, targets = array("I", [0]), array("I")
+            for mapping in self.mappings:
+                targets.extend(mapping[fw])
+                offsets.append(len(targets))
+            columns[f"{fw}.offsets"] = offsets
+            columns[f"{fw}.targets"] = targets
+            columns[f"{fw}.control_id"] = array("I", (self.intern(cid) for cid in self.targets[fw]))
+            columns[f"{fw}.control_title"] = array("I", self.target_titles[fw])
+        return CrossmapStore(self.strings, columns, digest)
+
+
+def build_store(files: Sequence[str], digest: bytes = b"") -> CrossmapStore:
+    """Parse OSCAL catalogs, controls.csv and mappings.csv into a store."""
+    builder = StoreBuilder()
+    for path in files:
+        name = os.path.basename(path)
+        if name.endswith(".json"):
+            for nist_id, title, family in parse_oscal_catalog(path):
+                builder.add_control(nist_id, title, family)
+        elif name == CONTROLS_CSV:
+            with open(path, newline="", encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    builder.add_control(row["nist_id"], row["nist_title"], row["nist_family"])
+    for path in files:
+        if os.path.basename(path) == MAPPINGS_CSV:
+            with open(path, newline="", encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    builder.add_mapping(row["nist_id"], row["framework"], row["control_id"], row["control_title"])
+    return builder.build(digest)
+
+
+def load_store(data_dir: str = CROSSMAP_DATA_DIR, cache_path: Optional[str] = CROSSMAP_CACHE) -> CrossmapStore:
+    """Load from the binary cache if it matches the source files, else parse them (and refresh the cache)."""
+    start = time.perf_counter()
+    files = source_files(data_dir)
+    if not files:
+        raise FileNotFoundError(f"No crossmap data (OSCAL *.json, {CONTROLS_CSV}, {MAPPINGS_CSV}) in {data_dir}")
+    digest = sources_digest(files)
+    if cache_path and os.path.exists(cache_path):
+        try:
+            store = CrossmapStore.load(cache_path)
+            if store.digest == digest:
+                logger.debug("Crossmap loaded from cache in %.1f ms", (time.perf_counter() - start) * 1000)
+                return store
+        except (OSError, ValueError, struct.error):
+            logger.warning("Ignoring unreadable crossmap cache %s", cache_path)
+    store = build_store(files, digest)
+    if cache_path:
+        try:
+            store.save(cache_path)
+        except OSError as e:
+            logger.info("Could not write crossmap cache %s: %s", cache_path, e)
+    logger.debug("Crossmap parsed from %d files in %.1f ms", len(files), (time.perf_counter() - start) * 1000)
+    return store
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Crossmap data store maintenance.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build_cmd = sub.add_parser("build-cache", help="Parse the data files and write the binary cache")
+    build_cmd.add_argument("--data-dir", default=CROSSMAP_DATA_DIR)
+    build_cmd.add_argument("--cache", default=CROSSMAP_CACHE)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    files = source_files(args.data_dir)
+    store = build_store(files, sources_digest(files))
+    store.save(args.cache)
+    print(json.dumps({
+        "controls": len(store),
+        "targets": {fw: store.target_count(fw) for fw in FRAMEWORKS},
+        "strings": len(store.strings),
+        "version": store.version,
+        "cache": args.cache,
+        "cache_bytes": os.path.getsize(args.cache),
+    }, indent=2))
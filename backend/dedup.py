@@ -0,0 +1,132 @@
+"""
+MinHash/LSH near-duplicate detection for ingestion.
+
+NIST and FedRAMP PDFs restate the same control text in baselines and repeat
+headers/footers on every page; embedding each copy wastes embedding calls
+and index space, and the copies crowd out diverse results at query time.
+
+Each chunk is reduced to a MinHash signature over word 5-gram shingles.
+Signatures are split into LSH bands so only chunks sharing a band bucket are
+compared, and a candidate counts as a duplicate when the estimated Jaccard
+similarity reaches DEDUP_THRESHOLD. Hashing is deterministic (crc32 plus
+fixed-seed permutations), so signatures persist across runs next to each
+index shard (minhash.npz).
+"""
+
+import logging
+import os
+import re
+import zlib
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Set
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+INGEST_DEDUP = os.environ.get("INGEST_DEDUP", "true").lower() == "true"
+# Estimated Jaccard similarity at or above which two chunks are collapsed
+DEDUP_THRESHOLD = float(os.environ.get("DEDUP_THRESHOLD", "0.9"))
+
+NUM_PERM = 128
+BANDS = 16  # 16 bands x 8 rows: a 0.9-similar pair becomes a candidate with p > 0.9999
+SHINGLE_SIZE = 5
+SIGNATURES_NAME = "minhash.npz"
+
+_PRIME = np.uint64(4294967291)  # largest prime < 2**32, so a * x fits in uint64
+_rng = np.random.RandomState(20240601)
+_PERM_A = _rng.randint(1, int(_PRIME), size=NUM_PERM, dtype=np.int64).astype(np.uint64)
+_PERM_B = _rng.randint(0, int(_PRIME), size=NUM_PERM, dtype=np.int64).astype(np.uint64)
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def _shingles(text: str) -> Set[str]:
+    tokens = _TOKEN_RE.findall(text.lower())
+    if len(tokens) <= SHINGLE_SIZE:
+        return {" ".join(tokens)}
+    return {" ".join(tokens[i:i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1)}
+
+
+def minhash(text: str) -> np.ndarray:
+    """NUM_PERM-value uint32 MinHash signature of a text."""
+    hashed = np.fromiter(
+        (zlib.crc32(s.encode("utf-8")) for s in _shingles(text)), dtype=np.uint64,
+    )
+    permuted = (_PERM_A[:, None] * hashed[None, :] + _PERM_B[:, None]) % _PRIME
+    return permuted.min(axis=1).astype(np.uint32)
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return float(np.mean(a == b))
+
+
+class LSHIndex:
+    """Banded LSH over MinHash signatures of stored (canonical) chunks."""
+
+    def __init__(self, threshold: float = DEDUP_THRESHOLD, bands: int = BANDS):
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = NUM_PERM // bands
+        self.signatures: Dict[str, np.ndarray] = {}
+        self._buckets: List[Dict[bytes, Set[str]]] = [defaultdict(set) for _ in range(bands)]
+
+    def __len__(self) -> int:
+        return len(self.signatures)
+
+    def _band_keys(self, signature: np.ndarray) -> Iterable[bytes]:
+        for band in range(self.bands):
+            yield signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def add(self, chunk_id: str, signature: np.ndarray) -> None:
+        self.signatures[chunk_id] = signature
+        for band, key in enumerate(self._band_keys(signature)):
+            self._buckets[band][key].add(chunk_id)
+
+    def remove(self, chunk_id: str) -> None:
+        signature = self.signatures.pop(chunk_id, None)
+        if signature is None:
+            return
+        for band, key in enumerate(self._band_keys(signature)):
+            bucket = self._buckets[band].get(key)
+            if bucket is not None:
+                bucket.discard(chunk_id)
+                if not bucket:
+                    del self._buckets[band][key]
+
+    def query(self, signature: np.ndarray) -> Optional[str]:
+        """Most similar stored chunk at or above the threshold, or None."""
+        candidates: Set[str] = set()
+        for band, key in enumerate(self._band_keys(signature)):
+            candidates |= self._buckets[band].get(key, set())
+        best, best_score = None, -1.0
+        for chunk_id in sorted(candidates):  # sorted: ties resolve the same way every run
+            score = similarity(signature, self.signatures[chunk_id])
+            if score >= self.threshold and score > best_score:
+                best, best_score = chunk_id, score
+        return best
+
+    def save(self, directory: str, keep: Optional[Sequence[str]] = None) -> None:
+        """Persist signatures (restricted to keep, e.g. the ids left in the shard)."""
+        ids = [i for i in (keep if keep is not None else self.signatures) if i in self.signatures]
+        matrix = np.stack([self.signatures[i] for i in ids]) if ids else np.zeros((0, NUM_PERM), dtype=np.uint32)
+        path = os.path.join(directory, SIGNATURES_NAME)
+        with open(path + ".tmp", "wb") as f:
+            np.savez(f, ids=np.array(ids, dtype=str), signatures=matrix)
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, directory: str, threshold: float = DEDUP_THRESHOLD) -> "LSHIndex":
+        """Signatures saved next to an index shard; empty if none were saved."""
+        index = cls(threshold)
+        path = os.path.join(directory, SIGNATURES_NAME)
+        if not os.path.exists(path):
+            return index
+        try:
+            with np.load(path) as data:
+                for chunk_id, signature in zip(data["ids"].tolist(), data["signatures"]):
+                    index.add(chunk_id, signature)
+        except (OSError, ValueError, KeyError):
+            logger.warning("Ignoring unreadable MinHash signatures at %s", path)
+            return cls(threshold)
+        return index
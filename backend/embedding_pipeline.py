@@ -0,0 +1,281 @@
+"""
+Batched, concurrent embedding stage for ingestion.
+
+Replaces the single opaque FAISS.from_documents() call with an explicit
+pipeline: chunks are embedded in batches with a bounded number of batches
+in flight, the batch size adapts to backend latency and errors (AIMD),
+failed batches are retried with exponential backoff, every completed batch
+is checkpointed to disk so an interrupted run resumes where it stopped,
+and throughput/ETA is reported as batches complete.
+"""
+
+import hashlib
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EMBED_BATCH_SIZE = int(os.environ.get("EMBED_BATCH_SIZE", "64"))
+EMBED_CONCURRENCY = int(os.environ.get("EMBED_CONCURRENCY", "4"))
+EMBED_MAX_RETRIES = int(os.environ.get("EMBED_MAX_RETRIES", "5"))
+# Batches slower than this (seconds) shrink the batch size; faster ones grow it
+EMBED_TARGET_LATENCY = float(os.environ.get("EMBED_TARGET_LATENCY", "2.0"))
+# Texts added to the batch size after each batch that meets the latency target
+EMBED_BATCH_STEP = int(os.environ.get("EMBED_BATCH_STEP", "8"))
+
+CHECKPOINT_ROOT = os.path.join(os.path.dirname(__file__), ".ingest_cache", "embeddings")
+
+
+class EmbeddingError(RuntimeError):
+    """Raised when a batch still fails after EMBED_MAX_RETRIES attempts."""
+
+
+def checkpoint_dir_for(signature: str) -> str:
+    """Checkpoint directory for one embedding model (vectors are model-specific)."""
+    return os.path.join(CHECKPOINT_ROOT, hashlib.sha256(signature.encode("utf-8")).hexdigest()[:16])
+
+
+class EmbeddingCheckpoint:
+    """Completed batches on disk, one .npz per batch, keyed by chunk ID.
+
+    The chunk ID -> file index is read once (IDs only) and kept up to date by
+    save(), so one instance shared by every staging shard of a run opens each
+    batch file once instead of rescanning the directory per shard.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._index: Optional[Dict[str, str]] = None
+
+    def _load_index(self) -> Dict[str, str]:
+        index: Dict[str, str] = {}
+        if not os.path.isdir(self.directory):
+            return index
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith(".npz"):
+                continue
+            try:
+                with np.load(os.path.join(self.directory, name)) as data:
+                    for chunk_id in data["ids"].tolist():
+                        index[chunk_id] = name
+            except (OSError, ValueError, KeyError):
+                logger.warning("Skipping unreadable embedding checkpoint %s", name)
+        return index
+
+    def load(self, wanted: Sequence[str]) -> Dict[str, np.ndarray]:
+        with self._lock:
+            if self._index is None:
+                self._index = self._load_index()
+            files: Dict[str, set] = {}
+            for chunk_id in wanted:
+                name = self._index.get(chunk_id)
+                if name is not None:
+                    files.setdefault(name, set()).add(chunk_id)
+        found: Dict[str, np.ndarray] = {}
+        for name, chunk_ids in sorted(files.items()):
+            try:
+                with np.load(os.path.join(self.directory, name)) as data:
+                    for chunk_id, vector in zip(data["ids"].tolist(), data["vectors"]):
+                        if chunk_id in chunk_ids:
+                            found[chunk_id] = vector
+            except (OSError, ValueError, KeyError):
+                logger.warning("Skipping unreadable embedding checkpoint %s", name)
+        return found
+
+    def save(self, ids: Sequence[str], vectors: Sequence[Sequence[float]]) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        name = hashlib.sha256("\n".join(ids).encode("utf-8")).hexdigest()[:24] + ".npz"
+        path = os.path.join(self.directory, name)
+        tmp_path = path + ".tmp"
+        with self._lock:
+            with open(tmp_path, "wb") as f:
+                np.savez(f, ids=np.array(ids), vectors=np.asarray(vectors, dtype=np.float32))
+            os.replace(tmp_path, path)
+            if self._index is not None:
+                for chunk_id in ids:
+                    self._index[chunk_id] = name
+
+    def clear(self) -> None:
+        if not os.path.isdir(self.directory):
+            return
+        for name in os.listdir(self.directory):
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+        with self._lock:
+            self._index = None
+
+
+class EmbeddingPipeline:
+    """Embed texts in adaptive, concurrent, retried and checkpointed batches.
+
+    Args:
+        embeddings: LangChain Embeddings (must implement embed_documents).
+        batch_size: initial batch size.
+        max_in_flight: maximum concurrent embedding requests.
+        checkpoint_dir: where completed batches are persisted; None disables.
+        checkpoint: an EmbeddingCheckpoint to share across pipelines (overrides checkpoint_dir).
+        progress: optional callback receiving a progress dict per batch.
+    """
+
+    def __init__(
+        self,
+        embeddings,
+        batch_size: int = EMBED_BATCH_SIZE,
+        max_in_flight: int = EMBED_CONCURRENCY,
+        min_batch_size: int = 1,
+        max_batch_size: int = 512,
+        target_latency: float = EMBED_TARGET_LATENCY,
+        max_retries: int = EMBED_MAX_RETRIES,
+        backoff_base: float = 1.0,
+        backoff_max: float = 60.0,
+        checkpoint_dir: Optional[str] = None,
+        checkpoint: Optional[EmbeddingCheckpoint] = None,
+        progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ):
+        self.embeddings = embeddings
+        self.batch_size = max(min_batch_size, min(batch_size, max_batch_size))
+        self.max_in_flight = max(1, max_in_flight)
+        self.min_batch_size = min_batch_size
+        self.max_batch_size = max_batch_size
+        self.target_latency = target_latency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.checkpoint = checkpoint or (EmbeddingCheckpoint(checkpoint_dir) if checkpoint_dir else None)
+        self.progress = progress
+        self.stats: Dict[str, Any] = {}
+
+    # -- batch size control (main thread only) -------------------------------
+
+    def _on_success(self, latency: float) -> None:
+        if latency <= self.target_latency:
+            # Additive increase (fixed step) while the backend keeps up
+            self.batch_size = min(self.max_batch_size, self.batch_size + EMBED_BATCH_STEP)
+        else:
+            # Gentle multiplicative decrease when a batch is slower than the target
+            self.batch_size = max(self.min_batch_size, int(self.batch_size * 0.75))
+
+    def _on_failure(self) -> None:
+        # Multiplicative decrease on errors (rate limits, payload too large, timeouts)
+        self.batch_size = max(self.min_batch_size, self.batch_size // 2)
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1)))
+        return delay * (0.5 + random.random() / 2)  # jitter avoids synchronized retries
+
+    # -- worker --------------------------------------------------------------
+
+    def _embed_batch(self, texts: List[str]):
+        began = time.perf_counter()
+        vectors = self.embeddings.embed_documents(texts)
+        if len(vectors) != len(texts):
+            raise EmbeddingError(f"Backend returned {len(vectors)} vectors for {len(texts)} texts")
+        return vectors, time.perf_counter() - began
+
+    # -- driver --------------------------------------------------------------
+
+    def embed(self, ids: Sequence[str], texts: Sequence[str]) -> List[List[float]]:
+        """Return one vector per text, in input order."""
+        total = len(texts)
+        results: Dict[int, Any] = {}
+
+        if self.checkpoint:
+            restored = self.checkpoint.load(ids)
+            for i, chunk_id in enumerate(ids):
+                if chunk_id in restored:
+                    results[i] = restored[chunk_id].tolist()
+        resumed = len(results)
+        if resumed:
+            logger.info("Resuming embedding: %d/%d chunks restored from checkpoint", resumed, total)
+
+        pending = deque(i for i in range(total) if i not in results)
+        attempts: Dict[int, int] = {}
+        in_flight: Dict[Any, List[int]] = {}
+        resume_at = 0.0
+        batches = retries = 0
+        began = time.perf_counter()
+        last_log = 0.0
+
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as pool:
+            while pending or in_flight:
+                now = time.perf_counter()
+                while pending and len(in_flight) < self.max_in_flight and now >= resume_at:
+                    batch = [pending.popleft() for _ in range(min(self.batch_size, len(pending)))]
+                    future = pool.submit(self._embed_batch, [texts[i] for i in batch])
+                    in_flight[future] = batch
+
+                if not in_flight:
+                    time.sleep(max(0.0, resume_at - time.perf_counter()))
+                    continue
+
+                timeout = max(0.0, resume_at - now) if pending and now < resume_at else None
+                done, _ = wait(list(in_flight), timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    batch = in_flight.pop(future)
+                    try:
+                        vectors, latency = future.result()
+                    except Exception as e:
+                        retries += 1
+                        attempt = max(attempts.get(i, 0) for i in batch) + 1
+                        for i in batch:
+                            attempts[i] = attempt
+                        if attempt > self.max_retries:
+                            raise EmbeddingError(
+                                f"Embedding batch failed after {self.max_retries} retries: {e}"
+                            ) from e
+                        self._on_failure()
+                        delay = self._backoff(attempt)
+                        resume_at = max(resume_at, time.perf_counter() + delay)
+                        logger.warning(
+                            "Embedding batch of %d failed (attempt %d/%d): %s — retrying in %.1fs with batch size %d",
+                            len(batch), attempt, self.max_retries, e, delay, self.batch_size,
+                        )
+                        pending.extendleft(reversed(batch))
+                        continue
+
+                    batches += 1
+                    for i, vector in zip(batch, vectors):
+                        results[i] = vector
+                    if self.checkpoint:
+                        self.checkpoint.save([ids[i] for i in batch], vectors)
+                    self._on_success(latency)
+
+                    report = self._progress_report(len(results), total, resumed, began, batches, retries)
+                    if self.progress:
+                        self.progress(report)
+                    if report["elapsed_seconds"] - last_log >= 5.0 or len(results) == total:
+                        last_log = report["elapsed_seconds"]
+                        logger.info(
+                            "Embedded %d/%d chunks (%.1f chunks/s, ETA %.0fs, batch size %d)",
+                            report["embedded"], total, report["chunks_per_sec"],
+                            report["eta_seconds"], self.batch_size,
+                        )
+
+        self.stats = self._progress_report(len(results), total, resumed, began, batches, retries)
+        return [results[i] for i in range(total)]
+
+    def _progress_report(self, done: int, total: int, resumed: int, began: float, batches: int, retries: int):
+        elapsed = time.perf_counter() - began
+        rate = (done - resumed) / elapsed if elapsed > 0 else 0.0
+        return {
+            "embedded": done,
+            "total": total,
+            "resumed_from_checkpoint": resumed,
+            "batches": batches,
+            "retries": retries,
+            "batch_size": self.batch_size,
+            "elapsed_seconds": round(elapsed, 3),
+            "chunks_per_sec": round(rate, 2),
+            "eta_seconds": round((total - done) / rate, 1) if rate > 0 else None,
+        }
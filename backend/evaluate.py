@@ -0,0 +1,335 @@
+"""
+Offline retrieval evaluation harness.
+
+Runs a golden set of questions (data/golden_set.json) directly against the
+FAISS index and the retrieval stage used by RAGEngine — no LLM generation.
+Each query is embedded once, then every retrieval configuration in the sweep
+(mode x k x fetch_k) is scored with recall@k, MRR and nDCG@k, alongside
+embedding and search latency. Off-topic entries measure how well
+RELEVANCE_THRESHOLD rejects unrelated questions.
+
+Usage:
+    python evaluate.py
+    python evaluate.py --k 3,5,10 --fetch-k 20,40 --mode mmr,similarity
+    python evaluate.py --index /tmp/index_chunk1000 --threshold 1.2 --json report.json
+    python evaluate.py --baseline-raw   # compressed index vs its float32 vectors
+"""
+
+import argparse
+import json
+import logging
+import math
+import os
+import re
+import statistics
+import time
+from typing import Any, Dict, List, Optional, Sequence, Set
+
+from index_store import INDEX_ROOT, resolve_index_path
+from rag_engine import (
+    RELEVANCE_THRESHOLD,
+    RETRIEVAL_FETCH_K,
+    RETRIEVAL_K,
+    get_embeddings,
+    retrieve_by_vector,
+)
+
+logger = logging.getLogger(__name__)
+
+GOLDEN_SET_PATH = os.path.join(os.path.dirname(__file__), "data", "golden_set.json")
+INDEX_PATH = INDEX_ROOT
+
+MODES = ("mmr", "similarity")
+
+
+# ---------------------------------------------------------------------------
+# Golden set
+# ---------------------------------------------------------------------------
+
+def load_golden_set(path: str = GOLDEN_SET_PATH) -> List[Dict[str, Any]]:
+    """Load golden queries from JSON ({"queries": [...]}) or a bare list."""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return data["queries"] if isinstance(data, dict) else data
+
+
+def _targets(query: Dict[str, Any]) -> Set[str]:
+    """Return the set of relevance targets ("control:AC-2", "page:file.pdf:3")."""
+    targets = {f"control:{c.upper()}" for c in query.get("expected_controls", [])}
+    for p in query.get("expected_pages", []):
+        targets.add(f"page:{p['source']}:{p['page']}")
+    return targets
+
+
+def _control_pattern(control_id: str):
+    # AC-2 matches "AC-2" and "AC-2(1)" but not "AC-20"
+    return re.compile(rf"(?<![A-Za-z0-9]){re.escape(control_id)}(?![0-9])")
+
+
+def matched_targets(doc, targets: Set[str]) -> Set[str]:
+    """Return the targets a retrieved document satisfies."""
+    hits = set()
+    page_key = f"page:{doc.metadata.get('source', '')}:{doc.metadata.get('page', '')}"
+    if page_key in targets:
+        hits.add(page_key)
+    for t in targets:
+        if t.startswith("control:") and _control_pattern(t[len("control:"):]).search(doc.page_content):
+            hits.add(t)
+    return hits
+
+
+# ---------------------------------------------------------------------------
+# Metrics
+# ---------------------------------------------------------------------------
+
+def score_ranking(hits_per_rank: Sequence[Set[str]], n_targets: int) -> Dict[str, float]:
+    """Compute recall, reciprocal rank and nDCG for one ranked result list.
+
+    Gain is novelty-aware: a document earns 1 only if it covers a target no
+    earlier document covered, so duplicates of the same page cannot push
+    nDCG above 1 and the ideal ranking covers one new target per rank.
+    """
+    covered: Set[str] = set()
+    rr = 0.0
+    dcg = 0.0
+    for rank, hits in enumerate(hits_per_rank, start=1):
+        if hits and rr == 0.0:
+            rr = 1.0 / rank
+        new = hits - covered
+        if new:
+            dcg += 1.0 / math.log2(rank + 1)
+            covered |= new
+    ideal = sum(1.0 / math.log2(r + 1) for r in range(1, min(len(hits_per_rank), n_targets) + 1))
+    return {
+        "recall": len(covered) / n_targets if n_targets else 0.0,
+        "rr": rr,
+        "ndcg": dcg / ideal if ideal else 0.0,
+    }
+
+
+def _percentile(values: Sequence[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[idx]
+
+
+def _latency_summary(samples_ms: Sequence[float]) -> Dict[str, float]:
+    return {
+        "mean_ms": round(statistics.fmean(samples_ms), 3) if samples_ms else 0.0,
+        "p50_ms": round(_percentile(samples_ms, 50), 3),
+        "p95_ms": round(_percentile(samples_ms, 95), 3),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Evaluation
+# ---------------------------------------------------------------------------
+
+def _search(vector_store, vector, mode: str, k: int, fetch_k: int):
+    """Run one retrieval configuration; returns (docs, top L2 distance)."""
+    if mode == "mmr":
+        return retrieve_by_vector(vector_store, vector, k=k, fetch_k=fetch_k)
+    scored = vector_store.similarity_search_with_score_by_vector(vector, k=k, fetch_k=fetch_k)
+    top_score = scored[0][1] if scored else None
+    return [doc for doc, _ in scored], top_score
+
+
+def evaluate_retrieval(
+    vector_store,
+    embeddings,
+    golden: List[Dict[str, Any]],
+    k_values: Sequence[int] = (RETRIEVAL_K,),
+    fetch_k_values: Sequence[int] = (RETRIEVAL_FETCH_K,),
+    modes: Sequence[str] = ("mmr",),
+    threshold: float = RELEVANCE_THRESHOLD,
+) -> Dict[str, Any]:
+    """Score every retrieval configuration against the golden set."""
+    # Embed each question once; the sweep reuses the vectors
+    embed_ms = []
+    vectors = []
+    for q in golden:
+        start = time.perf_counter()
+        vectors.append(embeddings.embed_query(q["question"]))
+        embed_ms.append((time.perf_counter() - start) * 1000)
+
+    on_topic = [i for i, q in enumerate(golden) if not q.get("off_topic")]
+    off_topic = [i for i, q in enumerate(golden) if q.get("off_topic")]
+
+    configs = []
+    for mode in modes:
+        for k in k_values:
+            for fetch_k in fetch_k_values:
+                if mode == "mmr" and fetch_k < k:
+                    continue
+                search_ms = []
+                per_query = []
+                top_scores: Dict[int, Optional[float]] = {}
+                for i, q in enumerate(golden):
+                    start = time.perf_counter()
+                    docs, top_score = _search(vector_store, vectors[i], mode, k, fetch_k)
+                    search_ms.append((time.perf_counter() - start) * 1000)
+                    top_scores[i] = top_score
+                    if i in on_topic:
+                        targets = _targets(q)
+                        hits = [matched_targets(d, targets) for d in docs]
+                        per_query.append({
+                            "question": q["question"],
+                            "top_score": float(top_score) if top_score is not None else None,
+                            **score_ranking(hits, len(targets)),
+                        })
+
+                def _rejected(i):
+                    return top_scores[i] is not None and top_scores[i] > threshold
+
+                configs.append({
+                    "mode": mode,
+                    "k": k,
+                    "fetch_k": fetch_k,
+                    "recall_at_k": _mean(p["recall"] for p in per_query),
+                    "mrr": _mean(p["rr"] for p in per_query),
+                    "ndcg_at_k": _mean(p["ndcg"] for p in per_query),
+                    "false_rejection_rate": _mean(1.0 if _rejected(i) else 0.0 for i in on_topic),
+                    "off_topic_rejection_rate": _mean(1.0 if _rejected(i) else 0.0 for i in off_topic),
+                    "search_latency": _latency_summary(search_ms),
+                    "queries": per_query,
+                })
+
+    return {
+        "golden_queries": len(golden),
+        "on_topic": len(on_topic),
+        "off_topic": len(off_topic),
+        "threshold": threshold,
+        "embed_latency": _latency_summary(embed_ms),
+        "threshold_hint": _threshold_hint(vector_store, vectors, on_topic, off_topic),
+        "configs": configs,
+    }
+
+
+def _mean(values) -> float:
+    values = list(values)
+    return round(statistics.fmean(values), 4) if values else 0.0
+
+
+def _threshold_hint(vector_store, vectors, on_topic, off_topic) -> Dict[str, Optional[float]]:
+    """Compare nearest-chunk L2 distances of on- and off-topic queries.
+
+    When the two groups separate cleanly, the midpoint between the worst
+    on-topic and the best off-topic distance is a reasonable threshold.
+    """
+    def nearest(i):
+        scored = vector_store.similarity_search_with_score_by_vector(vectors[i], k=1)
+        return float(scored[0][1]) if scored else None
+
+    on_scores = [s for s in (nearest(i) for i in on_topic) if s is not None]
+    off_scores = [s for s in (nearest(i) for i in off_topic) if s is not None]
+    max_on = max(on_scores) if on_scores else None
+    min_off = min(off_scores) if off_scores else None
+    suggested = None
+    if max_on is not None and min_off is not None and max_on < min_off:
+        suggested = round((max_on + min_off) / 2, 4)
+    return {"max_on_topic_l2": max_on, "min_off_topic_l2": min_off, "suggested_threshold": suggested}
+
+
+def compare_to_baseline(report: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    """Annotate each config with its metric deltas against the same config on a baseline index."""
+    by_config = {(c["mode"], c["k"], c["fetch_k"]): c for c in baseline["configs"]}
+    for c in report["configs"]:
+        base = by_config.get((c["mode"], c["k"], c["fetch_k"]))
+        if base is not None:
+            c["vs_baseline"] = {
+                metric: round(c[metric] - base[metric], 4) for metric in ("recall_at_k", "mrr", "ndcg_at_k")
+            }
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """Render the sweep as a fixed-width table."""
+    lines = [
+        f"Golden queries: {report['golden_queries']} "
+        f"({report['on_topic']} on-topic, {report['off_topic']} off-topic), "
+        f"threshold L2 > {report['threshold']}",
+        f"Embed latency: p50 {report['embed_latency']['p50_ms']} ms, "
+        f"p95 {report['embed_latency']['p95_ms']} ms",
+        f"Nearest-chunk L2: on-topic max {report['threshold_hint'].get('max_on_topic_l2')}, "
+        f"off-topic min {report['threshold_hint'].get('min_off_topic_l2')}, "
+        f"suggested threshold {report['threshold_hint'].get('suggested_threshold')}",
+        "",
+        f"{'mode':<11}{'k':>4}{'fetch_k':>9}{'recall@k':>10}{'MRR':>8}{'nDCG@k':>9}"
+        f"{'false_rej':>11}{'offtopic_rej':>14}{'p50 ms':>9}{'p95 ms':>9}",
+    ]
+    for c in report["configs"]:
+        lines.append(
+            f"{c['mode']:<11}{c['k']:>4}{c['fetch_k']:>9}{c['recall_at_k']:>10.3f}{c['mrr']:>8.3f}"
+            f"{c['ndcg_at_k']:>9.3f}{c['false_rejection_rate']:>11.2f}{c['off_topic_rejection_rate']:>14.2f}"
+            f"{c['search_latency']['p50_ms']:>9.2f}{c['search_latency']['p95_ms']:>9.2f}"
+        )
+    deltas = [c for c in report["configs"] if "vs_baseline" in c]
+    if deltas:
+        lines += ["", "Change vs float32 baseline:"]
+        for c in deltas:
+            d = c["vs_baseline"]
+            lines.append(
+                f"{c['mode']:<11}{c['k']:>4}{c['fetch_k']:>9}{d['recall_at_k']:>+10.3f}{d['mrr']:>+8.3f}"
+                f"{d['ndcg_at_k']:>+9.3f}"
+            )
+    return "\n".join(lines)
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description="Evaluate retrieval quality against a golden set (no LLM).")
+    parser.add_argument("--golden", default=GOLDEN_SET_PATH, help="Golden set JSON path")
+    parser.add_argument("--index", default=INDEX_PATH, help="Index root (live version is used) or FAISS index directory")
+    parser.add_argument("--k", type=_int_list, default=[RETRIEVAL_K], help="Comma-separated k values")
+    parser.add_argument("--fetch-k", type=_int_list, default=[RETRIEVAL_FETCH_K], help="Comma-separated fetch_k values")
+    parser.add_argument("--mode", default="mmr", help="Comma-separated modes: mmr, similarity")
+    parser.add_argument("--threshold", type=float, default=RELEVANCE_THRESHOLD, help="L2 relevance threshold")
+    parser.add_argument("--shards", help="Comma-separated index shards to search (default: all)")
+    parser.add_argument("--baseline-raw", action="store_true",
+                        help="Also score the uncompressed float32 vectors and report the change")
+    parser.add_argument("--json", dest="json_path", help="Write the full report to this path")
+    args = parser.parse_args(argv)
+
+    modes = [m.strip() for m in args.mode.split(",") if m.strip()]
+    unknown = set(modes) - set(MODES)
+    if unknown:
+        parser.error(f"Unknown mode(s): {', '.join(sorted(unknown))}")
+
+    from sharded_index import ShardedIndex
+
+    embeddings = get_embeddings()
+    golden = load_golden_set(args.golden)
+    shards = [s.strip() for s in args.shards.split(",") if s.strip()] if args.shards else None
+
+    def _run(raw: bool) -> Dict[str, Any]:
+        vector_store = ShardedIndex.load(resolve_index_path(args.index), embeddings, raw=raw).select(shards)
+        return evaluate_retrieval(
+            vector_store,
+            embeddings,
+            golden,
+            k_values=args.k,
+            fetch_k_values=args.fetch_k,
+            modes=modes,
+            threshold=args.threshold,
+        )
+
+    report = _run(raw=False)
+    if args.baseline_raw:
+        baseline = _run(raw=True)
+        compare_to_baseline(report, baseline)
+        report["baseline_threshold_hint"] = baseline["threshold_hint"]
+    print(format_report(report))
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
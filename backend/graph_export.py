@@ -0,0 +1,187 @@
+"""
+Streaming Sankey/graph export of the crossmap at control, family or framework level.
+
+generate_sankey_csv wrote one row per NIST -> target edge with value 1, and
+built the whole CSV in a StringIO first. On the full Rev.5 catalog that
+gives thousands of links, which makes a heavy and unreadable diagram.
+aggregate() folds the edges to the level asked for and sums their weights:
+
+    control    NIST AC-2            -> ISO A.5.16 / CSF PR.AA-01 / ISO27005 8.2   (one per mapping)
+    family     NIST Access Control  -> ISO A.5 / CSF PR.AA / ISO27005 8           (theme, category, clause)
+    framework  NIST Access Control  -> ISO 27001:2022 / NIST CSF 2.0 / ISO 27005
+
+Each (level, frameworks) graph is computed once and cached; the mapping data
+only changes with a deploy. export() then streams it as CSV
+(source,target,value — the Sankey format), JSON ({"nodes", "links"}) or
+GraphML, in chunks of EXPORT_CHUNK_ROWS rows. The document is never built
+in memory as a whole.
+
+Usage:
+    python graph_export.py --level family --format graphml > crossmap.graphml
+"""
+
+import argparse
+import csv
+import io
+import json
+import sys
+from functools import lru_cache
+from typing import Dict, Iterator, NamedTuple, Optional, Sequence, Tuple
+from xml.sax.saxutils import escape, quoteattr
+
+from crossmap import CROSSMAP, FRAMEWORK_NAMES, FRAMEWORKS
+
+LEVELS = ("control", "family", "framework")
+FORMATS = {
+    "csv": "text/csv",
+    "json": "application/json",
+    "graphml": "application/graphml+xml",
+}
+# Rows (links or nodes) per streamed chunk
+EXPORT_CHUNK_ROWS = 500
+
+# Node label prefix per framework (matches the original Sankey CSV)
+_LABEL_PREFIX = {"nist": "NIST", "iso27001": "ISO", "csf2": "CSF", "iso27005": "ISO27005"}
+
+
+class Node(NamedTuple):
+    id: str
+    framework: str  # "nist" or a target framework
+    group: str  # NIST family / target framework display name
+
+
+class Graph(NamedTuple):
+    level: str
+    nodes: Tuple[Node, ...]
+    links: Tuple[Tuple[str, str, int], ...]  # (source id, target id, summed weight)
+
+
+def target_group(framework: str, control_id: str) -> str:
+    """Family-level bucket of a target control: ISO theme A.8, CSF category DE.CM, ISO 27005 clause 8."""
+    if framework == "csf2":
+        return control_id.split("-", 1)[0]
+    if framework == "iso27001":
+        return ".".join(control_id.split(".")[:2])
+    return control_id.split(".", 1)[0]
+
+
+def normalize_frameworks(frameworks: Optional[Sequence[str]] = None) -> Tuple[str, ...]:
+    """Validated target frameworks without repeats, in FRAMEWORKS order (all when none are given)."""
+    for fw in frameworks or ():
+        if fw not in FRAMEWORKS:
+            raise ValueError(f"Unknown framework {fw!r}; expected one of {', '.join(FRAMEWORKS)}")
+    return tuple(fw for fw in FRAMEWORKS if fw in frameworks) if frameworks else FRAMEWORKS
+
+
+@lru_cache(maxsize=32)
+def aggregate(level: str = "control", frameworks: Tuple[str, ...] = FRAMEWORKS) -> Graph:
+    """Nodes and weighted links at `level`, for the given target frameworks (cached per argument pair)."""
+    if level not in LEVELS:
+        raise ValueError(f"Unknown level {level!r}; expected one of {', '.join(LEVELS)}")
+    frameworks = normalize_frameworks(frameworks)
+
+    nodes: Dict[str, Node] = {}
+    links: Dict[Tuple[str, str], int] = {}
+    for entry in CROSSMAP:
+        family = entry["nist_family"]
+        source = f"NIST {entry['nist_id'] if level == 'control' else family}"
+        nodes.setdefault(source, Node(source, "nist", family))
+        for fw in frameworks:
+            name = FRAMEWORK_NAMES[fw]
+            for control_id in entry[fw]:
+                if level == "control":
+                    target = f"{_LABEL_PREFIX[fw]} {control_id}"
+                elif level == "family":
+                    target = f"{_LABEL_PREFIX[fw]} {target_group(fw, control_id)}"
+                else:
+                    target = name
+                nodes.setdefault(target, Node(target, fw, name))
+                links[(source, target)] = links.get((source, target), 0) + 1
+    # NIST nodes first (catalog order), then targets by framework
+    ordered = sorted(nodes.values(), key=lambda n: 0 if n.framework == "nist" else 1 + FRAMEWORKS.index(n.framework))
+    return Graph(level, tuple(ordered), tuple((s, t, w) for (s, t), w in links.items()))
+
+
+def _chunks(items: Sequence) -> Iterator[Sequence]:
+    size = EXPORT_CHUNK_ROWS
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _csv(graph: Graph) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["source", "target", "value"])
+    for chunk in _chunks(graph.links):
+        writer.writerows(chunk)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _json(graph: Graph) -> Iterator[str]:
+    yield f'{{"level": {json.dumps(graph.level)}, "nodes": ['
+    separator = ""
+    for chunk in _chunks(graph.nodes):
+        yield separator + ", ".join(
+            json.dumps({"id": n.id, "framework": n.framework, "group": n.group}) for n in chunk
+        )
+        separator = ", "
+    yield '], "links": ['
+    separator = ""
+    for chunk in _chunks(graph.links):
+        yield separator + ", ".join(
+            json.dumps({"source": s, "target": t, "value": w}) for s, t, w in chunk
+        )
+        separator = ", "
+    yield "]}\n"
+
+
+def _graphml(graph: Graph) -> Iterator[str]:
+    yield (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n'
+        '  <key id="framework" for="node" attr.name="framework" attr.type="string"/>\n'
+        '  <key id="group" for="node" attr.name="group" attr.type="string"/>\n'
+        '  <key id="weight" for="edge" attr.name="weight" attr.type="int"/>\n'
+        f'  <graph id={quoteattr("crossmap-" + graph.level)} edgedefault="directed">\n'
+    )
+    for chunk in _chunks(graph.nodes):
+        yield "".join(
+            f'    <node id={quoteattr(n.id)}><data key="framework">{escape(n.framework)}</data>'
+            f'<data key="group">{escape(n.group)}</data></node>\n'
+            for n in chunk
+        )
+    for chunk in _chunks(graph.links):
+        yield "".join(
+            f'    <edge source={quoteattr(s)} target={quoteattr(t)}><data key="weight">{w}</data></edge>\n'
+            for s, t, w in chunk
+        )
+    yield "  </graph>\n</graphml>\n"
+
+
+_WRITERS = {"csv": _csv, "json": _json, "graphml": _graphml}
+
+
+def export(level: str = "control", fmt: str = "csv", frameworks: Optional[Sequence[str]] = None) -> Iterator[str]:
+    """Stream the graph at `level` as csv, json or graphml text chunks.
+
+    Raises ValueError (before streaming starts) for an unknown level, format or framework.
+    """
+    if fmt not in _WRITERS:
+        raise ValueError(f"Unknown format {fmt!r}; expected one of {', '.join(_WRITERS)}")
+    graph = aggregate(level, normalize_frameworks(frameworks))
+    return _WRITERS[fmt](graph)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the crossmap as a weighted graph.")
+    parser.add_argument("--level", choices=LEVELS, default="control")
+    parser.add_argument("--format", choices=list(FORMATS), default="csv")
+    parser.add_argument("--framework", action="append", choices=FRAMEWORKS,
+                        help="Target framework to include (repeatable; default all)")
+    args = parser.parse_args()
+    for chunk in export(args.level, args.format, args.framework):
+        sys.stdout.write(chunk)
@@ -0,0 +1,129 @@
+"""
+Cached component health for /api/health.
+
+Load balancers and uptime monitors poll /api/health every few seconds per
+instance. Running the checks inline (a DB round trip, a stat of the index
+directory) on every poll added steady connection churn and made the
+endpoint only as fast as its slowest dependency. A HealthMonitor now runs
+each registered check on a background thread (one per worker process) on
+its own interval. /api/health only copies the latest results, which
+include each check's status, last latency and age.
+
+A check is a zero-argument callable that returns ok (bool) or
+(ok, detail dict), and may raise. Only critical checks decide whether the
+service reports "healthy" or "degraded". A failing non-critical check
+(e.g. the LLM backend) is reported without changing the overall status.
+"""
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Seconds between background runs of a check (DB, index)
+HEALTH_CHECK_INTERVAL = float(os.environ.get("HEALTH_CHECK_INTERVAL", "15"))
+# The LLM reachability probe is a network call to Gemini/Ollama, so it runs less often
+HEALTH_LLM_CHECK_INTERVAL = float(os.environ.get("HEALTH_LLM_CHECK_INTERVAL", "60"))
+HEALTH_CHECK_LLM = os.environ.get("HEALTH_CHECK_LLM", "true").lower() == "true"
+HEALTH_LLM_TIMEOUT = float(os.environ.get("HEALTH_LLM_TIMEOUT", "3"))
+
+
+class _Check:
+    def __init__(self, name: str, fn: Callable[[], Any], interval: float, critical: bool):
+        self.name = name
+        self.fn = fn
+        self.interval = interval
+        self.critical = critical
+        self.result: Optional[Dict[str, Any]] = None
+        self.checked_at: Optional[float] = None  # monotonic
+
+    def due(self, now: float) -> bool:
+        return self.checked_at is None or now - self.checked_at >= self.interval
+
+
+class HealthMonitor:
+    """Runs registered checks in the background and serves their last results."""
+
+    def __init__(self, interval: float = HEALTH_CHECK_INTERVAL):
+        self.interval = interval
+        self._checks: Dict[str, _Check] = {}
+        self._lock = threading.Lock()
+        self._run_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+
+    def register(self, name: str, fn: Callable[[], Any], interval: Optional[float] = None,
+                 critical: bool = True) -> None:
+        self._checks[name] = _Check(name, fn, interval or self.interval, critical)
+
+    def _run(self, check: _Check) -> None:
+        start = time.perf_counter()
+        detail, error = None, None
+        try:
+            outcome = check.fn()
+            ok, detail = outcome if isinstance(outcome, tuple) else (outcome, None)
+            ok = bool(ok)
+        except Exception as e:
+            ok, error = False, str(e)
+            logger.warning("Health check %s failed: %s", check.name, e)
+        result = {
+            "status": "ok" if ok else "fail",
+            "critical": check.critical,
+            "latency_ms": round((time.perf_counter() - start) * 1000, 2),
+            "checked_at": datetime.now(timezone.utc).isoformat(),
+        }
+        if detail:
+            result["detail"] = detail
+        if error:
+            result["error"] = error
+        with self._lock:
+            check.result, check.checked_at = result, time.monotonic()
+
+    def refresh(self, force: bool = False) -> None:
+        """Run every check that is due (all of them with force=True)."""
+        with self._run_lock:
+            now = time.monotonic()
+            for check in list(self._checks.values()):
+                if force or check.due(now):
+                    self._run(check)
+
+    def _loop(self) -> None:
+        tick = min([c.interval for c in self._checks.values()] or [self.interval])
+        while not self._stop.wait(tick):
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("Health refresh failed")
+
+    def start(self) -> None:
+        """Start the background refresher (again in a forked worker, which inherits no threads)."""
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._stop.clear()
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._loop, name="health-monitor", daemon=True)
+                self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Latest results with their age; the very first call runs the checks inline."""
+        self.start()
+        if any(c.result is None for c in self._checks.values()):
+            self.refresh()
+        now = time.monotonic()
+        with self._lock:
+            checks = {
+                name: {**c.result, "age_s": round(now - c.checked_at, 3)}
+                for name, c in self._checks.items()
+            }
+        healthy = all(c["status"] == "ok" for c in checks.values() if c["critical"])
+        return {"status": "healthy" if healthy else "degraded", "checks": checks}
@@ -0,0 +1,160 @@
+"""
+Versioned FAISS index storage with an atomically swapped CURRENT pointer.
+
+Layout under the index root (backend/index_kms):
+
+    CURRENT                     -> text file holding the live version id
+    versions/<version>/         -> shards/<name>/index.faiss + index.pkl, manifest.json
+    versions/<version>.tmp/     -> a version still being built
+
+Ingestion builds into a .tmp directory, renames it into place and then
+replaces CURRENT with os.replace(), so readers only ever see a complete
+index. A root without CURRENT but with index.faiss (the layout shipped in
+the Docker image) is served as the "legacy" version.
+"""
+
+import logging
+import os
+import secrets
+import shutil
+import threading
+import time
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+INDEX_ROOT = os.path.join(os.path.dirname(__file__), "index_kms")
+CURRENT_FILE = "CURRENT"
+VERSIONS_DIR = "versions"
+SHARDS_DIR = "shards"
+LEGACY_VERSION = "legacy"
+
+# Published versions to keep on disk (including the live one)
+INDEX_KEEP_VERSIONS = int(os.environ.get("INDEX_KEEP_VERSIONS", "3"))
+# How often (seconds) a worker re-reads CURRENT to look for a new version
+INDEX_CHECK_INTERVAL = float(os.environ.get("INDEX_CHECK_INTERVAL", "5"))
+
+
+def current_version(root: str = INDEX_ROOT) -> Optional[str]:
+    """Return the live version id, LEGACY_VERSION for a flat index, or None."""
+    try:
+        with open(os.path.join(root, CURRENT_FILE), encoding="utf-8") as f:
+            version = f.read().strip()
+        if version:
+            return version
+    except OSError:
+        pass
+    if os.path.exists(os.path.join(root, "index.faiss")):
+        return LEGACY_VERSION
+    return None
+
+
+def version_path(root: str, version: str) -> str:
+    if version == LEGACY_VERSION:
+        return root
+    return os.path.join(root, VERSIONS_DIR, version)
+
+
+def has_index(path: str) -> bool:
+    """True if path holds a flat FAISS index or a shards/ directory (see sharded_index)."""
+    return os.path.exists(os.path.join(path, "index.faiss")) or os.path.isdir(os.path.join(path, SHARDS_DIR))
+
+
+def current_index_path(root: str = INDEX_ROOT) -> Optional[str]:
+    """Directory holding the live index, or None if no index exists."""
+    version = current_version(root)
+    if version is None:
+        return None
+    path = version_path(root, version)
+    return path if has_index(path) else None
+
+
+def resolve_index_path(path: str) -> str:
+    """Accept either an index root (versioned or legacy) or a plain index directory."""
+    return current_index_path(path) or path
+
+
+def new_version(root: str = INDEX_ROOT) -> Tuple[str, str]:
+    """Reserve a new version id and return (version, build directory)."""
+    version = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ") + "-" + secrets.token_hex(3)
+    build_dir = os.path.join(root, VERSIONS_DIR, version + ".tmp")
+    os.makedirs(build_dir)
+    return version, build_dir
+
+
+def publish(root: str, version: str, build_dir: str) -> str:
+    """Move a finished build into place and atomically point CURRENT at it."""
+    final_dir = version_path(root, version)
+    os.replace(build_dir, final_dir)
+    tmp_pointer = os.path.join(root, CURRENT_FILE + ".tmp")
+    with open(tmp_pointer, "w", encoding="utf-8") as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_pointer, os.path.join(root, CURRENT_FILE))
+    logger.info("Published index version %s", version)
+    return final_dir
+
+
+def list_versions(root: str = INDEX_ROOT) -> List[str]:
+    """Published version ids, oldest first (ids sort chronologically)."""
+    versions_dir = os.path.join(root, VERSIONS_DIR)
+    if not os.path.isdir(versions_dir):
+        return []
+    return sorted(
+        name for name in os.listdir(versions_dir)
+        if not name.endswith(".tmp") and os.path.isdir(os.path.join(versions_dir, name))
+    )
+
+
+def gc_versions(root: str = INDEX_ROOT, keep: int = INDEX_KEEP_VERSIONS, keep_builds: Tuple[str, ...] = ()) -> List[str]:
+    """Delete old published versions and abandoned builds; returns what was removed.
+
+    The live version is always kept. Workers that still serve an older
+    version hold it in memory, so removing its files is safe.
+    """
+    live = current_version(root)
+    published = list_versions(root)
+    survivors = set(published[-max(1, keep):]) | {live}
+    removed = []
+    versions_dir = os.path.join(root, VERSIONS_DIR)
+    if not os.path.isdir(versions_dir):
+        return removed
+    for name in sorted(os.listdir(versions_dir)):
+        path = os.path.join(versions_dir, name)
+        if name in survivors or path in keep_builds:
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+        removed.append(name)
+    if removed:
+        logger.info("Garbage-collected index versions: %s", ", ".join(removed))
+    return removed
+
+
+class VersionWatcher:
+    """Cheap change detection for CURRENT: at most one stat per interval."""
+
+    def __init__(self, root: str = INDEX_ROOT, interval: float = INDEX_CHECK_INTERVAL):
+        self.root = root
+        self.interval = interval
+        self._checked_at = 0.0
+        self._stat_key = None
+        self._version: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def version(self) -> Optional[str]:
+        now = time.monotonic()
+        if now - self._checked_at < self.interval and self._checked_at:
+            return self._version
+        with self._lock:
+            self._checked_at = now
+            try:
+                st = os.stat(os.path.join(self.root, CURRENT_FILE))
+                stat_key = (st.st_mtime_ns, st.st_size, st.st_ino)
+            except OSError:
+                stat_key = None
+            if stat_key != self._stat_key or stat_key is None:
+                self._stat_key = stat_key
+                self._version = current_version(self.root)
+            return self._version
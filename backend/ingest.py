@@ -1,68 +1,800 @@
+import argparse
+import hashlib
+import json
 import logging
 import os
 import glob
-from langchain_community.document_loaders import PyPDFLoader
+import itertools
+import shutil
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_community.vectorstores import FAISS
 from rag_engine import get_embeddings
+from dedup import DEDUP_THRESHOLD, INGEST_DEDUP, LSHIndex, minhash
+from embedding_pipeline import EmbeddingCheckpoint, EmbeddingPipeline, checkpoint_dir_for
+from index_store import INDEX_ROOT, SHARDS_DIR, current_index_path, gc_versions, new_version, publish
+from sharded_index import DEFAULT_SHARD, list_shards, load_shard_map, shard_name
+from vector_compression import (
+    COMPRESSION_RECALL_K,
+    INDEX_COMPRESSION,
+    compress_shard,
+    load_store,
+    parse_spec,
+    shard_compression,
+    spec_key,
+    summarize,
+)
 
 logger = logging.getLogger(__name__)
 
 DOCS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "docs")
-INDEX_PATH = os.path.join(os.path.dirname(__file__), "index_kms")
+# Index root: each run publishes a new version under versions/ (see index_store)
+INDEX_PATH = INDEX_ROOT
 
-def ingest_documents():
+# Extracted page text, keyed by file SHA-256 — survives index rebuilds
+TEXT_CACHE_DIR = os.path.join(os.path.dirname(__file__), ".ingest_cache", "text")
+
+# Parsing runs across a process pool; each task extracts and splits a page range.
+# INGEST_WORKERS=1 parses inline in the current process.
+INGEST_WORKERS = int(os.environ.get("INGEST_WORKERS", "0")) or (os.cpu_count() or 1)
+PAGES_PER_TASK = int(os.environ.get("INGEST_PAGES_PER_TASK", "8"))
+
+# New chunks are embedded and flushed to disk in shards of this many chunks,
+# then merged into the index — parse/embed memory stays flat as the corpus grows.
+INGEST_SHARD_SIZE = int(os.environ.get("INGEST_SHARD_SIZE", "2000"))
+
+# "Deep Analysis" Chunking Strategy
+# NIST documents have specific structures. We want to keep control families together if possible.
+# We use a large chunk size with overlap to capture context.
+CHUNK_SIZE = 2000
+CHUNK_OVERLAP = 300
+CHUNK_SEPARATORS = ["\nFamily:", "\nControl:", "\n\n", "\n", " "]
+
+# Manifest of file/page content hashes, stored next to the index.
+# Bump MANIFEST_VERSION whenever chunk ID derivation or the index layout changes.
+# v2: one FAISS index per shard (shards/<name>), each file entry records its shard.
+# v3: near-duplicate chunks are recorded as aliases ({chunk_id: [stored_id, page]}).
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 3
+
+
+def _make_splitter() -> RecursiveCharacterTextSplitter:
+    return RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP,
+        separators=CHUNK_SEPARATORS,
+        add_start_index=True,
+    )
+
+
+def _sha256_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _sha256_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _chunk_id(source: str, page_hash: str, start_index: int) -> str:
+    """Stable chunk ID: same file name + same page text + same offset -> same ID."""
+    return hashlib.sha256(f"{source}:{page_hash}:{start_index}".encode("utf-8")).hexdigest()[:32]
+
+
+def _embedding_signature(embeddings) -> str:
+    """Identify the embedding model so a model switch forces a full rebuild."""
+    return f"{type(embeddings).__name__}:{getattr(embeddings, 'model', '')}"
+
+
+def _page_count(pdf_path: str) -> int:
+    from pypdf import PdfReader
+    return len(PdfReader(pdf_path).pages)
+
+
+def _read_pdf_pages(pdf_path: str, start: int, stop: int) -> List[str]:
+    """Return the extracted text of pages [start, stop), in page order.
+
+    Matches PyPDFLoader's default ("plain" mode, stripped) so page hashes
+    stay stable across loaders.
+    """
+    from pypdf import PdfReader
+    reader = PdfReader(pdf_path)
+    return [reader.pages[i].extract_text(extraction_mode="plain").strip() for i in range(start, stop)]
+
+
+def _parse_page_range(
+    pdf_path: str, source: str, start: int, stop: int, texts: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """Pool task: extract (unless cached texts are given) and split pages [start, stop).
+
+    Returns plain data only so results pickle cheaply back to the parent.
+    """
+    began = time.perf_counter()
+    if texts is None:
+        texts = _read_pdf_pages(pdf_path, start, stop)
+    text_splitter = _make_splitter()
+    pages = []
+    for offset, text in enumerate(texts):
+        page_no = start + offset
+        page_hash = _sha256_text(text)
+        page_doc = Document(page_content=text, metadata={"source": source, "page": page_no})
+        splits = [(split.metadata.get("start_index", 0), split.page_content)
+                  for split in text_splitter.split_documents([page_doc])]
+        pages.append((page_no, page_hash, splits))
+    return {"texts": texts, "pages": pages, "seconds": time.perf_counter() - began}
+
+
+def _load_cached_text(file_hash: str) -> Optional[List[str]]:
+    path = os.path.join(TEXT_CACHE_DIR, f"{file_hash}.json")
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)["pages"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _store_cached_text(file_hash: str, texts: List[str]) -> None:
+    os.makedirs(TEXT_CACHE_DIR, exist_ok=True)
+    path = os.path.join(TEXT_CACHE_DIR, f"{file_hash}.json")
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"pages": texts}, f)
+    os.replace(tmp_path, path)
+
+
+def _build_file_result(source: str, page_results: List[Tuple[int, str, List[Tuple[int, str]]]]):
+    """Assemble a file's manifest entry and chunk Documents from ordered page results."""
+    page_hashes = {}
+    chunks = []
+    seen = set()
+    for page_no, page_hash, splits in page_results:
+        page_hashes[str(page_no)] = page_hash
+        for start_index, content in splits:
+            chunk_id = _chunk_id(source, page_hash, start_index)
+            # Byte-identical pages (blank pages, repeated covers) yield the same ID — keep the first
+            if chunk_id in seen:
+                continue
+            seen.add(chunk_id)
+            chunks.append(Document(
+                page_content=content,
+                metadata={"source": source, "page": page_no, "start_index": start_index, "chunk_id": chunk_id},
+            ))
+    entry = {
+        "pages": page_hashes,
+        "chunk_ids": [c.metadata["chunk_id"] for c in chunks],
+    }
+    return entry, chunks
+
+
+def _parse_task(task) -> Tuple[int, Dict[str, Any]]:
+    """Pool entry point: (file index, *_parse_page_range args) -> (file index, output)."""
+    return task[0], _parse_page_range(*task[1:])
+
+
+def iter_parsed_files(
+    files: List[Tuple[str, str]], workers: Optional[int] = None
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Parse and chunk PDFs page-range by page-range across a process pool.
+
+    Args:
+        files: (pdf_path, sha256) pairs.
+        workers: pool size (default INGEST_WORKERS); 1 parses inline.
+
+    Yields (source, {"entry", "chunks", "timing"}) one file at a time, in
+    input order. Output is deterministic: page ranges are reassembled in
+    page order no matter which worker finishes first. At most 2 x workers
+    page ranges are in flight, so memory is bounded by the largest file
+    rather than the corpus.
+    """
+    workers = workers or INGEST_WORKERS
+    plans: List[Tuple[str, str, bool, int]] = []
+
+    def _tasks():
+        # Lazily planned so cached text is loaded only when its file is reached
+        for file_idx, (pdf_path, file_hash) in enumerate(files):
+            cached = _load_cached_text(file_hash)
+            n_pages = len(cached) if cached is not None else _page_count(pdf_path)
+            ranges = [(i, min(i + PAGES_PER_TASK, n_pages)) for i in range(0, n_pages, PAGES_PER_TASK)]
+            plans.append((pdf_path, file_hash, cached is not None, len(ranges)))
+            source = os.path.basename(pdf_path)
+            for start, stop in ranges:
+                yield file_idx, pdf_path, source, start, stop, (cached[start:stop] if cached is not None else None)
+
+    def _outputs():
+        if workers <= 1:
+            yield from map(_parse_task, _tasks())
+            return
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            tasks = _tasks()
+            window = deque(pool.submit(_parse_task, t) for t in itertools.islice(tasks, 2 * workers))
+            while window:
+                result = window.popleft().result()
+                for t in itertools.islice(tasks, 1):
+                    window.append(pool.submit(_parse_task, t))
+                yield result
+
+    def _finish(file_idx, file_outputs):
+        pdf_path, file_hash, cache_hit, _ = plans[file_idx]
+        source = os.path.basename(pdf_path)
+        if not cache_hit:
+            _store_cached_text(file_hash, [t for out in file_outputs for t in out["texts"]])
+        entry, chunks = _build_file_result(source, [p for out in file_outputs for p in out["pages"]])
+        return source, {
+            "entry": entry,
+            "chunks": chunks,
+            "timing": {
+                "pages": sum(len(out["pages"]) for out in file_outputs),
+                "chunks": len(chunks),
+                "parse_seconds": round(sum(out["seconds"] for out in file_outputs), 3),
+                "text_cache_hit": cache_hit,
+            },
+        }
+
+    began = time.perf_counter()
+    buffered: Dict[int, List[Dict[str, Any]]] = {}
+    next_file = 0
+    for file_idx, output in _outputs():
+        buffered.setdefault(file_idx, []).append(output)
+        # Outputs arrive in task order, so files complete in input order
+        while next_file < len(plans) and len(buffered.get(next_file, [])) == plans[next_file][3]:
+            yield _finish(next_file, buffered.pop(next_file, []))
+            next_file += 1
+    # Task generator is exhausted, so every file (including zero-page ones) is planned
+    while next_file < len(plans):
+        yield _finish(next_file, buffered.pop(next_file, []))
+        next_file += 1
+    logger.info("Parsed %d file(s) with %d worker(s) in %.2fs", len(files), workers, time.perf_counter() - began)
+
+
+def parse_files(files: List[Tuple[str, str]], workers: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+    """Eager form of iter_parsed_files(): {source: result} in input order."""
+    return dict(iter_parsed_files(files, workers))
+
+
+def load_manifest(index_path: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Return the manifest stored next to an index directory (default: the live
+    version), or None if absent/unreadable."""
+    index_path = index_path or current_index_path(INDEX_PATH)
+    if index_path is None:
+        return None
+    path = os.path.join(index_path, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        logger.warning("Ignoring unreadable manifest at %s", path)
+        return None
+
+
+def _save_manifest(manifest: Dict[str, Any], index_path: str) -> None:
+    tmp_path = os.path.join(index_path, MANIFEST_NAME + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, os.path.join(index_path, MANIFEST_NAME))
+
+
+def _new_manifest(embeddings) -> Dict[str, Any]:
+    return {
+        "version": MANIFEST_VERSION,
+        "splitter": {"chunk_size": CHUNK_SIZE, "chunk_overlap": CHUNK_OVERLAP},
+        "embedding_model": _embedding_signature(embeddings),
+        "files": {},
+    }
+
+
+def _manifest_compatible(manifest: Optional[Dict[str, Any]], embeddings) -> bool:
+    """True if chunk IDs and vectors in the existing index can be reused."""
+    if not manifest:
+        return False
+    fresh = _new_manifest(embeddings)
+    return all(manifest.get(key) == fresh[key] for key in ("version", "splitter", "embedding_model"))
+
+
+def _batched(iterable, size: int) -> Iterator[List[Any]]:
+    it = iter(iterable)
+    while True:
+        batch = list(itertools.islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _write_shards(
+    chunks: Iterator[Document],
+    embeddings,
+    staging_dir: str,
+    checkpoint_dir: str,
+    shard_size: int,
+    on_embedded: Optional[Callable[[int], None]] = None,
+    group: Optional[Callable[[Document], str]] = None,
+) -> Tuple[List[Tuple[str, str]], Dict[str, Any]]:
+    """Embed a chunk stream and flush every shard_size chunks to disk as a FAISS index.
+
+    Only one shard's texts and vectors are held in memory at a time. A staging
+    shard never spans two index shards: a new one starts whenever group(chunk)
+    changes. Returns ([(index shard name, staging path)], embedding totals).
+    on_embedded, if given, receives the running embedded-chunk count across shards.
+    """
+    shard_paths = []
+    totals = {"embedded": 0, "batches": 0, "retries": 0, "resumed_from_checkpoint": 0, "elapsed_seconds": 0.0}
+    staged = (
+        (name, shard)
+        for name, grouped in itertools.groupby(chunks, key=group or (lambda c: DEFAULT_SHARD))
+        for shard in _batched(grouped, shard_size)
+    )
+    # One checkpoint index for the whole run, not a directory scan per shard
+    checkpoint = EmbeddingCheckpoint(checkpoint_dir)
+    for shard_no, (name, shard) in enumerate(staged):
+        ids = [c.metadata["chunk_id"] for c in shard]
+        texts = [c.page_content for c in shard]
+        done_before = totals["embedded"]
+        pipeline = EmbeddingPipeline(
+            embeddings,
+            checkpoint=checkpoint,
+            progress=(lambda report: on_embedded(done_before + report["embedded"])) if on_embedded else None,
+        )
+        vectors = pipeline.embed(ids, texts)
+        shard_store = FAISS.from_embeddings(
+            list(zip(texts, vectors)), embeddings, metadatas=[c.metadata for c in shard], ids=ids,
+        )
+        path = os.path.join(staging_dir, f"shard-{shard_no:05d}")
+        shard_store.save_local(path)
+        shard_paths.append((name, path))
+        for key in totals:
+            totals[key] += pipeline.stats.get(key, 0)
+        logger.info("  - Flushed shard %d (%d chunks of %s) to %s", shard_no, len(shard), name, path)
+
+    elapsed = totals["elapsed_seconds"]
+    fresh = totals["embedded"] - totals["resumed_from_checkpoint"]
+    totals["elapsed_seconds"] = round(elapsed, 3)
+    totals["chunks_per_sec"] = round(fresh / elapsed, 2) if elapsed > 0 else 0.0
+    return shard_paths, totals
+
+
+def _merge_shards(vector_store: Optional[FAISS], shard_paths: List[str], embeddings) -> Optional[FAISS]:
+    """Fold on-disk shards into vector_store (or the first shard), one at a time."""
+    for path in shard_paths:
+        shard = FAISS.load_local(path, embeddings, allow_dangerous_deserialization=True)
+        if vector_store is None:
+            vector_store = shard
+        else:
+            vector_store.merge_from(shard)
+    return vector_store
+
+
+def _link_or_copy(src: str, dst: str) -> None:
+    # Saved indexes are never modified in place, so versions can share files
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def _owned_ids(entry: Dict[str, Any]) -> List[str]:
+    """Chunk IDs of a file that are stored as their own vector (not collapsed)."""
+    aliases = entry.get("aliases", {})
+    return [c for c in entry["chunk_ids"] if c not in aliases]
+
+
+def _stored_ids(files: Dict[str, Dict[str, Any]], shard: str) -> set:
+    """Chunk IDs with a vector in an index shard: owned chunks plus alias targets."""
+    ids = set()
+    for entry in files.values():
+        if entry["shard"] == shard:
+            ids.update(_owned_ids(entry))
+            ids.update(target for target, _ in entry.get("aliases", {}).values())
+    return ids
+
+
+def _apply_provenance(vector_store: FAISS, files: Dict[str, Dict[str, Any]], shard: str) -> None:
+    """Record every (source, page) collapsed into a stored chunk as metadata["also_in"].
+
+    A stored chunk whose own file dropped it, but which near-duplicates still
+    point at, takes over the source/page of the first of them.
+    """
+    owned = set()
+    refs: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for source, entry in files.items():
+        if entry["shard"] != shard:
+            continue
+        owned.update(_owned_ids(entry))
+        for target, page in entry.get("aliases", {}).values():
+            refs[target].append({"source": source, "page": page})
+    for doc_id in vector_store.index_to_docstore_id.values():
+        doc = vector_store.docstore.search(doc_id)
+        if not isinstance(doc, Document):
+            continue
+        also_in = sorted(refs.get(doc_id, []), key=lambda r: (r["source"], r["page"]))
+        if doc_id not in owned and also_in:
+            doc.metadata.update(also_in.pop(0))
+        if also_in:
+            doc.metadata["also_in"] = also_in
+        else:
+            doc.metadata.pop("also_in", None)
+
+
+class _IngestProgress:
+    """Aggregate parse and embedding progress into one report for a callback.
+
+    The total number of new chunks is unknown until every file is parsed, so
+    it is extrapolated from the bytes parsed so far; ETA follows from the
+    end-to-end embedding throughput.
+    """
+
+    def __init__(self, callback: Optional[Callable[[Dict[str, Any]], None]], to_parse: List[Tuple[str, str]]):
+        self.callback = callback
+        self.began = time.perf_counter()
+        self.files_total = len(to_parse)
+        self.bytes_total = sum(os.path.getsize(path) for path, _ in to_parse)
+        self.files_parsed = 0
+        self.bytes_parsed = 0
+        self.chunks_parsed = 0
+        self.chunks_embedded = 0
+
+    def file_parsed(self, pdf_path: str, new_chunks: int) -> None:
+        self.files_parsed += 1
+        self.bytes_parsed += os.path.getsize(pdf_path)
+        self.chunks_parsed += new_chunks
+        self.emit("parsing")
+
+    def embedded(self, count: int) -> None:
+        self.chunks_embedded = count
+        self.emit("embedding")
+
+    def report(self, phase: str) -> Dict[str, Any]:
+        elapsed = time.perf_counter() - self.began
+        if self.files_parsed == self.files_total:
+            estimated = self.chunks_parsed
+        elif self.bytes_parsed:
+            estimated = max(self.chunks_parsed, round(self.chunks_parsed * self.bytes_total / self.bytes_parsed))
+        else:
+            estimated = None
+        rate = self.chunks_embedded / elapsed if elapsed > 0 else 0.0
+        eta = None
+        if phase == "done":
+            eta = 0.0
+        elif estimated is not None and rate > 0:
+            eta = round(max(0, estimated - self.chunks_embedded) / rate, 1)
+        return {
+            "phase": phase,
+            "files_total": self.files_total,
+            "files_parsed": self.files_parsed,
+            "chunks_parsed": self.chunks_parsed,
+            "chunks_estimated": estimated,
+            "chunks_embedded": self.chunks_embedded,
+            "chunks_per_sec": round(rate, 2),
+            "elapsed_seconds": round(elapsed, 3),
+            "eta_seconds": eta,
+        }
+
+    def emit(self, phase: str) -> None:
+        if self.callback:
+            self.callback(self.report(phase))
+
+
+def ingest_documents(
+    rebuild: bool = False,
+    progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+    rebuild_shards: Optional[Sequence[str]] = None,
+    before_publish: Optional[Callable[[], None]] = None,
+):
     """
     Ingests all PDF documents from the docs/ directory.
+
+    Incremental by default: files whose content hash matches the manifest
+    are not re-parsed, only chunks with new IDs are embedded, and chunks
+    belonging to changed or removed files are deleted from the existing
+    index. Pass rebuild=True (or change the splitter/embedding model) to
+    re-embed everything.
+
+    Sharded: each source (or docs/shards.json group) gets its own FAISS
+    index under shards/<name>. Only index shards whose files changed are
+    rebuilt; the rest are hard-linked from the live version. Pass
+    rebuild_shards=[...] to re-embed just those shards.
+
+    Deduplicated: new chunks that near-duplicate a stored chunk of the same
+    shard (MinHash/LSH, see dedup.py) are not embedded; the manifest records
+    them as aliases and the stored chunk lists them in metadata["also_in"].
+
+    Compressed (optional): with INDEX_COMPRESSION set, each rebuilt shard is
+    reduced/quantised after merging (see vector_compression.py); its float32
+    vectors are kept as raw.faiss for later incremental runs. Changing the
+    setting re-compresses linked shards without re-embedding.
+
+    Streaming: files are parsed one at a time, new chunks flow through the
+    embedding pipeline and are flushed to disk in INGEST_SHARD_SIZE staging
+    shards, which are merged into their index shards at the end. Memory during parsing and
+    embedding is bounded by the largest file and one shard, not the corpus.
+
+    progress, if given, is called with a report dict (phase, files parsed,
+    chunks embedded, throughput, ETA) as files are parsed and batches are
+    embedded, and once per later phase (merging, publishing, done).
+
+    before_publish, if given, is called once the new version is fully built,
+    right before it is made live (the job runner stops honouring cancels there).
     """
     logger.info("Scanning for documents in %s...", DOCS_DIR)
-    pdf_files = glob.glob(os.path.join(DOCS_DIR, "*.pdf"))
+    pdf_files = sorted(glob.glob(os.path.join(DOCS_DIR, "*.pdf")))
 
     if not pdf_files:
         return {"status": "no_files", "message": "No PDF files found in docs/ directory."}
 
-    all_splits = []
+    embeddings = get_embeddings()  # Must match RAG Engine
+    compression = parse_spec(INDEX_COMPRESSION)
 
-    # "Deep Analysis" Chunking Strategy
-    # NIST documents have specific structures. We want to keep control families together if possible.
-    # We use a large chunk size with overlap to capture context.
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=2000,
-        chunk_overlap=300,
-        separators=["\nFamily:", "\nControl:", "\n\n", "\n", " "],
-        add_start_index=True,
-    )
+    live_path = current_index_path(INDEX_PATH)
+    previous = None if rebuild or live_path is None else load_manifest(live_path)
+    index_exists = live_path is not None
+    if previous is not None and not (index_exists and _manifest_compatible(previous, embeddings)):
+        logger.info("Existing index is incompatible with current settings — rebuilding.")
+        previous = None
+    elif previous is None and index_exists and not rebuild:
+        logger.info("Existing index has no manifest — rebuilding.")
+
+    manifest = _new_manifest(embeddings)
+    manifest["compression"] = spec_key(compression)
+    old_files = previous["files"] if previous else {}
+    shard_map = load_shard_map(DOCS_DIR)
+    rebuild_shards = set(rebuild_shards or ())
+    changes = {"added": [], "changed": [], "removed": [], "unchanged": []}
+    # Index shards that must be rebuilt; every other shard is linked from the live version
+    affected: set = set()
+    # Old manifest entries new chunks are diffed against (same file, same shard)
+    diff_base: Dict[str, Dict[str, Any]] = {}
+    # Chunks whose owning file dropped them: no longer valid dedup targets
+    retired: Dict[str, set] = defaultdict(set)
+    # Reused chunks keep their vectors; only their metadata (page number) may need refreshing
+    reused_metadata: Dict[str, Dict[str, Any]] = {}
+    timings = {}
+    dedup_stats = {"enabled": INGEST_DEDUP, "threshold": DEDUP_THRESHOLD, "chunks_checked": 0, "duplicates": 0}
 
+    to_parse = []
     for pdf_path in pdf_files:
-        logger.info("Processing %s...", pdf_path)
-        loader = PyPDFLoader(pdf_path)
-        docs = loader.load()
-        splits = text_splitter.split_documents(docs)
+        source = os.path.basename(pdf_path)
+        file_hash = _sha256_file(pdf_path)
+        shard = shard_name(source, shard_map)
+        old_entry = old_files.get(source)
+        old_shard = old_entry.get("shard") if old_entry else None
 
-        # Add metadata
-        for split in splits:
-            split.metadata["source"] = os.path.basename(pdf_path)
+        if old_entry and old_entry.get("sha256") == file_hash and old_shard == shard and shard not in rebuild_shards:
+            manifest["files"][source] = old_entry
+            changes["unchanged"].append(source)
+            continue
+        to_parse.append((pdf_path, file_hash))
+        changes["changed" if old_entry else "added"].append(source)
+        affected.add(shard)
+        if old_entry and old_shard == shard and shard not in rebuild_shards:
+            diff_base[source] = old_entry
+        elif old_entry:
+            # Moved to another shard or forced rebuild: drop the old chunks, re-embed the file
+            retired[old_shard].update(_owned_ids(old_entry))
+            affected.add(old_shard)
 
-        all_splits.extend(splits)
-        logger.info("  - Generated %d chunks.", len(splits))
+    unknown = rebuild_shards - {shard_name(os.path.basename(p), shard_map) for p in pdf_files}
+    if unknown:
+        raise ValueError(f"Unknown shard(s) to rebuild: {', '.join(sorted(unknown))}")
 
-    if not all_splits:
-        return {"status": "empty", "message": "Documents were empty or could not be read."}
+    present = {os.path.basename(p) for p in pdf_files}
+    for source, old_entry in old_files.items():
+        if source not in present:
+            retired[old_entry["shard"]].update(_owned_ids(old_entry))
+            affected.add(old_entry["shard"])
+            changes["removed"].append(source)
 
-    logger.info("Generating embeddings (this may take a while)...")
-    embeddings = get_embeddings()  # Must match RAG Engine
+    def _stats(**extra):
+        return {
+            "total_documents": len(pdf_files),
+            "total_chunks": sum(len(e["chunk_ids"]) for e in manifest["files"].values()),
+            "index_path": live_path,
+            "mode": "incremental" if previous else "full",
+            "files": changes,
+            "parse_timings": timings,
+            **extra,
+        }
 
-    vector_store = FAISS.from_documents(all_splits, embeddings)
-    vector_store.save_local(INDEX_PATH)
+    if previous and not to_parse and not affected and previous.get("compression", "none") == manifest["compression"]:
+        logger.info("Index is up to date — nothing to ingest.")
+        return {"status": "unchanged", **_stats(chunks_deleted=0, chunks_embedded=0)}
 
-    logger.info("Index saved to %s", INDEX_PATH)
+    live_shards = list_shards(live_path) if previous else []
+    # Shards built on top of their live version (the rest start empty)
+    extend_shards = set(live_shards) - rebuild_shards
+    lsh_by_shard: Dict[str, LSHIndex] = {}
+
+    def _lsh(shard: str) -> LSHIndex:
+        if shard not in lsh_by_shard:
+            if shard in extend_shards:
+                lsh = LSHIndex.load(os.path.join(live_path, SHARDS_DIR, shard))
+            else:
+                lsh = LSHIndex()
+            for chunk_id in retired[shard]:
+                lsh.remove(chunk_id)
+            lsh_by_shard[shard] = lsh
+        return lsh_by_shard[shard]
+
+    tracker = _IngestProgress(progress, to_parse)
+    tracker.emit("parsing")
+
+    def _new_chunks() -> Iterator[Document]:
+        paths = {os.path.basename(path): (path, file_hash) for path, file_hash in to_parse}
+        for source, parsed in iter_parsed_files(to_parse):
+            old_entry = diff_base.get(source)
+            entry = parsed["entry"]
+            entry["sha256"] = paths[source][1]
+            entry["shard"] = shard_name(source, shard_map)
+            entry["aliases"] = {}
+            manifest["files"][source] = entry
+            timings[source] = parsed["timing"]
+
+            old_ids = set(old_entry["chunk_ids"]) if old_entry else set()
+            old_aliases = old_entry.get("aliases", {}) if old_entry else {}
+            new_ids = set(entry["chunk_ids"])
+            lsh = _lsh(entry["shard"])
+            # Edited chunks must not be collapsed into their own previous text
+            for chunk_id in (old_ids - new_ids) - set(old_aliases):
+                retired[entry["shard"]].add(chunk_id)
+                lsh.remove(chunk_id)
+
+            fresh = []
+            for c in parsed["chunks"]:
+                chunk_id = c.metadata["chunk_id"]
+                if chunk_id in old_ids:
+                    if chunk_id in old_aliases:
+                        entry["aliases"][chunk_id] = [old_aliases[chunk_id][0], c.metadata["page"]]
+                    else:
+                        reused_metadata[chunk_id] = c.metadata
+                    continue
+                signature = minhash(c.page_content)
+                dedup_stats["chunks_checked"] += 1
+                target = lsh.query(signature) if INGEST_DEDUP else None
+                if target is not None:
+                    entry["aliases"][chunk_id] = [target, c.metadata["page"]]
+                    dedup_stats["duplicates"] += 1
+                else:
+                    lsh.add(chunk_id, signature)
+                    fresh.append(c)
+            logger.info(
+                "  - %s: %d pages, %d chunks (%d new, %d near-duplicates) in %.2fs%s",
+                source, timings[source]["pages"], len(new_ids), len(new_ids - old_ids), len(entry["aliases"]),
+                timings[source]["parse_seconds"], " [text cache]" if timings[source]["text_cache_hit"] else "",
+            )
+            tracker.file_parsed(paths[source][0], len(fresh))
+            yield from fresh
+
+    # Build into a fresh version directory; the live index is never modified,
+    # so a failed or cancelled run leaves it serving as before.
+    version, build_dir = new_version(INDEX_PATH)
+    try:
+        staging_dir = os.path.join(build_dir, "staging")
+        checkpoint_dir = checkpoint_dir_for(manifest["embedding_model"])
+        logger.info("Generating embeddings (this may take a while)...")
+        shard_paths, embed_stats = _write_shards(
+            _new_chunks(), embeddings, staging_dir, checkpoint_dir, INGEST_SHARD_SIZE,
+            on_embedded=tracker.embedded,
+            group=lambda c: manifest["files"][c.metadata["source"]]["shard"],
+        )
+        tracker.emit("merging")
+
+        staged: Dict[str, List[str]] = defaultdict(list)
+        for name, path in shard_paths:
+            staged[name].append(path)
+        reused_by_shard: Dict[str, Dict[str, Dict[str, Any]]] = defaultdict(dict)
+        for chunk_id, metadata in reused_metadata.items():
+            reused_by_shard[manifest["files"][metadata["source"]]["shard"]][chunk_id] = metadata
+
+        index_shards: Dict[str, int] = {}
+        compression_reports: List[Dict[str, Any]] = []
+        chunks_deleted = 0
+        for name in sorted(set(live_shards) | affected):
+            target = os.path.join(build_dir, SHARDS_DIR, name)
+            if name not in affected:
+                shutil.copytree(os.path.join(live_path, SHARDS_DIR, name), target, copy_function=_link_or_copy)
+                index_shards[name] = len(_stored_ids(manifest["files"], name))
+                report = shard_compression(target)
+                if (report or {}).get("spec", "none") != manifest["compression"]:
+                    report = compress_shard(target, compression)
+                if report:
+                    compression_reports.append(report)
+                continue
+            keep = _stored_ids(manifest["files"], name)
+            vector_store = None
+            if name in extend_shards:
+                # Compressed shards are extended from their float32 copy (raw.faiss)
+                vector_store = load_store(os.path.join(live_path, SHARDS_DIR, name), embeddings, raw=True)
+                # Vectors no file references any more (changed, removed or moved chunks)
+                doomed = set(vector_store.index_to_docstore_id.values()) - keep
+                if doomed:
+                    vector_store.delete(list(doomed))
+                chunks_deleted += len(doomed)
+                # Unchanged pages keep their vectors, but may have moved (page inserted/removed)
+                for chunk_id, metadata in reused_by_shard[name].items():
+                    stored = vector_store.docstore.search(chunk_id)
+                    if isinstance(stored, Document):
+                        stored.metadata.update(metadata)
+            elif name in live_shards:
+                chunks_deleted += len(_stored_ids(old_files, name))
+            vector_store = _merge_shards(vector_store, staged[name], embeddings)
+            if vector_store is None or vector_store.index.ntotal == 0:
+                continue  # every source of this shard was removed or empty
+            _apply_provenance(vector_store, manifest["files"], name)
+            vector_store.save_local(target)
+            _lsh(name).save(target, keep=list(vector_store.index_to_docstore_id.values()))
+            index_shards[name] = vector_store.index.ntotal
+            if compression:
+                compression_reports.append(compress_shard(target, compression))
+
+        if not index_shards:
+            shutil.rmtree(build_dir, ignore_errors=True)
+            return {"status": "empty", "message": "Documents were empty or could not be read."}
+
+        _save_manifest(manifest, build_dir)
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        if before_publish:
+            before_publish()
+    except BaseException:
+        shutil.rmtree(build_dir, ignore_errors=True)
+        raise
+
+    tracker.emit("publishing")
+    live_path = publish(INDEX_PATH, version, build_dir)
+    EmbeddingCheckpoint(checkpoint_dir).clear()
+    gc_versions(INDEX_PATH)
+
+    logical_chunks = sum(len(e["chunk_ids"]) for e in manifest["files"].values())
+    index_vectors = sum(index_shards.values())
+    dedup_stats.update(
+        embeddings_saved=dedup_stats["duplicates"],
+        logical_chunks=logical_chunks,
+        index_vectors=index_vectors,
+        index_reduction_pct=round(100.0 * (1 - index_vectors / logical_chunks), 1) if logical_chunks else 0.0,
+    )
+    stats = _stats(
+        chunks_embedded=embed_stats["embedded"], chunks_deleted=chunks_deleted, shards=len(shard_paths),
+        embedding=embed_stats, index_version=version, index_shards=index_shards,
+        shards_rebuilt=sorted(affected & set(index_shards)), dedup=dedup_stats,
+        compression=summarize(compression_reports, compression) if compression else {"spec": "none"},
+    )
+    tracker.emit("done")
+    logger.info(
+        "Index version %s saved to %s (added: %s, changed: %s, removed: %s, unchanged: %s; embedded %d chunks in %d shard(s), deleted %d; rebuilt index shards: %s)",
+        version, live_path,
+        len(changes["added"]), len(changes["changed"]), len(changes["removed"]), len(changes["unchanged"]),
+        stats["chunks_embedded"], len(shard_paths), stats["chunks_deleted"], ", ".join(stats["shards_rebuilt"]) or "none",
+    )
+    logger.info(
+        "Dedup: %d near-duplicate chunks collapsed (%d embeddings saved); index holds %d vectors for %d chunks (-%.1f%%)",
+        dedup_stats["duplicates"], dedup_stats["embeddings_saved"], index_vectors, logical_chunks,
+        dedup_stats["index_reduction_pct"],
+    )
+
+    if compression:
+        logger.info(
+            "Compression %s: %d -> %d bytes (-%.1f%%), recall@%d vs float32 %.3f",
+            stats["compression"]["spec"], stats["compression"]["raw_bytes"], stats["compression"]["compressed_bytes"],
+            stats["compression"]["memory_saved_pct"], COMPRESSION_RECALL_K,
+            stats["compression"][f"recall_at_{COMPRESSION_RECALL_K}"],
+        )
+
+    return {"status": "success", **stats}
 
-    return {
-        "status": "success",
-        "total_documents": len(pdf_files),
-        "total_chunks": len(all_splits),
-        "index_path": INDEX_PATH
-    }
 
 if __name__ == "__main__":
-    ingest_documents()
+    parser = argparse.ArgumentParser(description="Ingest PDFs from docs/ into the FAISS index.")
+    parser.add_argument("--rebuild", action="store_true", help="Ignore the manifest and re-embed every chunk")
+    parser.add_argument("--shard", action="append", dest="shards", metavar="NAME",
+                        help="Re-embed only this index shard (repeatable)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    result = ingest_documents(rebuild=args.rebuild, rebuild_shards=args.shards)
+    print(json.dumps(result, indent=2))
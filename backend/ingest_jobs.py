@@ -0,0 +1,391 @@
+"""
+Background ingestion jobs.
+
+POST /api/ingest used to run ingest_documents() inside the request, tying
+up a gunicorn worker for the whole embedding run and tripping its timeout.
+A job now runs in its own process (python ingest_jobs.py run <id>) and the
+request returns the job id immediately.
+
+State lives on disk under backend/.ingest_cache/jobs so every gunicorn
+worker sees the same jobs:
+
+    <job_id>.json      -> job record (status, progress, result, error)
+    <job_id>.cancel    -> cancellation requested
+    active.lock        -> "<job_id> <pid>" of the running job, created with
+                          O_EXCL so a second concurrent run is rejected
+
+Cancelling sends SIGTERM to the job process. ingest_documents() builds into
+a fresh index version and only swaps CURRENT after a complete build, so a
+cancelled (or crashed) job leaves the live index untouched.
+"""
+
+import argparse
+import json
+import logging
+import os
+import re
+import secrets
+import signal
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+JOBS_DIR = os.path.join(os.path.dirname(__file__), ".ingest_cache", "jobs")
+LOCK_NAME = "active.lock"
+
+# Finished job records to keep on disk
+INGEST_JOB_HISTORY = int(os.environ.get("INGEST_JOB_HISTORY", "20"))
+# Minimum seconds between progress writes to the job record
+PROGRESS_INTERVAL = 1.0
+# A lock without a pid is abandoned if the launch never completed within this window
+LAUNCH_GRACE_SECONDS = 60.0
+
+ACTIVE_STATUSES = ("queued", "running")
+
+_JOB_ID_RE = re.compile(r"^[0-9]{8}T[0-9]{12}Z-[0-9a-f]{6}$")
+
+
+class IngestJobConflict(RuntimeError):
+    """Raised when an ingestion job is already queued or running."""
+
+    def __init__(self, job_id: Optional[str]):
+        super().__init__(f"Ingestion job {job_id} is already running")
+        self.job_id = job_id
+
+
+class IngestCancelled(BaseException):
+    """Raised inside the job process on SIGTERM.
+
+    A BaseException, like KeyboardInterrupt, so broad `except Exception`
+    retry handlers (e.g. in the embedding pipeline) cannot swallow it.
+    """
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def _new_job_id() -> str:
+    # Sortable like index versions: creation time plus a random suffix
+    return datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ") + "-" + secrets.token_hex(3)
+
+
+def _job_path(job_id: str, suffix: str = ".json") -> str:
+    return os.path.join(JOBS_DIR, job_id + suffix)
+
+
+def _lock_path() -> str:
+    return os.path.join(JOBS_DIR, LOCK_NAME)
+
+
+def _write_record(record: Dict[str, Any]) -> None:
+    os.makedirs(JOBS_DIR, exist_ok=True)
+    path = _job_path(record["job_id"])
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(record, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def _read_record(job_id: str) -> Optional[Dict[str, Any]]:
+    if not _JOB_ID_RE.match(job_id or ""):
+        return None
+    try:
+        with open(_job_path(job_id), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _pid_alive(pid: Optional[int]) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    # An exited child that nobody has reaped yet still answers signal 0
+    try:
+        with open(f"/proc/{pid}/stat", encoding="utf-8") as f:
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except (OSError, IndexError):
+        return True
+
+
+# ---------------------------------------------------------------------------
+# Lock
+# ---------------------------------------------------------------------------
+
+def _read_lock() -> Optional[Tuple[str, Optional[int], float]]:
+    """Return (job_id, pid or None, mtime) of the active lock, or None."""
+    path = _lock_path()
+    try:
+        with open(path, encoding="utf-8") as f:
+            parts = f.read().split()
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    if not parts:
+        return None
+    pid = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else None
+    return parts[0], pid, mtime
+
+
+def _try_lock(job_id: str) -> bool:
+    os.makedirs(JOBS_DIR, exist_ok=True)
+    try:
+        fd = os.open(_lock_path(), os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+    except FileExistsError:
+        return False
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(job_id)
+    return True
+
+
+def _set_lock_pid(job_id: str, pid: int) -> None:
+    """Record the job process pid; called by the job process itself, so a
+    job that finishes before its launcher returns cannot be re-locked."""
+    lock = _read_lock()
+    if lock is None or lock[0] != job_id:
+        return
+    tmp_path = f"{_lock_path()}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(f"{job_id} {pid}")
+    os.replace(tmp_path, _lock_path())
+
+
+def _release_lock(job_id: str) -> None:
+    lock = _read_lock()
+    if lock and lock[0] == job_id:
+        try:
+            os.remove(_lock_path())
+        except OSError:
+            pass
+
+
+def _lock_is_stale(lock: Tuple[str, Optional[int], float]) -> bool:
+    _, pid, mtime = lock
+    if pid is None:
+        return time.time() - mtime > LAUNCH_GRACE_SECONDS
+    return not _pid_alive(pid)
+
+
+# ---------------------------------------------------------------------------
+# API-side operations
+# ---------------------------------------------------------------------------
+
+def _launch(job_id: str, rebuild: bool) -> int:
+    """Start the job process detached from the web worker; returns its pid."""
+    cmd = [sys.executable, os.path.abspath(__file__), "run", job_id]
+    if rebuild:
+        cmd.append("--rebuild")
+    process = subprocess.Popen(
+        cmd,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        stdin=subprocess.DEVNULL,
+        start_new_session=True,  # survives worker restarts; not hit by signals sent to the worker
+    )
+    return process.pid
+
+
+def start_job(rebuild: bool = False) -> Dict[str, Any]:
+    """Queue an ingestion job and start its process.
+
+    Raises IngestJobConflict if another job holds the lock. A lock left
+    behind by a crashed job is cleared first.
+    """
+    job_id = _new_job_id()
+    if not _try_lock(job_id):
+        lock = _read_lock()
+        if lock and not _lock_is_stale(lock):
+            raise IngestJobConflict(lock[0])
+        if lock:
+            logger.warning("Clearing stale ingestion lock held by job %s", lock[0])
+            _finalize_dead_job(lock[0])
+            _release_lock(lock[0])
+        if not _try_lock(job_id):
+            lock = _read_lock()
+            raise IngestJobConflict(lock[0] if lock else None)
+
+    record = {
+        "job_id": job_id,
+        "status": "queued",
+        "rebuild": rebuild,
+        "pid": None,
+        "created_at": _now(),
+        "started_at": None,
+        "finished_at": None,
+        "progress": {},
+        "result": None,
+        "error": None,
+    }
+    _write_record(record)
+    try:
+        pid = _launch(job_id, rebuild)
+    except Exception as e:
+        record.update(status="failed", finished_at=_now(), error=f"Could not start ingestion process: {e}")
+        _write_record(record)
+        _release_lock(job_id)
+        raise
+    record["pid"] = pid
+    logger.info("Started ingestion job %s (pid %d)", job_id, pid)
+    return record
+
+
+def _finalize_dead_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """Mark an active record whose process is gone as cancelled or failed."""
+    record = _read_record(job_id)
+    if record is None or record["status"] not in ACTIVE_STATUSES:
+        return record
+    if os.path.exists(_job_path(job_id, ".cancel")):
+        record.update(status="cancelled", error=None)
+    else:
+        record.update(status="failed", error="Ingestion process exited unexpectedly.")
+    record["finished_at"] = _now()
+    _write_record(record)
+    return record
+
+
+def _job_pid(record: Dict[str, Any]) -> Optional[int]:
+    if record.get("pid"):
+        return record["pid"]
+    lock = _read_lock()
+    if lock and lock[0] == record["job_id"]:
+        return lock[1]
+    return None
+
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """Return the job record, or None for an unknown id."""
+    record = _read_record(job_id)
+    if record is None or record["status"] not in ACTIVE_STATUSES:
+        return record
+    lock = _read_lock()
+    holds_lock = lock is not None and lock[0] == job_id
+    if not holds_lock or _lock_is_stale(lock):
+        record = _finalize_dead_job(job_id)
+        if holds_lock:
+            _release_lock(job_id)
+    return record
+
+
+def cancel_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """Request cancellation of an active job; returns the record (None if unknown).
+
+    Finished jobs are returned unchanged — check record["status"].
+    """
+    record = get_job(job_id)
+    if record is None or record["status"] not in ACTIVE_STATUSES:
+        return record
+    with open(_job_path(job_id, ".cancel"), "w", encoding="utf-8") as f:
+        f.write(_now())
+    pid = _job_pid(record)
+    if pid and _pid_alive(pid):
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    logger.info("Cancellation requested for ingestion job %s", job_id)
+    return {**record, "cancel_requested": True}
+
+
+def list_jobs() -> List[Dict[str, Any]]:
+    """All job records on disk, newest first."""
+    if not os.path.isdir(JOBS_DIR):
+        return []
+    job_ids = sorted(
+        (name[:-len(".json")] for name in os.listdir(JOBS_DIR) if name.endswith(".json")),
+        reverse=True,
+    )
+    return [r for r in (_read_record(j) for j in job_ids) if r is not None]
+
+
+def _prune_history(keep: int = INGEST_JOB_HISTORY) -> None:
+    finished = [r for r in list_jobs() if r["status"] not in ACTIVE_STATUSES]
+    for record in finished[max(0, keep):]:
+        for suffix in (".json", ".cancel"):
+            try:
+                os.remove(_job_path(record["job_id"], suffix))
+            except OSError:
+                pass
+
+
+# ---------------------------------------------------------------------------
+# Job process
+# ---------------------------------------------------------------------------
+
+def _raise_cancelled(signum, frame):
+    raise IngestCancelled()
+
+
+def run_job(job_id: str, rebuild: bool = False) -> Dict[str, Any]:
+    """Job process entry point: run ingestion and keep the record up to date."""
+    record = _read_record(job_id) or {"job_id": job_id, "rebuild": rebuild, "created_at": _now()}
+    record.update(status="running", pid=os.getpid(), started_at=_now(), finished_at=None,
+                  progress={}, result=None, error=None)
+    previous_handler = signal.signal(signal.SIGTERM, _raise_cancelled)
+    _set_lock_pid(job_id, os.getpid())
+    last_write = 0.0
+
+    def _on_progress(report: Dict[str, Any]) -> None:
+        nonlocal last_write
+        phase_changed = report.get("phase") != record["progress"].get("phase")
+        record["progress"] = report
+        now = time.monotonic()
+        if phase_changed or now - last_write >= PROGRESS_INTERVAL:
+            last_write = now
+            _write_record(record)
+
+    def _drop_cancel_request() -> None:
+        try:
+            os.remove(_job_path(job_id, ".cancel"))
+        except OSError:
+            pass
+
+    def _on_publish() -> None:
+        # From here the new version goes live: a cancel can no longer leave the index unchanged
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        _drop_cancel_request()
+
+    try:
+        if os.path.exists(_job_path(job_id, ".cancel")):
+            raise IngestCancelled()
+        _write_record(record)
+
+        from ingest import ingest_documents
+
+        result = ingest_documents(rebuild=rebuild, progress=_on_progress, before_publish=_on_publish)
+        record.update(status="succeeded", result=result)
+        # A cancel requested while publishing (and ignored) does not apply to a finished job
+        _drop_cancel_request()
+    except IngestCancelled:
+        logger.info("Ingestion job %s cancelled; live index left unchanged", job_id)
+        record.update(status="cancelled")
+    except Exception as e:
+        logger.exception("Ingestion job %s failed", job_id)
+        record.update(status="failed", error=str(e))
+    finally:
+        signal.signal(signal.SIGTERM, previous_handler)
+        record["finished_at"] = _now()
+        _write_record(record)
+        _release_lock(job_id)
+        _prune_history()
+    return record
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a queued background ingestion job.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run_parser = sub.add_parser("run", help="Run the job with the given id")
+    run_parser.add_argument("job_id")
+    run_parser.add_argument("--rebuild", action="store_true", help="Ignore the manifest and re-embed every chunk")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    final = run_job(args.job_id, rebuild=args.rebuild)
+    sys.exit(0 if final["status"] == "succeeded" else 1)
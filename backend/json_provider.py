@@ -0,0 +1,81 @@
+"""
+Fast JSON serialization for the Flask app (orjson, with the stdlib as fallback).
+
+Every endpoint goes through jsonify. Flask's default provider uses the stdlib
+encoder with sort_keys and ensure_ascii, which dominates the cost of large
+payloads such as the crossmap list and long chat answers with source snippets.
+FastJSONProvider keeps Flask's output contract (sorted keys, compact
+separators, indent=2 in debug, HTTP dates for datetime/date, UUIDs, dataclasses)
+but serializes with orjson when it is installed, writing the bytes straight
+into the response. Values orjson rejects (e.g. integers above 64 bits) fall back to
+the stdlib for that call. JSON_PROVIDER=stdlib restores Flask's default
+provider.
+"""
+
+import logging
+import os
+from typing import Any
+
+from flask.json.provider import DefaultJSONProvider
+
+logger = logging.getLogger(__name__)
+
+# "orjson" (default; falls back to the stdlib when not installed) or "stdlib"
+JSON_PROVIDER = os.environ.get("JSON_PROVIDER", "orjson").lower()
+
+
+def _orjson():
+    try:
+        import orjson
+    except ImportError:
+        return None
+    return orjson
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """DefaultJSONProvider with orjson doing the encoding and decoding."""
+
+    def __init__(self, app):
+        super().__init__(app)
+        self._orjson = _orjson() if JSON_PROVIDER == "orjson" else None
+        if JSON_PROVIDER == "orjson" and self._orjson is None:
+            logger.info("orjson is not installed; using the stdlib JSON encoder")
+
+    @property
+    def backend(self) -> str:
+        return "orjson" if self._orjson else "stdlib"
+
+    def _options(self, indent: bool = False) -> int:
+        orjson = self._orjson
+        # Dates go through Flask's default (HTTP date strings), as with the stdlib provider
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def _dump_bytes(self, obj: Any, indent: bool = False) -> bytes:
+        try:
+            return self._orjson.dumps(obj, default=self.default, option=self._options(indent))
+        except TypeError:
+            kwargs = {"indent": 2} if indent else {"separators": (",", ":")}
+            return super().dumps(obj, **kwargs).encode("utf-8")
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        # Callers asking for stdlib-specific formatting keep the stdlib encoder
+        if self._orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return self._dump_bytes(obj).decode("utf-8")
+
+    def loads(self, s, **kwargs: Any) -> Any:
+        if self._orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return self._orjson.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        if self._orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self._dump_bytes(obj, indent) + b"\n", mimetype=self.mimetype)
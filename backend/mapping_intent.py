@@ -0,0 +1,220 @@
+"""
+Deterministic answers to cross-mapping lookups, without retrieval or the LLM.
+
+Questions like "map AC-2 to ISO 27001", "what CSF category covers SI-4?" or
+"which NIST controls map to A.8.15?" used to be routed to the Compliance
+Mapping Specialist. They then went through retrieval and a multi-second
+generation, although the exact answer is in the crossmap data. detect()
+recognises three shapes of mapping question:
+
+    forward   NIST control(s) -> ISO 27001 / CSF 2.0 / ISO 27005 (those named, else all)
+    reverse   ISO 27001 (A.x.y) or CSF 2.0 (XX.YY[-nn]) control(s) -> NIST controls
+    check     "does AC-2 map to A.5.16?"
+
+answer() renders these in the agents' markdown style (bold summary sentence,
+nested bullets, bold control IDs). A question is only answered here when it
+is a plain lookup: every control it names is in the crossmap, and it
+mentions no framework the crossmap does not cover (FedRAMP, CMMC, SOC 2...)
+and no open-ended ask (explain, implement, evidence...). Generic verbs
+(covers, relates, matches) only count as a mapping ask when an ISO/CSF
+framework or control is named, so "What does AC-2 cover?" or "How does AC-2
+relate to AC-3?" are not lookups. Without any mapping verb, only a bare
+"AC-2 ISO 27001?" (IDs and framework names alone) is. Everything else returns None and goes to the LLM as before. Bare ISO 27005 clause numbers
+("8.2") are too ambiguous in free text and are not detected.
+"""
+
+import os
+import re
+from typing import Any, Dict, List, Optional
+
+from crossmap import FRAMEWORK_NAMES, FRAMEWORKS, detect_framework, get_crossmap, get_reverse_mapping
+
+# Answer recognised mapping lookups from the crossmap (false = always ask the LLM)
+MAPPING_FAST_PATH = os.environ.get("MAPPING_FAST_PATH", "true").lower() == "true"
+
+_NIST_FAMILIES = "AC|AT|AU|CA|CM|CP|IA|IR|MA|MP|PE|PL|PM|PS|PT|RA|SA|SC|SI|SR"
+_NIST_ID = re.compile(rf"(?<![\w.])({_NIST_FAMILIES})-(\d{{1,2}})(?:\s?\((\d{{1,2}})\))?", re.IGNORECASE)
+_TARGET_ID = re.compile(r"\b(A\.\d{1,2}\.\d{1,2}|[A-Z]{2}\.[A-Z]{2}(?:-\d{2})?)(?![\w.-])", re.IGNORECASE)
+
+_FRAMEWORK_MENTIONS = (
+    ("iso27005", re.compile(r"\biso(?:/iec)?[\s-]*27005\b", re.IGNORECASE)),
+    ("iso27001", re.compile(r"\biso(?:/iec)?[\s-]*27001\b|\bannex a\b|\biso\b(?![\s/-]*(?:iec[\s-]*)?\d)", re.IGNORECASE)),
+    ("csf2", re.compile(r"\bcsf\b|\bcybersecurity framework\b", re.IGNORECASE)),
+)
+_NIST_MENTION = re.compile(r"\bnist\b|\b800-53\b|\bsp 800\b", re.IGNORECASE)
+# Verbs that ask for a mapping on their own ("mapping for AC-2 and AU-6")
+_MAPPING_CUE = re.compile(
+    r"\b(?:map|maps|mapped|mapping|mappings|crosswalk|cross-walk|cross-?map|equivalents?|correspond\w*"
+    r"|counterparts?)\b",
+    re.IGNORECASE,
+)
+# Generic verbs that only signal a mapping when a target framework or control is named
+# ("What CSF category covers SI-4?", not "Does SI-4 cover log retention?")
+_RELATION_CUE = re.compile(r"\b(?:covers?|covered|align\w*|relates?|matches|match)\b", re.IGNORECASE)
+# A NIST control as the object of the relation ("enhancements that map to AC-6"): NIST-to-NIST, not a crosswalk
+_NIST_OBJECT = re.compile(rf"\b(?:to|with|onto|into|against)\s+{_NIST_ID.pattern}", re.IGNORECASE)
+# Frameworks outside the crossmap, and asks that need more than a table lookup
+_OUT_OF_SCOPE = re.compile(
+    r"\b(?:fedramp|cmmc|soc\s?2|soc|hipaa|pci|cis|cobit|gdpr|800-171|iso(?:/iec)?[\s-]*(?!27001\b|27005\b)\d+"
+    r"|explain|why|how (?:do|does|should|can|to)|what does\b[^?]*\bcover\w*|implement\w*|evidence|differen\w*|compare|comparison"
+    r"|assess\w*|test\w*|audit\w*|gap\w*|risk\w*|example\w*)\b",
+    re.IGNORECASE,
+)
+# Words a bare lookup may contain besides control IDs and framework names ("AC-2 ISO 27001?",
+# "AC-2 -> CSF", "NIST controls for DE.CM-09"); anything else needs a mapping verb
+_BARE_LOOKUP_WORDS = {
+    "to", "in", "into", "for", "and", "vs", "versus", "control", "controls", "category", "categories",
+    "clause", "clauses",
+}
+_WORD = re.compile(r"[a-z]+")
+
+
+def _nist_ids(question: str) -> List[str]:
+    ids = []
+    for family, number, enhancement in _NIST_ID.findall(question):
+        nist_id = f"{family.upper()}-{int(number)}" + (f"({int(enhancement)})" if enhancement else "")
+        if nist_id not in ids:
+            ids.append(nist_id)
+    return ids
+
+
+def _target_ids(question: str) -> List[str]:
+    ids = []
+    for match in _TARGET_ID.findall(question):
+        control_id = match.upper()
+        if detect_framework(control_id) and control_id not in ids:
+            ids.append(control_id)
+    return ids
+
+
+def _mentioned_frameworks(question: str) -> List[str]:
+    mentioned = {fw for fw, pattern in _FRAMEWORK_MENTIONS if pattern.search(question)}
+    return [fw for fw in FRAMEWORKS if fw in mentioned]
+
+
+def _bare_lookup(text: str) -> bool:
+    """True when `text` (control IDs already removed) is nothing but framework names and connectors."""
+    for _, pattern in _FRAMEWORK_MENTIONS:
+        text = pattern.sub(" ", text)
+    text = _NIST_MENTION.sub(" ", text).lower()
+    return all(word in _BARE_LOOKUP_WORDS for word in _WORD.findall(text))
+
+
+def detect(question: str) -> Optional[Dict[str, Any]]:
+    """The mapping lookup a question asks for ({"kind", ...}), or None if it is anything else."""
+    if _OUT_OF_SCOPE.search(question):
+        return None
+    nist_ids, target_ids = _nist_ids(question), _target_ids(question)
+    # Keep the ISO/CSF mention regexes off the control IDs themselves
+    text = _TARGET_ID.sub(" ", _NIST_ID.sub(" ", question))
+    frameworks = _mentioned_frameworks(text)
+    cue = bool(_MAPPING_CUE.search(text))
+    named_target = bool(frameworks or target_ids)
+    # Covers/aligns/matches only count as a mapping ask next to a named framework or control
+    relation = cue or (named_target and bool(_RELATION_CUE.search(text)))
+    # No verb needed only when the question is just IDs and framework names
+    bare = _bare_lookup(text)
+
+    if nist_ids and target_ids:
+        return {"kind": "check", "nist_ids": nist_ids, "target_ids": target_ids} if relation or bare else None
+    if nist_ids:
+        if frameworks and (relation or bare):
+            return {"kind": "forward", "nist_ids": nist_ids, "frameworks": frameworks}
+        # Only NIST IDs named: a crosswalk to every framework, if asked for explicitly and not about
+        # how NIST controls relate to each other
+        if not frameworks and cue and not _NIST_OBJECT.search(question):
+            return {"kind": "forward", "nist_ids": nist_ids, "frameworks": list(FRAMEWORKS)}
+        return None
+    if target_ids and (relation or (_NIST_MENTION.search(text) and bare)):
+        return {"kind": "reverse", "target_ids": target_ids}
+    return None
+
+
+def _forward(nist_ids: List[str], frameworks: List[str]) -> Optional[str]:
+    entries = [get_crossmap(nist_id=nist_id) for nist_id in nist_ids]
+    if not all(entries):
+        return None
+    entries = [e[0] for e in entries]
+    if len(entries) == 1 and len(frameworks) == 1:
+        entry, fw = entries[0], frameworks[0]
+        count = len(entry[fw])
+        summary = (
+            f"**{entry['nist_id']} {entry['nist_title']}** maps to {count} {FRAMEWORK_NAMES[fw]} "
+            f"control{'s' if count != 1 else ''}: " + ", ".join(f"**{c}**" for c in entry[fw]) + "."
+        )
+    else:
+        names = [FRAMEWORK_NAMES[fw] for fw in frameworks]
+        names = " and ".join([", ".join(names[:-1]), names[-1]]) if len(names) > 1 else names[0]
+        controls = ", ".join(e["nist_id"] for e in entries)
+        summary = f"**Cross-mapping of {controls} to {names}.**"
+    lines = [summary, ""]
+    for entry in entries:
+        lines.append(f"- **{entry['nist_id']}**: {entry['nist_title']} ({entry['nist_family']})")
+        for fw in frameworks:
+            lines.append(f"  - **{FRAMEWORK_NAMES[fw]}**")
+            lines += [f"    - **{c}**: {t}" for c, t in zip(entry[fw], entry[f"{fw}_titles"])] or ["    - No mapping"]
+        lines.append("")
+    return "\n".join(lines).rstrip() + "\n"
+
+
+def _reverse(target_ids: List[str]) -> Optional[str]:
+    mappings = [get_reverse_mapping(control_id) for control_id in target_ids]
+    if not all(mappings):
+        return None
+    if len(mappings) == 1:
+        m = mappings[0]
+        count = len(m["nist_controls"])
+        summary = (
+            f"**{FRAMEWORK_NAMES[m['framework']]} {m['control_id']} {m['title']}** is mapped from {count} "
+            f"NIST 800-53 control{'s' if count != 1 else ''}: "
+            + ", ".join(f"**{c['nist_id']}**" for c in m["nist_controls"]) + "."
+        )
+    else:
+        summary = "**NIST 800-53 controls mapped to " + ", ".join(m["control_id"] for m in mappings) + ".**"
+    lines = [summary, ""]
+    for m in mappings:
+        lines.append(f"- **{m['control_id']}**: {m['title']} ({FRAMEWORK_NAMES[m['framework']]})")
+        lines += [f"  - **{c['nist_id']}**: {c['nist_title']} ({c['nist_family']})" for c in m["nist_controls"]]
+        lines.append("")
+    return "\n".join(lines).rstrip() + "\n"
+
+
+def _check(nist_ids: List[str], target_ids: List[str]) -> Optional[str]:
+    entries = [get_crossmap(nist_id=nist_id) for nist_id in nist_ids]
+    frameworks = [detect_framework(t) for t in target_ids]
+    if not all(entries) or not all(get_reverse_mapping(t) for t in target_ids):
+        return None
+    pairs = [
+        (e[0], t, fw, t in (c.upper() for c in e[0][fw]))
+        for e in entries for t, fw in zip(target_ids, frameworks)
+    ]
+    if len(pairs) == 1:
+        entry, target, fw, mapped = pairs[0]
+        verdict = "maps" if mapped else "does not map"
+        summary = f"**{entry['nist_id']} {verdict} to {FRAMEWORK_NAMES[fw]} {target}.**"
+    else:
+        summary = f"**{sum(p[3] for p in pairs)} of {len(pairs)} control pairs are mapped.**"
+    lines = [summary, ""]
+    for entry, target, fw, mapped in pairs:
+        lines.append(f"- **{entry['nist_id']}** → **{target}**: {'mapped' if mapped else 'not mapped'}")
+        others = ", ".join(f"**{c}**" for c in entry[fw]) or "none"
+        lines += [f"  - {entry['nist_id']} maps to {FRAMEWORK_NAMES[fw]}: {others}", ""]
+    return "\n".join(lines).rstrip() + "\n"
+
+
+def answer(question: str) -> Optional[Dict[str, Any]]:
+    """Deterministic response ({"answer", "sources", "deterministic"}) for a mapping lookup, else None."""
+    if not MAPPING_FAST_PATH:
+        return None
+    intent = detect(question)
+    if intent is None:
+        return None
+    if intent["kind"] == "forward":
+        text = _forward(intent["nist_ids"], intent["frameworks"])
+    elif intent["kind"] == "reverse":
+        text = _reverse(intent["target_ids"])
+    else:
+        text = _check(intent["nist_ids"], intent["target_ids"])
+    if text is None:
+        return None
+    return {"answer": text, "sources": [], "deterministic": True, "intent": intent["kind"]}
@@ -1,11 +1,12 @@
 import logging
 import os
+import threading
+import time
 from typing import List, Dict, Any, Optional
-from langchain_community.vectorstores import FAISS
-from langchain_ollama import OllamaEmbeddings, ChatOllama
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_core.output_parsers import StrOutputParser
-from langchain_core.messages import HumanMessage, AIMessage
+from index_store import INDEX_ROOT, VersionWatcher, current_index_path, current_version, version_path
+
+# LangChain, the Gemini/Ollama clients and FAISS are imported on first use
+# (or by the startup warm-up), so importing this module stays cheap.
 
 logger = logging.getLogger(__name__)
 
@@ -13,6 +14,10 @@ logger = logging.getLogger(__name__)
 # FAISS L2: 0 = identical, ~1.0 = related, >1.5 = likely irrelevant.
 RELEVANCE_THRESHOLD = 1.5
 
+# MMR retrieval depth — k results diversified from the fetch_k nearest chunks.
+RETRIEVAL_K = 5
+RETRIEVAL_FETCH_K = 20
+
 
 def get_llm(temperature=0.2):
     """Return Gemini LLM if API key is set, otherwise fall back to Ollama."""
@@ -24,6 +29,7 @@ def get_llm(temperature=0.2):
             google_api_key=gemini_key,
             temperature=temperature,
         )
+    from langchain_ollama import ChatOllama
     return ChatOllama(
         model=os.environ.get("OLLAMA_MODEL", "llama3"),
         temperature=temperature,
@@ -39,6 +45,7 @@ def get_embeddings():
             model=os.environ.get("GEMINI_EMBEDDING_MODEL", "models/gemini-embedding-001"),
             google_api_key=gemini_key,
         )
+    from langchain_ollama import OllamaEmbeddings
     return OllamaEmbeddings(
         model=os.environ.get("OLLAMA_MODEL", "llama3"),
     )
@@ -51,8 +58,62 @@ def get_llm_backend_name():
     return "ollama"
 
 
+def check_llm_backend(timeout: float = 3.0):
+    """Cheap reachability probe of the active LLM backend (no generation).
+
+    Gemini: fetch the configured model's metadata (also validates the key).
+    Ollama: list local models. Returns (ok, detail); network errors raise.
+    """
+    import urllib.error
+    import urllib.request
+
+    backend = get_llm_backend_name()
+    if backend == "gemini":
+        model = os.environ.get("GEMINI_MODEL", "gemini-2.0-flash")
+        request = urllib.request.Request(
+            f"https://generativelanguage.googleapis.com/v1beta/models/{model}",
+            headers={"x-goog-api-key": os.environ["GEMINI_API_KEY"]},
+        )
+    else:
+        model = os.environ.get("OLLAMA_MODEL", "llama3")
+        base_url = os.environ.get("OLLAMA_BASE_URL") or os.environ.get("OLLAMA_HOST") or "http://localhost:11434"
+        if "://" not in base_url:
+            base_url = f"http://{base_url}"
+        request = urllib.request.Request(f"{base_url.rstrip('/')}/api/tags")
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            code = response.status
+    except urllib.error.HTTPError as e:
+        code = e.code
+    return 200 <= code < 300, {"backend": backend, "model": model, "http_status": code}
+
+
+def retrieve_by_vector(
+    vector_store,
+    embedding: List[float],
+    k: int = RETRIEVAL_K,
+    fetch_k: int = RETRIEVAL_FETCH_K,
+    shards: Optional[List[str]] = None,
+):
+    """Run the retrieval stage for an already-embedded query.
+
+    Returns (MMR documents, L2 distance of the nearest chunk or None).
+    Shared by RAGEngine.chat and the offline evaluation harness so both
+    measure exactly the same retrieval behaviour. shards restricts a
+    ShardedIndex to the named shards (raises UnknownShardError).
+    """
+    if shards:
+        vector_store = vector_store.select(shards)
+    docs = vector_store.max_marginal_relevance_search_by_vector(embedding, k=k, fetch_k=fetch_k)
+    scored = vector_store.similarity_search_with_score_by_vector(embedding, k=1)
+    top_score = scored[0][1] if scored else None
+    return docs, top_score
+
+
 def _history_to_messages(history: List[Dict[str, str]]):
     """Convert chat history dicts to LangChain message objects."""
+    from langchain_core.messages import HumanMessage, AIMessage
+
     messages = []
     for entry in history:
         role = entry.get("role", "")
@@ -66,10 +127,18 @@ def _history_to_messages(history: List[Dict[str, str]]):
 
 class RAGEngine:
     def __init__(self):
-        self.index_path = os.path.join(os.path.dirname(__file__), "index_kms")
-        self.embeddings = get_embeddings()
+        self.index_path = INDEX_ROOT
         self.vector_store = None
-        self.llm = get_llm(temperature=0.2)
+        self.index_version = None
+        self._version_watcher = VersionWatcher(self.index_path)
+        self._reload_lock = threading.Lock()
+        self._reloading = False
+        self._failed_version = None
+        # Clients and the default chain are built on first use (see warm_up)
+        self._clients_lock = threading.Lock()
+        self._embeddings = None
+        self._llm = None
+        self._default_chain_cache = None
 
         self.default_system_prompt = (
             "You are a concise NIST 800-53 consultant. You MUST follow these rules:\n\n"
@@ -83,11 +152,34 @@ class RAGEngine:
             "Context:\n{context}"
         )
 
+    @property
+    def embeddings(self):
+        if self._embeddings is None:
+            with self._clients_lock:
+                if self._embeddings is None:
+                    self._embeddings = get_embeddings()
+        return self._embeddings
+
+    @property
+    def llm(self):
+        if self._llm is None:
+            with self._clients_lock:
+                if self._llm is None:
+                    self._llm = get_llm(temperature=0.2)
+        return self._llm
+
+    @property
+    def _default_chain(self):
         # Cache the default chain (rebuilt only when system_prompt_override is given)
-        self._default_chain = self._build_chain(self.default_system_prompt)
+        if self._default_chain_cache is None:
+            self._default_chain_cache = self._build_chain(self.default_system_prompt)
+        return self._default_chain_cache
 
     def _build_chain(self, system_prompt: str):
         """Build a prompt | llm | parser chain with history support."""
+        from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+        from langchain_core.output_parsers import StrOutputParser
+
         prompt = ChatPromptTemplate.from_messages([
             ("system", system_prompt),
             MessagesPlaceholder("chat_history", optional=True),
@@ -95,24 +187,110 @@ class RAGEngine:
         ])
         return prompt | self.llm | StrOutputParser()
 
+    def index_available(self) -> bool:
+        """True if a published (or legacy) index exists on disk."""
+        return current_index_path(self.index_path) is not None
+
+    def index_status(self) -> Dict[str, Any]:
+        """On-disk availability plus whether (and which version) this process has loaded."""
+        return {
+            "available": self.index_available(),
+            "loaded": self.vector_store is not None,
+            "version": self.index_version,
+        }
+
+    def _read_index(self, version: str):
+        from sharded_index import ShardedIndex
+
+        return ShardedIndex.load(version_path(self.index_path, version), self.embeddings)
+
+    def shard_sizes(self) -> Dict[str, int]:
+        """{shard name: vector count} of the served index (empty if none)."""
+        try:
+            return self._load_vector_store().sizes()
+        except FileNotFoundError:
+            return {}
+
+    def _reload_in_background(self, version: str):
+        """Load a new index version off the request path, then swap it in.
+
+        In-flight requests keep the store reference they already hold, so
+        nothing is dropped; new requests see the new version after the swap.
+        """
+        with self._reload_lock:
+            if self._reloading:
+                return
+            self._reloading = True
+
+        def _run():
+            try:
+                store = self._read_index(version)
+                self.vector_store, self.index_version = store, version
+                logger.info("Hot-swapped index to version %s", version)
+            except Exception:
+                self._failed_version = version
+                logger.exception("Failed to load index version %s — still serving %s", version, self.index_version)
+            finally:
+                self._reloading = False
+
+        threading.Thread(target=_run, name="index-reload", daemon=True).start()
+
     def _load_vector_store(self):
+        if self._version_watcher.root != self.index_path:
+            self._version_watcher = VersionWatcher(self.index_path)
+        version = self._version_watcher.version()
+
         if self.vector_store is None:
-            if os.path.exists(self.index_path):
-                self.vector_store = FAISS.load_local(
-                    self.index_path,
-                    self.embeddings,
-                    allow_dangerous_deserialization=True,
-                )
-            else:
+            # First load bypasses the watcher's interval so a fresh ingest is picked up at once
+            version = current_version(self.index_path)
+            if version is None or current_index_path(self.index_path) is None:
                 raise FileNotFoundError("Vector index not found. Run ingestion first (make ingest).")
+            with self._reload_lock:
+                if self.vector_store is None:
+                    self.vector_store = self._read_index(version)
+                    self.index_version = version
+        elif version and version != self.index_version and version != self._failed_version:
+            self._reload_in_background(version)
         return self.vector_store
 
+    def warm_up(self, query: str) -> Dict[str, Any]:
+        """Build clients, load the index and run one embed + search off the request path.
+
+        Returns per-step timings in ms. A missing index is not an error
+        (index_loaded is False); client or embedding failures raise.
+        """
+        timings: Dict[str, Any] = {}
+        start = time.perf_counter()
+        # Build the lazily-created clients now so the first request does not pay for them
+        _ = (self.embeddings, self._default_chain)
+        timings["clients_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+        start = time.perf_counter()
+        try:
+            vs = self._load_vector_store()
+        except FileNotFoundError:
+            timings["index_loaded"] = False
+            return timings
+        timings["index_load_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        timings["index_loaded"] = True
+        timings["index_version"] = self.index_version
+
+        start = time.perf_counter()
+        vector = self.embeddings.embed_query(query)
+        timings["embed_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        start = time.perf_counter()
+        retrieve_by_vector(vs, vector)
+        timings["search_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        return timings
+
     def chat(
         self,
         question: str,
         history: Optional[List[Dict[str, str]]] = None,
         system_prompt_override: Optional[str] = None,
+        shards: Optional[List[str]] = None,
     ) -> Dict[str, Any]:
+        """Answer from the index; shards limits retrieval to those index shards."""
         try:
             vs = self._load_vector_store()
         except FileNotFoundError:
@@ -121,13 +299,18 @@ class RAGEngine:
                 "sources": [],
             }
 
+        if shards:
+            vs = vs.select(shards)  # validate before paying for the embedding call
+
+        # Embed once — MMR retrieval and the score guard share the vector
+        query_vector = self.embeddings.embed_query(question)
+
         # MMR retrieval — diversifies results across different pages/sections
-        source_docs = vs.max_marginal_relevance_search(question, k=5, fetch_k=20)
+        source_docs, top_score = retrieve_by_vector(vs, query_vector)
 
         # Score threshold guard — reject off-topic queries
-        scored = vs.similarity_search_with_score(question, k=1)
-        if scored and scored[0][1] > RELEVANCE_THRESHOLD:
-            logger.info("Off-topic query (L2=%.2f): %s", scored[0][1], question[:80])
+        if top_score is not None and top_score > RELEVANCE_THRESHOLD:
+            logger.info("Off-topic query (L2=%.2f): %s", top_score, question[:80])
             return {
                 "answer": "I don't have specific information on that topic in the NIST 800-53 knowledge base. Please ask about NIST security controls, compliance, or risk management.",
                 "sources": [],
@@ -161,10 +344,14 @@ class RAGEngine:
             key = (doc.metadata.get("source", ""), doc.metadata.get("page", ""))
             if key not in seen:
                 seen.add(key)
-                sources.append({
+                citation = {
                     "source": doc.metadata.get("source", "Unknown"),
                     "page": doc.metadata.get("page", "Unknown"),
                     "content_snippet": doc.page_content[:200] + "...",
-                })
+                }
+                # Near-duplicate copies collapsed into this chunk at ingestion
+                if doc.metadata.get("also_in"):
+                    citation["also_in"] = doc.metadata["also_in"]
+                sources.append(citation)
 
         return {"answer": answer, "sources": sources}
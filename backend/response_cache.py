@@ -0,0 +1,139 @@
+"""
+Pre-serialized, pre-compressed responses for endpoints that serve static data.
+
+The crossmap endpoints return the same bytes until the mapping data changes,
+yet every request rebuilt the dicts, re-serialized the JSON and (for
+/api/crossmap/sankey) rewrote the whole CSV. A ResponseCache keeps the
+finished body for each (endpoint, normalized query params, data version) key,
+together with gzip and brotli copies compressed once at the highest level, and
+a strong ETag derived from the body. Serving a cached entry is a dict lookup:
+the client gets the smallest encoding it accepts, and a matching
+If-None-Match gets 304 with no body at all.
+
+The ETag carries a suffix per content-coding (-gzip, -br), because the
+encoded bytes are a different representation. A conditional request matches
+any variant of the same body. Brotli comes from the `Brotli` package
+pinned in requirements.txt; an environment installed without it still
+serves gzip copies.
+"""
+
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple
+
+# Maximum number of cached responses (distinct endpoint + query combinations)
+RESPONSE_CACHE_SIZE = int(os.environ.get("RESPONSE_CACHE_SIZE", "512"))
+# Cache-Control max-age (seconds) for cached responses; clients revalidate with the ETag afterwards
+RESPONSE_CACHE_MAX_AGE = int(os.environ.get("RESPONSE_CACHE_MAX_AGE", "300"))
+# Bodies smaller than this are not worth compressing
+RESPONSE_COMPRESS_MIN_BYTES = int(os.environ.get("RESPONSE_COMPRESS_MIN_BYTES", "256"))
+# Levels for bodies compressed per request (cached bodies are compressed once at the maximum)
+RESPONSE_GZIP_LEVEL = int(os.environ.get("RESPONSE_GZIP_LEVEL", "6"))
+RESPONSE_BROTLI_QUALITY = int(os.environ.get("RESPONSE_BROTLI_QUALITY", "5"))
+
+# Preferred first when the client accepts several
+ENCODINGS = ("br", "gzip")
+
+
+def _brotli():
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def compress(body: bytes, encoding: str, fast: bool = False) -> Optional[bytes]:
+    """`body` in the given content-coding (None if unavailable).
+
+    Maximum compression by default; `fast` uses the per-request levels instead.
+    """
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=RESPONSE_GZIP_LEVEL if fast else 9, mtime=0)
+    if encoding == "br":
+        brotli = _brotli()
+        return brotli.compress(body, quality=RESPONSE_BROTLI_QUALITY if fast else 11) if brotli else None
+    raise ValueError(f"Unsupported content-coding {encoding!r}")
+
+
+class CachedResponse:
+    """One finished body with its compressed variants and ETags."""
+
+    def __init__(self, body: bytes, content_type: str, headers: Optional[Dict[str, str]] = None):
+        self.body = body
+        self.content_type = content_type
+        self.headers = dict(headers or {})
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+        self.encoded: Dict[str, bytes] = {}
+        if len(body) >= RESPONSE_COMPRESS_MIN_BYTES:
+            for encoding in ENCODINGS:
+                data = compress(body, encoding)
+                # Only keep a variant that actually saves bytes
+                if data is not None and len(data) < len(body):
+                    self.encoded[encoding] = data
+
+    def etag_for(self, encoding: Optional[str]) -> str:
+        return f"{self.etag}-{encoding}" if encoding else self.etag
+
+    @property
+    def etags(self) -> Tuple[str, ...]:
+        return (self.etag,) + tuple(self.etag_for(e) for e in self.encoded)
+
+    def select(self, accepted: Iterable[str]) -> Tuple[Optional[str], bytes]:
+        """(content-coding, bytes) of the smallest stored variant the client accepts."""
+        accepted = set(accepted)
+        for encoding in ENCODINGS:
+            if encoding in accepted and encoding in self.encoded:
+                return encoding, self.encoded[encoding]
+        return None, self.body
+
+    def nbytes(self) -> int:
+        return len(self.body) + sum(len(b) for b in self.encoded.values())
+
+
+class ResponseCache:
+    """Thread-safe LRU of CachedResponse entries."""
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Hashable, entry: CachedResponse) -> CachedResponse:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": sum(e.nbytes() for e in self._entries.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "brotli": _brotli() is not None,
+            }
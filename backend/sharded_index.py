@@ -0,0 +1,222 @@
+"""
+Per-corpus FAISS shards searched in parallel.
+
+Each index version stores one FAISS index per shard:
+
+    versions/<version>/shards/<name>/index.faiss, index.pkl
+
+By default a shard holds one source document (nist_1362.pdf -> "nist_1362").
+An optional docs/shards.json groups sources, e.g. per framework:
+
+    {"fedramp.pdf": "fedramp", "fedramp_low.pdf": "fedramp"}
+
+ShardedIndex fans a query out to the selected shards on a thread pool
+(FAISS releases the GIL while searching), merges candidates by L2 distance
+and runs MMR over the merged pool. The union of each shard's top fetch_k is
+a superset of the combined index's top fetch_k, so results match one big
+index, while a shard filter searches only the vectors it names.
+
+Shards may be compressed (PCA/MRL + float16/int8, see vector_compression);
+the query transform is part of each shard's FAISS index, so searches pass
+the original embedding.
+"""
+
+import json
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from index_store import SHARDS_DIR
+
+if TYPE_CHECKING:  # numpy, LangChain and FAISS load with the first index, not with app.py
+    import numpy as np
+    from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+SHARD_MAP_NAME = "shards.json"
+# Name given to an unsharded index (legacy flat index or pre-shard versions)
+DEFAULT_SHARD = "default"
+
+# Threads used to search shards concurrently (per worker process)
+INDEX_SEARCH_WORKERS = int(os.environ.get("INDEX_SEARCH_WORKERS", "4"))
+
+_UNSAFE_CHARS = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+class UnknownShardError(ValueError):
+    """Raised when a search names a shard the index does not have."""
+
+
+def shard_name(source: str, shard_map: Optional[Dict[str, str]] = None) -> str:
+    """Shard for a source file: its docs/shards.json entry, else the file stem."""
+    name = (shard_map or {}).get(source) or os.path.splitext(source)[0]
+    return _UNSAFE_CHARS.sub("_", name).strip("._") or DEFAULT_SHARD
+
+
+def load_shard_map(docs_dir: str) -> Dict[str, str]:
+    """Read docs/shards.json ({source file: shard name}); empty if absent."""
+    path = os.path.join(docs_dir, SHARD_MAP_NAME)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        logger.warning("Ignoring unreadable shard map at %s", path)
+        return {}
+    return {str(k): str(v) for k, v in data.items()} if isinstance(data, dict) else {}
+
+
+def list_shards(index_dir: str) -> List[str]:
+    """Shard names stored in an index version directory."""
+    shards_dir = os.path.join(index_dir, SHARDS_DIR)
+    if not os.path.isdir(shards_dir):
+        return []
+    return sorted(
+        name for name in os.listdir(shards_dir)
+        if os.path.exists(os.path.join(shards_dir, name, "index.faiss"))
+    )
+
+
+class ShardedIndex:
+    """Read-only view over named FAISS shards with a FAISS-like search API.
+
+    Args:
+        shards: {name: FAISS store}.
+        embeddings: used by similarity_search() to embed text queries.
+        max_workers: threads for concurrent shard searches.
+    """
+
+    def __init__(self, shards: Dict[str, Any], embeddings=None, max_workers: int = INDEX_SEARCH_WORKERS,
+                 _pool: Optional[ThreadPoolExecutor] = None):
+        self.shards = dict(sorted(shards.items()))
+        self.embeddings = embeddings
+        self.max_workers = max(1, max_workers)
+        self._pool = _pool
+
+    @classmethod
+    def load(cls, index_dir: str, embeddings, max_workers: int = INDEX_SEARCH_WORKERS,
+             raw: bool = False) -> "ShardedIndex":
+        """Load every shard of a version directory (or a flat index as DEFAULT_SHARD).
+
+        raw=True loads compressed shards' float32 vectors instead (see vector_compression).
+        """
+        from vector_compression import load_store
+
+        names = list_shards(index_dir)
+        if names:
+            shards = {
+                name: load_store(os.path.join(index_dir, SHARDS_DIR, name), embeddings, raw=raw)
+                for name in names
+            }
+        else:
+            shards = {DEFAULT_SHARD: load_store(index_dir, embeddings, raw=raw)}
+        return cls(shards, embeddings, max_workers)
+
+    # -- shard selection -----------------------------------------------------
+
+    @property
+    def names(self) -> List[str]:
+        return list(self.shards)
+
+    @property
+    def ntotal(self) -> int:
+        return sum(store.index.ntotal for store in self.shards.values())
+
+    def sizes(self) -> Dict[str, int]:
+        return {name: store.index.ntotal for name, store in self.shards.items()}
+
+    def select(self, names: Optional[Sequence[str]]) -> "ShardedIndex":
+        """Restrict searches to the given shards (None or empty = all)."""
+        if not names:
+            return self
+        unknown = sorted(set(names) - set(self.shards))
+        if unknown:
+            raise UnknownShardError(
+                f"Unknown shard(s): {', '.join(unknown)}. Available: {', '.join(self.shards)}"
+            )
+        return ShardedIndex(
+            {name: self.shards[name] for name in names}, self.embeddings, self.max_workers, _pool=self._executor(),
+        )
+
+    def documents(self) -> List["Document"]:
+        """Every stored chunk, shard by shard."""
+        docs = []
+        for store in self.shards.values():
+            docs.extend(store.docstore.search(doc_id) for doc_id in store.index_to_docstore_id.values())
+        return docs
+
+    # -- fan-out -------------------------------------------------------------
+
+    def _executor(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="shard-search")
+        return self._pool
+
+    def _fan_out(self, search: Callable[[Any], List[Any]]) -> List[Any]:
+        stores = list(self.shards.values())
+        if len(stores) == 1:
+            return search(stores[0])
+        merged = []
+        for results in self._executor().map(search, stores):
+            merged.extend(results)
+        return merged
+
+    @staticmethod
+    def _candidates(store, query: "np.ndarray", n: int) -> List[Tuple[float, "Document", "np.ndarray"]]:
+        from langchain_core.documents import Document
+
+        scores, indices = store.index.search(query, n)
+        out = []
+        for score, i in zip(scores[0], indices[0]):
+            if i == -1:  # fewer than n vectors in this shard
+                continue
+            doc = store.docstore.search(store.index_to_docstore_id[i])
+            if isinstance(doc, Document):
+                out.append((float(score), doc, store.index.reconstruct(int(i))))
+        return out
+
+    # -- FAISS-compatible search API -----------------------------------------
+
+    def similarity_search_with_score_by_vector(
+        self, embedding: List[float], k: int = 4, fetch_k: int = 20, shards: Optional[Sequence[str]] = None, **kwargs,
+    ) -> List[Tuple["Document", float]]:
+        """Top-k (Document, L2 distance) across shards, nearest first."""
+        if shards:
+            return self.select(shards).similarity_search_with_score_by_vector(embedding, k=k, fetch_k=fetch_k)
+        scored = self._fan_out(lambda store: store.similarity_search_with_score_by_vector(embedding, k=k))
+        scored.sort(key=lambda pair: pair[1])
+        return scored[:k]
+
+    def max_marginal_relevance_search_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        fetch_k: int = 20,
+        lambda_mult: float = 0.5,
+        shards: Optional[Sequence[str]] = None,
+        **kwargs,
+    ) -> List["Document"]:
+        """MMR over the fetch_k nearest chunks of the selected shards."""
+        import numpy as np
+        from langchain_community.vectorstores.utils import maximal_marginal_relevance
+
+        if shards:
+            return self.select(shards).max_marginal_relevance_search_by_vector(
+                embedding, k=k, fetch_k=fetch_k, lambda_mult=lambda_mult,
+            )
+        query = np.array([embedding], dtype=np.float32)
+        candidates = self._fan_out(lambda store: self._candidates(store, query, fetch_k))
+        candidates.sort(key=lambda c: c[0])
+        candidates = candidates[:fetch_k]
+        if not candidates:
+            return []
+        selected = maximal_marginal_relevance(query, [c[2] for c in candidates], k=k, lambda_mult=lambda_mult)
+        return [candidates[i][1] for i in selected]
+
+    def similarity_search(self, query: str, k: int = 4, shards: Optional[Sequence[str]] = None, **kwargs):
+        vector = self.embeddings.embed_query(query)
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(vector, k=k, shards=shards)]
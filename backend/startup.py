@@ -0,0 +1,131 @@
+"""
+Startup timing and background warm-up.
+
+Importing app.py used to build every LangChain/Gemini/Ollama client, while
+the FAISS index loaded on the first /api/chat, so the first user after a
+deploy or scale-up paid for both. Now the heavy libraries are imported on
+first use, the app starts serving as soon as Flask is up, and a background
+thread (one per worker process) builds the clients, loads the index and runs
+one embed + search with WARMUP_QUERY.
+
+GET /api/ready answers 503 until warm-up has finished, then 200, together
+with the import-time and startup-phase breakdown. A warm-up failure (e.g.
+the embedding API is unreachable) is reported as "degraded" but still ready:
+requests retry the same steps lazily, as they did before warm-up existed.
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Warm the index and clients in the background at import (set false for tests/CLI tools)
+WARMUP_ON_START = os.environ.get("WARMUP_ON_START", "true").lower() == "true"
+WARMUP_QUERY = os.environ.get("WARMUP_QUERY", "What is AC-2 Account Management?")
+
+# Heavy modules that should not be imported before the app starts serving
+DEFERRED_MODULES = (
+    "langchain_google_genai",
+    "langchain_ollama",
+    "langchain_community",
+    "langchain_core.runnables",
+    "faiss",
+)
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 1)
+
+
+class StartupTracker:
+    """Import/startup timings and warm-up state of one worker process."""
+
+    def __init__(self):
+        self.began = time.perf_counter()
+        self.imports: Dict[str, float] = {}
+        self.phases: Dict[str, Any] = {}
+        self.status = "starting"
+        self.error: Optional[str] = None
+        self.deferred: List[str] = []
+        self._serving_at: Optional[float] = None
+        self._ready_at: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @contextmanager
+    def timed_import(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.imports[name] = _ms(time.perf_counter() - start)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time a synchronous startup step (reported as startup.<name>_ms)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[f"{name}_ms"] = _ms(time.perf_counter() - start)
+
+    def serving(self) -> None:
+        """Mark the app importable and able to serve requests."""
+        self._serving_at = time.perf_counter()
+        self.deferred = [m for m in DEFERRED_MODULES if m not in sys.modules]
+
+    def skip_warmup(self) -> None:
+        self.status = "ready"
+        self.phases["warmup"] = "skipped"
+        self._ready_at = time.perf_counter()
+
+    def start_warmup(self, orchestrator, query: str = WARMUP_QUERY) -> threading.Thread:
+        """Run orchestrator.warm_up(query) on a daemon thread."""
+        self.status = "warming"
+
+        def _run():
+            start = time.perf_counter()
+            try:
+                self.phases.update(orchestrator.warm_up(query))
+                self.status = "ready"
+            except Exception as e:
+                self.error = str(e)
+                self.status = "degraded"
+                logger.exception("Startup warm-up failed — requests will load lazily")
+            finally:
+                self.phases["warmup_ms"] = _ms(time.perf_counter() - start)
+                self._ready_at = time.perf_counter()
+                logger.info("Warm-up finished (%s) in %.0f ms", self.status, self.phases["warmup_ms"])
+
+        self._thread = threading.Thread(target=_run, name="startup-warmup", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    @property
+    def ready(self) -> bool:
+        return self._ready_at is not None
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.ready
+
+    def report(self) -> Dict[str, Any]:
+        now = time.perf_counter()
+        return {
+            "ready": self.ready,
+            "status": self.status,
+            "error": self.error,
+            "imports_ms": dict(self.imports),
+            "startup": {
+                "app_import_ms": _ms(self._serving_at - self.began) if self._serving_at else None,
+                "time_to_ready_ms": _ms(self._ready_at - self.began) if self._ready_at else None,
+                "uptime_ms": _ms(now - self.began),
+                **self.phases,
+            },
+            "deferred_imports": list(self.deferred),
+        }
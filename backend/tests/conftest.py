@@ -6,6 +6,11 @@ from unittest.mock import MagicMock, patch
 # Ensure backend is on the path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 
+# No background index load/embedding call when tests import app.py
+os.environ.setdefault("WARMUP_ON_START", "false")
+# ...and no network probe of the LLM backend from the health monitor
+os.environ.setdefault("HEALTH_CHECK_LLM", "false")
+
 
 @pytest.fixture
 def mock_ollama():
@@ -27,6 +32,7 @@ def app_client():
         "agent_name": "NIST Controls Specialist",
         "agent_id": "NIST_SPECIALIST",
     }
+    mock_orch_instance.rag_engine.index_status.return_value = {"available": True, "loaded": True, "version": "v1"}
 
     # Patch Orchestrator class so reload creates our mock instance
     mock_orch_cls = MagicMock(return_value=mock_orch_instance)
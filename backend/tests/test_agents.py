@@ -113,3 +113,27 @@ class TestOrchestratorRouting:
         orch = Orchestrator()
         result = orch._keyword_route("How to add SAST to CI/CD pipeline?")
         assert result == "DEVSECOPS_AGENT"
+
+
+class TestMappingFastPath:
+    @patch("agents.get_llm")
+    @patch("agents.RAGEngine")
+    def test_mapping_lookup_skips_rag(self, mock_rag, mock_get_llm):
+        orch = Orchestrator()
+        orch.answer_store.enabled = False
+        response = orch.route_and_chat("What CSF category covers SI-4?")
+        assert response["agent_id"] == "COMPLIANCE_SPECIALIST"
+        assert response["agent_name"] == AGENTS["COMPLIANCE_SPECIALIST"]["name"]
+        assert "**DE.CM-01**" in response["answer"]
+        orch.rag_engine.chat.assert_not_called()
+        mock_get_llm.assert_not_called()
+
+    @patch("agents.get_llm")
+    @patch("agents.RAGEngine")
+    def test_other_questions_use_rag(self, mock_rag, mock_get_llm):
+        orch = Orchestrator()
+        orch.answer_store.enabled = False
+        orch.rag_engine.chat.return_value = {"answer": "live", "sources": []}
+        response = orch.route_and_chat("How does AC-2 map to FedRAMP?")
+        assert response["answer"] == "live"
+        assert response["agent_id"] == "COMPLIANCE_SPECIALIST"
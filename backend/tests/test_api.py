@@ -1,4 +1,5 @@
 import json
+from datetime import date
 import os
 import pytest
 from unittest.mock import patch
@@ -15,6 +16,26 @@ class TestHealthEndpoint:
         assert data["status"] == "healthy"
 
 
+    def test_health_serves_cached_checks(self, app_client):
+        import app as app_module
+        with patch.object(app_module.health._checks["database"], "fn", return_value=True) as db_check:
+            app_module.health.refresh(force=True)
+            for _ in range(5):
+                data = json.loads(app_client.get("/api/health").data)
+        assert db_check.call_count == 1
+        assert data["checks"]["database"]["status"] == "ok"
+        assert {"latency_ms", "age_s", "checked_at"} <= set(data["checks"]["database"])
+        assert data["checks"]["faiss_index"]["detail"]["version"] == "v1"
+
+    def test_health_degraded_when_index_missing(self, app_client):
+        import app as app_module
+        app_module.orchestrator.rag_engine.index_status.return_value = {"available": False, "loaded": False, "version": None}
+        app_module.health.refresh(force=True)
+        data = json.loads(app_client.get("/api/health").data)
+        assert data["status"] == "degraded"
+        assert data["checks"]["faiss_index"]["status"] == "fail"
+
+
 class TestChatEndpoint:
     def test_chat_requires_message(self, app_client):
         response = app_client.post(
@@ -127,3 +148,132 @@ class TestApiKeyAuth:
         with patch.dict(os.environ, {"API_KEY": "test-secret-key"}, clear=False):
             response = app_client.get("/api/visitors/count")
             assert response.status_code == 200
+
+
+class TestIngestJobEndpoints:
+    def test_ingest_returns_job_id(self, app_client):
+        job = {"job_id": "20260101T000000000000Z-abcdef", "status": "queued"}
+        with patch("app.start_job", return_value=job) as start:
+            response = app_client.post("/api/ingest", json={"rebuild": True})
+        assert response.status_code == 202
+        data = json.loads(response.data)
+        assert data["job_id"] == job["job_id"]
+        assert data["status_url"] == f"/api/ingest/{job['job_id']}"
+        assert response.headers["Location"] == data["status_url"]
+        start.assert_called_once_with(rebuild=True)
+
+    def test_duplicate_ingest_rejected(self, app_client):
+        from ingest_jobs import IngestJobConflict
+        with patch("app.start_job", side_effect=IngestJobConflict("20260101T000000000000Z-abcdef")):
+            response = app_client.post("/api/ingest")
+        assert response.status_code == 409
+        assert json.loads(response.data)["job_id"] == "20260101T000000000000Z-abcdef"
+
+    def test_ingest_disabled(self, app_client):
+        with patch.dict(os.environ, {"DISABLE_INGEST": "true"}, clear=False), patch("app.start_job") as start:
+            response = app_client.post("/api/ingest")
+        assert response.status_code == 403
+        start.assert_not_called()
+
+    def test_job_status(self, app_client):
+        job = {"job_id": "20260101T000000000000Z-abcdef", "status": "running",
+               "progress": {"files_parsed": 1, "chunks_embedded": 40, "chunks_per_sec": 12.5, "eta_seconds": 8.0}}
+        with patch("app.get_job", return_value=job):
+            response = app_client.get(f"/api/ingest/{job['job_id']}")
+        assert response.status_code == 200
+        assert json.loads(response.data)["progress"]["chunks_embedded"] == 40
+
+    def test_unknown_job_is_404(self, app_client):
+        with patch("app.get_job", return_value=None):
+            assert app_client.get("/api/ingest/nope").status_code == 404
+        with patch("app.cancel_job", return_value=None):
+            assert app_client.delete("/api/ingest/nope").status_code == 404
+
+    def test_cancel_running_job(self, app_client):
+        job = {"job_id": "20260101T000000000000Z-abcdef", "status": "running", "cancel_requested": True}
+        with patch("app.cancel_job", return_value=job):
+            response = app_client.delete(f"/api/ingest/{job['job_id']}")
+        assert response.status_code == 202
+
+    def test_cancel_finished_job_conflicts(self, app_client):
+        job = {"job_id": "20260101T000000000000Z-abcdef", "status": "succeeded"}
+        with patch("app.cancel_job", return_value=job):
+            response = app_client.delete(f"/api/ingest/{job['job_id']}")
+        assert response.status_code == 409
+
+    def test_job_status_protected(self, app_client):
+        with patch.dict(os.environ, {"API_KEY": "test-secret-key"}, clear=False):
+            assert app_client.get("/api/ingest/20260101T000000000000Z-abcdef").status_code == 401
+
+
+class TestShardEndpoints:
+    def test_list_shards(self, app_client):
+        import app as app_module
+        app_module.orchestrator.rag_engine.shard_sizes.return_value = {"fedramp": 120, "nist_1362": 340}
+        data = json.loads(app_client.get("/api/shards").data)
+        assert data == {"shards": {"fedramp": 120, "nist_1362": 340}, "count": 2}
+
+    def test_chat_passes_shard_filter(self, app_client):
+        import app as app_module
+        response = app_client.post("/api/chat", json={"message": "What is AC-2?", "shards": ["nist_1362"]})
+        assert response.status_code == 200
+        _, kwargs = app_module.orchestrator.route_and_chat.call_args
+        assert kwargs["shards"] == ["nist_1362"]
+
+    def test_chat_rejects_malformed_shards(self, app_client):
+        response = app_client.post("/api/chat", json={"message": "What is AC-2?", "shards": "nist_1362"})
+        assert response.status_code == 400
+
+    def test_chat_unknown_shard_is_400(self, app_client):
+        import app as app_module
+        from sharded_index import UnknownShardError
+        app_module.orchestrator.route_and_chat.side_effect = UnknownShardError("Unknown shard(s): iso")
+        response = app_client.post("/api/chat", json={"message": "What is AC-2?", "shards": ["iso"]})
+        assert response.status_code == 400
+        assert "iso" in json.loads(response.data)["error"]
+
+
+class TestReadinessEndpoint:
+    def test_ready_when_warmup_skipped(self, app_client):
+        response = app_client.get("/api/ready")
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert data["ready"] is True
+        assert data["startup"]["warmup"] == "skipped"
+        assert {"flask", "agents", "sharded_index"} <= set(data["imports_ms"])
+
+    def test_not_ready_while_warming(self, app_client):
+        import app as app_module
+        from startup import StartupTracker
+        with patch.object(app_module, "startup", StartupTracker()) as tracker:
+            tracker.status = "warming"
+            response = app_client.get("/api/ready")
+        assert response.status_code == 503
+        assert json.loads(response.data)["status"] == "warming"
+
+
+class TestVisitorStatsEndpoint:
+    def test_daily_range(self, app_client):
+        import app as app_module
+        with patch.object(app_module, "get_daily_stats", return_value={"days": []}) as daily:
+            response = app_client.get("/api/visitors/stats?from=2025-03-01&to=2025-03-31")
+        assert response.status_code == 200
+        assert daily.call_args[0] == (date(2025, 3, 1), date(2025, 3, 31))
+
+    def test_default_is_last_30_days(self, app_client):
+        import app as app_module
+        with patch.object(app_module, "get_daily_stats", return_value={"days": []}) as daily:
+            app_client.get("/api/visitors/stats")
+        start, end = daily.call_args[0]
+        assert (end - start).days == 29
+
+    def test_recent_hours(self, app_client):
+        import app as app_module
+        with patch.object(app_module, "get_recent_stats", return_value={"hours": 24}) as recent:
+            response = app_client.get("/api/visitors/stats?hours=24")
+        assert response.status_code == 200
+        recent.assert_called_once_with(24)
+
+    @pytest.mark.parametrize("query", ["from=03-01-2025", "hours=abc", "from=2025-03-02&to=2025-03-01"])
+    def test_bad_params_are_400(self, app_client, query):
+        assert app_client.get(f"/api/visitors/stats?{query}").status_code == 400
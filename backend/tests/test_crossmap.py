@@ -1,12 +1,16 @@
 import json
+import gzip
 import csv
 import io
 import sys
 import os
+import pytest
+from unittest.mock import patch
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 
 from crossmap import get_crossmap, get_families, get_stats, generate_sankey_csv, CROSSMAP
+from crossmap import detect_framework, get_coverage, get_reverse_mapping, get_target_controls
 
 
 class TestCrossmapModule:
@@ -62,6 +66,85 @@ class TestCrossmapModule:
         results = get_crossmap()
         assert len(results) == len(CROSSMAP)
 
+    def test_family_substring_and_case(self):
+        assert get_crossmap(family="access control") == get_crossmap(family="Access Control")
+        # "and" matches several families; catalog order is kept
+        results = get_crossmap(family="and")
+        assert {r["nist_family"] for r in results} >= {"Audit and Accountability", "Identification and Authentication"}
+        assert [CROSSMAP.index(r) for r in results] == sorted(CROSSMAP.index(r) for r in results)
+
+    def test_nist_id_with_family_and_framework(self):
+        assert get_crossmap(nist_id="ac-2", family="Access") == get_crossmap(nist_id="AC-2")
+        assert get_crossmap(nist_id="AC-2", family="Incident") == []
+        assert get_crossmap(nist_id="AC-2", framework="csf2")[0]["csf2"] == ["PR.AA-01", "PR.AA-03"]
+        assert get_crossmap(nist_id="XX-99") == []
+
+    def test_crossmap_is_a_read_only_view(self):
+        import crossmap
+        assert CROSSMAP[-1] == CROSSMAP[len(CROSSMAP) - 1]
+        assert CROSSMAP[:2] == [CROSSMAP[0], CROSSMAP[1]]
+        with pytest.raises(IndexError):
+            CROSSMAP[len(CROSSMAP)]
+        assert len(crossmap.DATA_VERSION) == 16
+
+    def test_stats_match_full_scan(self):
+        stats = get_stats()
+        assert stats["unique_iso27001_controls"] == len({c for e in CROSSMAP for c in e["iso27001"]})
+        assert stats["unique_csf2_categories"] == len({c for e in CROSSMAP for c in e["csf2"]})
+        assert stats["nist_families"] == len({e["nist_family"] for e in CROSSMAP}) == len(get_families())
+
+
+class TestReverseLookup:
+    def test_detect_framework(self):
+        assert detect_framework("A.8.15") == "iso27001"
+        assert detect_framework("de.cm-09") == "csf2"
+        assert detect_framework("8.2") == "iso27005"
+        assert detect_framework("AC-2") is None
+
+    def test_reverse_mapping_matches_forward(self):
+        result = get_reverse_mapping("a.5.16")
+        assert result["framework"] == "iso27001" and result["title"] == "Identity management"
+        nist_ids = [c["nist_id"] for c in result["nist_controls"]]
+        assert "AC-2" in nist_ids
+        assert nist_ids == [e["nist_id"] for e in CROSSMAP if "A.5.16" in e["iso27001"]]
+
+    def test_reverse_unknown(self):
+        assert get_reverse_mapping("A.9.99") is None
+        with pytest.raises(ValueError):
+            get_reverse_mapping("AC-2")
+
+    def test_target_controls_sorted_naturally(self):
+        controls = get_target_controls("iso27001")
+        ids = [c["control_id"] for c in controls]
+        assert ids.index("A.5.2") < ids.index("A.5.15")
+        assert sum(c["nist_count"] for c in controls) == sum(len(e["iso27001"]) for e in CROSSMAP)
+
+
+class TestCoverage:
+    def test_iso_to_nist_and_csf(self):
+        result = get_coverage("iso27001", ["A.8.15", "A.9.99"])
+        assert result["unknown"] == ["A.9.99"]
+        covered = set(result["nist"]["covered_controls"])
+        assert covered == {m["nist_id"] for m in get_reverse_mapping("A.8.15")["nist_controls"]}
+        csf = result["targets"]["csf2"]
+        reached = {c["control_id"] for c in csf["controls"] if c["nist_covered"]}
+        assert reached == {cat for entry in CROSSMAP if entry["nist_id"] in covered for cat in entry["csf2"]}
+        assert set(csf["gap_controls"]).isdisjoint(reached)
+
+    def test_all_mode_is_stricter(self):
+        controls = ["A.5.15", "A.8.15", "A.8.16"]
+        any_mode = get_coverage("iso27001", controls)["nist"]
+        all_mode = get_coverage("iso27001", controls, mode="all")["nist"]
+        assert set(all_mode["covered_controls"]) < set(any_mode["covered_controls"])
+        assert set(any_mode["covered_controls"]) - set(all_mode["covered_controls"]) == set(any_mode["partial_controls"])
+
+    def test_nist_source(self):
+        result = get_coverage("nist", ["ac-2"], targets=["iso27001"])
+        assert result["nist"]["covered_controls"] == ["AC-2"]
+        assert result["nist"]["coverage_pct"] == round(100 / len(CROSSMAP), 1)
+        assert {c["control_id"] for c in result["targets"]["iso27001"]["controls"] if c["nist_covered"]} == set(
+            get_crossmap(nist_id="AC-2")[0]["iso27001"])
+
 
 class TestSankeyCSV:
     """Tests for Sankey diagram CSV generation."""
@@ -152,6 +235,132 @@ class TestCrossmapEndpoints:
         header = next(reader)
         assert header == ["source", "target", "value"]
 
+    def test_reverse_endpoint(self, app_client):
+        response = app_client.get("/api/crossmap/reverse?control=A.8.15,DE.CM-09&control=A.9.99")
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert [r["framework"] for r in data["results"]] == ["iso27001", "csf2"]
+        assert data["not_found"] == ["A.9.99"]
+        assert all(r["nist_controls"] for r in data["results"])
+
+    def test_reverse_endpoint_errors(self, app_client):
+        assert app_client.get("/api/crossmap/reverse").status_code == 400
+        assert app_client.get("/api/crossmap/reverse?control=AC-2").status_code == 400
+        assert app_client.get("/api/crossmap/reverse?control=A.9.99").status_code == 404
+
+    def test_targets_endpoint(self, app_client):
+        data = json.loads(app_client.get("/api/crossmap/targets/csf2").data)
+        assert data["count"] == len(data["controls"]) > 5
+        assert app_client.get("/api/crossmap/targets/pci").status_code == 400
+
+    def test_responses_are_cached_per_normalized_query(self, app_client):
+        import app as app_module
+        app_module.response_cache.clear()
+        with patch.object(app_module, "get_crossmap", wraps=app_module.get_crossmap) as build:
+            first = app_client.get("/api/crossmap?family=Access+Control")
+            second = app_client.get("/api/crossmap?family=access+control&unused=1")
+            app_client.get("/api/crossmap?family=Audit")
+        assert build.call_count == 2
+        assert first.data == second.data
+        assert first.headers["ETag"] == second.headers["ETag"]
+        assert first.headers["Vary"] == "Accept-Encoding"
+
+    def test_gzip_and_etag_revalidation(self, app_client):
+        plain = app_client.get("/api/crossmap")
+        zipped = app_client.get("/api/crossmap", headers={"Accept-Encoding": "gzip"})
+        assert zipped.headers["Content-Encoding"] == "gzip"
+        assert gzip.decompress(zipped.data) == plain.data
+        assert zipped.headers["ETag"] == plain.headers["ETag"][:-1] + '-gzip"'
+        for etag in (plain.headers["ETag"], zipped.headers["ETag"]):
+            response = app_client.get("/api/crossmap", headers={"If-None-Match": etag, "Accept-Encoding": "gzip"})
+            assert response.status_code == 304
+            assert response.data == b""
+        assert app_client.get("/api/crossmap", headers={"If-None-Match": '"stale"'}).status_code == 200
+
+    def test_cached_sankey_keeps_download_headers(self, app_client):
+        for _ in range(2):
+            response = app_client.get("/api/crossmap/sankey")
+            assert response.content_type == "text/csv; charset=utf-8"
+            assert "attachment" in response.headers["Content-Disposition"]
+
+    def test_precompute_fills_cache(self, app_client):
+        import app as app_module
+        app_module.response_cache.clear()
+        app_module._precompute_crossmap_responses()
+        assert app_module.response_cache.stats()["entries"] == 7
+        app_client.get("/api/crossmap/stats")
+        assert app_module.response_cache.stats()["hits"] == 1
+
+    def test_errors_are_not_cached(self, app_client):
+        import app as app_module
+        app_client.get("/api/crossmap/targets/pci")
+        assert all(key[1] != (("framework", "pci"),) for key in app_module.response_cache._entries)
+
+    def test_coverage_endpoint(self, app_client):
+        response = app_client.get("/api/crossmap/coverage?framework=iso27001&control=A.5.15,A.8.15&target=csf2")
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert data["implemented"] == ["A.5.15", "A.8.15"]
+        assert set(data["targets"]) == {"csf2"}
+        assert data["nist"]["covered"] == len(data["nist"]["covered_controls"]) > 0
+        assert sum(f["covered"] for f in data["families"]) == data["nist"]["covered"]
+
+    def test_coverage_endpoint_is_not_response_cached(self, app_client):
+        import app as app_module
+        query = "/api/crossmap/coverage?framework=iso27001&control=A.5.15,A.8.15"
+        plain = app_client.get(query)
+        zipped = app_client.get(query, headers={"Accept-Encoding": "gzip"})
+        assert all(key[0] != "crossmap_coverage" for key in app_module.response_cache._entries)
+        assert zipped.headers["Content-Encoding"] == "gzip"
+        assert gzip.decompress(zipped.data) == plain.data
+
+    @pytest.mark.parametrize("query", [
+        "control=A.5.15", "framework=iso27001", "framework=pci&control=1.1",
+        "framework=iso27001&control=A.5.15&mode=most", "framework=iso27001&control=A.5.15&target=pci",
+    ])
+    def test_coverage_endpoint_errors(self, app_client, query):
+        assert app_client.get(f"/api/crossmap/coverage?{query}").status_code == 400
+
+    def test_search_endpoint(self, app_client):
+        data = json.loads(app_client.get("/api/crossmap/search?q=acc+man").data)
+        assert data["results"][0]["control_id"] == "AC-2"
+        assert data["count"] == len(data["results"])
+        data = json.loads(app_client.get("/api/crossmap/search?q=a.8&kind=iso27001&limit=3").data)
+        assert data["count"] == 3 and all(r["kind"] == "iso27001" for r in data["results"])
+
+    @pytest.mark.parametrize("query", ["", "q=", "q=ac&kind=pci", "q=ac&limit=x"])
+    def test_search_endpoint_errors(self, app_client, query):
+        assert app_client.get(f"/api/crossmap/search?{query}").status_code == 400
+
+    def test_sankey_family_level(self, app_client):
+        response = app_client.get("/api/crossmap/sankey?level=family")
+        assert response.status_code == 200
+        assert "NIST Access Control,ISO A.5," in response.data.decode("utf-8")
+        assert app_client.get("/api/crossmap/sankey?level=team").status_code == 400
+
+    def test_graph_endpoint_streams_and_revalidates(self, app_client):
+        response = app_client.get("/api/crossmap/graph?level=family&format=json")
+        assert response.status_code == 200
+        assert response.mimetype == "application/json"
+        assert "nist_crossmap_family.json" in response.headers["Content-Disposition"]
+        data = json.loads(response.data)
+        assert data["links"] and data["nodes"]
+        etag = response.headers["ETag"]
+        again = app_client.get("/api/crossmap/graph?level=family&format=json", headers={"If-None-Match": etag})
+        assert again.status_code == 304
+        graphml = app_client.get("/api/crossmap/graph?format=graphml&framework=csf2")
+        assert graphml.data.startswith(b"<?xml") and b"ISO A." not in graphml.data
+
+    def test_graph_endpoint_repeated_framework(self, app_client):
+        once = app_client.get("/api/crossmap/graph?level=framework&framework=csf2")
+        twice = app_client.get("/api/crossmap/graph?level=framework&framework=csf2,csf2&framework=csf2")
+        assert twice.data == once.data
+        assert twice.headers["ETag"] == once.headers["ETag"]
+
+    @pytest.mark.parametrize("query", ["level=team", "format=xlsx", "framework=pci", "framework=csf2,pci"])
+    def test_graph_endpoint_errors(self, app_client, query):
+        assert app_client.get(f"/api/crossmap/graph?{query}").status_code == 400
+
     def test_crossmap_endpoints_not_protected(self, app_client):
         """Crossmap endpoints should be publicly accessible."""
         from unittest.mock import patch as mock_patch
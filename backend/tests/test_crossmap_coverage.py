@@ -0,0 +1,68 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from crossmap_coverage import CoverageEngine
+from crossmap_store import StoreBuilder
+
+
+@pytest.fixture
+def engine():
+    builder = StoreBuilder()
+    for nist_id, title, family in (
+        ("AC-2", "Account Management", "Access Control"),
+        ("AC-3", "Access Enforcement", "Access Control"),
+        ("SI-4", "System Monitoring", "System and Information Integrity"),
+        ("PL-2", "System Security Plans", "Planning"),
+    ):
+        builder.add_control(nist_id, title, family)
+    for nist_id, fw, control_id in (
+        ("AC-2", "iso27001", "A.5.16"), ("AC-2", "iso27001", "A.5.18"),
+        ("AC-3", "iso27001", "A.8.3"),
+        ("SI-4", "iso27001", "A.8.16"),
+        ("AC-2", "csf2", "PR.AA-01"), ("AC-3", "csf2", "PR.AA-05"), ("SI-4", "csf2", "DE.CM-01"),
+        ("PL-2", "csf2", "GV.PO-01"),
+    ):
+        builder.add_mapping(nist_id, fw, control_id, f"{control_id} title")
+    return CoverageEngine(builder.build())
+
+
+def _ids(engine, mask):
+    return [engine.nist_ids[row] for row in mask.nonzero()[0]]
+
+
+class TestCoverageEngine:
+    def test_resolve_normalizes_and_reports_unknown(self, engine):
+        mask, known, unknown = engine.resolve("iso27001", [" a.5.16", "A.8.3", "A.5.16", "A.9.9"])
+        assert int(mask.sum()) == 2 and len(known) == 2
+        assert unknown == ["A.9.9"]
+        with pytest.raises(ValueError):
+            engine.resolve("pci", ["1.1"])
+
+    def test_any_and_all_modes(self, engine):
+        mask, _, _ = engine.resolve("iso27001", ["A.5.16", "A.8.3"])
+        any_mode = engine.nist_coverage("iso27001", mask, "any")
+        assert _ids(engine, any_mode["covered"]) == ["AC-2", "AC-3"]
+        assert _ids(engine, any_mode["partial"]) == ["AC-2"]
+        assert _ids(engine, any_mode["gap"]) == ["SI-4"]
+        assert _ids(engine, ~any_mode["mapped"]) == ["PL-2"]
+        assert _ids(engine, engine.nist_coverage("iso27001", mask, "all")["covered"]) == ["AC-3"]
+        with pytest.raises(ValueError):
+            engine.nist_coverage("iso27001", mask, "most")
+
+    def test_nist_source_is_taken_as_covered(self, engine):
+        mask, _, _ = engine.resolve("nist", ["si-4"])
+        assert _ids(engine, engine.nist_coverage("nist", mask)["covered"]) == ["SI-4"]
+
+    def test_family_and_transitive_coverage(self, engine):
+        mask, _, _ = engine.resolve("iso27001", ["A.5.16"])
+        nist = engine.nist_coverage("iso27001", mask)
+        covered, mapped = engine.family_coverage(nist["covered"], nist["mapped"])
+        assert dict(zip(engine.families, zip(covered.tolist(), mapped.tolist()))) == {
+            "Access Control": (1, 2), "System and Information Integrity": (0, 1), "Planning": (0, 0),
+        }
+        reach, total = engine.target_coverage("csf2", nist["covered"])
+        by_id = {engine.store.target_id("csf2", t): (int(reach[t]), int(total[t])) for t in range(len(total))}
+        assert by_id == {"PR.AA-01": (1, 1), "PR.AA-05": (0, 1), "DE.CM-01": (0, 1), "GV.PO-01": (0, 1)}
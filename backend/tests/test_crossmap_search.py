@@ -0,0 +1,71 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from crossmap_search import SearchIndex, compact_id
+from crossmap_store import StoreBuilder
+
+
+@pytest.fixture(scope="module")
+def index():
+    builder = StoreBuilder()
+    for nist_id, title, family in (
+        ("AC-2", "Account Management", "Access Control"),
+        ("AC-2(1)", "Automated System Account Management", "Access Control"),
+        ("AC-20", "Use of External Systems", "Access Control"),
+        ("AU-2", "Event Logging", "Audit and Accountability"),
+        ("PE-2", "Physical Access Authorizations", "Physical and Environmental Protection"),
+    ):
+        builder.add_control(nist_id, title, family)
+    for nist_id, fw, control_id, title in (
+        ("AC-2", "iso27001", "A.5.16", "Identity management"),
+        ("AU-2", "iso27001", "A.8.15", "Logging"),
+        ("AU-2", "csf2", "DE.CM-09", "Computing hardware and software are monitored"),
+        ("PE-2", "csf2", "PR.AA-05", "Access permissions are managed"),
+    ):
+        builder.add_mapping(nist_id, fw, control_id, title)
+    return SearchIndex(builder.build())
+
+
+def _ids(results):
+    return [r["control_id"] for r in results]
+
+
+class TestSearchIndex:
+    def test_compact_id(self):
+        assert compact_id(" AC-2(1) ") == "ac2.1"
+        assert compact_id("DE.CM-09") == "de.cm09"
+
+    def test_partial_title_words(self, index):
+        assert _ids(index.search("acc man"))[:2] == ["AC-2", "AC-2(1)"]
+
+    @pytest.mark.parametrize("query, first", [
+        ("ac-2", "AC-2"), ("AC 2", "AC-2"), ("ac-2(1)", "AC-2(1)"), ("a.8.1", "A.8.15"),
+        ("8.15", "A.8.15"), ("de.cm", "DE.CM-09"), ("event log", "AU-2"),
+    ])
+    def test_ids_and_titles(self, index, query, first):
+        assert _ids(index.search(query))[0] == first
+
+    def test_exact_id_outranks_prefix(self, index):
+        results = index.search("ac-2")
+        assert results[0]["control_id"] == "AC-2"
+        assert results[0]["score"] > results[1]["score"]
+        assert "AC-20" in _ids(results)
+
+    def test_typo_falls_back_to_trigrams(self, index):
+        assert _ids(index.search("acount"))[0] == "AC-2"
+        assert index.search("zzzz") == []
+
+    def test_kind_limit_and_fields(self, index):
+        results = index.search("a", limit=2, kind="iso27001")
+        assert len(results) == 2 and {r["kind"] for r in results} == {"iso27001"}
+        assert "family" not in results[0]
+        assert index.search("au-2")[0]["family"] == "Audit and Accountability"
+        with pytest.raises(ValueError):
+            index.search("a", kind="pci")
+
+    def test_cached_results_are_copies(self, index):
+        index.search("event logging")[0]["title"] = "changed"
+        assert index.search("event logging")[0]["title"] == "Event Logging"
@@ -0,0 +1,134 @@
+import csv
+import json
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import crossmap_store
+from crossmap_store import CrossmapStore, build_store, load_store, parse_oscal_catalog, source_files
+
+CATALOG = {
+    "catalog": {
+        "groups": [
+            {"id": "ac", "title": "Access Control", "controls": [
+                {"id": "ac-1", "title": "Policy and Procedures"},
+                {"id": "ac-2", "title": "Account Management", "controls": [
+                    {"id": "ac-2.1", "title": "Automated System Account Management"},
+                    {"id": "ac-2.10", "title": "Shared Credential Change",
+                     "props": [{"name": "status", "value": "withdrawn"}]},
+                ]},
+            ]},
+            {"id": "si", "title": "System and Information Integrity", "controls": [
+                {"id": "si-4", "title": "System Monitoring"},
+            ]},
+        ]
+    }
+}
+
+MAPPINGS = [
+    ("AC-2", "iso27001", "A.5.16", "Identity management"),
+    ("AC-2", "iso27001", "A.5.18", "Access rights"),
+    ("AC-2", "csf2", "PR.AA-01", "Identities and credentials are issued"),
+    ("AC-2(1)", "iso27001", "A.5.16", "Identity management"),
+    ("SI-4", "csf2", "DE.CM-01", "Networks are monitored"),
+    ("XX-9", "csf2", "DE.CM-01", "Networks are monitored"),
+]
+
+
+def _write_data(data_dir, controls_csv=None):
+    with open(os.path.join(data_dir, "catalog.json"), "w", encoding="utf-8") as f:
+        json.dump(CATALOG, f)
+    with open(os.path.join(data_dir, "mappings.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["nist_id", "framework", "control_id", "control_title"])
+        writer.writerows(MAPPINGS)
+    if controls_csv:
+        with open(os.path.join(data_dir, "controls.csv"), "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["nist_id", "nist_title", "nist_family"])
+            writer.writerows(controls_csv)
+
+
+class TestParsing:
+    def test_oscal_ids_families_and_withdrawn(self, tmp_path):
+        _write_data(str(tmp_path))
+        controls = list(parse_oscal_catalog(str(tmp_path / "catalog.json")))
+        assert [c[0] for c in controls] == ["AC-1", "AC-2", "AC-2(1)", "SI-4"]
+        assert controls[2] == ("AC-2(1)", "Automated System Account Management", "Access Control")
+
+    def test_store_entries_in_catalog_order(self, tmp_path):
+        _write_data(str(tmp_path), controls_csv=[("AC-1", "Policy and Procedures (custom)", "Access Control"),
+                                                 ("PM-1", "Information Security Program Plan", "Program Management")])
+        store = build_store(source_files(str(tmp_path)))
+        assert [store.entry(i)["nist_id"] for i in range(len(store))] == ["AC-1", "AC-2", "AC-2(1)", "SI-4", "PM-1"]
+        assert store.entry(0)["nist_title"] == "Policy and Procedures (custom)"
+        assert store.entry(1) == {
+            "nist_id": "AC-2", "nist_title": "Account Management", "nist_family": "Access Control",
+            "iso27001": ["A.5.16", "A.5.18"], "iso27001_titles": ["Identity management", "Access rights"],
+            "csf2": ["PR.AA-01"], "csf2_titles": ["Identities and credentials are issued"],
+            "iso27005": [], "iso27005_titles": [],
+        }
+        assert store.entry(1, "csf2") == {
+            "nist_id": "AC-2", "nist_title": "Account Management", "nist_family": "Access Control",
+            "csf2": ["PR.AA-01"], "csf2_titles": ["Identities and credentials are issued"],
+        }
+        # Shared targets are stored once; unknown controls are skipped
+        assert store.target_count("iso27001") == 2
+        assert store.target_count("csf2") == 2
+        assert store.strings.count("Identity management") == 1
+
+    def test_unknown_framework_rejected(self, tmp_path):
+        _write_data(str(tmp_path))
+        with open(tmp_path / "mappings.csv", "a", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerow(["AC-1", "pci", "1.1", "PCI requirement"])
+        with pytest.raises(ValueError):
+            build_store(source_files(str(tmp_path)))
+
+
+class TestCache:
+    def test_round_trip(self, tmp_path):
+        _write_data(str(tmp_path))
+        store = build_store(source_files(str(tmp_path)), b"x" * 32)
+        store.save(str(tmp_path / "crossmap.bin"))
+        loaded = CrossmapStore.load(str(tmp_path / "crossmap.bin"))
+        assert loaded.digest == store.digest
+        assert loaded.strings == store.strings
+        assert [loaded.entry(i) for i in range(len(loaded))] == [store.entry(i) for i in range(len(store))]
+
+    def test_load_store_uses_and_refreshes_cache(self, tmp_path, monkeypatch):
+        _write_data(str(tmp_path))
+        cache = str(tmp_path / "crossmap.bin")
+        first = load_store(str(tmp_path), cache)
+        assert os.path.exists(cache)
+
+        # A matching cache is read without parsing the sources
+        monkeypatch.setattr(crossmap_store, "build_store", lambda *a, **k: pytest.fail("sources re-parsed"))
+        assert load_store(str(tmp_path), cache).version == first.version
+        monkeypatch.undo()
+
+        # Changing a source file invalidates it
+        with open(tmp_path / "mappings.csv", "a", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerow(["AC-1", "iso27005", "5.1", "General — Establishing context"])
+        second = load_store(str(tmp_path), cache)
+        assert second.version != first.version
+        assert second.entry(0)["iso27005"] == ["5.1"]
+        assert CrossmapStore.load(cache).version == second.version
+
+    def test_corrupt_cache_ignored(self, tmp_path):
+        _write_data(str(tmp_path))
+        cache = tmp_path / "crossmap.bin"
+        cache.write_bytes(b"garbage")
+        assert len(load_store(str(tmp_path), str(cache))) == 4
+
+    def test_missing_data(self, tmp_path):
+        with pytest.raises(FileNotFoundError):
+            load_store(str(tmp_path), None)
+
+
+class TestShippedData:
+    def test_bundled_files_load(self):
+        store = load_store(cache_path=None)
+        assert len(store) > 20
+        assert store.entry(0)["nist_id"] == "AC-1"
@@ -0,0 +1,124 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import dedup
+import ingest
+from tests.test_ingest import _index_size, _write, ingest_env  # noqa: F401 (fixture)
+
+CONTROL_TEXT = (
+    "AC-2 Account Management. The organization identifies and selects the types of information system "
+    "accounts, assigns account managers, establishes conditions for group and role membership, specifies "
+    "authorized users of the information system, requires approvals by designated personnel for requests "
+    "to create information system accounts, monitors the use of accounts, notifies account managers when "
+    "accounts are no longer required, and reviews accounts for compliance with account management "
+    "requirements at an organization-defined frequency."
+)
+RESTATED = CONTROL_TEXT.replace("at an organization-defined frequency.", "at an organization-defined frequency (Moderate).")
+UNRELATED = (
+    "IR-4 Incident Handling. Implement an incident handling capability for incidents that is consistent "
+    "with the incident response plan and includes preparation, detection and analysis, containment, "
+    "eradication, and recovery; coordinate incident handling activities with contingency planning."
+)
+
+
+class TestMinHash:
+    def test_near_duplicates_are_similar(self):
+        assert dedup.similarity(dedup.minhash(CONTROL_TEXT), dedup.minhash(RESTATED)) >= 0.9
+        assert dedup.similarity(dedup.minhash(CONTROL_TEXT), dedup.minhash(UNRELATED)) < 0.2
+
+    def test_signatures_are_deterministic(self):
+        assert (dedup.minhash(CONTROL_TEXT) == dedup.minhash(CONTROL_TEXT.upper())).all()
+
+    def test_lsh_query_add_remove(self):
+        lsh = dedup.LSHIndex(threshold=0.9)
+        lsh.add("a", dedup.minhash(CONTROL_TEXT))
+        lsh.add("b", dedup.minhash(UNRELATED))
+        assert lsh.query(dedup.minhash(RESTATED)) == "a"
+        lsh.remove("a")
+        assert lsh.query(dedup.minhash(RESTATED)) is None
+        assert len(lsh) == 1
+
+    def test_save_and_load(self, tmp_path):
+        lsh = dedup.LSHIndex()
+        lsh.add("a", dedup.minhash(CONTROL_TEXT))
+        lsh.add("b", dedup.minhash(UNRELATED))
+        lsh.save(str(tmp_path), keep=["a"])
+        loaded = dedup.LSHIndex.load(str(tmp_path))
+        assert list(loaded.signatures) == ["a"]
+        assert loaded.query(dedup.minhash(RESTATED)) == "a"
+        assert len(dedup.LSHIndex.load(str(tmp_path / "missing"))) == 0
+
+
+class TestIngestDedup:
+    def test_near_duplicates_collapse_with_provenance(self, ingest_env):
+        docs_dir, index_path, embeddings = ingest_env
+        _write(docs_dir, "a.pdf", [CONTROL_TEXT, UNRELATED, RESTATED])
+        result = ingest.ingest_documents()
+        assert result["chunks_embedded"] == 2
+        assert result["dedup"]["duplicates"] == 1
+        assert result["dedup"]["embeddings_saved"] == 1
+        assert result["dedup"]["logical_chunks"] == 3
+        assert result["dedup"]["index_vectors"] == 2
+        assert result["dedup"]["index_reduction_pct"] == pytest.approx(33.3)
+
+        _, vs = _index_size(index_path, embeddings)
+        canonical = next(d for d in vs.documents() if d.page_content == CONTROL_TEXT)
+        assert canonical.metadata["page"] == 0
+        assert canonical.metadata["also_in"] == [{"source": "a.pdf", "page": 2}]
+
+    def test_duplicates_only_collapse_within_a_shard(self, ingest_env):
+        docs_dir, index_path, embeddings = ingest_env
+        _write(docs_dir, "nist.pdf", [CONTROL_TEXT])
+        _write(docs_dir, "fedramp.pdf", [RESTATED])
+        result = ingest.ingest_documents()
+        assert result["dedup"]["duplicates"] == 0
+        assert _index_size(index_path, embeddings)[0] == 2
+
+    def test_new_file_reuses_existing_vector(self, ingest_env, monkeypatch):
+        docs_dir, index_path, embeddings = ingest_env
+        (docs_dir / "shards.json").write_text('{"a.pdf": "catalog", "b.pdf": "catalog"}')
+        _write(docs_dir, "a.pdf", [CONTROL_TEXT])
+        ingest.ingest_documents()
+        _write(docs_dir, "b.pdf", [UNRELATED, RESTATED])
+        result = ingest.ingest_documents()
+        assert result["chunks_embedded"] == 1
+        assert result["dedup"]["duplicates"] == 1
+        canonical = next(d for d in _index_size(index_path, embeddings)[1].documents() if d.page_content == CONTROL_TEXT)
+        assert canonical.metadata["also_in"] == [{"source": "b.pdf", "page": 1}]
+
+    def test_removing_canonical_file_keeps_vector_for_duplicates(self, ingest_env):
+        docs_dir, index_path, embeddings = ingest_env
+        (docs_dir / "shards.json").write_text('{"a.pdf": "catalog", "b.pdf": "catalog"}')
+        _write(docs_dir, "a.pdf", [CONTROL_TEXT])
+        _write(docs_dir, "b.pdf", [UNRELATED, RESTATED])
+        ingest.ingest_documents()
+
+        (docs_dir / "a.pdf").unlink()
+        result = ingest.ingest_documents()
+        assert result["chunks_deleted"] == 0
+        docs = _index_size(index_path, embeddings)[1].documents()
+        assert len(docs) == 2
+        promoted = next(d for d in docs if d.page_content == CONTROL_TEXT)
+        assert (promoted.metadata["source"], promoted.metadata["page"]) == ("b.pdf", 1)
+        assert "also_in" not in promoted.metadata
+
+    def test_edited_chunk_is_not_collapsed_into_its_old_text(self, ingest_env):
+        docs_dir, index_path, embeddings = ingest_env
+        _write(docs_dir, "a.pdf", [CONTROL_TEXT])
+        ingest.ingest_documents()
+        _write(docs_dir, "a.pdf", [RESTATED])
+        result = ingest.ingest_documents()
+        assert result["chunks_embedded"] == 1
+        assert result["chunks_deleted"] == 1
+        assert [d.page_content for d in _index_size(index_path, embeddings)[1].documents()] == [RESTATED]
+
+    def test_dedup_can_be_disabled(self, ingest_env, monkeypatch):
+        docs_dir, index_path, embeddings = ingest_env
+        monkeypatch.setattr(ingest, "INGEST_DEDUP", False)
+        _write(docs_dir, "a.pdf", [CONTROL_TEXT, RESTATED])
+        result = ingest.ingest_documents()
+        assert result["dedup"]["duplicates"] == 0
+        assert _index_size(index_path, embeddings)[0] == 2
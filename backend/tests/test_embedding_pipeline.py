@@ -0,0 +1,96 @@
+import sys
+import os
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import embedding_pipeline
+from embedding_pipeline import EmbeddingCheckpoint, EmbeddingError, EmbeddingPipeline
+
+
+class FakeEmbeddings:
+    """Embeds text as [len(text), index-of-call]; can fail the first N calls."""
+
+    def __init__(self, fail_first=0):
+        self.fail_first = fail_first
+        self.batch_sizes = []
+
+    def embed_documents(self, texts):
+        self.batch_sizes.append(len(texts))
+        if self.fail_first > 0:
+            self.fail_first -= 1
+            raise ConnectionError("429 Too Many Requests")
+        return [[float(len(t)), 1.0] for t in texts]
+
+
+def _inputs(n):
+    return [f"id{i}" for i in range(n)], ["x" * (i + 1) for i in range(n)]
+
+
+class TestEmbeddingPipeline:
+    def test_preserves_input_order_with_concurrency(self):
+        ids, texts = _inputs(50)
+        pipeline = EmbeddingPipeline(FakeEmbeddings(), batch_size=4, max_in_flight=4)
+        vectors = pipeline.embed(ids, texts)
+        assert [v[0] for v in vectors] == [float(len(t)) for t in texts]
+        assert pipeline.stats["embedded"] == 50
+
+    def test_batch_size_grows_when_backend_is_fast(self):
+        ids, texts = _inputs(100)
+        backend = FakeEmbeddings()
+        pipeline = EmbeddingPipeline(backend, batch_size=2, max_in_flight=1, target_latency=10.0)
+        pipeline.embed(ids, texts)
+        assert backend.batch_sizes[-1] > backend.batch_sizes[0]
+        # Additive: a fixed step per fast batch, not a percentage
+        assert backend.batch_sizes[1] - backend.batch_sizes[0] == embedding_pipeline.EMBED_BATCH_STEP
+
+    def test_retries_with_smaller_batches_after_errors(self):
+        ids, texts = _inputs(16)
+        backend = FakeEmbeddings(fail_first=2)
+        pipeline = EmbeddingPipeline(backend, batch_size=16, max_in_flight=1, backoff_base=0.0)
+        vectors = pipeline.embed(ids, texts)
+        assert len(vectors) == 16
+        assert backend.batch_sizes[:3] == [16, 8, 4]
+        assert pipeline.stats["retries"] == 2
+
+    def test_gives_up_after_max_retries(self):
+        ids, texts = _inputs(4)
+        pipeline = EmbeddingPipeline(FakeEmbeddings(fail_first=10), max_retries=2, backoff_base=0.0)
+        with pytest.raises(EmbeddingError):
+            pipeline.embed(ids, texts)
+
+    def test_checkpoint_resumes_completed_batches(self, tmp_path):
+        ids, texts = _inputs(6)
+        EmbeddingCheckpoint(str(tmp_path)).save(ids[:4], [[9.0, 9.0]] * 4)
+        backend = FakeEmbeddings()
+        pipeline = EmbeddingPipeline(backend, batch_size=8, checkpoint_dir=str(tmp_path))
+        vectors = pipeline.embed(ids, texts)
+        assert backend.batch_sizes == [2]
+        assert vectors[0] == [9.0, 9.0]
+        assert vectors[5] == [6.0, 1.0]
+        assert pipeline.stats["resumed_from_checkpoint"] == 4
+
+    def test_shared_checkpoint_reads_index_once(self, tmp_path, monkeypatch):
+        ids, texts = _inputs(6)
+        checkpoint = EmbeddingCheckpoint(str(tmp_path))
+        checkpoint.save(ids[:3], [[9.0, 9.0]] * 3)
+        checkpoint.save(ids[3:], [[8.0, 8.0]] * 3)
+        opened = []
+        real_load = np.load
+        monkeypatch.setattr(np, "load", lambda path, *a, **kw: opened.append(path) or real_load(path, *a, **kw))
+        for shard in (slice(0, 3), slice(3, 6)):
+            pipeline = EmbeddingPipeline(FakeEmbeddings(), checkpoint=checkpoint)
+            pipeline.embed(ids[shard], texts[shard])
+            assert pipeline.stats["resumed_from_checkpoint"] == 3
+        # Two files indexed once, then each shard opens only its own file
+        assert len(opened) == 4
+
+    def test_progress_callback_reports_throughput(self):
+        ids, texts = _inputs(10)
+        reports = []
+        EmbeddingPipeline(FakeEmbeddings(), batch_size=5, max_in_flight=1, progress=reports.append).embed(ids, texts)
+        assert reports[-1]["embedded"] == 10
+        assert reports[-1]["total"] == 10
+        assert "chunks_per_sec" in reports[-1]
+        assert "eta_seconds" in reports[-1]
@@ -0,0 +1,117 @@
+import sys
+import os
+import json
+import pytest
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_community.vectorstores import FAISS
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from evaluate import (
+    evaluate_retrieval,
+    format_report,
+    load_golden_set,
+    main,
+    matched_targets,
+    score_ranking,
+    GOLDEN_SET_PATH,
+)
+
+
+@pytest.fixture
+def tiny_index():
+    embeddings = DeterministicFakeEmbedding(size=16)
+    docs = [
+        Document(page_content="AC-2 Account Management covers account lifecycle.", metadata={"source": "a.pdf", "page": 0}),
+        Document(page_content="AU-2 Event Logging defines auditable events.", metadata={"source": "a.pdf", "page": 1}),
+        Document(page_content="SR-6 Supplier Assessments and Reviews.", metadata={"source": "b.pdf", "page": 3}),
+    ]
+    return FAISS.from_documents(docs, embeddings), embeddings
+
+
+class TestMetrics:
+    def test_perfect_ranking(self):
+        scores = score_ranking([{"t1"}, {"t2"}], n_targets=2)
+        assert scores == {"recall": 1.0, "rr": 1.0, "ndcg": 1.0}
+
+    def test_miss(self):
+        scores = score_ranking([set(), set()], n_targets=1)
+        assert scores["recall"] == 0.0
+        assert scores["rr"] == 0.0
+        assert scores["ndcg"] == 0.0
+
+    def test_late_hit_lowers_rr_and_ndcg(self):
+        scores = score_ranking([set(), {"t1"}], n_targets=1)
+        assert scores["rr"] == 0.5
+        assert 0.0 < scores["ndcg"] < 1.0
+
+    def test_duplicate_hits_do_not_exceed_one(self):
+        scores = score_ranking([{"t1"}, {"t1"}, {"t1"}], n_targets=1)
+        assert scores["ndcg"] == 1.0
+        assert scores["recall"] == 1.0
+
+    def test_control_match_ignores_longer_ids(self):
+        doc = Document(page_content="See AC-20 and AC-2(1).", metadata={})
+        assert matched_targets(doc, {"control:AC-2"}) == {"control:AC-2"}
+        doc = Document(page_content="See AC-20 only.", metadata={})
+        assert matched_targets(doc, {"control:AC-2"}) == set()
+
+    def test_page_match(self):
+        doc = Document(page_content="text", metadata={"source": "b.pdf", "page": 3})
+        assert matched_targets(doc, {"page:b.pdf:3"}) == {"page:b.pdf:3"}
+
+
+class TestEvaluateRetrieval:
+    def test_golden_set_loads(self):
+        golden = load_golden_set(GOLDEN_SET_PATH)
+        assert len(golden) > 5
+        assert any(q.get("off_topic") for q in golden)
+
+    def test_exact_question_is_found(self, tiny_index):
+        vs, embeddings = tiny_index
+        # DeterministicFakeEmbedding maps identical text to identical vectors
+        golden = [{
+            "question": "AC-2 Account Management covers account lifecycle.",
+            "expected_controls": ["AC-2"],
+        }]
+        report = evaluate_retrieval(vs, embeddings, golden, k_values=[1], fetch_k_values=[3], modes=["similarity"])
+        config = report["configs"][0]
+        assert config["recall_at_k"] == 1.0
+        assert config["mrr"] == 1.0
+        assert config["search_latency"]["p50_ms"] >= 0.0
+
+    def test_sweep_produces_one_config_per_combination(self, tiny_index):
+        vs, embeddings = tiny_index
+        golden = [
+            {"question": "supplier reviews", "expected_pages": [{"source": "b.pdf", "page": 3}]},
+            {"question": "bread recipe", "off_topic": True},
+        ]
+        report = evaluate_retrieval(vs, embeddings, golden, k_values=[1, 2], fetch_k_values=[3], modes=["mmr", "similarity"])
+        assert len(report["configs"]) == 4
+        assert report["off_topic"] == 1
+        assert "k" in format_report(report)
+
+    def test_cli_writes_json(self, tiny_index, tmp_path, monkeypatch):
+        vs, embeddings = tiny_index
+        vs.save_local(str(tmp_path / "index"))
+        golden_path = tmp_path / "golden.json"
+        golden_path.write_text(json.dumps([{"question": "logging", "expected_controls": ["AU-2"]}]))
+        monkeypatch.setattr("evaluate.get_embeddings", lambda: embeddings)
+        out = tmp_path / "report.json"
+        main(["--golden", str(golden_path), "--index", str(tmp_path / "index"), "--k", "1,3", "--json", str(out)])
+        report = json.loads(out.read_text())
+        assert [c["k"] for c in report["configs"]] == [1, 3]
+
+    def test_cli_compares_compressed_index_to_raw(self, tiny_index, tmp_path, monkeypatch):
+        from vector_compression import compress_shard, parse_spec
+
+        vs, embeddings = tiny_index
+        vs.save_local(str(tmp_path / "index"))
+        compress_shard(str(tmp_path / "index"), parse_spec("fp16"))
+        golden_path = tmp_path / "golden.json"
+        golden_path.write_text(json.dumps([{"question": "logging", "expected_controls": ["AU-2"]}]))
+        monkeypatch.setattr("evaluate.get_embeddings", lambda: embeddings)
+        report = main(["--golden", str(golden_path), "--index", str(tmp_path / "index"), "--k", "3", "--baseline-raw"])
+        assert report["configs"][0]["vs_baseline"]["recall_at_k"] == 0.0
+        assert "Change vs float32 baseline" in format_report(report)
@@ -0,0 +1,83 @@
+import csv
+import io
+import json
+import os
+import sys
+import xml.etree.ElementTree as ET
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import graph_export
+from crossmap import CROSSMAP, FRAMEWORKS
+from graph_export import aggregate, export, normalize_frameworks, target_group
+
+
+def _rows(level, frameworks=None):
+    return list(csv.reader(io.StringIO("".join(export(level, "csv", frameworks)))))[1:]
+
+
+class TestAggregate:
+    def test_target_groups(self):
+        assert target_group("iso27001", "A.8.15") == "A.8"
+        assert target_group("csf2", "DE.CM-09") == "DE.CM"
+        assert target_group("iso27005", "8.2") == "8"
+
+    @pytest.mark.parametrize("level", ["control", "family", "framework"])
+    def test_weights_sum_to_mapping_count(self, level):
+        mappings = sum(len(entry[fw]) for entry in CROSSMAP for fw in FRAMEWORKS)
+        assert sum(w for _, _, w in aggregate(level).links) == mappings
+
+    def test_family_level_folds_edges(self):
+        control, family = aggregate("control"), aggregate("family")
+        assert len(family.links) < len(control.links)
+        assert ("NIST Audit and Accountability", "ISO A.8", 4) in family.links
+        framework = {(s, t): w for s, t, w in aggregate("framework").links}
+        assert framework[("NIST Access Control", "ISO 27001:2022")] == sum(
+            len(e["iso27001"]) for e in CROSSMAP if e["nist_family"] == "Access Control")
+
+    def test_cached_per_level(self):
+        assert aggregate("family") is aggregate("family")
+        assert aggregate("family") is not aggregate("family", ("csf2",))
+
+    def test_framework_filter(self):
+        assert {t.split()[0] for _, t, _ in aggregate("control", ("csf2",)).links} == {"CSF"}
+
+    def test_repeated_frameworks_are_counted_once(self):
+        assert normalize_frameworks(["iso27005", "csf2", "csf2"]) == ("csf2", "iso27005")
+        assert normalize_frameworks([]) == normalize_frameworks(None)
+        assert "".join(export("framework", "csv", ["csf2", "csf2"])) == "".join(export("framework", "csv", ["csf2"]))
+        assert aggregate("framework", ("csf2", "csf2")) == aggregate("framework", ("csf2",))
+
+    def test_unknown_arguments(self):
+        with pytest.raises(ValueError):
+            aggregate("team")
+        with pytest.raises(ValueError):
+            aggregate("control", ("pci",))
+        with pytest.raises(ValueError):
+            export("control", "csv", ["csf2", "pci"])
+        with pytest.raises(ValueError):
+            export("control", "xlsx")
+
+
+class TestFormats:
+    def test_csv_streams_in_chunks(self, monkeypatch):
+        monkeypatch.setattr(graph_export, "EXPORT_CHUNK_ROWS", 10)
+        chunks = list(export("control", "csv"))
+        assert len(chunks) > 2
+        assert chunks[0].startswith("source,target,value")
+        assert len(_rows("control")) == len(aggregate("control").links)
+
+    def test_json_nodes_and_links(self):
+        data = json.loads("".join(export("family", "json")))
+        ids = {n["id"] for n in data["nodes"]}
+        assert data["level"] == "family"
+        assert all(link["source"] in ids and link["target"] in ids for link in data["links"])
+        assert {"id": "NIST Access Control", "framework": "nist", "group": "Access Control"} in data["nodes"]
+
+    def test_graphml_is_valid(self):
+        root = ET.fromstring("".join(export("framework", "graphml")))
+        ns = {"g": "http://graphml.graphdrawing.org/xmlns"}
+        graph = root.find("g:graph", ns)
+        assert len(graph.findall("g:edge", ns)) == len(aggregate("framework").links)
+        assert len(graph.findall("g:node", ns)) == len(aggregate("framework").nodes)
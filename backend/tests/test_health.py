@@ -0,0 +1,69 @@
+import os
+import sys
+import time
+import pytest
+from unittest.mock import MagicMock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from health import HealthMonitor
+
+
+@pytest.fixture
+def monitor():
+    monitor = HealthMonitor(interval=3600)
+    yield monitor
+    monitor.stop()
+
+
+class TestHealthMonitor:
+    def test_first_snapshot_runs_checks_then_serves_cache(self, monitor):
+        db = MagicMock(return_value=True)
+        monitor.register("database", db)
+        for _ in range(10):
+            snapshot = monitor.snapshot()
+        assert db.call_count == 1
+        assert snapshot["status"] == "healthy"
+        check = snapshot["checks"]["database"]
+        assert check["status"] == "ok" and check["critical"] is True
+        assert check["latency_ms"] >= 0 and check["age_s"] >= 0
+
+    def test_detail_and_exceptions(self, monitor):
+        monitor.register("faiss_index", lambda: (True, {"version": "v1"}))
+        monitor.register("database", MagicMock(side_effect=RuntimeError("connection refused")))
+        snapshot = monitor.snapshot()
+        assert snapshot["checks"]["faiss_index"]["detail"] == {"version": "v1"}
+        assert snapshot["checks"]["database"]["status"] == "fail"
+        assert snapshot["checks"]["database"]["error"] == "connection refused"
+        assert snapshot["status"] == "degraded"
+
+    def test_non_critical_failure_keeps_healthy(self, monitor):
+        monitor.register("database", lambda: True)
+        monitor.register("llm_backend", lambda: False, critical=False)
+        snapshot = monitor.snapshot()
+        assert snapshot["status"] == "healthy"
+        assert snapshot["checks"]["llm_backend"]["status"] == "fail"
+
+    def test_refresh_runs_only_due_checks(self, monitor):
+        fast, slow = MagicMock(return_value=True), MagicMock(return_value=True)
+        monitor.register("fast", fast, interval=0.001)
+        monitor.register("slow", slow, interval=3600)
+        monitor.refresh()
+        monitor._checks["fast"].checked_at -= 1
+        monitor.refresh()
+        assert fast.call_count == 2 and slow.call_count == 1
+        monitor.refresh(force=True)
+        assert slow.call_count == 2
+
+    def test_background_thread_refreshes(self):
+        monitor = HealthMonitor(interval=0.01)
+        db = MagicMock(return_value=True)
+        monitor.register("database", db)
+        monitor.snapshot()
+        try:
+            deadline = time.monotonic() + 5
+            while db.call_count < 3 and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            monitor.stop()
+        assert db.call_count >= 3
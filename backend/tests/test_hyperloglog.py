@@ -0,0 +1,39 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from hyperloglog import HyperLogLog
+
+
+class TestHyperLogLog:
+    def test_small_counts_exact(self):
+        hll = HyperLogLog().update(["10.0.0.1", "10.0.0.2", "10.0.0.1", "10.0.0.3"])
+        assert hll.count() == 3
+        assert HyperLogLog().count() == 0
+
+    @pytest.mark.parametrize("n", [5000, 100000])
+    def test_estimate_within_error(self, n):
+        hll = HyperLogLog().update(f"ip-{i}" for i in range(n))
+        assert abs(hll.count() - n) / n < 0.03
+
+    def test_merge_is_union(self):
+        a = HyperLogLog().update(f"ip-{i}" for i in range(3000))
+        b = HyperLogLog().update(f"ip-{i}" for i in range(2000, 5000))
+        assert abs(a.merge(b).count() - 5000) / 5000 < 0.03
+
+    def test_round_trip(self):
+        hll = HyperLogLog(p=10).update(["a", "b", "c"])
+        data = hll.to_bytes()
+        assert len(data) == 1024
+        restored = HyperLogLog.from_bytes(memoryview(data))
+        assert restored.p == 10 and restored.count() == 3
+
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            HyperLogLog(p=2)
+        with pytest.raises(ValueError):
+            HyperLogLog.from_bytes(b"\x00" * 1000)
+        with pytest.raises(ValueError):
+            HyperLogLog(p=10).merge(HyperLogLog(p=12))
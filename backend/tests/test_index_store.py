@@ -0,0 +1,98 @@
+import sys
+import os
+import time
+import pytest
+from unittest.mock import patch
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_community.vectorstores import FAISS
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import index_store
+
+
+def _publish(root, texts, embeddings):
+    version, build_dir = index_store.new_version(str(root))
+    FAISS.from_texts(texts, embeddings).save_local(build_dir)
+    index_store.publish(str(root), version, build_dir)
+    return version
+
+
+@pytest.fixture
+def embeddings():
+    return DeterministicFakeEmbedding(size=8)
+
+
+class TestIndexStore:
+    def test_empty_root_has_no_version(self, tmp_path):
+        assert index_store.current_version(str(tmp_path)) is None
+        assert index_store.current_index_path(str(tmp_path)) is None
+
+    def test_publish_swaps_current(self, tmp_path, embeddings):
+        v1 = _publish(tmp_path, ["a"], embeddings)
+        assert index_store.current_version(str(tmp_path)) == v1
+        v2 = _publish(tmp_path, ["b"], embeddings)
+        assert index_store.current_version(str(tmp_path)) == v2
+        assert index_store.current_index_path(str(tmp_path)).endswith(v2)
+
+    def test_unpublished_build_is_invisible(self, tmp_path, embeddings):
+        v1 = _publish(tmp_path, ["a"], embeddings)
+        _, build_dir = index_store.new_version(str(tmp_path))
+        FAISS.from_texts(["half"], embeddings).save_local(build_dir)
+        assert index_store.current_version(str(tmp_path)) == v1
+        assert index_store.list_versions(str(tmp_path)) == [v1]
+
+    def test_gc_keeps_live_and_recent(self, tmp_path, embeddings):
+        versions = [_publish(tmp_path, [str(i)], embeddings) for i in range(4)]
+        index_store.new_version(str(tmp_path))  # abandoned build
+        removed = index_store.gc_versions(str(tmp_path), keep=2)
+        assert index_store.list_versions(str(tmp_path)) == versions[2:]
+        assert len(removed) == 3
+
+    def test_watcher_only_rereads_after_interval(self, tmp_path, embeddings):
+        v1 = _publish(tmp_path, ["a"], embeddings)
+        watcher = index_store.VersionWatcher(str(tmp_path), interval=3600)
+        assert watcher.version() == v1
+        _publish(tmp_path, ["b"], embeddings)
+        assert watcher.version() == v1  # cached within the interval
+        watcher.interval = 0
+        assert watcher.version() == index_store.current_version(str(tmp_path))
+
+
+class TestHotReload:
+    @patch("rag_engine.get_llm")
+    @patch("rag_engine.get_embeddings")
+    def test_engine_hot_swaps_to_new_version(self, mock_emb, mock_get_llm, tmp_path, embeddings):
+        mock_emb.return_value = embeddings
+        from rag_engine import RAGEngine
+
+        v1 = _publish(tmp_path, ["first version"], embeddings)
+        engine = RAGEngine()
+        engine.index_path = str(tmp_path)
+        old_store = engine._load_vector_store()
+        assert engine.index_version == v1
+
+        v2 = _publish(tmp_path, ["second version"], embeddings)
+        engine._version_watcher.interval = 0
+        # The request that notices the new version is still served by the old store
+        assert engine._load_vector_store() is old_store
+
+        deadline = time.time() + 5
+        while engine.index_version != v2 and time.time() < deadline:
+            time.sleep(0.01)
+        assert engine.index_version == v2
+        docs = engine._load_vector_store().similarity_search("second version", k=1)
+        assert docs[0].page_content == "second version"
+
+    @patch("rag_engine.get_llm")
+    @patch("rag_engine.get_embeddings")
+    def test_engine_loads_legacy_flat_index(self, mock_emb, mock_get_llm, tmp_path, embeddings):
+        mock_emb.return_value = embeddings
+        from rag_engine import RAGEngine
+
+        FAISS.from_texts(["legacy"], embeddings).save_local(str(tmp_path))
+        engine = RAGEngine()
+        engine.index_path = str(tmp_path)
+        assert engine.index_available()
+        engine._load_vector_store()
+        assert engine.index_version == index_store.LEGACY_VERSION
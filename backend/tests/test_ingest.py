@@ -0,0 +1,302 @@
+import functools
+import sys
+import os
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_community.vectorstores import FAISS
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import ingest
+import embedding_pipeline
+import index_store
+from sharded_index import ShardedIndex
+
+
+REAL_PDF = os.path.join(os.path.dirname(__file__), "..", "..", "docs", "nist_1362.pdf")
+
+
+def _fake_pages(pdf_path, start=0, stop=None):
+    """Test 'PDFs' are text files with pages separated by form feeds."""
+    with open(pdf_path, encoding="utf-8") as f:
+        return f.read().split("\f")[start:stop]
+
+
+def _fake_page_count(pdf_path):
+    return len(_fake_pages(pdf_path))
+
+
+@pytest.fixture
+def ingest_env(tmp_path, monkeypatch):
+    docs_dir = tmp_path / "docs"
+    docs_dir.mkdir()
+    index_path = tmp_path / "index_kms"
+    monkeypatch.setattr(ingest, "DOCS_DIR", str(docs_dir))
+    monkeypatch.setattr(ingest, "INDEX_PATH", str(index_path))
+    monkeypatch.setattr(ingest, "_read_pdf_pages", _fake_pages)
+    monkeypatch.setattr(ingest, "_page_count", _fake_page_count)
+    monkeypatch.setattr(ingest, "TEXT_CACHE_DIR", str(tmp_path / "text_cache"))
+    monkeypatch.setattr(ingest, "INGEST_WORKERS", 1)
+    monkeypatch.setattr(embedding_pipeline, "CHECKPOINT_ROOT", str(tmp_path / "embed_checkpoints"))
+    embeddings = DeterministicFakeEmbedding(size=8)
+    monkeypatch.setattr(ingest, "get_embeddings", lambda: embeddings)
+    return docs_dir, index_path, embeddings
+
+
+def _write(docs_dir, name, pages):
+    (docs_dir / name).write_text("\f".join(pages), encoding="utf-8")
+
+
+def _index_size(index_path, embeddings):
+    live = index_store.current_index_path(str(index_path))
+    vs = ShardedIndex.load(live, embeddings)
+    return vs.ntotal, vs
+
+
+class TestIncrementalIngestion:
+    def test_no_files(self, ingest_env):
+        assert ingest.ingest_documents()["status"] == "no_files"
+
+    def test_first_run_embeds_everything(self, ingest_env):
+        docs_dir, index_path, embeddings = ingest_env
+        _write(docs_dir, "a.pdf", ["AC-2 Account Management", "AU-2 Event Logging"])
+        result = ingest.ingest_documents()
+        assert result["status"] == "success"
+        assert result["mode"] == "full"
+        assert result["files"]["added"] == ["a.pdf"]
+        assert result["chunks_embedded"] == 2
+        assert _index_size(index_path, embeddings)[0] == 2
+        assert "a.pdf" in ingest.load_manifest()["files"]
+
+    def test_rerun_without_changes_is_noop(self, ingest_env):
+        docs_dir, _, _ = ingest_env
+        _write(docs_dir, "a.pdf", ["AC-2 Account Management"])
+        ingest.ingest_documents()
+        result = ingest.ingest_documents()
+        assert result["status"] == "unchanged"
+        assert result["files"]["unchanged"] == ["a.pdf"]
+        assert result["chunks_embedded"] == 0
+
+    def test_only_changed_pages_are_embedded(self, ingest_env):
+        docs_dir, index_path, embeddings = ingest_env
+        _write(docs_dir, "a.pdf", ["page one", "page two", "page three"])
+        _write(docs_dir, "b.pdf", ["other document"])
+        ingest.ingest_documents()
+
+        _write(docs_dir, "a.pdf", ["page one", "page two EDITED", "page three"])
+        result = ingest.ingest_documents()
+        assert result["mode"] == "incremental"
+        assert result["files"]["changed"] == ["a.pdf"]
+        assert result["files"]["unchanged"] == ["b.pdf"]
+        assert result["chunks_embedded"] == 1
+        assert result["chunks_deleted"] == 1
+
+        total, vs = _index_size(index_path, embeddings)
+        assert total == 4
+        texts = {d.page_content for d in vs.documents()}
+        assert "page two EDITED" in texts
+        assert "page two" not in texts
+
+    def test_removed_file_vectors_are_deleted(self, ingest_env):
+        docs_dir, index_path, embeddings = ingest_env
+        _write(docs_dir, "a.pdf", ["keep me"])
+        _write(docs_dir, "b.pdf", ["remove me", "and me"])
+        ingest.ingest_documents()
+
+        (docs_dir / "b.pdf").unlink()
+        result = ingest.ingest_documents()
+        assert result["files"]["removed"] == ["b.pdf"]
+        assert result["chunks_deleted"] == 2
+        assert _index_size(index_path, embeddings)[0] == 1
+
+    def test_inserted_page_updates_page_numbers_without_reembedding(self, ingest_env):
+        docs_dir, index_path, embeddings = ingest_env
+        _write(docs_dir, "a.pdf", ["intro", "controls"])
+        ingest.ingest_documents()
+
+        _write(docs_dir, "a.pdf", ["cover", "intro", "controls"])
+        result = ingest.ingest_documents()
+        assert result["chunks_embedded"] == 1
+        _, vs = _index_size(index_path, embeddings)
+        pages = {d.page_content: d.metadata["page"] for d in vs.documents()}
+        assert pages == {"cover": 0, "intro": 1, "controls": 2}
+
+    def test_rebuild_reembeds_everything(self, ingest_env):
+        docs_dir, _, _ = ingest_env
+        _write(docs_dir, "a.pdf", ["one", "two"])
+        ingest.ingest_documents()
+        result = ingest.ingest_documents(rebuild=True)
+        assert result["mode"] == "full"
+        assert result["chunks_embedded"] == 2
+
+    def test_embedding_model_change_forces_rebuild(self, ingest_env, monkeypatch):
+        docs_dir, _, _ = ingest_env
+        _write(docs_dir, "a.pdf", ["one"])
+        ingest.ingest_documents()
+        monkeypatch.setattr(ingest, "_embedding_signature", lambda emb: "OtherModel:x")
+        result = ingest.ingest_documents()
+        assert result["mode"] == "full"
+        assert result["chunks_embedded"] == 1
+
+    def test_failed_embedding_leaves_index_and_resumes(self, ingest_env, monkeypatch):
+        docs_dir, index_path, embeddings = ingest_env
+        _write(docs_dir, "a.pdf", ["one"])
+        ingest.ingest_documents()
+
+        calls = []
+        fail_on = {"three"}
+
+        def _embed_documents(texts):
+            calls.append(list(texts))
+            if fail_on & set(texts):
+                raise ConnectionError("backend down")
+            return [embeddings.embed_query(t) for t in texts]
+
+        monkeypatch.setattr(type(embeddings), "embed_documents", lambda self, texts: _embed_documents(texts))
+        monkeypatch.setattr(ingest, "EmbeddingPipeline", functools.partial(
+            embedding_pipeline.EmbeddingPipeline, batch_size=1, max_in_flight=1, max_retries=0, backoff_base=0.0,
+        ))
+
+        _write(docs_dir, "a.pdf", ["one", "two", "three"])
+        live_version = index_store.current_version(str(index_path))
+        with pytest.raises(embedding_pipeline.EmbeddingError):
+            ingest.ingest_documents()
+        # Live index untouched: still only the first page, no half-built version left behind
+        assert index_store.current_version(str(index_path)) == live_version
+        assert _index_size(index_path, embeddings)[0] == 1
+        assert index_store.list_versions(str(index_path)) == [live_version]
+        assert not [v for v in os.listdir(index_path / "versions") if v.endswith(".tmp")]
+
+        calls.clear()
+        fail_on.clear()
+        result = ingest.ingest_documents()
+        assert result["embedding"]["resumed_from_checkpoint"] == 1
+        assert calls == [["three"]]
+        assert _index_size(index_path, embeddings)[0] == 3
+
+
+class TestParallelParsing:
+    def test_reports_per_file_timings(self, ingest_env):
+        docs_dir, _, _ = ingest_env
+        _write(docs_dir, "a.pdf", ["one", "two"])
+        result = ingest.ingest_documents()
+        timing = result["parse_timings"]["a.pdf"]
+        assert timing["pages"] == 2
+        assert timing["chunks"] == 2
+        assert timing["text_cache_hit"] is False
+
+    def test_text_cache_skips_extraction(self, ingest_env, monkeypatch):
+        docs_dir, _, _ = ingest_env
+        _write(docs_dir, "a.pdf", ["one", "two"])
+        ingest.ingest_documents()
+
+        def _fail(*args):
+            raise AssertionError("extraction should be served from the text cache")
+
+        monkeypatch.setattr(ingest, "_read_pdf_pages", _fail)
+        monkeypatch.setattr(ingest, "_page_count", _fail)
+        result = ingest.ingest_documents(rebuild=True)
+        assert result["parse_timings"]["a.pdf"]["text_cache_hit"] is True
+        assert result["chunks_embedded"] == 2
+
+    def test_small_page_ranges_keep_page_order(self, ingest_env, monkeypatch):
+        docs_dir, _, _ = ingest_env
+        monkeypatch.setattr(ingest, "PAGES_PER_TASK", 2)
+        pages = [f"page {i}" for i in range(7)]
+        _write(docs_dir, "a.pdf", pages)
+        sha = ingest._sha256_file(str(docs_dir / "a.pdf"))
+        result = ingest.parse_files([(str(docs_dir / "a.pdf"), sha)])
+        chunks = result["a.pdf"]["chunks"]
+        assert [c.page_content for c in chunks] == pages
+        assert [c.metadata["page"] for c in chunks] == list(range(7))
+
+    def test_process_pool_matches_inline(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(ingest, "TEXT_CACHE_DIR", str(tmp_path / "text_cache"))
+        monkeypatch.setattr(ingest, "PAGES_PER_TASK", 4)
+        sha = ingest._sha256_file(REAL_PDF)
+        pooled = ingest.parse_files([(REAL_PDF, sha)], workers=2)["nist_1362.pdf"]
+        # Second run is served from the text cache and split inline
+        inline = ingest.parse_files([(REAL_PDF, sha)], workers=1)["nist_1362.pdf"]
+        assert pooled["timing"]["text_cache_hit"] is False
+        assert inline["timing"]["text_cache_hit"] is True
+        assert pooled["entry"] == inline["entry"]
+        assert [c.page_content for c in pooled["chunks"]] == [c.page_content for c in inline["chunks"]]
+
+
+class TestStreamingIngestion:
+    def test_chunks_are_flushed_in_shards_and_merged(self, ingest_env, monkeypatch):
+        docs_dir, index_path, embeddings = ingest_env
+        monkeypatch.setattr(ingest, "INGEST_SHARD_SIZE", 2)
+        _write(docs_dir, "a.pdf", ["p1", "p2", "p3"])
+        _write(docs_dir, "b.pdf", ["q1", "q2"])
+        result = ingest.ingest_documents()
+        assert result["shards"] == 3
+        assert result["chunks_embedded"] == 5
+        assert _index_size(index_path, embeddings)[0] == 5
+        versions = os.listdir(index_path / "versions")
+        assert not [v for v in versions if v.endswith(".tmp")]
+        assert not os.path.exists(index_path / "versions" / result["index_version"] / "staging")
+
+    def test_incremental_shards_merge_into_existing_index(self, ingest_env, monkeypatch):
+        docs_dir, index_path, embeddings = ingest_env
+        monkeypatch.setattr(ingest, "INGEST_SHARD_SIZE", 1)
+        _write(docs_dir, "a.pdf", ["p1"])
+        ingest.ingest_documents()
+        _write(docs_dir, "b.pdf", ["q1", "q2"])
+        result = ingest.ingest_documents()
+        assert result["shards"] == 2
+        assert _index_size(index_path, embeddings)[0] == 3
+
+    def test_files_are_parsed_lazily_one_at_a_time(self, ingest_env):
+        docs_dir, _, _ = ingest_env
+        names = ["a.pdf", "b.pdf", "c.pdf"]
+        for name in names:
+            _write(docs_dir, name, [f"{name} text"])
+        files = [(str(docs_dir / n), ingest._sha256_file(str(docs_dir / n))) for n in names]
+        stream = ingest.iter_parsed_files(files, workers=1)
+        source, parsed = next(stream)
+        assert source == "a.pdf"
+        assert not os.path.exists(os.path.join(ingest.TEXT_CACHE_DIR, files[1][1] + ".json"))
+        assert [s for s, _ in stream] == ["b.pdf", "c.pdf"]
+
+    def test_zero_page_files_keep_order(self, ingest_env, monkeypatch):
+        docs_dir, _, _ = ingest_env
+        monkeypatch.setattr(ingest, "_page_count", lambda path: 0 if "empty" in path else 1)
+        for name in ["a.pdf", "empty.pdf", "z.pdf"]:
+            _write(docs_dir, name, ["text"])
+        files = [(str(docs_dir / n), n) for n in ["a.pdf", "empty.pdf", "z.pdf"]]
+        result = list(ingest.iter_parsed_files(files, workers=1))
+        assert [s for s, _ in result] == ["a.pdf", "empty.pdf", "z.pdf"]
+        assert result[1][1]["chunks"] == []
+
+
+class TestVersionedPublishing:
+    def test_each_run_publishes_a_new_version(self, ingest_env):
+        docs_dir, index_path, _ = ingest_env
+        _write(docs_dir, "a.pdf", ["one"])
+        first = ingest.ingest_documents()["index_version"]
+        _write(docs_dir, "a.pdf", ["one", "two"])
+        second = ingest.ingest_documents()["index_version"]
+        assert first != second
+        assert index_store.current_version(str(index_path)) == second
+        assert index_store.list_versions(str(index_path)) == [first, second]
+
+    def test_old_versions_are_garbage_collected(self, ingest_env, monkeypatch):
+        docs_dir, index_path, _ = ingest_env
+        monkeypatch.setattr(index_store, "INDEX_KEEP_VERSIONS", 2)
+        monkeypatch.setattr(ingest, "gc_versions", lambda root: index_store.gc_versions(root, keep=2))
+        for i in range(4):
+            _write(docs_dir, "a.pdf", [f"revision {i}"])
+            ingest.ingest_documents()
+        versions = index_store.list_versions(str(index_path))
+        assert len(versions) == 2
+        assert versions[-1] == index_store.current_version(str(index_path))
+
+    def test_legacy_flat_index_is_migrated(self, ingest_env):
+        docs_dir, index_path, embeddings = ingest_env
+        FAISS.from_texts(["old"], embeddings).save_local(str(index_path))
+        assert index_store.current_version(str(index_path)) == index_store.LEGACY_VERSION
+        _write(docs_dir, "a.pdf", ["one"])
+        result = ingest.ingest_documents()
+        assert result["mode"] == "full"
+        assert index_store.current_version(str(index_path)) == result["index_version"]
@@ -0,0 +1,175 @@
+import os
+import signal
+import subprocess
+import sys
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import ingest
+import ingest_jobs
+import index_store
+from tests.test_ingest import _index_size, _write, ingest_env  # noqa: F401 (fixture)
+
+
+@pytest.fixture
+def jobs_env(tmp_path, monkeypatch):
+    launched = []
+    monkeypatch.setattr(ingest_jobs, "JOBS_DIR", str(tmp_path / "jobs"))
+    monkeypatch.setattr(ingest_jobs, "_launch", lambda job_id, rebuild: launched.append((job_id, rebuild)) or os.getpid())
+    return launched
+
+
+def _dead_pid():
+    proc = subprocess.Popen([sys.executable, "-c", "pass"])
+    proc.wait()
+    return proc.pid
+
+
+class TestJobLifecycle:
+    def test_start_returns_queued_job(self, jobs_env):
+        job = ingest_jobs.start_job(rebuild=True)
+        assert job["status"] == "queued"
+        assert jobs_env == [(job["job_id"], True)]
+        assert ingest_jobs.get_job(job["job_id"])["status"] == "queued"
+
+    def test_duplicate_run_is_rejected(self, jobs_env):
+        job = ingest_jobs.start_job()
+        with pytest.raises(ingest_jobs.IngestJobConflict) as exc:
+            ingest_jobs.start_job()
+        assert exc.value.job_id == job["job_id"]
+        assert len(jobs_env) == 1
+
+    def test_unknown_or_malformed_id(self, jobs_env):
+        assert ingest_jobs.get_job("20260101T000000000000Z-abcdef") is None
+        assert ingest_jobs.get_job("../../etc/passwd") is None
+
+    def test_successful_run_records_progress_and_releases_lock(self, jobs_env, monkeypatch):
+        def fake_ingest(rebuild=False, progress=None, before_publish=None):
+            progress({"phase": "parsing", "files_parsed": 1, "chunks_embedded": 0})
+            progress({"phase": "done", "files_parsed": 1, "chunks_embedded": 3})
+            return {"status": "success", "chunks_embedded": 3}
+
+        monkeypatch.setattr(ingest, "ingest_documents", fake_ingest)
+        job = ingest_jobs.start_job()
+        ingest_jobs.run_job(job["job_id"])
+
+        record = ingest_jobs.get_job(job["job_id"])
+        assert record["status"] == "succeeded"
+        assert record["progress"]["phase"] == "done"
+        assert record["result"]["chunks_embedded"] == 3
+        assert record["finished_at"] is not None
+        # Lock released: the next run is accepted
+        assert ingest_jobs.start_job()["status"] == "queued"
+
+    def test_failed_run_records_error(self, jobs_env, monkeypatch):
+        def broken_ingest(rebuild=False, progress=None, before_publish=None):
+            raise RuntimeError("embedding backend down")
+
+        monkeypatch.setattr(ingest, "ingest_documents", broken_ingest)
+        job = ingest_jobs.start_job()
+        record = ingest_jobs.run_job(job["job_id"])
+        assert record["status"] == "failed"
+        assert "embedding backend down" in record["error"]
+
+    def test_crashed_job_is_detected_and_lock_cleared(self, jobs_env):
+        job = ingest_jobs.start_job()
+        ingest_jobs._set_lock_pid(job["job_id"], _dead_pid())
+        assert ingest_jobs.get_job(job["job_id"])["status"] == "failed"
+        assert ingest_jobs.start_job()["status"] == "queued"
+
+    def test_history_is_pruned(self, jobs_env, monkeypatch):
+        monkeypatch.setattr(ingest_jobs, "INGEST_JOB_HISTORY", 2)
+        monkeypatch.setattr(ingest, "ingest_documents", lambda rebuild=False, progress=None, before_publish=None: {"status": "unchanged"})
+        for _ in range(4):
+            job = ingest_jobs.start_job()
+            ingest_jobs.run_job(job["job_id"])
+        ingest_jobs._prune_history(keep=2)
+        assert len(ingest_jobs.list_jobs()) == 2
+
+
+class TestCancellation:
+    def test_cancel_before_start(self, jobs_env, monkeypatch):
+        monkeypatch.setattr(ingest, "ingest_documents", lambda **kwargs: pytest.fail("should not run"))
+        job = ingest_jobs.start_job()
+        assert ingest_jobs.cancel_job(job["job_id"])["cancel_requested"] is True
+        assert ingest_jobs.run_job(job["job_id"])["status"] == "cancelled"
+
+    def test_sigterm_cancels_running_job(self, jobs_env, monkeypatch):
+        def slow_ingest(rebuild=False, progress=None, before_publish=None):
+            os.kill(os.getpid(), signal.SIGTERM)
+            pytest.fail("SIGTERM was not delivered")
+
+        monkeypatch.setattr(ingest, "ingest_documents", slow_ingest)
+        job = ingest_jobs.start_job()
+        assert ingest_jobs.run_job(job["job_id"])["status"] == "cancelled"
+        assert signal.getsignal(signal.SIGTERM) is not ingest_jobs._raise_cancelled
+
+    def test_cancel_after_publish_is_ignored(self, jobs_env, ingest_env, monkeypatch):
+        docs_dir, index_path, _ = ingest_env
+        _write(docs_dir, "a.pdf", ["AC-2 Account Management"])
+        original_gc = ingest.gc_versions
+
+        def cancelled_during_gc(*args, **kwargs):
+            # Same as cancel_job: request file, then SIGTERM
+            ingest_jobs.cancel_job(job["job_id"])
+            return original_gc(*args, **kwargs)
+
+        monkeypatch.setattr(ingest, "gc_versions", cancelled_during_gc)
+        job = ingest_jobs.start_job()
+        record = ingest_jobs.run_job(job["job_id"])
+        assert record["status"] == "succeeded"
+        assert record["result"]["index_version"] == index_store.current_version(str(index_path))
+        assert not os.path.exists(ingest_jobs._job_path(job["job_id"], ".cancel"))
+        assert signal.getsignal(signal.SIGTERM) is not signal.SIG_IGN
+
+    def test_cancel_finished_job_is_not_requested(self, jobs_env, monkeypatch):
+        monkeypatch.setattr(ingest, "ingest_documents", lambda rebuild=False, progress=None, before_publish=None: {"status": "unchanged"})
+        job = ingest_jobs.start_job()
+        ingest_jobs.run_job(job["job_id"])
+        record = ingest_jobs.cancel_job(job["job_id"])
+        assert record["status"] == "succeeded"
+        assert "cancel_requested" not in record
+
+    def test_cancelled_ingest_leaves_live_index_intact(self, jobs_env, ingest_env, monkeypatch):
+        docs_dir, index_path, embeddings = ingest_env
+        _write(docs_dir, "a.pdf", ["AC-2 Account Management"])
+        ingest.ingest_documents()
+        live_version = index_store.current_version(str(index_path))
+
+        _write(docs_dir, "b.pdf", ["AU-2 Event Logging", "SI-4 System Monitoring"])
+        original = DeterministicFakeEmbedding.embed_documents
+
+        def interrupted(self, texts):
+            os.kill(os.getpid(), signal.SIGTERM)
+            return original(self, texts)
+
+        monkeypatch.setattr(DeterministicFakeEmbedding, "embed_documents", interrupted)
+        job = ingest_jobs.start_job()
+        assert ingest_jobs.run_job(job["job_id"])["status"] == "cancelled"
+
+        assert index_store.current_version(str(index_path)) == live_version
+        assert index_store.list_versions(str(index_path)) == [live_version]
+        assert not [n for n in os.listdir(index_path / "versions") if n.endswith(".tmp")]
+        assert _index_size(index_path, embeddings)[0] == 1
+
+
+class TestIngestProgress:
+    def test_progress_reports_files_chunks_and_eta(self, ingest_env):
+        docs_dir, _, _ = ingest_env
+        _write(docs_dir, "a.pdf", ["AC-2 Account Management", "AU-2 Event Logging"])
+        _write(docs_dir, "b.pdf", ["SI-4 System Monitoring"])
+        reports = []
+        ingest.ingest_documents(progress=reports.append)
+
+        phases = [r["phase"] for r in reports]
+        assert phases[0] == "parsing"
+        assert phases[-1] == "done"
+        assert {"embedding", "merging", "publishing"} <= set(phases)
+        final = reports[-1]
+        assert final["files_total"] == final["files_parsed"] == 2
+        assert final["chunks_embedded"] == final["chunks_estimated"] == 3
+        assert final["eta_seconds"] == 0.0
+        embedded = [r["chunks_embedded"] for r in reports]
+        assert embedded == sorted(embedded)
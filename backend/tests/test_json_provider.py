@@ -0,0 +1,127 @@
+import gzip
+import json
+import os
+import sys
+import uuid
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from unittest.mock import patch
+
+import pytest
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import json_provider
+from json_provider import FastJSONProvider
+
+pytest.importorskip("orjson")
+
+
+@dataclass
+class Control:
+    nist_id: str
+    title: str
+
+
+PAYLOAD = {
+    "answer": "**AC-2** Account Management — “quoted” text ✓",
+    "sources": [{"source": "nist_80053r5.pdf", "page": 42, "score": 0.8125, "tags": None}],
+    "nested": {"b": [1, 2.5, True], "a": {"z": 1, "y": 2}},
+    "when": datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc),
+    "day": date(2024, 5, 1),
+    "id": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+    "control": Control("AC-2", "Account Management"),
+}
+
+
+def _app(provider_cls):
+    app = Flask(__name__)
+    app.json = provider_cls(app)
+    return app
+
+
+class TestFastJSONProvider:
+    def test_uses_orjson_when_installed(self):
+        assert _app(FastJSONProvider).json.backend == "orjson"
+
+    def test_same_document_as_flask_default(self):
+        fast, default = _app(FastJSONProvider), _app(DefaultJSONProvider)
+        with fast.app_context():
+            fast_body = fast.json.response(PAYLOAD).get_data()
+        with default.app_context():
+            default_body = default.json.response(PAYLOAD).get_data()
+        assert json.loads(fast_body) == json.loads(default_body)
+        # Dates keep Flask's HTTP-date format
+        assert json.loads(fast_body)["day"] == "Wed, 01 May 2024 00:00:00 GMT"
+        assert fast_body.endswith(b"\n")
+
+    def test_keys_sorted_and_compact(self):
+        app = _app(FastJSONProvider)
+        assert app.json.dumps({"b": 1, "a": [1, 2]}) == '{"a":[1,2],"b":1}'
+
+    def test_indented_in_debug(self):
+        app = _app(FastJSONProvider)
+        app.debug = True
+        with app.app_context():
+            body = app.json.response({"a": 1}).get_data()
+        assert body == b'{\n  "a": 1\n}\n'
+
+    def test_falls_back_to_stdlib_for_unsupported_values(self):
+        app = _app(FastJSONProvider)
+        assert app.json.loads(app.json.dumps({"big": 2 ** 70})) == {"big": 2 ** 70}
+
+    def test_stdlib_kwargs_use_stdlib(self):
+        app = _app(FastJSONProvider)
+        assert app.json.dumps({"a": 1}, indent=4) == '{\n    "a": 1\n}'
+
+    def test_stdlib_setting_and_missing_orjson(self):
+        with patch.object(json_provider, "JSON_PROVIDER", "stdlib"):
+            assert _app(FastJSONProvider).json.backend == "stdlib"
+        with patch.object(json_provider, "_orjson", return_value=None):
+            app = _app(FastJSONProvider)
+        assert app.json.backend == "stdlib"
+        with app.app_context():
+            assert json.loads(app.json.response(PAYLOAD).get_data())["control"]["nist_id"] == "AC-2"
+
+
+LONG_ANSWER = "**AC-2 Account Management** requires the organization to manage system accounts. " * 20
+
+
+class TestResponseCompression:
+    def _long_chat(self):
+        import app as app_module
+        app_module.orchestrator.route_and_chat.return_value = {
+            "answer": LONG_ANSWER, "sources": [], "agent_name": "NIST Controls Specialist",
+            "agent_id": "NIST_SPECIALIST",
+        }
+
+    def test_app_uses_fast_provider(self, app_client):
+        assert isinstance(app_client.application.json, FastJSONProvider)
+
+    def test_gzip_when_accepted(self, app_client):
+        self._long_chat()
+        plain = app_client.post("/api/chat", json={"message": "AC-2?"})
+        zipped = app_client.post("/api/chat", json={"message": "AC-2?"}, headers={"Accept-Encoding": "gzip"})
+        assert "Content-Encoding" not in plain.headers
+        assert zipped.headers["Content-Encoding"] == "gzip"
+        assert "Accept-Encoding" in zipped.headers["Vary"]
+        assert int(zipped.headers["Content-Length"]) == len(zipped.data) < len(plain.data)
+        assert gzip.decompress(zipped.data) == plain.data
+
+    def test_small_bodies_not_compressed(self, app_client):
+        response = app_client.get("/api/visitors/count", headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == 200 and len(response.data) < 256
+        assert "Content-Encoding" not in response.headers
+
+    def test_error_responses_not_compressed(self, app_client):
+        response = app_client.post("/api/chat", json={"message": ""}, headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == 400
+        assert "Content-Encoding" not in response.headers
+
+    def test_streamed_export_not_compressed(self, app_client):
+        response = app_client.get("/api/crossmap/graph?format=json", headers={"Accept-Encoding": "gzip"})
+        assert response.is_streamed
+        assert "Content-Encoding" not in response.headers
+        assert json.loads(response.data)["level"] == "control"
@@ -0,0 +1,72 @@
+import os
+import sys
+import pytest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import mapping_intent
+from mapping_intent import answer, detect
+
+
+class TestDetect:
+    @pytest.mark.parametrize("question, expected", [
+        ("map AC-2 to ISO 27001", {"kind": "forward", "nist_ids": ["AC-2"], "frameworks": ["iso27001"]}),
+        ("What CSF category covers SI-4?", {"kind": "forward", "nist_ids": ["SI-4"], "frameworks": ["csf2"]}),
+        ("AC-2 ISO 27001?", {"kind": "forward", "nist_ids": ["AC-2"], "frameworks": ["iso27001"]}),
+        ("AC-2 → CSF", {"kind": "forward", "nist_ids": ["AC-2"], "frameworks": ["csf2"]}),
+        ("AC-2 vs ISO 27001:2022", {"kind": "forward", "nist_ids": ["AC-2"], "frameworks": ["iso27001"]}),
+        ("what iso controls correspond to ac-2(1)", {"kind": "forward", "nist_ids": ["AC-2(1)"], "frameworks": ["iso27001"]}),
+        ("Mapping for AC-2 and AU-6", {"kind": "forward", "nist_ids": ["AC-2", "AU-6"],
+                                       "frameworks": ["iso27001", "csf2", "iso27005"]}),
+        ("Which NIST controls map to A.8.15?", {"kind": "reverse", "target_ids": ["A.8.15"]}),
+        ("NIST controls for DE.CM-09", {"kind": "reverse", "target_ids": ["DE.CM-09"]}),
+        ("Does AC-2 map to A.5.16?", {"kind": "check", "nist_ids": ["AC-2"], "target_ids": ["A.5.16"]}),
+    ])
+    def test_mapping_lookups(self, question, expected):
+        assert detect(question) == expected
+
+    @pytest.mark.parametrize("question", [
+        "What is AC-2?",
+        "What evidence do I need for AC-2 assessment?",
+        "How does AC-2 relate to FedRAMP?",
+        "Map AC-2 to ISO 9001",
+        "Explain how AC-2 maps to ISO 27001",
+        "We meet at 5 to discuss the plan",
+        "What does AC-2 cover?",
+        "How does AC-2 relate to AC-3?",
+        "Does SI-4 cover log retention?",
+        "Is AC-2 covered by my SIEM?",
+        "AC-2 enhancements that map to AC-6",
+        "Which controls match AU-6?",
+        "Who owns AC-2 in ISO 27001?",
+        "Is AC-2 mandatory for ISO 27001 certification?",
+        "Does ISO 27001 require AC-2?",
+        "What does ISO say about AC-2?",
+        "What does A.8.15 require from NIST?",
+    ])
+    def test_other_questions_fall_through(self, question):
+        assert detect(question) is None
+
+
+class TestAnswer:
+    def test_forward_answer_lists_mapped_controls(self):
+        response = answer("map AC-2 to ISO 27001")
+        assert response["deterministic"] is True and response["sources"] == []
+        text = response["answer"]
+        assert text.startswith("**AC-2 Account Management** maps to 2 ISO 27001:2022 controls")
+        assert "**A.5.16**: Identity management" in text
+        assert "CSF" not in text
+
+    def test_reverse_and_check(self):
+        assert "**AU-6**" in answer("Which NIST controls map to A.8.15?")["answer"]
+        assert answer("Does AC-2 map to A.5.16?")["answer"].startswith("**AC-2 maps to ISO 27001:2022 A.5.16.**")
+        assert answer("Does AC-2 map to A.8.15?")["answer"].startswith("**AC-2 does not map to")
+
+    def test_unknown_controls_fall_through(self):
+        assert answer("Map AC-99 to ISO 27001") is None
+        assert answer("Which NIST controls map to A.9.99?") is None
+
+    def test_disabled(self):
+        with patch.object(mapping_intent, "MAPPING_FAST_PATH", False):
+            assert answer("map AC-2 to ISO 27001") is None
@@ -10,7 +10,7 @@ class TestGetLlm:
     @patch.dict(os.environ, {}, clear=True)
     def test_default_returns_ollama(self):
         from rag_engine import get_llm
-        with patch("rag_engine.ChatOllama") as mock_ollama:
+        with patch("langchain_ollama.ChatOllama") as mock_ollama:
             get_llm()
             mock_ollama.assert_called_once()
 
@@ -33,7 +33,7 @@ class TestGetEmbeddings:
     @patch.dict(os.environ, {}, clear=True)
     def test_default_returns_ollama(self):
         from rag_engine import get_embeddings
-        with patch("rag_engine.OllamaEmbeddings") as mock_ollama:
+        with patch("langchain_ollama.OllamaEmbeddings") as mock_ollama:
             get_embeddings()
             mock_ollama.assert_called_once()
 
@@ -60,6 +60,29 @@ class TestGetLlmBackendName:
         assert get_llm_backend_name() == "gemini"
 
 
+class TestCheckLlmBackend:
+    @patch.dict(os.environ, {"OLLAMA_BASE_URL": "http://ollama:11434"}, clear=True)
+    def test_ollama_lists_models(self):
+        from rag_engine import check_llm_backend
+        with patch("urllib.request.urlopen") as urlopen:
+            urlopen.return_value.__enter__.return_value.status = 200
+            ok, detail = check_llm_backend(timeout=1)
+        assert ok and detail["backend"] == "ollama"
+        request = urlopen.call_args[0][0]
+        assert request.full_url == "http://ollama:11434/api/tags"
+        assert urlopen.call_args[1]["timeout"] == 1
+
+    @patch.dict(os.environ, {"GEMINI_API_KEY": "bad-key", "GEMINI_MODEL": "gemini-2.0-flash"}, clear=True)
+    def test_gemini_rejected_key_is_not_ok(self):
+        import urllib.error
+        from rag_engine import check_llm_backend
+        error = urllib.error.HTTPError("https://example", 403, "Forbidden", {}, None)
+        with patch("urllib.request.urlopen", side_effect=error) as urlopen:
+            ok, detail = check_llm_backend()
+        assert not ok and detail["http_status"] == 403
+        assert urlopen.call_args[0][0].full_url.endswith("/models/gemini-2.0-flash")
+
+
 class TestRAGEngine:
     @patch("rag_engine.get_llm")
     @patch("rag_engine.get_embeddings")
@@ -67,7 +90,10 @@ class TestRAGEngine:
         from rag_engine import RAGEngine
         engine = RAGEngine()
         assert engine.vector_store is None
+        # Clients are created on first use, not at construction
+        mock_emb.assert_not_called()
         assert engine.llm is not None
+        assert engine.embeddings is engine.embeddings
         mock_emb.assert_called_once()
 
     @patch("rag_engine.get_llm")
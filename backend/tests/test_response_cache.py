@@ -0,0 +1,50 @@
+import gzip
+import os
+import sys
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import response_cache
+from response_cache import CachedResponse, ResponseCache
+
+
+BODY = b'{"mappings": [' + b'{"nist_id": "AC-2", "iso27001": ["A.5.16"]}, ' * 50 + b"{}]}"
+
+
+class TestCachedResponse:
+    def test_gzip_variant_and_etags(self):
+        entry = CachedResponse(BODY, "application/json")
+        assert gzip.decompress(entry.encoded["gzip"]) == BODY
+        assert entry.etag_for(None) == entry.etag
+        assert entry.etag_for("gzip") == f"{entry.etag}-gzip"
+        assert entry.etag == CachedResponse(BODY, "application/json").etag
+        assert entry.etag != CachedResponse(BODY + b" ", "application/json").etag
+
+    def test_select_prefers_smallest_accepted(self):
+        entry = CachedResponse(BODY, "application/json")
+        entry.encoded["br"] = b"brotli"
+        assert entry.select(["gzip", "br"]) == ("br", b"brotli")
+        assert entry.select(["gzip"])[0] == "gzip"
+        assert entry.select([]) == (None, BODY)
+
+    def test_small_bodies_are_not_compressed(self):
+        assert CachedResponse(b"{}", "application/json").encoded == {}
+
+    def test_brotli_is_optional(self):
+        with patch.object(response_cache, "_brotli", return_value=None):
+            entry = CachedResponse(BODY, "application/json")
+        assert set(entry.encoded) == {"gzip"}
+
+
+class TestResponseCache:
+    def test_lru_eviction_and_stats(self):
+        cache = ResponseCache(max_entries=2)
+        for key in ("a", "b"):
+            cache.put(key, CachedResponse(key.encode(), "text/plain"))
+        assert cache.get("a") is not None
+        cache.put("c", CachedResponse(b"c", "text/plain"))
+        assert cache.get("b") is None
+        assert cache.get("a") is not None and cache.get("c") is not None
+        stats = cache.stats()
+        assert stats["entries"] == 2 and stats["hits"] == 3 and stats["misses"] == 1
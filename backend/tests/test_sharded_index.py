@@ -0,0 +1,164 @@
+import json
+import os
+import sys
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_community.vectorstores import FAISS
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import ingest
+import index_store
+from sharded_index import DEFAULT_SHARD, ShardedIndex, UnknownShardError, load_shard_map, shard_name
+from tests.test_ingest import _index_size, _write, ingest_env  # noqa: F401 (fixture)
+
+CORPUS = {
+    "nist": ["AC-2 Account Management", "AU-2 Event Logging", "SI-4 System Monitoring", "IR-4 Incident Handling"],
+    "fedramp": ["FedRAMP continuous monitoring", "FedRAMP authorization boundary", "FedRAMP POA&M"],
+    "ir": ["Windows incident response", "Collect volatile memory", "Preserve event logs"],
+}
+
+
+@pytest.fixture
+def embeddings():
+    return DeterministicFakeEmbedding(size=16)
+
+
+@pytest.fixture
+def stores(embeddings):
+    sharded = ShardedIndex(
+        {name: FAISS.from_texts(texts, embeddings, metadatas=[{"shard": name}] * len(texts))
+         for name, texts in CORPUS.items()},
+        embeddings,
+    )
+    combined = FAISS.from_texts([t for texts in CORPUS.values() for t in texts], embeddings)
+    return sharded, combined
+
+
+class TestShardNames:
+    def test_default_is_file_stem(self):
+        assert shard_name("nist_1362.pdf") == "nist_1362"
+        assert shard_name("My Doc (v2).pdf") == "My_Doc_v2"
+
+    def test_shard_map_groups_sources(self, tmp_path):
+        (tmp_path / "shards.json").write_text(json.dumps({"fedramp.pdf": "fedramp", "fedramp_low.pdf": "fedramp"}))
+        shard_map = load_shard_map(str(tmp_path))
+        assert shard_name("fedramp_low.pdf", shard_map) == "fedramp"
+        assert shard_name("nist_1362.pdf", shard_map) == "nist_1362"
+
+    def test_missing_or_bad_shard_map(self, tmp_path):
+        assert load_shard_map(str(tmp_path)) == {}
+        (tmp_path / "shards.json").write_text("{not json")
+        assert load_shard_map(str(tmp_path)) == {}
+
+
+class TestFanOutSearch:
+    def test_similarity_matches_single_index(self, stores, embeddings):
+        sharded, combined = stores
+        vector = embeddings.embed_query("incident handling")
+        expected = combined.similarity_search_with_score_by_vector(vector, k=5)
+        got = sharded.similarity_search_with_score_by_vector(vector, k=5)
+        assert [d.page_content for d, _ in got] == [d.page_content for d, _ in expected]
+        assert [round(float(s), 5) for _, s in got] == [round(float(s), 5) for _, s in expected]
+
+    def test_mmr_matches_single_index(self, stores, embeddings):
+        sharded, combined = stores
+        vector = embeddings.embed_query("monitoring")
+        expected = combined.max_marginal_relevance_search_by_vector(vector, k=4, fetch_k=6)
+        got = sharded.max_marginal_relevance_search_by_vector(vector, k=4, fetch_k=6)
+        assert [d.page_content for d in got] == [d.page_content for d in expected]
+
+    def test_shard_filter_only_searches_named_shards(self, stores, embeddings):
+        sharded, _ = stores
+        vector = embeddings.embed_query("anything")
+        docs = sharded.max_marginal_relevance_search_by_vector(vector, k=10, fetch_k=20, shards=["fedramp"])
+        assert {d.metadata["shard"] for d in docs} == {"fedramp"}
+        scored = sharded.similarity_search_with_score_by_vector(vector, k=10, shards=["nist", "ir"])
+        assert {d.metadata["shard"] for d, _ in scored} == {"nist", "ir"}
+        assert len(scored) == 7
+
+    def test_unknown_shard_rejected(self, stores):
+        sharded, _ = stores
+        with pytest.raises(UnknownShardError):
+            sharded.select(["iso27001"])
+
+    def test_sizes_and_text_search(self, stores):
+        sharded, _ = stores
+        assert sharded.sizes() == {"fedramp": 3, "ir": 3, "nist": 4}
+        assert sharded.ntotal == 10
+        assert sharded.similarity_search("AC-2 Account Management", k=1)[0].page_content == "AC-2 Account Management"
+
+    def test_flat_index_loads_as_default_shard(self, tmp_path, embeddings):
+        FAISS.from_texts(["legacy"], embeddings).save_local(str(tmp_path))
+        loaded = ShardedIndex.load(str(tmp_path), embeddings)
+        assert loaded.names == [DEFAULT_SHARD]
+
+
+def _shard_file(index_path, name):
+    live = index_store.current_index_path(str(index_path))
+    return os.path.join(live, index_store.SHARDS_DIR, name, "index.faiss")
+
+
+class TestShardedIngestion:
+    def test_one_shard_per_source(self, ingest_env):
+        docs_dir, index_path, embeddings = ingest_env
+        _write(docs_dir, "nist_1362.pdf", ["AC-2", "AU-2"])
+        _write(docs_dir, "fedramp.pdf", ["FedRAMP"])
+        result = ingest.ingest_documents()
+        assert result["index_shards"] == {"fedramp": 1, "nist_1362": 2}
+        _, vs = _index_size(index_path, embeddings)
+        assert vs.sizes() == {"fedramp": 1, "nist_1362": 2}
+
+    def test_changing_one_source_only_rebuilds_its_shard(self, ingest_env):
+        docs_dir, index_path, _ = ingest_env
+        _write(docs_dir, "nist_1362.pdf", ["AC-2", "AU-2"])
+        _write(docs_dir, "fedramp.pdf", ["FedRAMP"])
+        ingest.ingest_documents()
+        nist_before = os.stat(_shard_file(index_path, "nist_1362"))
+
+        _write(docs_dir, "fedramp.pdf", ["FedRAMP", "FedRAMP moderate baseline"])
+        result = ingest.ingest_documents()
+        assert result["shards_rebuilt"] == ["fedramp"]
+        assert result["chunks_embedded"] == 1
+        # Untouched shard is shared with the previous version, not rewritten
+        assert os.stat(_shard_file(index_path, "nist_1362")).st_ino == nist_before.st_ino
+
+    def test_shard_map_groups_sources(self, ingest_env):
+        docs_dir, index_path, embeddings = ingest_env
+        (docs_dir / "shards.json").write_text(json.dumps({"a.pdf": "framework", "b.pdf": "framework"}))
+        _write(docs_dir, "a.pdf", ["one"])
+        _write(docs_dir, "b.pdf", ["two"])
+        _write(docs_dir, "c.pdf", ["three"])
+        ingest.ingest_documents()
+        assert _index_size(index_path, embeddings)[1].sizes() == {"c": 1, "framework": 2}
+
+    def test_moving_a_source_between_shards(self, ingest_env):
+        docs_dir, index_path, embeddings = ingest_env
+        _write(docs_dir, "a.pdf", ["one"])
+        _write(docs_dir, "b.pdf", ["two"])
+        ingest.ingest_documents()
+        (docs_dir / "shards.json").write_text(json.dumps({"b.pdf": "a"}))
+        result = ingest.ingest_documents()
+        assert result["files"]["changed"] == ["b.pdf"]
+        assert _index_size(index_path, embeddings)[1].sizes() == {"a": 2}
+
+    def test_rebuild_single_shard(self, ingest_env):
+        docs_dir, _, _ = ingest_env
+        _write(docs_dir, "a.pdf", ["one", "two"])
+        _write(docs_dir, "b.pdf", ["three"])
+        ingest.ingest_documents()
+        result = ingest.ingest_documents(rebuild_shards=["a"])
+        assert result["mode"] == "incremental"
+        assert result["shards_rebuilt"] == ["a"]
+        assert result["chunks_embedded"] == 2
+        with pytest.raises(ValueError):
+            ingest.ingest_documents(rebuild_shards=["nope"])
+
+    def test_removing_last_source_drops_shard(self, ingest_env):
+        docs_dir, index_path, embeddings = ingest_env
+        _write(docs_dir, "a.pdf", ["one"])
+        _write(docs_dir, "b.pdf", ["two"])
+        ingest.ingest_documents()
+        (docs_dir / "b.pdf").unlink()
+        ingest.ingest_documents()
+        assert _index_size(index_path, embeddings)[1].names == ["a"]
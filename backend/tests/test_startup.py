@@ -0,0 +1,89 @@
+import os
+import subprocess
+import sys
+import threading
+import pytest
+from unittest.mock import MagicMock, patch
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from startup import DEFERRED_MODULES, StartupTracker
+from tests.test_index_store import _publish
+
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), "..")
+
+
+class TestStartupTracker:
+    def test_timed_imports_and_serving(self):
+        tracker = StartupTracker()
+        with tracker.timed_import("json"):
+            import json  # noqa: F401
+        tracker.serving()
+        report = tracker.report()
+        assert "json" in report["imports_ms"]
+        assert report["startup"]["app_import_ms"] is not None
+        assert report["ready"] is False
+
+    def test_ready_only_after_warmup_finishes(self):
+        release = threading.Event()
+        orchestrator = MagicMock()
+        orchestrator.warm_up.side_effect = lambda query: release.wait(5) and {"index_load_ms": 1.0}
+        tracker = StartupTracker()
+        tracker.start_warmup(orchestrator, query="AC-2")
+        assert tracker.report()["status"] == "warming"
+        assert not tracker.ready
+
+        release.set()
+        assert tracker.wait(5)
+        report = tracker.report()
+        assert report["status"] == "ready"
+        assert report["startup"]["index_load_ms"] == 1.0
+        assert report["startup"]["time_to_ready_ms"] >= report["startup"]["warmup_ms"]
+        orchestrator.warm_up.assert_called_once_with("AC-2")
+
+    def test_failed_warmup_is_degraded_but_ready(self):
+        orchestrator = MagicMock()
+        orchestrator.warm_up.side_effect = ConnectionError("embedding API unreachable")
+        tracker = StartupTracker()
+        tracker.start_warmup(orchestrator)
+        assert tracker.wait(5)
+        assert tracker.report()["status"] == "degraded"
+        assert "unreachable" in tracker.report()["error"]
+
+
+class TestEngineWarmUp:
+    @patch("rag_engine.get_llm")
+    @patch("rag_engine.get_embeddings")
+    def test_loads_index_and_searches(self, mock_emb, mock_get_llm, tmp_path):
+        embeddings = DeterministicFakeEmbedding(size=8)
+        mock_emb.return_value = embeddings
+        from rag_engine import RAGEngine
+
+        version = _publish(tmp_path, ["AC-2 Account Management", "AU-2 Event Logging"], embeddings)
+        engine = RAGEngine()
+        engine.index_path = str(tmp_path)
+        timings = engine.warm_up("AC-2")
+        assert timings["index_loaded"] is True
+        assert timings["index_version"] == version
+        assert {"clients_ms", "index_load_ms", "embed_ms", "search_ms"} <= set(timings)
+        assert engine.vector_store is not None
+
+    @patch("rag_engine.get_llm")
+    @patch("rag_engine.get_embeddings")
+    def test_missing_index_is_not_an_error(self, mock_emb, mock_get_llm, tmp_path):
+        from rag_engine import RAGEngine
+
+        engine = RAGEngine()
+        engine.index_path = str(tmp_path / "none")
+        assert engine.warm_up("AC-2")["index_loaded"] is False
+
+
+def test_app_import_defers_heavy_modules():
+    code = "import sys, app; print(','.join(m for m in %r if m in sys.modules))" % (DEFERRED_MODULES,)
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=BACKEND_DIR, capture_output=True, text=True, timeout=60,
+        env={**os.environ, "WARMUP_ON_START": "false"},
+    )
+    assert out.returncode == 0, out.stderr
+    assert out.stdout.strip() == ""
@@ -0,0 +1,135 @@
+import os
+import sys
+import faiss
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import ingest
+import index_store
+import vector_compression
+from vector_compression import CompressionSpec, build_index, compress_shard, neighbor_recall, parse_spec
+from tests.test_ingest import _index_size, _write, ingest_env  # noqa: F401 (fixture)
+
+PAGES = [f"Control {i}: the organization reviews and updates policy family {i}" for i in range(12)]
+
+
+@pytest.fixture
+def vectors():
+    rng = np.random.RandomState(7)
+    # Low-rank structure plus noise, like real embeddings
+    basis = rng.randn(8, 64).astype(np.float32)
+    return (rng.randn(300, 8).astype(np.float32) @ basis + 0.05 * rng.randn(300, 64).astype(np.float32))
+
+
+def _shard_dir(index_path, name):
+    return os.path.join(index_store.current_index_path(str(index_path)), index_store.SHARDS_DIR, name)
+
+
+class TestSpec:
+    def test_parse(self):
+        assert parse_spec("none") is None
+        assert parse_spec("") is None
+        assert parse_spec("pca256,sq8") == CompressionSpec("pca", 256, "sq8")
+        assert parse_spec(" MRL768 , fp16 ") == CompressionSpec("mrl", 768, "fp16")
+        assert parse_spec("sq8").key == "sq8"
+        assert parse_spec("pca64").key == "pca64"
+
+    @pytest.mark.parametrize("bad", ["pca", "pca0", "sq4", "pca64,mrl32", "sq8,fp16"])
+    def test_invalid(self, bad):
+        with pytest.raises(ValueError):
+            parse_spec(bad)
+
+
+class TestBuildIndex:
+    @pytest.mark.parametrize("spec", ["fp16", "sq8", "pca16", "pca16,sq8", "mrl32,fp16"])
+    def test_smaller_and_searchable_with_original_queries(self, vectors, spec):
+        exact = faiss.IndexFlatL2(64)
+        exact.add(vectors)
+        compressed = build_index(vectors, parse_spec(spec))
+        assert compressed.ntotal == len(vectors)
+        assert vector_compression.index_bytes(compressed) < vector_compression.index_bytes(exact)
+        # Queries stay in the original space; the index applies the transform
+        _, ids = compressed.search(vectors[:1], 1)
+        assert ids[0][0] == 0
+        assert compressed.reconstruct(0).shape == (64,)
+
+    def test_recall_against_float32(self, vectors):
+        exact = faiss.IndexFlatL2(64)
+        exact.add(vectors)
+        assert neighbor_recall(exact, build_index(vectors, parse_spec("fp16")), vectors) >= 0.99
+        assert neighbor_recall(exact, build_index(vectors, parse_spec("pca8,sq8")), vectors) >= 0.8
+
+    def test_pca_clamped_to_sample_count(self, vectors):
+        index = build_index(vectors[:5], parse_spec("pca32"))
+        assert index.ntotal == 5
+
+
+class TestCompressShard:
+    def test_compress_recompress_and_restore(self, tmp_path, vectors):
+        raw = faiss.IndexFlatL2(64)
+        raw.add(vectors)
+        faiss.write_index(raw, str(tmp_path / "index.faiss"))
+
+        report = compress_shard(str(tmp_path), parse_spec("sq8"))
+        assert report["spec"] == "sq8"
+        assert report["memory_saved_pct"] > 60
+        assert report["recall_at_10"] > 0.8
+        assert (tmp_path / "raw.faiss").exists()
+        assert vector_compression.shard_compression(str(tmp_path)) == report
+
+        # Re-compression starts from the float32 copy, not the quantised index
+        report = compress_shard(str(tmp_path), parse_spec("fp16"))
+        assert report["spec"] == "fp16" and report["recall_at_10"] >= 0.99
+
+        assert compress_shard(str(tmp_path), None) is None
+        assert not (tmp_path / "raw.faiss").exists()
+        assert vector_compression.shard_compression(str(tmp_path)) is None
+        assert faiss.read_index(str(tmp_path / "index.faiss")).ntotal == len(vectors)
+
+
+class TestIngestCompression:
+    def test_ingest_reports_savings_and_serves_compressed(self, ingest_env, monkeypatch):
+        docs_dir, index_path, embeddings = ingest_env
+        monkeypatch.setattr(ingest, "INDEX_COMPRESSION", "fp16")
+        _write(docs_dir, "a.pdf", PAGES)
+        result = ingest.ingest_documents()
+        assert result["compression"]["spec"] == "fp16"
+        assert result["compression"]["compressed_bytes"] < result["compression"]["raw_bytes"]
+        assert result["compression"]["recall_at_10"] >= 0.99
+
+        ntotal, vs = _index_size(index_path, embeddings)
+        assert ntotal == len(PAGES)
+        assert vs.similarity_search(PAGES[3], k=1)[0].page_content == PAGES[3]
+        assert vs.max_marginal_relevance_search_by_vector(embeddings.embed_query(PAGES[5]), k=2, fetch_k=4)
+
+    def test_incremental_run_extends_float32_copy(self, ingest_env, monkeypatch):
+        docs_dir, index_path, embeddings = ingest_env
+        monkeypatch.setattr(ingest, "INDEX_COMPRESSION", "sq8")
+        _write(docs_dir, "a.pdf", PAGES)
+        ingest.ingest_documents()
+        _write(docs_dir, "a.pdf", PAGES[:-1] + ["A replaced final page"])
+        result = ingest.ingest_documents()
+        assert result["chunks_embedded"] == 1
+        assert result["chunks_deleted"] == 1
+        assert faiss.read_index(os.path.join(_shard_dir(index_path, "a"), "raw.faiss")).ntotal == len(PAGES)
+        assert _index_size(index_path, embeddings)[0] == len(PAGES)
+
+    def test_changing_setting_recompresses_without_embedding(self, ingest_env, monkeypatch):
+        docs_dir, index_path, embeddings = ingest_env
+        _write(docs_dir, "a.pdf", PAGES)
+        ingest.ingest_documents()
+        monkeypatch.setattr(ingest, "INDEX_COMPRESSION", "pca4,sq8")
+        result = ingest.ingest_documents()
+        assert result["status"] == "success"
+        assert result["chunks_embedded"] == 0
+        assert result["compression"]["spec"] == "pca4,sq8"
+        assert vector_compression.shard_compression(_shard_dir(index_path, "a"))["spec"] == "pca4,sq8"
+        assert ingest.ingest_documents()["status"] == "unchanged"
+
+        monkeypatch.setattr(ingest, "INDEX_COMPRESSION", "none")
+        result = ingest.ingest_documents()
+        assert result["compression"] == {"spec": "none"}
+        assert not os.path.exists(os.path.join(_shard_dir(index_path, "a"), "raw.faiss"))
+        assert _index_size(index_path, embeddings)[0] == len(PAGES)
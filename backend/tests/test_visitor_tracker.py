@@ -0,0 +1,284 @@
+import os
+import sys
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+import pytest
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import visitor_tracker
+
+
+@pytest.fixture
+def sqlite_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(visitor_tracker, "DATABASE_URL", None)
+    monkeypatch.setattr(visitor_tracker, "_SQLITE_PATH", str(tmp_path / "visitors.db"))
+    monkeypatch.setattr(visitor_tracker, "_stats", {k: 0 for k in visitor_tracker._stats})
+    # Synchronous writes unless a test exercises the buffer
+    monkeypatch.setattr(visitor_tracker, "VISITOR_WRITE_BEHIND", False)
+    visitor_tracker.close_connections()
+    yield tmp_path / "visitors.db"
+    visitor_tracker.close_connections()
+
+
+class TestSQLite:
+    def test_schema_created_once_and_connection_reused(self, sqlite_db):
+        with patch.object(visitor_tracker, "_create_schema", wraps=visitor_tracker._create_schema) as create:
+            assert visitor_tracker.init_db()
+            for i in range(5):
+                visitor_tracker.track_visit(f"10.0.0.{i % 2}", "pytest", "/api/chat")
+            assert visitor_tracker.get_visitor_counts() == {"unique_visitors": 2, "total_visits": 5}
+            assert visitor_tracker.check_db_health()
+        assert create.call_count == 1
+        stats = visitor_tracker.pool_stats()
+        assert stats["backend"] == "sqlite"
+        assert stats["connections_opened"] == 1
+        assert stats["checkouts"] == 8
+        assert stats["reused"] == 7
+
+    def test_wal_mode(self, sqlite_db):
+        visitor_tracker.init_db()
+        with visitor_tracker._connection() as conn:
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    def test_one_connection_per_thread(self, sqlite_db):
+        visitor_tracker.init_db()
+        worker = threading.Thread(target=visitor_tracker.track_visit, args=("10.0.0.9",))
+        worker.start()
+        worker.join()
+        assert visitor_tracker.get_visitor_counts()["total_visits"] == 1
+        assert visitor_tracker.pool_stats()["connections_opened"] == 2
+
+    def test_failed_write_is_logged_not_raised(self, sqlite_db):
+        visitor_tracker.init_db()
+        with patch.object(visitor_tracker, "_get_sqlite_conn") as get_conn:
+            get_conn.return_value.executemany.side_effect = RuntimeError("disk full")
+            visitor_tracker.track_visit("10.0.0.1")
+        assert visitor_tracker.pool_stats()["errors"] == 1
+
+
+class TestRollups:
+    def _insert_raw(self, rows):
+        with visitor_tracker._connection() as conn:
+            visitor_tracker._insert_events(conn, [(ip, "", ts, "/") for ip, ts in rows])
+
+    def test_counts_read_from_rollup_not_raw_table(self, sqlite_db):
+        visitor_tracker.init_db()
+        for i in range(6):
+            visitor_tracker.track_visit(f"10.0.0.{i % 3}")
+        # Raw rows without rollup updates are invisible until a backfill
+        self._insert_raw([("10.9.9.9", "2024-01-01T00:00:00+00:00")])
+        assert visitor_tracker.get_visitor_counts() == {"unique_visitors": 3, "total_visits": 6}
+
+    def test_daily_rows_and_all_time_row(self, sqlite_db):
+        visitor_tracker.init_db()
+        visitor_tracker._write_visits([
+            ("10.0.0.1", "", "2025-03-01T10:00:00+00:00", "/"),
+            ("10.0.0.2", "", "2025-03-01T11:00:00+00:00", "/"),
+            ("10.0.0.1", "", "2025-03-02T09:00:00+00:00", "/"),
+        ])
+        with visitor_tracker._connection() as conn:
+            rows = conn.execute("SELECT period, visits, unique_visitors FROM visitor_rollups ORDER BY period").fetchall()
+        assert rows == [("2025-03-01", 2, 2), ("2025-03-02", 1, 1), ("all", 3, 2)]
+
+    def test_backfill_rebuilds_from_raw_rows(self, sqlite_db):
+        visitor_tracker.init_db()
+        visitor_tracker.track_visit("10.0.0.1")
+        self._insert_raw([(f"10.1.{i // 250}.{i % 250}", f"2024-01-0{1 + i % 3}T00:00:00+00:00") for i in range(1000)])
+        result = visitor_tracker.rebuild_rollups()
+        assert result["total_visits"] == result["rows_scanned"] == 1001
+        assert result["days"] == 4
+        counts = visitor_tracker.get_visitor_counts()
+        assert counts["total_visits"] == 1001
+        assert abs(counts["unique_visitors"] - 1001) <= 10
+        # Writes after a backfill keep incrementing the rebuilt rows
+        visitor_tracker.track_visit("10.0.0.1")
+        assert visitor_tracker.get_visitor_counts()["total_visits"] == 1002
+
+
+def _tables(db_path):
+    import sqlite3
+    with sqlite3.connect(db_path) as conn:
+        return {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'index')")}
+
+
+class TestPartitions:
+    def _visits(self, *stamps):
+        return [(f"10.0.0.{i}", "", ts, "/") for i, ts in enumerate(stamps)]
+
+    def test_rows_routed_to_indexed_period_tables(self, sqlite_db):
+        visitor_tracker.init_db()
+        visitor_tracker._write_visits(self._visits(
+            "2025-03-31T23:59:59+00:00", "2025-04-01T00:00:00+00:00", "2025-04-15T12:00:00+00:00",
+        ))
+        tables = _tables(sqlite_db)
+        assert {"visitor_events_p202503", "visitor_events_p202504", "visitor_events_p202504_visited_at"} <= tables
+        with visitor_tracker._connection() as conn:
+            assert visitor_tracker._list_partitions(conn) == ["visitor_events_p202503", "visitor_events_p202504"]
+            assert conn.execute("SELECT COUNT(*) FROM visitor_events_p202504").fetchone()[0] == 2
+            assert isinstance(conn.execute("SELECT visited_at FROM visitor_events_p202503").fetchone()[0], int)
+
+    def test_daily_partitions(self, sqlite_db, monkeypatch):
+        monkeypatch.setattr(visitor_tracker, "VISITOR_PARTITION", "day")
+        visitor_tracker._write_visits(self._visits("2025-03-01T10:00:00+00:00", "2025-03-02T10:00:00+00:00"))
+        with visitor_tracker._connection() as conn:
+            assert visitor_tracker._list_partitions(conn) == ["visitor_events_p20250301", "visitor_events_p20250302"]
+        assert visitor_tracker._partition_bounds("visitor_events_p20250302") == (date(2025, 3, 2), date(2025, 3, 3))
+        assert visitor_tracker._partition_bounds("visitor_events_p202512") == (date(2025, 12, 1), date(2026, 1, 1))
+
+    def test_legacy_table_migrated_by_backfill(self, sqlite_db):
+        import sqlite3
+        with sqlite3.connect(sqlite_db) as conn:
+            conn.execute("CREATE TABLE visitors (id INTEGER PRIMARY KEY, ip_address TEXT, user_agent TEXT, visited_at TEXT, path TEXT)")
+            conn.executemany("INSERT INTO visitors (ip_address, user_agent, visited_at, path) VALUES (?, ?, ?, ?)",
+                             self._visits("2025-01-05T08:00:00+00:00", "2025-02-05T08:00:00+00:00"))
+        result = visitor_tracker.rebuild_rollups()
+        assert result["migrated_legacy_rows"] == 2
+        assert "visitors" not in _tables(sqlite_db)
+        assert visitor_tracker.get_visitor_counts() == {"unique_visitors": 2, "total_visits": 2}
+
+    def test_retention_drops_old_partitions_but_keeps_rollups(self, sqlite_db):
+        now = datetime(2025, 6, 15, tzinfo=timezone.utc)
+        visitor_tracker._write_visits(self._visits(
+            "2025-01-10T00:00:00+00:00", "2025-02-10T00:00:00+00:00", "2025-03-10T00:00:00+00:00",
+            "2025-06-14T00:00:00+00:00",
+        ))
+        result = visitor_tracker.apply_retention(days=90, now=now)
+        # Cutoff 2025-03-17: March still holds rows inside the window
+        assert result["dropped_partitions"] == ["visitor_events_p202501", "visitor_events_p202502"]
+        assert result["rows_rolled_up"] == 2
+        with visitor_tracker._connection() as conn:
+            assert visitor_tracker._list_partitions(conn) == ["visitor_events_p202503", "visitor_events_p202506"]
+        assert visitor_tracker.get_visitor_counts() == {"unique_visitors": 4, "total_visits": 4}
+        assert visitor_tracker.get_daily_stats(date(2025, 1, 1), date(2025, 1, 31))["total_visits"] == 1
+        # A backfill after retention keeps the day rows of dropped partitions
+        assert visitor_tracker.rebuild_rollups()["total_visits"] == 4
+        assert visitor_tracker.apply_retention(days=0)["status"] == "disabled"
+
+
+class TestTimeRangeStats:
+    def test_daily_stats_merge_uniques_across_days(self, sqlite_db):
+        visitor_tracker._write_visits([
+            ("10.0.0.1", "", "2025-03-01T10:00:00+00:00", "/"),
+            ("10.0.0.2", "", "2025-03-01T11:00:00+00:00", "/"),
+            ("10.0.0.1", "", "2025-03-02T09:00:00+00:00", "/"),
+            ("10.0.0.3", "", "2025-03-05T09:00:00+00:00", "/"),
+        ])
+        stats = visitor_tracker.get_daily_stats(date(2025, 3, 1), date(2025, 3, 2))
+        assert stats["total_visits"] == 3
+        assert stats["unique_visitors"] == 2
+        assert stats["days"] == [
+            {"date": "2025-03-01", "visits": 2, "unique_visitors": 2},
+            {"date": "2025-03-02", "visits": 1, "unique_visitors": 1},
+        ]
+        with pytest.raises(ValueError):
+            visitor_tracker.get_daily_stats(date(2025, 3, 2), date(2025, 3, 1))
+        with pytest.raises(ValueError):
+            visitor_tracker.get_daily_stats(date(2024, 1, 1), date(2025, 3, 1))
+
+    def test_recent_stats_scan_only_the_window(self, sqlite_db):
+        now = datetime(2025, 4, 1, 6, 0, tzinfo=timezone.utc)
+        stamps = [now - timedelta(hours=h) for h in (1, 2, 5, 30, 24 * 40)]
+        visitor_tracker._write_visits([("10.0.0.%d" % (i % 2), "", ts.isoformat(), "/") for i, ts in enumerate(stamps)])
+        stats = visitor_tracker.get_recent_stats(24, now=now)
+        assert stats["total_visits"] == 3 and stats["unique_visitors"] == 2
+        assert visitor_tracker.get_recent_stats(48, now=now)["total_visits"] == 4
+        with pytest.raises(ValueError):
+            visitor_tracker.get_recent_stats(24 * 365, now=now)
+
+
+class TestWriteBehind:
+    @pytest.fixture
+    def buffer(self, sqlite_db, monkeypatch):
+        monkeypatch.setattr(visitor_tracker, "VISITOR_WRITE_BEHIND", True)
+        buffer = visitor_tracker.VisitBuffer(maxsize=100, batch_size=10, interval=0.05)
+        monkeypatch.setattr(visitor_tracker, "_buffer", buffer)
+        visitor_tracker.init_db()
+        return buffer
+
+    def test_events_written_in_batches(self, buffer):
+        with patch.object(visitor_tracker, "_write_visits", wraps=visitor_tracker._write_visits) as write:
+            for i in range(25):
+                visitor_tracker.track_visit(f"10.0.0.{i % 5}", "pytest", "/api/chat")
+            assert visitor_tracker.flush()
+        assert visitor_tracker.get_visitor_counts() == {"unique_visitors": 5, "total_visits": 25}
+        assert all(len(call.args[0]) <= 10 for call in write.call_args_list)
+        assert write.call_count < 25
+        stats = visitor_tracker.buffer_stats()
+        assert stats["enqueued"] == stats["written"] == 25
+        assert stats["queued"] == 0 and stats["dropped"] == 0
+
+    def test_interval_flushes_partial_batch(self, buffer):
+        visitor_tracker.track_visit("10.0.0.1")
+        deadline = time.monotonic() + 5
+        while buffer.snapshot()["written"] < 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert visitor_tracker.get_visitor_counts()["total_visits"] == 1
+
+    def test_full_buffer_drops_instead_of_blocking(self, buffer, monkeypatch):
+        release = threading.Event()
+        monkeypatch.setattr(visitor_tracker, "_write_visits", lambda rows: release.wait(5))
+        small = visitor_tracker.VisitBuffer(maxsize=3, batch_size=1, interval=0.01)
+        monkeypatch.setattr(visitor_tracker, "_buffer", small)
+        for i in range(20):
+            visitor_tracker.track_visit(f"10.0.0.{i}")
+        stats = visitor_tracker.buffer_stats()
+        assert stats["dropped"] >= 16
+        assert stats["enqueued"] + stats["dropped"] == 20
+        release.set()
+        assert visitor_tracker.flush()
+
+    def test_failed_batch_counted_as_lost(self, buffer, monkeypatch):
+        monkeypatch.setattr(visitor_tracker, "_write_visits", MagicMock(side_effect=RuntimeError("db down")))
+        visitor_tracker.track_visit("10.0.0.1")
+        visitor_tracker.track_visit("10.0.0.2")
+        assert visitor_tracker.flush()
+        stats = visitor_tracker.buffer_stats()
+        assert stats["lost"] == 2 and stats["write_errors"] >= 1
+
+
+class TestPostgresPool:
+    @pytest.fixture
+    def pg(self, monkeypatch):
+        monkeypatch.setattr(visitor_tracker, "DATABASE_URL", "postgresql://example/db")
+        monkeypatch.setattr(visitor_tracker, "_stats", {k: 0 for k in visitor_tracker._stats})
+        monkeypatch.setattr(visitor_tracker, "_schema_ready", True)
+        monkeypatch.setattr(visitor_tracker, "VISITOR_WRITE_BEHIND", False)
+        pool = MagicMock()
+        conn = MagicMock(closed=0)
+        conn.cursor.return_value.fetchone.return_value = (1, None)
+        pool.getconn.return_value = conn
+        monkeypatch.setattr(visitor_tracker, "_pool", pool)
+        monkeypatch.setattr(visitor_tracker, "_pool_pid", os.getpid())
+        return pool, conn
+
+    def test_connections_are_borrowed_and_returned(self, pg):
+        pool, conn = pg
+        with patch("psycopg2.extras.execute_values") as execute_values:
+            visitor_tracker.track_visit("10.0.0.1", "pytest", "/api/chat")
+        assert visitor_tracker.check_db_health()
+        assert pool.getconn.call_count == 2
+        pool.putconn.assert_called_with(conn, close=False)
+        _, sql, rows = execute_values.call_args[0]
+        assert sql.endswith("VALUES %s")
+        assert rows[0][0] == "10.0.0.1"
+        assert conn.commit.call_count == 2
+
+    def test_closed_connection_is_discarded(self, pg):
+        pool, conn = pg
+        conn.cursor.return_value.execute.side_effect = RuntimeError("server closed the connection")
+        conn.closed = 2
+        assert not visitor_tracker.check_db_health()
+        conn.rollback.assert_called_once()
+        pool.putconn.assert_called_with(conn, close=True)
+
+    def test_pool_recreated_after_fork(self, pg, monkeypatch):
+        monkeypatch.setattr(visitor_tracker, "_pool_pid", -1)
+        with patch("psycopg2.pool.ThreadedConnectionPool") as pool_cls:
+            assert visitor_tracker._get_pool() is pool_cls.return_value
+        args, kwargs = pool_cls.call_args
+        assert args == (visitor_tracker.VISITOR_DB_POOL_MIN, visitor_tracker.VISITOR_DB_POOL_MAX, "postgresql://example/db")
+        assert visitor_tracker._pool_pid == os.getpid()
+        assert visitor_tracker.pool_stats()["pool_max"] == visitor_tracker.VISITOR_DB_POOL_MAX
@@ -0,0 +1,236 @@
+"""
+Optional vector compression for index shards.
+
+gemini-embedding-001 returns 3072 float32 values per chunk, and a flat FAISS
+index keeps all of them in memory and scans all of them per query. With
+INDEX_COMPRESSION set, ingestion replaces each shard's flat index with a
+FAISS IndexPreTransform:
+
+    pca<N>   project onto the top N principal components (fitted per shard)
+    mrl<N>   Matryoshka-style truncation to the first N dimensions, then
+             L2-renormalisation (gemini-embedding-001 is MRL-trained)
+    fp16     store components as float16 (2x smaller)
+    sq8      8-bit scalar quantisation (4x smaller, trained min/max per dimension)
+
+combined as "<reduction>,<quantiser>", e.g. "pca256,sq8", "mrl768,fp16" or
+just "sq8". The transform lives inside the FAISS index, so query embeddings
+from RAGEngine are projected the same way at search time and reconstruct()
+(used by MMR) maps stored vectors back to the original space.
+
+Each compressed shard keeps its float32 vectors as raw.faiss. Incremental
+ingestion extends and merges those (compressed indexes cannot be merged),
+and changing or disabling INDEX_COMPRESSION re-compresses existing shards
+without re-embedding. Serving loads only index.faiss, so the memory saving
+is what the running app sees.
+
+Compressing a shard records its size before/after and recall@k of the
+compressed index against exact float32 search (compression.json), using a
+sample of the shard's own vectors as queries. Distances change under
+compression: re-check RELEVANCE_THRESHOLD with evaluate.py --baseline-raw.
+"""
+
+import json
+import logging
+import os
+import re
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# "none" (default), or e.g. "pca256,sq8", "mrl768,fp16", "sq8" (see module docstring)
+INDEX_COMPRESSION = os.environ.get("INDEX_COMPRESSION", "none")
+# Stored vectors used as queries when measuring recall of a compressed shard
+COMPRESSION_RECALL_SAMPLE = int(os.environ.get("COMPRESSION_RECALL_SAMPLE", "200"))
+COMPRESSION_RECALL_K = 10
+
+INDEX_NAME = "index.faiss"
+RAW_INDEX_NAME = "raw.faiss"
+COMPRESSION_NAME = "compression.json"
+
+_REDUCTION_RE = re.compile(r"^(pca|mrl)(\d+)$")
+_QUANTIZERS = ("flat", "fp16", "sq8")
+
+
+class CompressionSpec(NamedTuple):
+    reduction: Optional[str]  # "pca", "mrl" or None
+    dim: Optional[int]
+    quantizer: str  # "flat", "fp16" or "sq8"
+
+    @property
+    def key(self) -> str:
+        parts = [f"{self.reduction}{self.dim}"] if self.reduction else []
+        if self.quantizer != "flat" or not parts:
+            parts.append(self.quantizer)
+        return ",".join(parts)
+
+
+def parse_spec(spec: Optional[str]) -> Optional[CompressionSpec]:
+    """Parse an INDEX_COMPRESSION value; None means no compression."""
+    tokens = [t.strip().lower() for t in (spec or "").split(",") if t.strip()]
+    if not tokens or tokens == ["none"]:
+        return None
+    reduction, dim, quantizer = None, None, "flat"
+    for token in tokens:
+        match = _REDUCTION_RE.match(token)
+        if match and reduction is None and int(match.group(2)) > 0:
+            reduction, dim = match.group(1), int(match.group(2))
+        elif token in _QUANTIZERS and quantizer == "flat":
+            quantizer = token
+        else:
+            raise ValueError(f"Invalid INDEX_COMPRESSION {spec!r}: unexpected {token!r}")
+    if reduction is None and quantizer == "flat":
+        return None
+    return CompressionSpec(reduction, dim, quantizer)
+
+
+def spec_key(spec: Optional[CompressionSpec]) -> str:
+    return spec.key if spec else "none"
+
+
+def build_index(vectors: np.ndarray, spec: CompressionSpec):
+    """Train and fill a compressed FAISS index over float32 vectors (n x d)."""
+    import faiss
+
+    n, d = vectors.shape
+    transforms = []
+    dim = d
+    if spec.reduction == "pca":
+        # PCA cannot output more components than there are training vectors
+        dim = min(spec.dim, d, n)
+        if dim < spec.dim:
+            logger.info("  - PCA reduced to %d dimensions (%d vectors of dimension %d)", dim, n, d)
+        transforms.append(faiss.PCAMatrix(d, dim))
+    elif spec.reduction == "mrl":
+        dim = min(spec.dim, d)
+        truncate = faiss.LinearTransform(d, dim, False)
+        faiss.copy_array_to_vector(np.eye(dim, d, dtype=np.float32).ravel(), truncate.A)
+        truncate.set_is_orthonormal()
+        truncate.is_trained = True
+        transforms.extend([truncate, faiss.NormalizationTransform(dim)])
+
+    if spec.quantizer == "flat":
+        inner = faiss.IndexFlatL2(dim)
+    else:
+        qtype = faiss.ScalarQuantizer.QT_fp16 if spec.quantizer == "fp16" else faiss.ScalarQuantizer.QT_8bit
+        inner = faiss.IndexScalarQuantizer(dim, qtype, faiss.METRIC_L2)
+    if transforms:
+        index = faiss.IndexPreTransform(inner)
+        for transform in reversed(transforms):
+            index.prepend_transform(transform)
+    else:
+        index = inner
+    index.train(vectors)
+    index.add(vectors)
+    return index
+
+
+def index_bytes(index) -> int:
+    """Serialized size of a FAISS index (vectors/codes plus any trained transform)."""
+    import faiss
+
+    return int(faiss.serialize_index(index).nbytes)
+
+
+def neighbor_recall(exact, approx, vectors: np.ndarray, k: int = COMPRESSION_RECALL_K,
+                    sample: int = COMPRESSION_RECALL_SAMPLE) -> float:
+    """Mean overlap of approx's top-k with exact's top-k, over up to `sample` of the vectors as queries."""
+    n = len(vectors)
+    k = min(k, n)
+    if not k:
+        return 1.0
+    # Evenly spaced rows: deterministic, and spread across every source in the shard
+    rows = np.unique(np.linspace(0, n - 1, num=min(sample, n)).astype(int))
+    queries = vectors[rows]
+    _, truth = exact.search(queries, k)
+    _, found = approx.search(queries, k)
+    return round(float(np.mean([len(set(t) & set(f)) / k for t, f in zip(truth, found)])), 4)
+
+
+def shard_compression(shard_dir: str) -> Optional[Dict[str, Any]]:
+    """compression.json of a shard, or None if it is stored uncompressed."""
+    path = os.path.join(shard_dir, COMPRESSION_NAME)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        logger.warning("Ignoring unreadable compression report at %s", path)
+        return None
+
+
+def _write_index(index, path: str) -> None:
+    # Shard files may be hard links shared with older versions: never write in place
+    import faiss
+
+    faiss.write_index(index, path + ".tmp")
+    os.replace(path + ".tmp", path)
+
+
+def compress_shard(shard_dir: str, spec: Optional[CompressionSpec]) -> Optional[Dict[str, Any]]:
+    """(Re)compress a saved shard in place; spec=None restores its float32 index.
+
+    Returns the compression report (also written to compression.json), or
+    None when the shard ends up uncompressed.
+    """
+    import faiss
+
+    index_path = os.path.join(shard_dir, INDEX_NAME)
+    raw_path = os.path.join(shard_dir, RAW_INDEX_NAME)
+    report_path = os.path.join(shard_dir, COMPRESSION_NAME)
+    if spec is None:
+        if os.path.exists(raw_path):
+            os.replace(raw_path, index_path)
+        if os.path.exists(report_path):
+            os.remove(report_path)
+        return None
+
+    if not os.path.exists(raw_path):
+        os.replace(index_path, raw_path)
+    raw = faiss.read_index(raw_path)
+    vectors = raw.reconstruct_n(0, raw.ntotal)
+    compressed = build_index(vectors, spec)
+    raw_bytes, compressed_bytes = index_bytes(raw), index_bytes(compressed)
+    report = {
+        "spec": spec.key,
+        "vectors": int(raw.ntotal),
+        "dimension": int(raw.d),
+        "raw_bytes": raw_bytes,
+        "compressed_bytes": compressed_bytes,
+        "memory_saved_pct": round(100.0 * (1 - compressed_bytes / raw_bytes), 1) if raw_bytes else 0.0,
+        f"recall_at_{COMPRESSION_RECALL_K}": neighbor_recall(raw, compressed, vectors),
+    }
+    _write_index(compressed, index_path)
+    with open(report_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    os.replace(report_path + ".tmp", report_path)
+    return report
+
+
+def summarize(reports: List[Dict[str, Any]], spec: Optional[CompressionSpec]) -> Dict[str, Any]:
+    """Combine per-shard reports: total bytes and vector-weighted recall."""
+    raw_bytes = sum(r["raw_bytes"] for r in reports)
+    compressed_bytes = sum(r["compressed_bytes"] for r in reports)
+    vectors = sum(r["vectors"] for r in reports)
+    recall_key = f"recall_at_{COMPRESSION_RECALL_K}"
+    return {
+        "spec": spec_key(spec),
+        "raw_bytes": raw_bytes,
+        "compressed_bytes": compressed_bytes,
+        "memory_saved_pct": round(100.0 * (1 - compressed_bytes / raw_bytes), 1) if raw_bytes else 0.0,
+        recall_key: round(sum(r[recall_key] * r["vectors"] for r in reports) / vectors, 4) if vectors else None,
+    }
+
+
+def load_store(shard_dir: str, embeddings, raw: bool = False):
+    """Load a shard as a LangChain FAISS store; raw=True swaps in its float32 index if compressed."""
+    import faiss
+    from langchain_community.vectorstores import FAISS
+
+    store = FAISS.load_local(shard_dir, embeddings, allow_dangerous_deserialization=True)
+    raw_path = os.path.join(shard_dir, RAW_INDEX_NAME)
+    if raw and os.path.exists(raw_path):
+        store.index = faiss.read_index(raw_path)
+    return store
@@ -1,7 +1,65 @@
+"""
+Visitor tracking: one row per /api/chat request in time-partitioned tables.
+
+PostgreSQL (DATABASE_URL) connections come from a process-wide
+ThreadedConnectionPool; SQLite (local dev) keeps one connection per thread
+in WAL mode, so readers never block the writer. The schema is created once
+per process (init_db(), called at app startup) instead of before every
+query. pool_stats() reports connections opened vs. reused and the time
+spent acquiring them, exposed through /api/health.
+
+Write-behind: track_visit() runs on every chat request, so it only appends
+the event to a bounded in-memory queue. A background flusher writes queued
+events in one multi-row INSERT per batch, whenever VISITOR_FLUSH_BATCH
+events are waiting or VISITOR_FLUSH_INTERVAL seconds have passed since the
+first one. When the queue is full (DB down or too slow), new events are
+dropped and counted instead of slowing requests. flush() drains the queue
+synchronously and runs at interpreter exit; buffer_stats() shows
+queued/written/dropped counts in /api/health.
+
+Aggregates: get_visitor_counts() is public and polled by the frontend, so
+it no longer scans the visitors table. Each batch write also updates, in the
+same transaction, a `visitor_rollups` row per UTC day touched plus the
+all-time row ("all"). Each row holds the visit count, a HyperLogLog sketch
+of the IPs and its cached estimate. Reading the counts is then one
+primary-key lookup. Rows written before the rollups existed are folded in
+with:
+
+    python visitor_tracker.py backfill
+
+Partitions and retention: raw events are stored by period, one partition per
+month (VISITOR_PARTITION=month) or per day. PostgreSQL uses native range
+partitions of `visitor_events` (visited_at TIMESTAMPTZ). SQLite has no
+partitioning, so it uses one `visitor_events_p<period>` table per period with
+visited_at stored as epoch seconds. Every partition is indexed on
+visited_at. The retention job:
+
+    python visitor_tracker.py retention [--days N]
+
+re-derives the day rollups of every partition that lies entirely before
+VISITOR_RETENTION_DAYS ago, then drops it. A drop costs the same whatever
+the row count, and counts for those days stay available from the rollups.
+Time-range stats come from the day rollups for calendar days
+(get_daily_stats) and from raw partitions for the last N hours
+(get_recent_stats).
+"""
+
+import argparse
+import atexit
+import json
 import logging
 import os
+import queue
+import re
 import sqlite3
-from datetime import datetime, timezone
+import threading
+import time
+from contextlib import contextmanager
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+from hyperloglog import HyperLogLog
 
 logger = logging.getLogger(__name__)
 
@@ -13,108 +71,690 @@ _SQLITE_PATH = os.path.join(
     os.environ.get("VISITOR_DB_PATH", "visitors.db"),
 )
 
-_CREATE_TABLE_PG = """
-CREATE TABLE IF NOT EXISTS visitors (
-    id SERIAL PRIMARY KEY,
+# PostgreSQL pool bounds (per worker process)
+VISITOR_DB_POOL_MIN = int(os.environ.get("VISITOR_DB_POOL_MIN", "1"))
+VISITOR_DB_POOL_MAX = int(os.environ.get("VISITOR_DB_POOL_MAX", "5"))
+
+# Write-behind buffer: queue bound, rows per INSERT, and max seconds an event waits
+VISITOR_WRITE_BEHIND = os.environ.get("VISITOR_WRITE_BEHIND", "true").lower() == "true"
+VISITOR_BUFFER_SIZE = int(os.environ.get("VISITOR_BUFFER_SIZE", "10000"))
+VISITOR_FLUSH_BATCH = int(os.environ.get("VISITOR_FLUSH_BATCH", "500"))
+VISITOR_FLUSH_INTERVAL = float(os.environ.get("VISITOR_FLUSH_INTERVAL", "1.0"))
+
+# Raw-event partition period ("month" or "day"; keep it fixed once data exists)
+VISITOR_PARTITION = os.environ.get("VISITOR_PARTITION", "month")
+# Raw partitions older than this are rolled up and dropped by the retention job (0 = keep forever)
+VISITOR_RETENTION_DAYS = int(os.environ.get("VISITOR_RETENTION_DAYS", "90"))
+
+EVENTS_TABLE = "visitor_events"
+# Unpartitioned table of earlier releases; moved into partitions by `backfill`
+LEGACY_TABLE = "visitors"
+
+_CREATE_EVENTS_PG = """
+CREATE TABLE IF NOT EXISTS visitor_events (
     ip_address TEXT NOT NULL,
     user_agent TEXT,
-    visited_at TEXT NOT NULL,
+    visited_at TIMESTAMPTZ NOT NULL,
     path TEXT
-)
+) PARTITION BY RANGE (visited_at)
 """
+_CREATE_EVENTS_INDEX_PG = "CREATE INDEX IF NOT EXISTS visitor_events_visited_at ON visitor_events (visited_at)"
 
-_CREATE_TABLE_SQLITE = """
-CREATE TABLE IF NOT EXISTS visitors (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
+_CREATE_PARTITION_SQLITE = """
+CREATE TABLE IF NOT EXISTS {name} (
     ip_address TEXT NOT NULL,
     user_agent TEXT,
-    visited_at TEXT NOT NULL,
+    visited_at INTEGER NOT NULL,
     path TEXT
 )
 """
+_PARTITION_NAME = re.compile(r"^visitor_events_p(\d{6}|\d{8})$")
+
+# Per-day and all-time aggregates maintained on write (same DDL on both backends)
+_CREATE_ROLLUPS = """
+CREATE TABLE IF NOT EXISTS visitor_rollups (
+    period TEXT PRIMARY KEY,
+    visits BIGINT NOT NULL DEFAULT 0,
+    unique_visitors BIGINT NOT NULL DEFAULT 0,
+    hll {blob}
+)
+"""
+ROLLUP_ALL = "all"
 
+_lock = threading.Lock()
+_local = threading.local()
+_pool = None
+_pool_pid = None
+_schema_ready = False
+# Partitions created by this process; shared by request threads and the flusher
+_known_partitions = set()
+_partitions_lock = threading.Lock()
+_stats = {"connections_opened": 0, "checkouts": 0, "acquire_ms_total": 0.0, "errors": 0}
 
-def _get_pg_conn():
-    """Return a psycopg2 connection using DATABASE_URL."""
-    import psycopg2
-    conn = psycopg2.connect(DATABASE_URL)
-    conn.autocommit = False
-    with conn.cursor() as cur:
-        cur.execute(_CREATE_TABLE_PG)
-    conn.commit()
+
+def _placeholder() -> str:
+    return "%s" if DATABASE_URL else "?"
+
+
+def _get_pool():
+    """Process-wide psycopg2 pool, recreated after a fork."""
+    global _pool, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        with _lock:
+            if _pool is None or _pool_pid != os.getpid():
+                from psycopg2.extensions import connection
+                from psycopg2.pool import ThreadedConnectionPool
+
+                class _CountedConnection(connection):
+                    def __init__(self, *args, **kwargs):
+                        super().__init__(*args, **kwargs)
+                        _stats["connections_opened"] += 1
+
+                _pool = ThreadedConnectionPool(
+                    VISITOR_DB_POOL_MIN, VISITOR_DB_POOL_MAX, DATABASE_URL, connection_factory=_CountedConnection,
+                )
+                _pool_pid = os.getpid()
+    return _pool
+
+
+def _get_sqlite_conn() -> sqlite3.Connection:
+    """This thread's sqlite3 connection (local dev fallback), opened once in WAL mode."""
+    conn = getattr(_local, "conn", None)
+    if conn is None or getattr(_local, "path", None) != _SQLITE_PATH:
+        conn = sqlite3.connect(_SQLITE_PATH, timeout=5.0)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        _local.conn, _local.path = conn, _SQLITE_PATH
+        with _lock:
+            _stats["connections_opened"] += 1
     return conn
 
 
-def _get_sqlite_conn():
-    """Return a sqlite3 connection (local dev fallback)."""
-    conn = sqlite3.connect(_SQLITE_PATH)
-    conn.execute(_CREATE_TABLE_SQLITE)
+@contextmanager
+def _connection() -> Iterator[Any]:
+    """Borrow a connection: pooled for PostgreSQL, per-thread for SQLite.
+
+    Commits on success and rolls back on error; the schema is created on
+    first use if init_db() has not run yet.
+    """
+    start = time.perf_counter()
+    if DATABASE_URL:
+        pool = _get_pool()
+        conn = pool.getconn()
+    else:
+        pool = None
+        conn = _get_sqlite_conn()
+    with _lock:
+        _stats["checkouts"] += 1
+        _stats["acquire_ms_total"] += (time.perf_counter() - start) * 1000
+    broken = False
+    try:
+        if not _schema_ready:
+            _create_schema(conn)
+        yield conn
+        conn.commit()
+    except Exception:
+        with _lock:
+            _stats["errors"] += 1
+        try:
+            conn.rollback()
+        except Exception:
+            broken = True
+        raise
+    finally:
+        if pool is not None:
+            # A connection the server closed must not go back into the pool
+            pool.putconn(conn, close=broken or bool(conn.closed))
+
+
+def _create_schema(conn) -> None:
+    global _schema_ready
+    if DATABASE_URL:
+        with conn.cursor() as cur:
+            cur.execute(_CREATE_EVENTS_PG)
+            cur.execute(_CREATE_EVENTS_INDEX_PG)
+            cur.execute(_CREATE_ROLLUPS.format(blob="BYTEA"))
+    else:
+        # SQLite partitions are created on first write to their period
+        conn.execute(_CREATE_ROLLUPS.format(blob="BLOB"))
     conn.commit()
-    return conn
+    _schema_ready = True
 
 
-def _get_db():
-    """Return a DB connection — PostgreSQL if DATABASE_URL is set, else SQLite."""
+def _execute(conn, sql: str, params=()):
+    """Run one statement on either backend; returns the cursor (caller fetches)."""
     if DATABASE_URL:
-        return _get_pg_conn()
-    return _get_sqlite_conn()
+        cur = conn.cursor()
+        cur.execute(sql, params)
+        return cur
+    return conn.execute(sql, params)
 
 
-def track_visit(ip_address, user_agent="", path="/"):
-    """Record a visitor hit."""
-    conn = _get_db()
+def init_db() -> bool:
+    """Create the schema once per process (at startup). Returns False if the DB is unreachable."""
     try:
+        with _connection():
+            pass
+        return True
+    except Exception:
+        logger.exception("Visitor database initialisation failed — retrying on first use")
+        return False
+
+
+def pool_stats() -> Dict[str, Any]:
+    """Connections opened vs. checkouts served, and mean time to acquire one."""
+    with _lock:
+        stats = dict(_stats)
+    checkouts = stats.pop("checkouts")
+    acquire_ms_total = stats.pop("acquire_ms_total")
+    stats.update(
+        backend="postgresql" if DATABASE_URL else "sqlite",
+        schema_ready=_schema_ready,
+        checkouts=checkouts,
+        reused=max(0, checkouts - stats["connections_opened"]),
+        avg_acquire_ms=round(acquire_ms_total / checkouts, 3) if checkouts else 0.0,
+    )
+    if DATABASE_URL:
+        stats.update(pool_min=VISITOR_DB_POOL_MIN, pool_max=VISITOR_DB_POOL_MAX)
+    return stats
+
+
+def close_connections() -> None:
+    """Close the pool and this thread's SQLite connection (tests, shutdown)."""
+    global _pool, _schema_ready
+    with _lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.closeall()
+        _pool = None
+        _schema_ready = False
+    with _partitions_lock:
+        _known_partitions.clear()
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+
+
+Visit = Tuple[str, str, str, str]  # (ip_address, user_agent, visited_at, path)
+
+
+def _to_datetime(value) -> datetime:
+    """UTC datetime from an ISO string, a datetime (PostgreSQL) or epoch seconds (SQLite)."""
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value, timezone.utc)
+    dt = value if isinstance(value, datetime) else datetime.fromisoformat(value)
+    return dt.astimezone(timezone.utc) if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def _next_month(day: date) -> date:
+    return (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def _partition_for(day: date) -> Tuple[str, date, date]:
+    """(table name, first day, day after the last) of the partition holding `day`."""
+    if VISITOR_PARTITION == "day":
+        return f"{EVENTS_TABLE}_p{day:%Y%m%d}", day, day + timedelta(days=1)
+    start = day.replace(day=1)
+    return f"{EVENTS_TABLE}_p{start:%Y%m}", start, _next_month(start)
+
+
+def _partition_bounds(name: str) -> Tuple[date, date]:
+    period = _PARTITION_NAME.match(name).group(1)
+    if len(period) == 8:
+        start = datetime.strptime(period, "%Y%m%d").date()
+        return start, start + timedelta(days=1)
+    start = datetime.strptime(period, "%Y%m").date()
+    return start, _next_month(start)
+
+
+def _ensure_partition(conn, name: str, start: date, end: date) -> None:
+    if DATABASE_URL:
+        _execute(
+            conn,
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {EVENTS_TABLE} "
+            f"FOR VALUES FROM ('{start.isoformat()} 00:00:00+00') TO ('{end.isoformat()} 00:00:00+00')",
+        )
+    else:
+        conn.execute(_CREATE_PARTITION_SQLITE.format(name=name))
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name}_visited_at ON {name} (visited_at)")
+
+
+def _list_partitions(conn) -> List[str]:
+    if DATABASE_URL:
+        rows = _execute(
+            conn,
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent WHERE p.relname = %s",
+            (EVENTS_TABLE,),
+        ).fetchall()
+    else:
+        rows = conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall()
+    return sorted(name for (name,) in rows if _PARTITION_NAME.match(name))
+
+
+def _table_exists(conn, name: str) -> bool:
+    if DATABASE_URL:
+        return _execute(conn, "SELECT to_regclass(%s)", (name,)).fetchone()[0] is not None
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)).fetchone() is not None
+
+
+def _insert_events(conn, rows: Sequence[Visit]) -> None:
+    """Insert raw events into their period partitions, creating partitions as needed."""
+    by_partition: Dict[str, List[Visit]] = {}
+    for row in rows:
+        name, start, end = _partition_for(_to_datetime(row[2]).date())
+        with _partitions_lock:
+            known = name in _known_partitions
+        if not known:
+            # Idempotent (IF NOT EXISTS), so two threads racing here is harmless
+            _ensure_partition(conn, name, start, end)
+            with _partitions_lock:
+                _known_partitions.add(name)
+        by_partition.setdefault(name, []).append(row)
+    if DATABASE_URL:
+        from psycopg2.extras import execute_values
+        # PostgreSQL routes each row to its partition
+        with conn.cursor() as cur:
+            execute_values(
+                cur, f"INSERT INTO {EVENTS_TABLE} (ip_address, user_agent, visited_at, path) VALUES %s",
+                rows, page_size=len(rows),
+            )
+        return
+    for name, part in by_partition.items():
+        conn.executemany(
+            f"INSERT INTO {name} (ip_address, user_agent, visited_at, path) VALUES (?, ?, ?, ?)",
+            [(ip, ua, int(_to_datetime(ts).timestamp()), path) for ip, ua, ts, path in part],
+        )
+
+
+def _scan(conn, tables: Iterable[str]) -> Iterator[Tuple[str, Any]]:
+    """Stream (ip_address, visited_at) from the given tables."""
+    for table in tables:
         if DATABASE_URL:
-            with conn.cursor() as cur:
-                cur.execute(
-                    "INSERT INTO visitors (ip_address, user_agent, visited_at, path) VALUES (%s, %s, %s, %s)",
-                    (ip_address, user_agent, datetime.now(timezone.utc).isoformat(), path),
-                )
-            conn.commit()
+            # Server-side cursor: stream rows instead of loading the table
+            cur = conn.cursor(name="visitor_scan")
+            cur.itersize = 10000
+            cur.execute(f"SELECT ip_address, visited_at FROM {table}")
         else:
-            conn.execute(
-                "INSERT INTO visitors (ip_address, user_agent, visited_at, path) VALUES (?, ?, ?, ?)",
-                (ip_address, user_agent, datetime.now(timezone.utc).isoformat(), path),
-            )
-            conn.commit()
+            cur = conn.execute(f"SELECT ip_address, visited_at FROM {table}")
+        try:
+            yield from cur
+        finally:
+            cur.close()
+
+
+def _update_rollups(conn, rows: Sequence[Visit]) -> None:
+    """Add a batch to its day rows and the all-time row (caller's transaction)."""
+    groups: Dict[str, List[Visit]] = {ROLLUP_ALL: list(rows)}
+    for row in rows:
+        groups.setdefault(_to_datetime(row[2]).date().isoformat(), []).append(row)
+    p = _placeholder()
+    # FOR UPDATE serialises concurrent workers; SQLite already holds the write lock
+    lock = " FOR UPDATE" if DATABASE_URL else ""
+    for period in sorted(groups):  # one lock order for every writer
+        group = groups[period]
+        _execute(conn, f"INSERT INTO visitor_rollups (period) VALUES ({p}) ON CONFLICT (period) DO NOTHING", (period,))
+        visits, hll = _execute(
+            conn, f"SELECT visits, hll FROM visitor_rollups WHERE period = {p}{lock}", (period,),
+        ).fetchone()
+        sketch = HyperLogLog.from_bytes(hll) if hll else HyperLogLog()
+        sketch.update(row[0] for row in group)
+        _execute(
+            conn,
+            f"UPDATE visitor_rollups SET visits = {p}, unique_visitors = {p}, hll = {p} WHERE period = {p}",
+            (visits + len(group), sketch.count(), sketch.to_bytes(), period),
+        )
+
+
+def _rebuild_days(conn, events: Iterable[Tuple[str, Any]]) -> Counter:
+    """Replace the day rollups of every day present in `events`; returns visits per day."""
+    sketches: Dict[str, HyperLogLog] = {}
+    visits: Counter = Counter()
+    for ip_address, visited_at in events:
+        day = _to_datetime(visited_at).date().isoformat()
+        sketches.setdefault(day, HyperLogLog()).add(ip_address)
+        visits[day] += 1
+    p = _placeholder()
+    for day, sketch in sorted(sketches.items()):
+        _execute(conn, f"DELETE FROM visitor_rollups WHERE period = {p}", (day,))
+        _execute(
+            conn,
+            f"INSERT INTO visitor_rollups (period, visits, unique_visitors, hll) VALUES ({p}, {p}, {p}, {p})",
+            (day, visits[day], sketch.count(), sketch.to_bytes()),
+        )
+    return visits
+
+
+def _recompute_all(conn) -> Tuple[int, int]:
+    """Set the all-time row to the merge of every day row; returns (visits, unique)."""
+    p = _placeholder()
+    lock = " FOR UPDATE" if DATABASE_URL else ""
+    _execute(conn, f"INSERT INTO visitor_rollups (period) VALUES ({p}) ON CONFLICT (period) DO NOTHING", (ROLLUP_ALL,))
+    _execute(conn, f"SELECT visits FROM visitor_rollups WHERE period = {p}{lock}", (ROLLUP_ALL,)).fetchone()
+    rows = _execute(conn, f"SELECT visits, hll FROM visitor_rollups WHERE period <> {p}", (ROLLUP_ALL,)).fetchall()
+    sketch = HyperLogLog.union(HyperLogLog.from_bytes(hll) for _, hll in rows if hll)
+    total, unique = sum(visits for visits, _ in rows), sketch.count()
+    _execute(
+        conn, f"UPDATE visitor_rollups SET visits = {p}, unique_visitors = {p}, hll = {p} WHERE period = {p}",
+        (total, unique, sketch.to_bytes(), ROLLUP_ALL),
+    )
+    return total, unique
+
+
+def _write_visits(rows: Sequence[Visit]) -> None:
+    """Insert visits into their partitions and update the rollups, in one transaction."""
+    try:
+        with _connection() as conn:
+            _insert_events(conn, rows)
+            _update_rollups(conn, rows)
+    except Exception:
+        # Partitions created in the rolled-back transaction no longer exist
+        with _partitions_lock:
+            _known_partitions.clear()
+        raise
+
+
+class VisitBuffer:
+    """Bounded queue of visits drained by a background flusher thread."""
+
+    def __init__(self, maxsize: int = VISITOR_BUFFER_SIZE, batch_size: int = VISITOR_FLUSH_BATCH,
+                 interval: float = VISITOR_FLUSH_INTERVAL):
+        self.maxsize = maxsize
+        self.batch_size = max(1, batch_size)
+        self.interval = interval
+        self.stats = {"enqueued": 0, "written": 0, "dropped": 0, "batches": 0, "write_errors": 0, "lost": 0}
+        self._queue: "queue.Queue[Visit]" = queue.Queue(maxsize)
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _ensure_flusher(self) -> None:
+        # Forked workers inherit the queue but not the thread: start afresh
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                if self._pid is not None and self._pid != os.getpid():
+                    self._queue = queue.Queue(self.maxsize)
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name="visitor-flush", daemon=True)
+                self._thread.start()
+
+    def put(self, visit: Visit) -> bool:
+        """Enqueue without blocking; False (and counted) if the buffer is full."""
+        self._ensure_flusher()
+        try:
+            self._queue.put_nowait(visit)
+        except queue.Full:
+            with self._lock:
+                self.stats["dropped"] += 1
+                dropped = self.stats["dropped"]
+            if dropped == 1 or dropped % 1000 == 0:
+                logger.warning("Visitor buffer full — %d events dropped so far", dropped)
+            return False
+        with self._lock:
+            self.stats["enqueued"] += 1
+        return True
+
+    def _take(self, first_timeout: float, window: float) -> List[Visit]:
+        """Block up to first_timeout for one event, then gather more for up to `window` seconds."""
+        try:
+            batch = [self._queue.get(timeout=first_timeout)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + window
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch: List[Visit]) -> None:
+        try:
+            _write_visits(batch)
+            with self._lock:
+                self.stats["written"] += len(batch)
+                self.stats["batches"] += 1
+        except Exception:
+            logger.exception("Failed to write %d visitor events", len(batch))
+            with self._lock:
+                self.stats["write_errors"] += 1
+                self.stats["lost"] += len(batch)
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+    def _run(self) -> None:
+        while True:
+            batch = self._take(first_timeout=3600, window=self.interval)
+            if batch:
+                self._write(batch)
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Write everything queued so far; True once the flusher has nothing in flight."""
+        while True:
+            batch = self._take(first_timeout=0, window=0)
+            if not batch:
+                break
+            self._write(batch)
+        deadline = time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+        stats.update(queued=self._queue.qsize(), capacity=self.maxsize, write_behind=VISITOR_WRITE_BEHIND)
+        return stats
+
+
+_buffer = VisitBuffer()
+atexit.register(lambda: _buffer.flush())
+
+
+def track_visit(ip_address, user_agent="", path="/"):
+    """Record a visitor hit (queued for the background flusher; never blocks on the DB)."""
+    visit = (ip_address, user_agent, datetime.now(timezone.utc).isoformat(), path)
+    if VISITOR_WRITE_BEHIND:
+        _buffer.put(visit)
+        return
+    try:
+        _write_visits([visit])
     except Exception:
         logger.exception("Failed to track visit")
-    finally:
-        conn.close()
+
+
+def flush(timeout: float = 5.0) -> bool:
+    """Write all buffered visits now (shutdown, tests, before exact counts are needed)."""
+    return _buffer.flush(timeout)
+
+
+def buffer_stats() -> Dict[str, Any]:
+    """Write-behind counters: enqueued, written, dropped (buffer full), lost (failed writes), queued."""
+    return _buffer.snapshot()
 
 
 def get_visitor_counts():
-    """Return unique visitor and total visit counts."""
-    conn = _get_db()
+    """Return unique visitor (HyperLogLog estimate) and total visit counts from the all-time rollup."""
     try:
-        if DATABASE_URL:
-            with conn.cursor() as cur:
-                cur.execute("SELECT COUNT(DISTINCT ip_address) FROM visitors")
-                unique = cur.fetchone()[0]
-                cur.execute("SELECT COUNT(*) FROM visitors")
-                total = cur.fetchone()[0]
-        else:
-            unique = conn.execute("SELECT COUNT(DISTINCT ip_address) FROM visitors").fetchone()[0]
-            total = conn.execute("SELECT COUNT(*) FROM visitors").fetchone()[0]
+        with _connection() as conn:
+            row = _execute(
+                conn, f"SELECT unique_visitors, visits FROM visitor_rollups WHERE period = {_placeholder()}",
+                (ROLLUP_ALL,),
+            ).fetchone()
+        unique, total = row if row else (0, 0)
         return {"unique_visitors": unique, "total_visits": total}
     except Exception:
         logger.exception("Failed to get visitor counts")
         return {"unique_visitors": 0, "total_visits": 0, "error": "db_unavailable"}
-    finally:
-        conn.close()
 
 
 def check_db_health():
     """Return True if the visitor database is reachable."""
     try:
-        conn = _get_db()
-        if DATABASE_URL:
-            with conn.cursor() as cur:
-                cur.execute("SELECT 1")
-        else:
-            conn.execute("SELECT 1")
-        conn.close()
+        with _connection() as conn:
+            _execute(conn, "SELECT 1").fetchone()
         return True
     except Exception:
         logger.exception("DB health check failed")
         return False
+
+
+def _lock_for_maintenance(conn) -> None:
+    """Block visit writes until the caller's transaction ends."""
+    if DATABASE_URL:
+        _execute(conn, f"LOCK TABLE {EVENTS_TABLE} IN SHARE MODE")
+    else:
+        conn.execute("BEGIN IMMEDIATE")
+
+
+def _migrate_legacy(conn, batch_size: int = 5000) -> int:
+    """Move rows of the unpartitioned `visitors` table into partitions, then drop it."""
+    if not _table_exists(conn, LEGACY_TABLE):
+        return 0
+    cur = _execute(conn, f"SELECT ip_address, user_agent, visited_at, path FROM {LEGACY_TABLE}")
+    moved = 0
+    while True:
+        rows = cur.fetchmany(batch_size)
+        if not rows:
+            break
+        _insert_events(conn, [(ip, ua or "", ts, path) for ip, ua, ts, path in rows])
+        moved += len(rows)
+    _execute(conn, f"DROP TABLE {LEGACY_TABLE}")
+    logger.info("Moved %d rows from the legacy %s table into partitions", moved, LEGACY_TABLE)
+    return moved
+
+
+def rebuild_rollups() -> Dict[str, Any]:
+    """Recompute the rollups from the raw partitions (backfill / repair).
+
+    Rows of the pre-partitioning `visitors` table are migrated first. Day
+    rows whose raw partitions were already dropped by retention are kept.
+    Visit writes are blocked for the duration, so no batch is counted twice.
+    """
+    flush()
+    started = time.perf_counter()
+    with _connection() as conn:
+        _lock_for_maintenance(conn)
+        migrated = _migrate_legacy(conn)
+        visits = _rebuild_days(conn, _scan(conn, _list_partitions(conn)))
+        total, unique = _recompute_all(conn)
+    return {
+        "migrated_legacy_rows": migrated,
+        "rows_scanned": sum(visits.values()),
+        "days": len(visits),
+        "total_visits": total,
+        "unique_visitors": unique,
+        "elapsed_seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+def apply_retention(days: int = VISITOR_RETENTION_DAYS, now: datetime = None) -> Dict[str, Any]:
+    """Roll up and drop raw partitions that end before `days` ago."""
+    if days <= 0:
+        return {"status": "disabled"}
+    flush()
+    cutoff = ((now or datetime.now(timezone.utc)) - timedelta(days=days)).date()
+    dropped, rolled_up = [], 0
+    with _connection() as conn:
+        _lock_for_maintenance(conn)
+        for name in _list_partitions(conn):
+            if _partition_bounds(name)[1] > cutoff:
+                continue
+            rolled_up += sum(_rebuild_days(conn, _scan(conn, [name])).values())
+            _execute(conn, f"DROP TABLE {name}")
+            with _partitions_lock:
+                _known_partitions.discard(name)
+            dropped.append(name)
+        if dropped:
+            _recompute_all(conn)
+    logger.info("Retention (%d days, cutoff %s): dropped %d partitions, %d rows rolled up",
+                days, cutoff, len(dropped), rolled_up)
+    return {
+        "status": "success",
+        "retention_days": days,
+        "cutoff": cutoff.isoformat(),
+        "dropped_partitions": dropped,
+        "rows_rolled_up": rolled_up,
+    }
+
+
+# Longest calendar range /api/visitors/stats merges sketches for
+MAX_STATS_DAYS = 366
+
+
+def get_daily_stats(start: date, end: date) -> Dict[str, Any]:
+    """Per-day visits/uniques for [start, end] from the rollups, plus the range's merged unique count."""
+    if start > end:
+        raise ValueError("'from' must not be after 'to'")
+    if (end - start).days >= MAX_STATS_DAYS:
+        raise ValueError(f"Date range is limited to {MAX_STATS_DAYS} days")
+    p = _placeholder()
+    with _connection() as conn:
+        # 'all' sorts after every ISO date, so the range never includes it
+        rows = _execute(
+            conn,
+            f"SELECT period, visits, unique_visitors, hll FROM visitor_rollups "
+            f"WHERE period >= {p} AND period <= {p} ORDER BY period",
+            (start.isoformat(), end.isoformat()),
+        ).fetchall()
+    sketch = HyperLogLog.union(HyperLogLog.from_bytes(hll) for *_, hll in rows if hll)
+    return {
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "total_visits": sum(row[1] for row in rows),
+        "unique_visitors": sketch.count(),
+        "days": [{"date": period, "visits": visits, "unique_visitors": unique} for period, visits, unique, _ in rows],
+        "source": "rollups",
+    }
+
+
+def get_recent_stats(hours: int, now: datetime = None) -> Dict[str, Any]:
+    """Exact visits/uniques over the last `hours` from the raw partitions (indexed range scan)."""
+    if hours <= 0:
+        raise ValueError("hours must be positive")
+    if VISITOR_RETENTION_DAYS > 0 and hours > VISITOR_RETENTION_DAYS * 24:
+        raise ValueError(f"Raw events are kept for {VISITOR_RETENTION_DAYS} days; use from/to for longer ranges")
+    since = (now or datetime.now(timezone.utc)) - timedelta(hours=hours)
+    with _connection() as conn:
+        if DATABASE_URL:
+            # Partition pruning skips every partition before `since`
+            total, unique = _execute(
+                conn, f"SELECT COUNT(*), COUNT(DISTINCT ip_address) FROM {EVENTS_TABLE} WHERE visited_at >= %s",
+                (since,),
+            ).fetchone()
+        else:
+            tables = [n for n in _list_partitions(conn) if _partition_bounds(n)[1] > since.date()]
+            total = unique = 0
+            if tables:
+                union = " UNION ALL ".join(f"SELECT ip_address FROM {t} WHERE visited_at >= ?" for t in tables)
+                total, unique = conn.execute(
+                    f"SELECT COUNT(*), COUNT(DISTINCT ip_address) FROM ({union})",
+                    [int(since.timestamp())] * len(tables),
+                ).fetchone()
+    return {
+        "hours": hours,
+        "since": since.isoformat(),
+        "total_visits": total,
+        "unique_visitors": unique,
+        "source": "raw",
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Visitor database maintenance.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("backfill", help="Migrate the legacy visitors table and rebuild the rollups from raw events")
+    retention_cmd = sub.add_parser("retention", help="Roll up and drop raw partitions past the retention window")
+    retention_cmd.add_argument("--days", type=int, default=VISITOR_RETENTION_DAYS, help="Days of raw events to keep")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    result = rebuild_rollups() if args.command == "backfill" else apply_retention(args.days)
+    print(json.dumps(result, indent=2))